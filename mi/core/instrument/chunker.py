@@ -11,8 +11,13 @@
 __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
+import struct
+
+import numpy
+
 from mi.core.log import get_logger ; log = get_logger()
 
+from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException
 
 class Chunker(object):
@@ -473,4 +478,174 @@ class BinaryChunker(Chunker):
     def __init__(self, data_sieve_fn):
         Chunker.__init__(self, data_sieve_fn)
         self.buffer = []
-    
\ No newline at end of file
+
+
+def running_sum(raw):
+    """
+    The running sum of a byte array, wrapping at 16 bits
+    @param raw numpy uint8 array
+    @retval numpy uint16 array one longer than raw, where element i is the sum of
+        the first i bytes
+    """
+    result = numpy.zeros(len(raw) + 1, dtype=numpy.uint16)
+    numpy.cumsum(raw, dtype=numpy.uint16, out=result[1:])
+    return result
+
+
+class FrameChecksum(BaseEnum):
+    """
+    Checksum kinds understood by the FramingSieve.  The checksum always covers
+    the frame from the sync pattern up to the checksum and is truncated to 16 bits.
+    """
+    NONE = 'none'
+    # sum of the bytes (OPTAA, PD0)
+    BYTE_SUM = 'byte_sum'
+    # sum of the 16 bit little endian words (Nortek)
+    WORD_SUM = 'word_sum'
+
+
+class FramingSieve(object):
+    """
+    A sieve function for binary instruments whose frames start with a sync
+    pattern followed by a length field.  The length and checksum of every
+    candidate frame in the buffer are checked at once with numpy, the checksums
+    from a running sum over the buffer rather than summing the bytes of each
+    candidate.  The sieve then jumps from frame to frame, skipping candidates
+    inside a frame, and resyncs at the next valid candidate after corruption.
+
+    Use an instance wherever a sieve function is expected, for example:
+    StringChunker(FramingSieve('\x7f\x7f', 2, '<H', trailer_size=2,
+                               checksum=FrameChecksum.BYTE_SUM))
+    """
+    def __init__(self, sync, length_offset, length_format, length_multiplier=1,
+                 length_adjustment=0, trailer_size=0, checksum=FrameChecksum.NONE,
+                 checksum_format=None, checksum_seed=0):
+        """
+        @param sync The string each frame starts with
+        @param length_offset The offset of the length field from the start of the frame
+        @param length_format The struct format of the unsigned length field, for
+            example '<H'
+        @param length_multiplier The number of bytes per unit of the length field,
+            for example 2 when the length is a count of words
+        @param length_adjustment The number of bytes to add to the length field
+            (after the multiplier) to give the offset of the checksum, or the end
+            of the frame when there is no checksum
+        @param trailer_size The number of bytes following the checksum offset
+            which are part of the frame, including the checksum and any pad bytes
+        @param checksum One of the FrameChecksum kinds
+        @param checksum_format The struct format of the unsigned checksum, defaults
+            to a short with the byte order of the length field
+        @param checksum_seed The value the checksum sum starts from
+        @throws SampleException if the checksum kind is unknown
+        """
+        if not FrameChecksum.has(checksum):
+            raise SampleException("Unknown frame checksum kind: %s" % checksum)
+
+        if checksum_format is None:
+            checksum_format = length_format[0] + 'H'
+
+        self.sync = sync
+        self.length_offset = length_offset
+        self.length_format = length_format
+        self.length_multiplier = length_multiplier
+        self.length_adjustment = length_adjustment
+        self.trailer_size = trailer_size
+        self.checksum = checksum
+        self.checksum_format = checksum_format
+        self.checksum_seed = checksum_seed
+
+        self._header_size = max(len(sync), length_offset + struct.calcsize(length_format))
+
+    @staticmethod
+    def _read_fields(raw, positions, field_format):
+        """
+        Read an unsigned integer field at each of a number of positions
+        @param raw The buffer as a numpy uint8 array
+        @param positions numpy array of the index of the field in each frame
+        @param field_format The struct format of the field
+        @retval numpy int64 array of the field values
+        """
+        size = struct.calcsize(field_format)
+        byte_shifts = range(size)
+        if field_format[0] == '>':
+            byte_shifts.reverse()
+
+        values = numpy.zeros(len(positions), dtype=numpy.int64)
+        for i, shift in enumerate(byte_shifts):
+            values |= raw[positions + i].astype(numpy.int64) << (8 * shift)
+        return values
+
+    def __call__(self, raw_data):
+        """
+        Find the frames in raw_data
+        @param raw_data The string to search
+        @retval A list of (start, end) tuples, in order and without overlap
+        """
+        data_length = len(raw_data)
+
+        # every sync pattern which could start a frame header, including ones
+        # overlapping a false sync pattern
+        starts = []
+        last_start = data_length - self._header_size
+        start = raw_data.find(self.sync)
+        while 0 <= start <= last_start:
+            starts.append(start)
+            start = raw_data.find(self.sync, start + 1)
+        if not starts:
+            return []
+
+        raw = numpy.frombuffer(raw_data, dtype=numpy.uint8)
+        starts = numpy.array(starts, dtype=numpy.int64)
+
+        checksum_offsets = self._read_fields(raw, starts + self.length_offset, self.length_format) * \
+            self.length_multiplier + self.length_adjustment
+        ends = starts + checksum_offsets + self.trailer_size
+
+        valid = (checksum_offsets >= self._header_size) & (ends <= data_length)
+
+        if self.checksum != FrameChecksum.NONE:
+            checksum_size = struct.calcsize(self.checksum_format)
+            valid &= starts + checksum_offsets + checksum_size <= data_length
+            starts = starts[valid]
+            ends = ends[valid]
+            checksum_offsets = checksum_offsets[valid]
+
+            expected = self._read_fields(raw, starts + checksum_offsets, self.checksum_format)
+            valid = self._checksums(raw, starts, checksum_offsets) == expected
+
+        return_list = []
+        last_end = 0
+        for start, end in zip(starts[valid].tolist(), ends[valid].tolist()):
+            if start >= last_end:
+                return_list.append((start, end))
+                last_end = end
+
+        return return_list
+
+    def _checksums(self, raw, starts, lengths):
+        """
+        Calculate the checksum of each candidate frame from running sums over the
+        whole buffer
+        @param raw The buffer as a numpy uint8 array
+        @param starts numpy array of the start of each frame
+        @param lengths numpy array of the number of bytes covered by each checksum
+        @retval numpy int64 array of the 16 bit checksums
+        """
+        # the checksums are 16 bits, so the running sums can wrap at 16 bits
+        if self.checksum == FrameChecksum.WORD_SUM:
+            # the low bytes of the words are at the same parity as the start of
+            # the frame, the high bytes at the other parity
+            ends = starts + (lengths & ~1)
+            even = running_sum(raw[0::2])
+            odd = running_sum(raw[1::2])
+            even_sums = (even[(ends + 1) // 2] - even[(starts + 1) // 2]).astype(numpy.int64)
+            odd_sums = (odd[ends // 2] - odd[starts // 2]).astype(numpy.int64)
+            odd_start = starts % 2 == 1
+            low = numpy.where(odd_start, odd_sums, even_sums)
+            high = numpy.where(odd_start, even_sums, odd_sums)
+            sums = low + (high << 8)
+        else:
+            byte_sum = running_sum(raw)
+            sums = (byte_sum[starts + lengths] - byte_sum[starts]).astype(numpy.int64)
+
+        return (sums + self.checksum_seed) & 0xFFFF
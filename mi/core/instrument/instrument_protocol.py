@@ -47,6 +47,11 @@ from mi.core.exceptions import InstrumentParameterExpirationException
 MAX_BUFFER_SIZE=32768
 DEFAULT_CMD_TIMEOUT=20
 DEFAULT_WRITE_DELAY=0
+# _get_response polls the buffers at increasing intervals, from the first
+# to the last (seconds), so a prompt that follows right after the command
+# is found promptly
+RESPONSE_POLL_FIRST=0.005
+RESPONSE_POLL_INTERVAL=0.1
 RE_PATTERN = type(re.compile(""))
 
 class InterfaceType(BaseEnum):
@@ -889,6 +894,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
 
         log.debug('_get_response: timeout=%s, prompt_list=%s, expected_prompt=%s, response_regex=%r, promptbuf=%s',
                   timeout, prompt_list, expected_prompt, pattern, self._promptbuf)
+        poll_interval = RESPONSE_POLL_FIRST
         while True:
             if response_regex:
                 match = response_regex.search(self._linebuf)
@@ -901,7 +907,8 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
                         result = self._promptbuf[0:index+len(item)]
                         return item, result
 
-            time.sleep(.1)
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, RESPONSE_POLL_INTERVAL)
 
             if time.time() > starttime + timeout:
                 raise InstrumentTimeoutException("in InstrumentProtocol._get_response()")
@@ -995,9 +1002,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         if (write_delay == 0):
             self._connection.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+            self._connection.send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -1052,9 +1057,7 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         if (write_delay == 0):
             self._connection.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+            self._connection.send_paced(cmd_line, write_delay)
     
     def _do_cmd_direct(self, cmd):
         """
@@ -1076,8 +1079,8 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
         Called by the instrument connection when data is available.
         Append line and prompt buffers.
 
-        Also add data to the chunker and when received call got_chunk
-        to publish results.
+        Also add data to the chunker and pass the structures it finds to
+        _got_chunks to publish results.
         """
 
         data_length = port_agent_packet.get_data_length()
@@ -1094,10 +1097,27 @@ class CommandResponseInstrumentProtocol(InstrumentProtocol):
             self.add_to_buffer(data)
 
             self._chunker.add_chunk(data, timestamp)
+            self._got_chunks(self._next_chunks())
+
+    def _next_chunks(self):
+        """
+        Generate the structures in the chunker until it has no more data
+        @retval generator of (timestamp, structure) tuples
+        """
+        (timestamp, chunk) = self._chunker.get_next_data()
+        while(chunk):
+            yield (timestamp, chunk)
             (timestamp, chunk) = self._chunker.get_next_data()
-            while(chunk):
-                self._got_chunk(chunk, timestamp)
-                (timestamp, chunk) = self._chunker.get_next_data()
+
+    def _got_chunks(self, chunks):
+        """
+        Handle the structures the chunker found in a packet.  By default each
+        structure is passed to _got_chunk in order, subclasses may override
+        this to decode runs of structures together.
+        @param chunks iterable of (timestamp, structure) tuples
+        """
+        for (timestamp, chunk) in chunks:
+            self._got_chunk(chunk, timestamp)
 
     ########################################################################
     # Incoming raw data callback.
@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.pd0 Shared PD0 decoding
+@file mi/core/instrument/pd0.py
+@brief Decoding of Teledyne RDI PD0 ensembles shared by the ADCP instrument
+    drivers and dataset parsers.  Leaders and depth cell arrays are decoded
+    with numpy views of the raw ensemble rather than one struct.unpack per
+    field or cell, and the 16 bit byte sum checksum is computed without a
+    python loop over the ensemble bytes.
+"""
+
+__license__ = 'Apache 2.0'
+
+import re
+
+import numpy
+
+# header bytes in PD0 files flagged by 7F7F
+PD0_HEADER_REGEX = b'\x7f\x7f'
+PD0_HEADER_MATCHER = re.compile(PD0_HEADER_REGEX)
+
+# ensembles end with a 2 byte checksum which is not included in the number of bytes field
+CHECKSUM_BYTES = 2
+# used to verify 16 bit checksum
+CHECKSUM_MASK = 0xFFFF
+
+# each data type starts with its 2 byte ID
+ID_BYTES = 2
+
+# number of beams in each depth cell
+NUM_BEAMS = 4
+
+# fixed leader, '<H8B3H4BH4B2h2B2H4BHQH2BI'
+FIXED_LEADER_DTYPE = numpy.dtype([
+    ('fixed_leader_id', '<u2'),
+    ('firmware_version', 'u1'),
+    ('firmware_revision', 'u1'),
+    ('sysconfig_lsb', 'u1'),
+    ('sysconfig_msb', 'u1'),
+    ('data_flag', 'u1'),
+    ('lag_length', 'u1'),
+    ('num_beams', 'u1'),
+    ('num_cells', 'u1'),
+    ('pings_per_ensemble', '<u2'),
+    ('depth_cell_length', '<u2'),
+    ('blank_after_transmit', '<u2'),
+    ('signal_processing_mode', 'u1'),
+    ('low_corr_threshold', 'u1'),
+    ('num_code_repetitions', 'u1'),
+    ('percent_good_min', 'u1'),
+    ('error_vel_threshold', '<u2'),
+    ('time_per_ping_minutes', 'u1'),
+    ('time_per_ping_seconds', 'u1'),
+    ('time_per_ping_hundredths', 'u1'),
+    ('coord_transform_type', 'u1'),
+    ('heading_alignment', '<i2'),
+    ('heading_bias', '<i2'),
+    ('sensor_source', 'u1'),
+    ('sensor_available', 'u1'),
+    ('bin_1_distance', '<u2'),
+    ('transmit_pulse_length', '<u2'),
+    ('reference_layer_start', 'u1'),
+    ('reference_layer_stop', 'u1'),
+    ('false_target_threshold', 'u1'),
+    ('low_latency_trigger', 'u1'),
+    ('transmit_lag_distance', '<u2'),
+    ('cpu_serial_num', '<u8'),
+    ('system_bandwidth', '<u2'),
+    ('system_power', 'u1'),
+    ('spare', 'u1'),
+    ('serial_number', '<u4'),
+])
+
+# variable leader, '<2H10B3H2hHh18BH2I', the last 4 bytes are spare
+VARIABLE_LEADER_DTYPE = numpy.dtype(
+    [('variable_leader_id', '<u2'),
+     ('ensemble_number', '<u2'),
+     ('rtc_year', 'u1'),
+     ('rtc_month', 'u1'),
+     ('rtc_day', 'u1'),
+     ('rtc_hour', 'u1'),
+     ('rtc_minute', 'u1'),
+     ('rtc_second', 'u1'),
+     ('rtc_hundredths', 'u1'),
+     ('ensemble_number_increment', 'u1'),
+     ('error_bit_field', 'u1'),
+     ('reserved_error_bit_field', 'u1'),
+     ('speed_of_sound', '<u2'),
+     ('transducer_depth', '<u2'),
+     ('heading', '<u2'),
+     ('pitch', '<i2'),
+     ('roll', '<i2'),
+     ('salinity', '<u2'),
+     ('temperature', '<i2')] +
+    [(name, 'u1') for name in (
+        'mpt_minutes', 'mpt_seconds_component', 'mpt_hundredths_component',
+        'heading_stdev', 'pitch_stdev', 'roll_stdev',
+        'adc_transmit_current', 'adc_transmit_voltage', 'adc_ambient_temp',
+        'adc_pressure_plus', 'adc_pressure_minus', 'adc_attitude_temp',
+        'adc_attitude', 'adc_contamination_sensor',
+        'error_status_word_1', 'error_status_word_2', 'error_status_word_3',
+        'error_status_word_4')] +
+    [('spare1', '<u2'),
+     ('pressure', '<u4'),
+     ('pressure_variance', '<u4'),
+     ('spare2', '<u4')])
+
+# depth cell element types
+VELOCITY_DTYPE = numpy.dtype('<i2')
+BYTE_DTYPE = numpy.dtype('u1')
+
+
+def byte_sum(data):
+    """
+    Sum all the bytes in data
+    @param data The raw bytes
+    @retval The unbounded sum as an int
+    """
+    return int(numpy.frombuffer(data, dtype=numpy.uint8).sum(dtype=numpy.uint64))
+
+
+def calculate_checksum(data, length=None):
+    """
+    Calculate the PD0 checksum, the sum of all the bytes in the ensemble
+    modulo 65536
+    @param data The raw ensemble
+    @param length The number of bytes to include in the sum, defaults to
+        the whole of data
+    @retval The checksum as an int
+    """
+    if length is not None:
+        data = data[:length]
+    return byte_sum(data) & CHECKSUM_MASK
+
+
+def unpack_leader(data, dtype):
+    """
+    Unpack a leader (or any other fixed layout block) with a structured dtype
+    @param data The raw bytes, starting at the leader ID. Bytes past the end of
+        the dtype are ignored
+    @param dtype The structured numpy dtype describing the leader
+    @retval A tuple of python values, in the same order as the dtype fields
+    @throws ValueError if data is shorter than the dtype
+    """
+    return numpy.frombuffer(data, dtype=dtype, count=1)[0].item()
+
+
+def unpack_cells(data, num_cells, dtype, offset=ID_BYTES):
+    """
+    Unpack a depth cell array, num_cells rows of one value per beam
+    @param data The raw bytes of the data type
+    @param num_cells The number of depth cells to unpack
+    @param dtype The numpy dtype of a single beam value
+    @param offset The offset of the first cell in data, by default just after
+        the data type ID
+    @retval A list with one list of values per beam
+    @throws ValueError if data is too short for num_cells
+    """
+    if num_cells <= 0:
+        return [[] for _ in range(NUM_BEAMS)]
+    cells = numpy.frombuffer(data, dtype=dtype, count=num_cells * NUM_BEAMS, offset=offset)
+    return cells.reshape(num_cells, NUM_BEAMS).T.tolist()
+
+
+def find_ensembles(input_buffer):
+    """
+    Find all the complete ensembles in a buffer.  An ensemble is considered
+    to be properly framed if there is a sync word and the checksum matches.
+    The checksum of every candidate ensemble is taken from a single running sum
+    over the buffer rather than summing the bytes of each candidate.
+    @param input_buffer The raw data to search
+    @retval A list of (start, end) tuples, end includes the checksum bytes
+    """
+    # don't look in the last 2 bytes because you will not have num bytes
+    search_end = max(len(input_buffer) - CHECKSUM_BYTES, 0)
+
+    starts = [match.start() for match in PD0_HEADER_MATCHER.finditer(input_buffer, 0, search_end)]
+    if not starts:
+        return []
+
+    raw = numpy.frombuffer(input_buffer, dtype=numpy.uint8)
+    starts = numpy.array(starts, dtype=numpy.int64)
+
+    # the number of bytes in each record, does not include the 2 checksum bytes
+    num_bytes = raw[starts + 2].astype(numpy.int64) | (raw[starts + 3].astype(numpy.int64) << 8)
+    ends = starts + num_bytes
+
+    # only check records which are entirely in the buffer, including checksum bytes
+    complete = ends <= search_end
+    starts = starts[complete]
+    ends = ends[complete]
+    if len(starts) == 0:
+        return []
+
+    running_sum = numpy.zeros(len(raw) + 1, dtype=numpy.uint64)
+    numpy.cumsum(raw, dtype=numpy.uint64, out=running_sum[1:])
+
+    checksums = (running_sum[ends] - running_sum[starts]) & CHECKSUM_MASK
+    expected = raw[ends].astype(numpy.uint64) | (raw[ends + 1].astype(numpy.uint64) << 8)
+
+    valid = checksums == expected
+    return zip(starts[valid].tolist(), (ends[valid] + CHECKSUM_BYTES).tolist())
@@ -278,6 +278,9 @@ class PortAgentClient(object):
         self.listener_callback_error = None
         self.last_retry_time = None
         self.recovery_mutex = threading.Lock()
+        # time before which the next byte must not go to the data port, set
+        # by send_paced to keep write_delay after its last character
+        self.paced_send_deadline = None
         
     def _init_comms(self):
         """
@@ -517,6 +520,7 @@ class PortAgentClient(object):
         """
         if (not sock):
             sock = self.sock
+            self._wait_paced_send_deadline()
 
         if (not host):
             host = self.host
@@ -563,6 +567,42 @@ class PortAgentClient(object):
         
         return total_bytes_sent
             
+    def send_paced(self, data, write_delay):
+        """
+        Send data to the port agent one character at a time, for instruments
+        that cannot take their input at full speed. Each character is sent
+        write_delay seconds after the send of the previous one returned, and
+        the next byte sent to the data port, by this or any later call, waits
+        write_delay after the last character. The waits are plain time.sleep
+        calls, which yield to the other greenlets when gevent has patched the
+        process.
+        @param data The data to send.
+        @param write_delay Seconds between consecutive characters.
+        @retval The number of bytes sent.
+        """
+        if write_delay <= 0:
+            return self.send(data)
+
+        total_bytes_sent = 0
+        for char in data:
+            total_bytes_sent += self.send(char)
+            self.paced_send_deadline = time.time() + write_delay
+
+        return total_bytes_sent
+
+    def _wait_paced_send_deadline(self):
+        """
+        Sleep until the write_delay following the last character sent by
+        send_paced has passed.
+        """
+        if self.paced_send_deadline is None:
+            return
+
+        delay = self.paced_send_deadline - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self.paced_send_deadline = None
+
     def _invoke_error_callback(self, error_string = "No error string passed."):
         """
         Invoke callback_error; and its return_code indicates that it failed to
@@ -11,7 +11,10 @@ __author__ = 'Steve Foley'
 __license__ = 'Apache 2.0'
 
 import unittest
+import os
+import random
 import re
+import struct
 from functools import partial
 from mi.core.unit_test import MiUnitTest, MiUnitTestCase
 from nose.plugins.attrib import attr
@@ -19,7 +22,9 @@ from pyon.util.unit_test import IonUnitTestCase
 from ooi.logging import log
 
 from mi.core.exceptions import SampleException
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, FramingSieve, FrameChecksum
+from mi.core.instrument.pd0 import PD0_HEADER_REGEX, find_ensembles
+from mi.idk.config import Config
 
 @attr('UNIT', group='mi')
 class UnitTestStringChunker(MiUnitTestCase):
@@ -380,3 +385,219 @@ class UnitTestBinaryChunker(MiUnitTestCase):
         """
         pass
     
+
+
+# OPTAA packets, framed by a big endian record length at offset 4 which is the offset of the
+# big endian checksum, followed by a pad byte
+OPTAA_SYNC = '\xff\x00\xff\x00'
+OPTAA_SYNC_REGEX = re.compile(OPTAA_SYNC)
+
+# Nortek velocity structures, with the size in words at offset 2 and a word sum checksum seeded
+# with 0xb58c in the last word
+NORTEK_SYNC = '\xa5\x01'
+NORTEK_WORDS = 21
+NORTEK_REGEX = re.compile(r'%s%s.{%d}' % (NORTEK_SYNC, struct.pack('<H', NORTEK_WORDS), 2 * NORTEK_WORDS - 4),
+                          re.DOTALL)
+NORTEK_CHECKSUM_SEED = 0xb58c
+
+PD0_RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver',
+                                 'moas', 'gl', 'adcpa', 'resource')
+
+
+def optaa_reference_sieve(raw_data):
+    """
+    The sample sieve from the OPTAA driver before it used the FramingSieve
+    """
+    return_list = []
+    for match in OPTAA_SYNC_REGEX.finditer(raw_data):
+        if match.start() + 6 < len(raw_data):
+            packet_length = ord(raw_data[match.start() + 4]) * 256 + ord(raw_data[match.start() + 5]) + 3
+            if match.start() + packet_length <= len(raw_data):
+                return_list.append((match.start(), match.start() + packet_length))
+    return return_list
+
+
+def nortek_reference_sieve(raw_data):
+    """
+    A regex sieve in the style of the Nortek drivers
+    """
+    return [(match.start(), match.end()) for match in NORTEK_REGEX.finditer(raw_data)]
+
+
+def optaa_checksum_valid(frame):
+    """
+    The byte by byte checksum check done by the OPTAA sample particle
+    """
+    record_length = ord(frame[4]) * 256 + ord(frame[5])
+    checksum = 0
+    for i in range(0, record_length):
+        checksum += ord(frame[i])
+        checksum &= 0xffff
+    return checksum == ord(frame[record_length]) * 256 + ord(frame[record_length + 1])
+
+
+def nortek_checksum_valid(frame):
+    """
+    The word by word checksum check done by the Nortek particles
+    """
+    checksum = NORTEK_CHECKSUM_SEED
+    for i in range(0, len(frame) - 2, 2):
+        checksum += struct.unpack_from('<H', frame, i)[0]
+    return checksum & 0xffff == struct.unpack_from('<H', frame, len(frame) - 2)[0]
+
+
+def build_optaa_packet(rand, num_wavelengths):
+    """
+    Build an OPTAA sample packet with random contents and a valid checksum
+    """
+    body = ''.join(chr(rand.randint(0, 255)) for _ in range(26 + 8 * num_wavelengths))
+    record = OPTAA_SYNC + struct.pack('>H', 6 + len(body)) + body
+    checksum = sum(ord(c) for c in record) & 0xFFFF
+    return record + struct.pack('>H', checksum) + '\x00'
+
+
+def build_nortek_frame(rand):
+    """
+    Build a Nortek velocity structure with random contents and a valid checksum
+    """
+    record = NORTEK_SYNC + struct.pack('<H', NORTEK_WORDS) + \
+        ''.join(chr(rand.randint(0, 255)) for _ in range(2 * NORTEK_WORDS - 6))
+    checksum = (NORTEK_CHECKSUM_SEED + sum(struct.unpack('<%dH' % (NORTEK_WORDS - 1), record))) & 0xFFFF
+    return record + struct.pack('<H', checksum)
+
+
+def build_capture(frames, rand, garbage_rate, sync):
+    """
+    Join frames into a capture, inserting garbage (including sync patterns)
+    between some of them
+    @retval The capture and the list of (start, end) of each frame in it
+    """
+    capture = []
+    indices = []
+    position = 0
+    for frame in frames:
+        if rand.random() < garbage_rate:
+            garbage = ''.join(chr(rand.randint(0, 255)) for _ in range(rand.randint(1, 60)))
+            garbage = garbage[:rand.randint(0, len(garbage))] + sync + garbage
+            capture.append(garbage)
+            position += len(garbage)
+        capture.append(frame)
+        indices.append((position, position + len(frame)))
+        position += len(frame)
+    return ''.join(capture), indices
+
+
+@attr('UNIT', group='mi')
+class UnitTestFramingSieve(MiUnitTestCase):
+    """
+    Compare the framing sieve with the hand written binary sieves
+    """
+    def setUp(self):
+        self.rand = random.Random(1234)
+        self.optaa_sieve = FramingSieve(OPTAA_SYNC, 4, '>H', trailer_size=3,
+                                        checksum=FrameChecksum.BYTE_SUM)
+        self.nortek_sieve = FramingSieve(NORTEK_SYNC, 2, '<H', length_multiplier=2, length_adjustment=-2,
+                                         trailer_size=2, checksum=FrameChecksum.WORD_SUM,
+                                         checksum_seed=NORTEK_CHECKSUM_SEED)
+        self.pd0_sieve = FramingSieve(PD0_HEADER_REGEX, 2, '<H', trailer_size=2,
+                                      checksum=FrameChecksum.BYTE_SUM)
+
+    def test_clean_frames(self):
+        """
+        Without corruption the framing sieve finds the same frames as the
+        existing sieves
+        """
+        optaa, optaa_indices = build_capture([build_optaa_packet(self.rand, 80) for _ in range(50)],
+                                             self.rand, 0, OPTAA_SYNC)
+        self.assertEqual(self.optaa_sieve(optaa), optaa_indices)
+        self.assertEqual(optaa_reference_sieve(optaa), optaa_indices)
+
+        nortek, nortek_indices = build_capture([build_nortek_frame(self.rand) for _ in range(200)],
+                                               self.rand, 0, NORTEK_SYNC)
+        self.assertEqual(self.nortek_sieve(nortek), nortek_indices)
+        self.assertEqual(nortek_reference_sieve(nortek), nortek_indices)
+
+        for file_name in ('LA101636.PD0', 'LB180210_50.PD0'):
+            with open(os.path.join(PD0_RESOURCE_PATH, file_name), 'rb') as stream_handle:
+                pd0 = stream_handle.read()
+            self.assertEqual(self.pd0_sieve(pd0), find_ensembles(pd0))
+
+        self.assertEqual(self.optaa_sieve(''), [])
+        self.assertEqual(self.optaa_sieve(OPTAA_SYNC + '\x00'), [])
+        self.assertRaises(SampleException, FramingSieve, OPTAA_SYNC, 4, '>H', checksum='crc')
+
+    def test_resync(self):
+        """
+        Every frame is found when garbage containing sync patterns is inserted
+        between them, and corrupted frames are skipped
+        """
+        packets = [build_optaa_packet(self.rand, 20) for _ in range(300)]
+        optaa, optaa_indices = build_capture(packets, self.rand, 0.3, OPTAA_SYNC)
+        self.assertEqual(self.optaa_sieve(optaa), optaa_indices)
+
+        nortek, nortek_indices = build_capture([build_nortek_frame(self.rand) for _ in range(300)],
+                                               self.rand, 0.3, NORTEK_SYNC)
+        self.assertEqual(self.nortek_sieve(nortek), nortek_indices)
+
+        # corrupt a byte in the middle of the second packet
+        start, end = optaa_indices[1]
+        middle = (start + end) / 2
+        corrupted = optaa[:middle] + chr((ord(optaa[middle]) + 1) % 256) + optaa[middle + 1:]
+        self.assertEqual(self.optaa_sieve(corrupted), optaa_indices[:1] + optaa_indices[2:])
+
+    def test_chunker(self):
+        """
+        Frames fed to the chunker in random fragments come out whole and in order
+        """
+        packets = [build_optaa_packet(self.rand, 20) for _ in range(50)]
+        optaa, optaa_indices = build_capture(packets, self.rand, 0.3, OPTAA_SYNC)
+
+        chunker = StringChunker(self.optaa_sieve)
+        chunks = []
+        position = 0
+        while position < len(optaa):
+            size = self.rand.randint(1, 500)
+            chunker.add_chunk(optaa[position:position + size], 3569168821.102485)
+            position += size
+            (timestamp, chunk) = chunker.get_next_data()
+            while chunk is not None:
+                chunks.append(chunk)
+                (timestamp, chunk) = chunker.get_next_data()
+
+        self.assertEqual(chunks, packets)
+
+    def test_captures(self):
+        """
+        Over captures with injected garbage the framing sieve finds every frame,
+        without overlap, and every frame the existing sieves find with a valid
+        checksum.  The OPTAA and Nortek sieves do not check the checksum, which
+        their particles then do.
+        """
+        captures = [
+            (self.optaa_sieve, optaa_reference_sieve, optaa_checksum_valid,
+             build_capture([build_optaa_packet(self.rand, 80) for _ in range(100)],
+                           self.rand, 0.1, OPTAA_SYNC)),
+            (self.nortek_sieve, nortek_reference_sieve, nortek_checksum_valid,
+             build_capture([build_nortek_frame(self.rand) for _ in range(500)],
+                           self.rand, 0.1, NORTEK_SYNC)),
+        ]
+
+        pd0_frames = []
+        for file_name in ('LA101636.PD0', 'LB180210_50.PD0'):
+            with open(os.path.join(PD0_RESOURCE_PATH, file_name), 'rb') as stream_handle:
+                pd0 = stream_handle.read()
+            pd0_frames.extend(pd0[start:end] for start, end in find_ensembles(pd0))
+        captures.append((self.pd0_sieve, find_ensembles, None,
+                         build_capture(pd0_frames * 2, self.rand, 0.1, PD0_HEADER_REGEX)))
+
+        for framing_sieve, reference_sieve, checksum_valid, (capture, indices) in captures:
+            reference_result = reference_sieve(capture)
+            if checksum_valid is not None:
+                reference_result = [(start, end) for start, end in reference_result
+                                    if checksum_valid(capture[start:end])]
+
+            framing_result = framing_sieve(capture)
+            self.assertEqual(framing_result, indices)
+            self.assertFalse(StringChunker.overlaps(framing_result))
+            # the existing sieves miss frames whose sync pattern overlaps one in the garbage
+            self.assertTrue(set(reference_result) <= set(framing_result))
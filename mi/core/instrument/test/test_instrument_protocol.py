@@ -13,8 +13,10 @@ __license__ = 'Apache 2.0'
 import re
 import time
 import ntplib
+import socket
 import datetime
-from mock import Mock
+import threading
+from mock import Mock, patch
 from nose.plugins.attrib import attr
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.instrument.instrument_fsm import ThreadSafeFSM
@@ -22,6 +24,7 @@ from mi.core.instrument.instrument_driver import DriverParameter
 from mi.core.instrument.instrument_protocol import InstrumentProtocol
 from mi.core.instrument.instrument_protocol import MenuInstrumentProtocol
 from mi.core.instrument.instrument_protocol import CommandResponseInstrumentProtocol
+from mi.core.instrument.port_agent_client import PortAgentClient
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.instrument_driver import ConfigMetadataKey
 from mi.instrument.satlantic.par_ser_600m.driver import SAMPLE_REGEX
@@ -613,6 +616,176 @@ class TestUnitCommandInstrumentProtocol(MiUnitTestCase):
                           self.TestEvent.TEST, expected_prompt=">", response_regex=regex1)
 
 
+class SlowInstrument(threading.Thread):
+    """
+    Simulated instrument reading its input one character at a time. It
+    records every command line and answers it with the prompt.
+    """
+    def __init__(self, sock, protocol):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.sock = sock
+        self.protocol = protocol
+        self.commands = []
+
+    def run(self):
+        line = ''
+        while True:
+            try:
+                char = self.sock.recv(1)
+            except socket.error:
+                # the socket was closed under us, the test is over
+                break
+            if not char:
+                break
+            line += char
+            if char == '\r':
+                self.commands.append(line)
+                self.protocol.add_to_buffer('%s\n>' % line)
+                line = ''
+
+
+@attr('UNIT', group='mi')
+class TestUnitPacedCommands(MiUnitTestCase):
+    """
+    Test cases for commands sent with a write_delay, through a port agent
+    client to a simulated slow instrument.
+    """
+    WRITE_DELAY = 0.02
+
+    def setUp(self):
+        self.protocol = CommandResponseInstrumentProtocol([">"], "\r", lambda event, value=None: None)
+        self.protocol._add_build_handler('set', lambda cmd, key, value: '%s=%s\r' % (key, value))
+        self.protocol._wakeup = lambda timeout, delay=1: ">"
+        self.protocol.get_current_state = Mock(return_value=None)
+
+        def set_params(params, startup=False):
+            for key, value in sorted(params.iteritems()):
+                self.protocol._do_cmd_resp('set', key, value, expected_prompt='>', timeout=5,
+                                           write_delay=self.WRITE_DELAY)
+        self.protocol._set_params = set_params
+
+        for index in range(8):
+            self.protocol._param_dict.add("param%d" % index, r'param%d=(.*)' % index,
+                                          lambda match: int(match.group(1)),
+                                          str,
+                                          startup_param=True,
+                                          default_value=1000 + index)
+
+        client_sock, instrument_sock = socket.socketpair()
+        self.protocol._connection = PortAgentClient('localhost', 0, None)
+        self.protocol._connection.sock = client_sock
+        self.instrument = SlowInstrument(instrument_sock, self.protocol)
+        self.instrument.start()
+
+        # cleanups run last in first out: closing the client socket ends the
+        # instrument thread, which is joined before its socket is closed
+        self.addCleanup(instrument_sock.close)
+        self.addCleanup(self.instrument.join, 5)
+        self.addCleanup(client_sock.close)
+
+    def test_apply_startup_params(self):
+        """
+        Verify applying the startup parameters sends every command to the
+        slow instrument, each waiting for the prompt before the next.  The
+        byte timing of the paced sends is verified with a fake clock in
+        TestUnitPacedSend.
+        """
+        self.protocol.apply_startup_params()
+
+        self.assertEqual(self.instrument.commands,
+                         ['param%d=%d\r' % (index, 1000 + index) for index in range(8)])
+
+
+class FakeClock(object):
+    """
+    Clock for the port agent client, advanced by its sleeps and by the time
+    each send takes.
+    """
+    def __init__(self, send_time):
+        self.now = 1000.0
+        self.send_time = send_time
+        self.sleeps = []
+        self.sends = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    def send(self, data):
+        """
+        socket send, recording when each byte went out
+        """
+        self.sends.append((data, self.now))
+        self.now += self.send_time
+        return len(data)
+
+
+@attr('UNIT', group='mi')
+class TestUnitPacedSend(MiUnitTestCase):
+    """
+    Test the byte timing of paced sends, with a fake clock.
+    """
+    WRITE_DELAY = 0.2
+    SEND_TIME = 0.01
+
+    def setUp(self):
+        self.clock = FakeClock(self.SEND_TIME)
+        patcher = patch('mi.core.instrument.port_agent_client.time',
+                        Mock(time=self.clock.time, sleep=self.clock.sleep))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.connection = PortAgentClient('localhost', 0, None)
+        self.connection.sock = Mock(send=self.clock.send)
+
+        self.protocol = CommandResponseInstrumentProtocol([">"], "\r", lambda event, value=None: None)
+        self.protocol._add_build_handler('set', lambda cmd, key, value: '%s=%s\r' % (key, value))
+        self.protocol._wakeup = lambda timeout, delay=1: ">"
+        self.protocol._connection = self.connection
+
+    def assert_paced(self, data):
+        """
+        Verify data was sent one byte at a time, each byte write_delay after
+        the send of the previous one returned.
+        """
+        self.assertEqual(''.join(char for char, sent in self.clock.sends), data)
+        for (_, previous), (_, sent) in zip(self.clock.sends, self.clock.sends[1:]):
+            self.assertAlmostEqual(sent - (previous + self.SEND_TIME), self.WRITE_DELAY)
+
+    def test_send_paced(self):
+        """
+        Verify the gap between characters is the send time plus write_delay,
+        and send_paced returns without sleeping after the last character.
+        """
+        sent = self.connection.send_paced('param0=1\r', self.WRITE_DELAY)
+
+        self.assertEqual(sent, 9)
+        self.assert_paced('param0=1\r')
+        self.assertEqual(len(self.clock.sleeps), 8)
+        self.assertAlmostEqual(self.clock.now, self.clock.sends[-1][1] + self.SEND_TIME)
+
+    def test_back_to_back_commands(self):
+        """
+        Verify consecutive paced commands, and a plain send following them,
+        keep write_delay after the last character of the previous command.
+        """
+        self.protocol._do_cmd_no_resp('set', 'param0', 1, write_delay=self.WRITE_DELAY)
+        self.protocol._do_cmd_no_resp('set', 'param1', 2, write_delay=self.WRITE_DELAY)
+        self.connection.send('x')
+
+        self.assert_paced('param0=1\rparam1=2\rx')
+
+        # no wait once the delay has passed
+        self.clock.now += self.WRITE_DELAY
+        sleeps = len(self.clock.sleeps)
+        self.connection.send('y')
+        self.assertEqual(len(self.clock.sleeps), sleeps)
+
+
 @attr('UNIT', group='mi')
 class TestUnitMenuInstrumentProtocol(MiUnitTestCase):
     """
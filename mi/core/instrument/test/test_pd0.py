@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.instrument.test.test_pd0
+@file mi/core/instrument/test/test_pd0.py
+@brief Test cases for the shared PD0 decoding
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import random
+import re
+import struct
+
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.unit_test import MiUnitTestCase
+
+from mi.core.instrument.pd0 import FIXED_LEADER_DTYPE, VARIABLE_LEADER_DTYPE, \
+    VELOCITY_DTYPE, BYTE_DTYPE, calculate_checksum, find_ensembles, \
+    unpack_cells, unpack_leader
+
+from mi.idk.config import Config
+RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver',
+                             'moas', 'gl', 'adcpa', 'resource')
+
+FIXED_LEADER_FORMAT = '<H8B3H4BH4B2h2B2H4BHQH2BI'
+VARIABLE_LEADER_FORMAT = '<2H10B3H2hHh18BH2II'
+
+
+def struct_sieve(input_buffer):
+    """
+    Reference sieve which sums the bytes of each candidate ensemble in python
+    """
+    indices_list = []
+    for match in re.finditer(b'\x7f\x7f', input_buffer[0: -2]):
+        record_start = match.start()
+        num_bytes = struct.unpack("<H", input_buffer[record_start + 2: record_start + 4])[0]
+        record_end = record_start + num_bytes
+        if record_end <= len(input_buffer[0: -2]):
+            total = 0
+            for i in range(record_start, record_end):
+                total += ord(input_buffer[i])
+            if total & 65535 == struct.unpack("<H", input_buffer[record_end: record_end + 2])[0]:
+                indices_list.append((record_start, record_end + 2))
+    return indices_list
+
+
+def struct_cells(data, num_cells, cell_format):
+    """
+    Reference cell decoding with one struct unpack per cell
+    """
+    beams = [[], [], [], []]
+    offset = 2
+    cell_size = struct.calcsize(cell_format)
+    for row in range(0, num_cells):
+        for beam, value in zip(beams, struct.unpack_from(cell_format, data, offset)):
+            beam.append(value)
+        offset += cell_size
+    return beams
+
+
+def build_ensemble(num_cells, rand):
+    """
+    Build a PD0 ensemble with fixed and variable leaders and the four depth
+    cell data types, filled with random values
+    @param num_cells The number of depth cells
+    @param rand The random number generator
+    @retval The ensemble, including the checksum
+    """
+    def random_bytes(n):
+        return ''.join(chr(rand.randint(0, 255)) for _ in range(n))
+
+    fixed_leader = '\x00\x00' + random_bytes(6) + chr(4) + chr(num_cells) + random_bytes(48)
+    variable_leader = '\x80\x00' + random_bytes(58)
+    types = [fixed_leader,
+             variable_leader,
+             '\x00\x01' + random_bytes(8 * num_cells),
+             '\x00\x02' + random_bytes(4 * num_cells),
+             '\x00\x03' + random_bytes(4 * num_cells),
+             '\x00\x04' + random_bytes(4 * num_cells)]
+
+    header_bytes = 6 + 2 * len(types)
+    offsets = []
+    offset = header_bytes
+    for data_type in types:
+        offsets.append(offset)
+        offset += len(data_type)
+
+    ensemble = struct.pack('<BBHBB', 0x7f, 0x7f, offset, 0, len(types)) + \
+        struct.pack('<%dH' % len(types), *offsets) + ''.join(types)
+    checksum = sum(ord(c) for c in ensemble) & 65535
+    return ensemble + struct.pack('<H', checksum)
+
+
+@attr('UNIT', group='mi')
+class UnitTestPd0(MiUnitTestCase):
+    """
+    Compare the shared PD0 decoding with struct based decoding
+    """
+
+    def setUp(self):
+        self.rand = random.Random(1234)
+
+    def test_leaders(self):
+        """
+        The structured leader dtypes decode the same values as the leader formats
+        """
+        self.assertEqual(FIXED_LEADER_DTYPE.itemsize, struct.calcsize(FIXED_LEADER_FORMAT))
+        self.assertEqual(VARIABLE_LEADER_DTYPE.itemsize, struct.calcsize(VARIABLE_LEADER_FORMAT))
+
+        for i in range(100):
+            data = ''.join(chr(self.rand.randint(0, 255)) for _ in range(65))
+            self.assertEqual(unpack_leader(data, FIXED_LEADER_DTYPE),
+                             struct.unpack_from(FIXED_LEADER_FORMAT, data))
+            self.assertEqual(unpack_leader(data, VARIABLE_LEADER_DTYPE),
+                             struct.unpack_from(VARIABLE_LEADER_FORMAT, data))
+
+        self.assertRaises(ValueError, unpack_leader, '\x00' * 10, FIXED_LEADER_DTYPE)
+
+    def test_cells(self):
+        """
+        Cell arrays decode to the same beam lists as unpacking cell by cell
+        """
+        for num_cells in (0, 1, 20, 100):
+            data = ''.join(chr(self.rand.randint(0, 255)) for _ in range(2 + 8 * num_cells))
+            self.assertEqual(unpack_cells(data, num_cells, VELOCITY_DTYPE),
+                             struct_cells(data, num_cells, '<4h'))
+            self.assertEqual(unpack_cells(data, num_cells, BYTE_DTYPE),
+                             struct_cells(data, num_cells, '<4B'))
+
+    def test_checksum(self):
+        """
+        The checksum is the sum of the bytes modulo 65536
+        """
+        for length in (0, 1, 300, 5000):
+            data = ''.join(chr(self.rand.randint(0, 255)) for _ in range(length))
+            self.assertEqual(calculate_checksum(data), sum(ord(c) for c in data) & 65535)
+            self.assertEqual(calculate_checksum(data + '\xff\xff', length),
+                             sum(ord(c) for c in data) & 65535)
+
+    def test_find_ensembles(self):
+        """
+        The vectorized sieve finds the same ensembles as summing each candidate,
+        on real files, truncated files and files with garbage inserted
+        """
+        for file_name in ('LA101636.PD0', 'LB180210_50.PD0', 'LB180210_3_corrupted.PD0'):
+            with open(os.path.join(RESOURCE_PATH, file_name), 'rb') as stream_handle:
+                data = stream_handle.read()
+
+            self.assertEqual(find_ensembles(data), struct_sieve(data))
+
+            for i in range(5):
+                cut = self.rand.randint(0, len(data))
+                self.assertEqual(find_ensembles(data[:cut]), struct_sieve(data[:cut]))
+
+                garbage = '\x7f\x7f' + ''.join(chr(self.rand.randint(0, 255)) for _ in range(50))
+                corrupted = data[:cut] + garbage + data[cut:]
+                self.assertEqual(find_ensembles(corrupted), struct_sieve(corrupted))
+
+        self.assertEqual(find_ensembles(''), [])
+        self.assertEqual(find_ensembles('\x7f\x7f\x00'), [])
+
+    def test_ensembles(self):
+        """
+        Verify whole streams of 20 and 100 cell ensembles are framed and
+        decoded the same with struct and numpy
+        """
+        for num_cells in (20, 100):
+            ensembles = [build_ensemble(num_cells, self.rand) for _ in range(20)]
+            data = ''.join(ensembles)
+
+            struct_results = []
+            for start, end in struct_sieve(data):
+                ensemble = data[start:end]
+                result = [struct.unpack_from(FIXED_LEADER_FORMAT, ensemble, 18),
+                          struct.unpack_from(VARIABLE_LEADER_FORMAT, ensemble, 76)]
+                offset = 136
+                result.append(struct_cells(ensemble[offset:], num_cells, '<4h'))
+                offset += 2 + 8 * num_cells
+                for i in range(3):
+                    result.append(struct_cells(ensemble[offset:], num_cells, '<4B'))
+                    offset += 2 + 4 * num_cells
+                struct_results.append(result)
+
+            numpy_results = []
+            for start, end in find_ensembles(data):
+                ensemble = data[start:end]
+                result = [unpack_leader(ensemble[18:], FIXED_LEADER_DTYPE),
+                          unpack_leader(ensemble[76:], VARIABLE_LEADER_DTYPE)]
+                offset = 136
+                result.append(unpack_cells(ensemble[offset:], num_cells, VELOCITY_DTYPE))
+                offset += 2 + 8 * num_cells
+                for i in range(3):
+                    result.append(unpack_cells(ensemble[offset:], num_cells, BYTE_DTYPE))
+                    offset += 2 + 4 * num_cells
+                numpy_results.append(result)
+
+            self.assertEqual(len(numpy_results), len(ensembles))
+            self.assertEqual(numpy_results, struct_results)
@@ -17,6 +17,7 @@ try:
 except ImportError:
     import warnings
     warnings.warn("Failed to import Antelope libs", RuntimeWarning)
+    _pkt = None
 
 __all__ = ['_pkt']
 
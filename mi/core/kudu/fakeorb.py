@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.kudu.fakeorb
+@file mi/core/kudu/fakeorb.py
+@brief An in-process stand in for OrbReapThr, so code that reaps ORB packets
+    can be exercised and benchmarked without an Antelope install or ORB server.
+"""
+
+__license__ = 'Apache 2.0'
+
+import Queue
+import threading
+import time
+
+from mi.core.kudu.brttpkt import NoData, Timeout, Stopped
+
+
+class FakeOrbReapThr(object):
+    """
+    Takes the same arguments and has the same methods as OrbReapThr.  Instead of
+    reaping an ORB, a producer thread queues count packets at rate packets per
+    second, blocking while the queue is full as the real reap thread does.  Each
+    packet is (pktid, srcname, pkttime, packet), and pkttime is the system time the
+    packet was queued, so the latency to publishing a packet can be measured.
+    """
+
+    def __init__(self, orbname, select=None, reject=None,
+                 tafter=-1, timeout=-1, queuesize=64,
+                 rate=None, count=None, srcname='net_sta_chan/GENC', packet=''):
+        """
+        @param orbname, select, reject, tafter Accepted for compatibility with OrbReapThr
+        @param timeout Seconds get waits for a packet, 0 to never wait, negative to wait forever
+        @param queuesize Most packets held in the queue
+        @param rate Packets per second to produce, None to produce them as fast as they are taken
+        @param count Number of packets to produce, None to produce them until stopped
+        @param srcname The source name of every packet
+        @param packet The raw packet contents of every packet
+        """
+        self.orbname = orbname
+        self._timeout = timeout
+        self._queue = Queue.Queue(queuesize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, args=(rate, count, srcname, packet))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _produce(self, rate, count, srcname, packet):
+        """
+        Queue the packets, pacing them at rate
+        """
+        start_time = time.time()
+        pktid = 0
+        while not self._stop.is_set() and (count is None or pktid < count):
+            if rate:
+                delay = start_time + float(pktid) / rate - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put((pktid, srcname, time.time(), packet), timeout=0.1)
+                    break
+                except Queue.Full:
+                    pass
+            pktid += 1
+
+    def stop_and_wait(self):
+        self._stop.set()
+        self._thread.join()
+
+    def set_to_stop(self):
+        self._stop.set()
+
+    def is_stopped(self):
+        return not self._thread.is_alive()
+
+    def get(self):
+        try:
+            if self._timeout == 0:
+                return self._queue.get(False)
+            elif self._timeout > 0:
+                return self._queue.get(True, self._timeout)
+            while True:
+                # wait forever, unless stopped with nothing left to get
+                if self._stop.is_set() and self._queue.empty():
+                    raise Stopped()
+                try:
+                    return self._queue.get(True, 0.1)
+                except Queue.Empty:
+                    pass
+        except Queue.Empty:
+            if self._stop.is_set():
+                raise Stopped()
+            if self._timeout == 0:
+                raise NoData()
+            raise Timeout()
+
+    def destroy(self):
+        self.stop_and_wait()
@@ -6,6 +6,8 @@ __license__ = 'Apache 2.0'
 from os.path import basename, dirname
 from os import makedirs
 from os.path import exists
+import os
+import random
 import sys
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -15,6 +17,7 @@ from mi.core.time import *
 import unittest
 from mi.core.unit_test import MiUnitTest
 import datetime
+import numpy
 import time as system_time
 from mi.idk.exceptions import InvalidParameters
 
@@ -65,3 +68,109 @@ class TestTime(MiUnitTest):
             now = datetime.datetime.utcnow()
             self.assertLess(now.microsecond, 100)
             system_time.sleep(0.1)
+
+
+def legacy_string_to_ntp_date_time(datestr):
+    """
+    The dateutil based conversion string_to_ntp_date_time used to do, only
+    correct when the local timezone is UTC.
+    """
+    import ntplib
+    from dateutil import parser
+    if datestr[-1:] != 'Z':
+        datestr += 'Z'
+    local_sec = float(parser.parse(datestr).strftime("%s.%f"))
+    return ntplib.system_to_ntp_time(local_sec - system_time.timezone)
+
+
+def random_date_string(rand):
+    """
+    Random date string in one of the formats matching DATE_PATTERN.
+    """
+    date = datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=rand.randint(0, 130 * 365 * 86400))
+    datestr = date.strftime('%Y-%m-%dT%H:%M:%S')
+    digits = rand.randint(0, 7)
+    if digits:
+        datestr += '.' + ''.join(rand.choice('0123456789') for _ in range(digits))
+    if rand.random() < 0.5:
+        datestr += 'Z'
+    return datestr
+
+
+@attr('UNIT', group='mi')
+class TestStringToNtpDateTime(MiUnitTest):
+    """
+    Test the ISO8601 to NTP conversions
+    """
+    def setUp(self):
+        self._tz = os.environ.get('TZ')
+        self.addCleanup(self._restore_tz)
+
+    def _set_tz(self, tz):
+        os.environ['TZ'] = tz
+        system_time.tzset()
+
+    def _restore_tz(self):
+        if self._tz is None:
+            os.environ.pop('TZ', None)
+        else:
+            os.environ['TZ'] = self._tz
+        system_time.tzset()
+
+    def test_conversion(self):
+        """
+        Test known conversions and the errors for invalid strings
+        """
+        self.assertEqual(string_to_ntp_date_time("1970-01-01T00:00:00.00Z"), 2208988800.0)
+        self.assertEqual(string_to_ntp_date_time("1970-01-01T00:00:00"), 2208988800.0)
+        self.assertAlmostEqual(string_to_ntp_date_time("1970-01-01T00:01:00.101Z"), 2208988860.101, places=6)
+        self.assertEqual(string_to_ntp_date_time("2000-01-01T00:00:00.00Z"), 3155673600.0)
+        self.assertEqual(string_to_ntp_date_time("2012-02-29T23:59:59.9999999Z"), 3539548799.999999)
+
+        self.assertRaises(IOError, string_to_ntp_date_time, 3155673600)
+        self.assertRaises(ValueError, string_to_ntp_date_time, "09/05/2013 02:47:21.000")
+        for datestr in ["2013-02-29T00:00:00Z", "2013-13-01T00:00:00Z", "2013-01-01T24:00:00Z",
+                        "2013-01-01T00:60:00Z", "2013-01-01T00:00:60Z", "0000-01-01T00:00:00Z"]:
+            self.assertRaises(ValueError, string_to_ntp_date_time, datestr)
+            self.assertRaises(ValueError, strings_to_ntp_date_time, ["2013-01-01T00:00:00Z", datestr])
+
+    def test_matches_dateutil(self):
+        """
+        Compare random dates against the dateutil based conversion
+        """
+        self._set_tz('UTC')
+        rand = random.Random(41)
+        for _ in range(5000):
+            datestr = random_date_string(rand)
+            self.assertAlmostEqual(string_to_ntp_date_time(datestr), legacy_string_to_ntp_date_time(datestr),
+                                   places=6, msg=datestr)
+
+    def test_timezone(self):
+        """
+        Test the conversion does not depend on the local timezone
+        """
+        datestrs = ["1970-01-01T00:00:00Z", "2000-01-01T00:00:00.00Z", "2013-07-01T12:30:00.5", "2013-03-10T02:30:00"]
+        self._set_tz('UTC')
+        expected = [string_to_ntp_date_time(datestr) for datestr in datestrs]
+
+        for tz in ['America/Los_Angeles', 'Asia/Kolkata', 'EST5EDT', 'Pacific/Chatham']:
+            self._set_tz(tz)
+            self.assertEqual([string_to_ntp_date_time(datestr) for datestr in datestrs], expected)
+            self.assertEqual(list(strings_to_ntp_date_time(datestrs)), expected)
+
+    def test_batch(self):
+        """
+        Test the batch conversion gives the same values as one at a time
+        """
+        rand = random.Random(42)
+        datestrs = [random_date_string(rand) for _ in range(5000)]
+        result = strings_to_ntp_date_time(datestrs)
+        self.assertEqual(len(result), len(datestrs))
+        for datestr, timestamp in zip(datestrs, result):
+            self.assertAlmostEqual(timestamp, string_to_ntp_date_time(datestr), places=6, msg=datestr)
+
+        self.assertEqual(len(strings_to_ntp_date_time([])), 0)
+        for datestr in ["0001-01-01T00:00:00Z", "9999-12-31T23:59:59.999999Z"]:
+            self.assertEqual(list(strings_to_ntp_date_time([datestr])), [string_to_ntp_date_time(datestr)])
+        self.assertEqual(list(strings_to_ntp_date_time(numpy.array(datestrs[:3]))),
+                         list(strings_to_ntp_date_time(datestrs[:3])))
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.test.test_time_slice
+@file mi/core/test/test_time_slice.py
+@brief Test the time slices shared between CPU bound greenlets
+"""
+
+__license__ = 'Apache 2.0'
+
+import time
+import gevent
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.time_slice import TimeSlice
+
+@attr('UNIT', group='mi')
+class TestTimeSlice(MiUnitTest):
+    """
+    Test the TimeSlice
+    """
+    def test_cooperate(self):
+        """
+        Test a greenlet only yields once the budget is used up, and other
+        greenlets run when it does
+        """
+        time_slice = TimeSlice(budget=0.05)
+        ran = []
+        gevent.spawn(ran.append, True)
+
+        self.assertFalse(time_slice.cooperate())
+        self.assertEqual(ran, [])
+
+        end = time.time() + 0.06
+        while time.time() < end:
+            pass
+
+        self.assertTrue(time_slice.expired())
+        self.assertTrue(time_slice.cooperate())
+        self.assertEqual(ran, [True])
+        self.assertEqual(time_slice.yields, 1)
+
+        # a new slice started
+        self.assertFalse(time_slice.expired())
+        self.assertFalse(time_slice.cooperate())
@@ -15,8 +15,10 @@ __license__ = 'Apache 2.0'
 
 from mi.core.log import get_logger ; log = get_logger()
 
+import calendar
 import datetime
 import ntplib
+import numpy
 import time
 import re
 from dateutil import parser
@@ -24,6 +26,15 @@ from dateutil import parser
 DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z?$'
 DATE_MATCHER = re.compile(DATE_PATTERN)
 
+# same as DATE_PATTERN, with the fields as groups
+DATE_FIELDS_PATTERN = r'^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?Z?$'
+DATE_FIELDS_MATCHER = re.compile(DATE_FIELDS_PATTERN)
+
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+# seconds from the start of 1900 to the start of 1970
+NTP_DELTA = ntplib.system_to_ntp_time(0)
+
 def get_timestamp_delayed(format):
     '''
     Return a formatted date string of the current utc time,
@@ -71,6 +82,40 @@ def get_timestamp(format):
 
     return time.strftime(format, time.gmtime())
 
+def _iso8601_to_unix_time(datestr):
+        """
+        Convert a date string matching DATE_PATTERN to seconds since the unix
+        epoch, without going through dateutil. The date is always taken to
+        be in UTC; fractions of a second are truncated to microseconds, as
+        dateutil does.
+        @retval (seconds, microseconds), or None if the fields are out of range
+        """
+        year, month, day, hour, minute, second, fraction = DATE_FIELDS_MATCHER.match(datestr).groups()
+        hour, minute, second = int(hour), int(minute), int(second)
+        if hour > 23 or minute > 59 or second > 59:
+            return None
+
+        try:
+            days = datetime.date(int(year), int(month), int(day)).toordinal() - UNIX_EPOCH_ORDINAL
+        except ValueError:
+            return None
+
+        microsecond = int(fraction[:6].ljust(6, '0')) if fraction else 0
+        return days * 86400 + hour * 3600 + minute * 60 + second, microsecond
+
+
+def _dateutil_to_unix_time(datestr):
+        """
+        Convert a date string to seconds since the unix epoch with dateutil,
+        for the dates _iso8601_to_unix_time does not handle. Raises the
+        ValueError from dateutil for invalid dates.
+        @retval (seconds, microseconds)
+        """
+        # This assumes input date string are in UTC (=GMT)
+        date = parser.parse(datestr).replace(tzinfo=None)
+        return calendar.timegm(date.timetuple()), date.microsecond
+
+
 def string_to_ntp_date_time(datestr):
         """
         Extract an ntp date from a ISO8601 formatted date string.
@@ -85,25 +130,45 @@ def string_to_ntp_date_time(datestr):
             raise ValueError("date string not in ISO8601 format YYYY-MM-DDTHH:MM:SS.SSSSZ")
 
         try:
-            # This assumes input date string are in UTC (=GMT)
-            if datestr[-1:] != 'Z':
-                datestr += 'Z'
-
-            # the parsed date time represents a GMT time, but strftime
-            # does not take timezone into account, so these are seconds from the
-            # local start of 1970
-            local_sec = float(parser.parse(datestr).strftime("%s.%f"))
-            # remove the local time zone to convert to gmt (seconds since gmt jan 1 1970)
-            gmt_sec = local_sec - time.timezone
-            # convert to ntp (seconds since gmt jan 1 1900)
-            timestamp = ntplib.system_to_ntp_time(gmt_sec)
-
+            unix_time = _iso8601_to_unix_time(datestr) or _dateutil_to_unix_time(datestr)
         except ValueError as e:
             raise ValueError('Value %s could not be formatted to a date. %s' % (str(datestr), e))
 
-        log.debug("converting time string '%s', unix_ts: %s ntp: %s", datestr, gmt_sec, timestamp)
+        seconds, microsecond = unix_time
+        # convert to ntp (seconds since gmt jan 1 1900)
+        return (seconds + microsecond / 1e6) + NTP_DELTA
+
+
+def strings_to_ntp_date_time(datestrs):
+        """
+        Batch version of string_to_ntp_date_time, converting a sequence of
+        ISO8601 formatted date strings at once.
+        @param datestrs list or array of ISO8601 formatted strings
+        @retval numpy array of ntp date numbers, the same values
+        string_to_ntp_date_time returns for each string
+        @throws ValueError if any of the strings cannot be formatted to a date.
+        """
+        datestrs = list(datestrs)
+        for datestr in datestrs:
+            if not isinstance(datestr, str):
+                raise IOError('Value %s is not a string.' % str(datestr))
+            if not DATE_MATCHER.match(datestr):
+                raise ValueError("date string not in ISO8601 format YYYY-MM-DDTHH:MM:SS.SSSSZ")
+
+        try:
+            # numpy also accepts years outside of the 1..9999 datetime supports
+            if not all(1 <= int(datestr[:4]) <= 9999 for datestr in datestrs):
+                raise ValueError("year out of range")
+            # numpy parses the same fixed format, as UTC
+            microseconds = numpy.array([datestr.rstrip('Z') for datestr in datestrs],
+                                       dtype='datetime64[us]').astype(numpy.int64)
+        except ValueError:
+            # let string_to_ntp_date_time report the invalid one
+            return numpy.array([string_to_ntp_date_time(datestr) for datestr in datestrs], dtype=numpy.float64)
+
+        seconds, microsecond = numpy.divmod(microseconds, 1000000)
+        return (seconds + microsecond / 1e6) + NTP_DELTA
 
-        return timestamp
 
 def time_to_ntp_date_time(unix_time=None):
         """
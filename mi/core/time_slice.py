@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+
+"""
+@package mi.core.time_slice
+@file mi/core/time_slice.py
+@brief Share the gevent hub between CPU bound loops and the rest of a process
+
+Parsing a data file is CPU bound and never blocks, so a parser running in a
+greenlet holds the gevent hub until it is done, and the command handling and
+heartbeats of the process stall until then.  Long loops call cooperate()
+between units of work, which yields to the hub once the time slice budget
+is used up, instead of yielding on every iteration or not at all.
+
+gevent runs one greenlet at a time, so the time since the hub last got
+control is the CPU time the running greenlet has used.  The time slice is
+shared by the whole process, a yield from any loop starts a new slice.
+
+Usage:
+
+from mi.core.time_slice import cooperate
+
+for record in records:
+    parse(record)
+    cooperate()
+"""
+# Needed to import the time module rather than mi.core.time
+from __future__ import absolute_import
+
+__license__ = 'Apache 2.0'
+
+import time
+import gevent
+
+# Seconds a greenlet runs before yielding to the hub
+DEFAULT_BUDGET = 0.05
+
+# Seconds a greenlet sleeps when it yields.  With libev gevent.sleep(0) only
+# runs the greenlets already scheduled, sleeping on a timer lets the hub run
+# the expired timers and pending IO as well.
+YIELD_TIME = 0.0001
+
+class TimeSlice(object):
+    """
+    CPU time budget between two yields to the gevent hub
+    """
+    def __init__(self, budget=DEFAULT_BUDGET):
+        """
+        @param budget seconds a greenlet runs before yielding
+        """
+        self.budget = budget
+        self.yields = 0
+        self._start = time.time()
+
+    def restart(self):
+        """
+        Start a new time slice
+        """
+        self._start = time.time()
+
+    def expired(self):
+        """
+        @retval True if the budget of the current slice is used up
+        """
+        return time.time() - self._start >= self.budget
+
+    def cooperate(self):
+        """
+        Yield to the hub if the budget of the current slice is used up, so
+        other greenlets can run, then start a new slice.
+        @retval True if it yielded
+        """
+        if not self.expired():
+            return False
+
+        gevent.sleep(YIELD_TIME)
+        self.yields += 1
+        self.restart()
+        return True
+
+_time_slice = TimeSlice()
+
+def get_time_slice():
+    """
+    @retval the TimeSlice shared by the process
+    """
+    return _time_slice
+
+def cooperate():
+    """
+    Yield to the hub if the shared time slice is used up
+    @retval True if it yielded
+    """
+    return _time_slice.cooperate()
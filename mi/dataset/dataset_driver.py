@@ -35,6 +35,7 @@ from mi.core.instrument.driver_dict import DriverDict
 from mi.core.instrument.protocol_param_dict import ParameterDictType
 from mi.core.instrument.protocol_param_dict import Parameter
 from mi.core.common import BaseEnum
+from mi.core.time_slice import cooperate
 
 class DataSourceConfigKey(BaseEnum):
     HARVESTER = 'harvester'
@@ -647,6 +648,8 @@ class SimpleDataSetDriver(DataSetDriver):
                     log.trace("Record parsed: %r delay: %f", result, delay)
                     if delay:
                         gevent.sleep(delay)
+                    else:
+                        cooperate()
                 else:
                     break
 
@@ -842,6 +845,8 @@ class SingleFileDataSetDriver(SimpleDataSetDriver):
                     log.trace("Record parsed: %r delay: %f", result, delay)
                     if delay:
                         gevent.sleep(delay)
+                    else:
+                        cooperate()
                 else:
                     break
 
@@ -1187,6 +1192,8 @@ class MultipleHarvesterDataSetDriver(SimpleDataSetDriver):
                 log.trace("Record parsed: %r delay: %f", result, delay)
                 if delay:
                     gevent.sleep(delay)
+                else:
+                    cooperate()
             else:
                 break
 
@@ -16,6 +16,7 @@ import ntplib
 
 from mi.core.log import get_logger
 log = get_logger()
+from mi.core.time_slice import cooperate
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.exceptions import RecoverableSampleException, SampleEncodingException
@@ -249,11 +250,13 @@ class BufferLoadingParser(Parser):
     def _load_particle_buffer(self):
         """
         Load up the internal record buffer with some particles based on a
-        gather from the get_block method.
+        gather from the get_block method.  Yield to other greenlets between
+        blocks once the time slice is used up.
         """
         while self.get_block():
             result = self.parse_chunks()
             self._record_buffer.extend(result)
+            cooperate()
 
     def get_block(self, size=1024):
         """
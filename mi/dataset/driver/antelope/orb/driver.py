@@ -18,6 +18,7 @@ import gevent
 from mi.core.log import get_logger ; log = get_logger()
 
 from mi.core.exceptions import SampleException, ConfigurationException
+from mi.core.time_slice import cooperate
 
 from mi.dataset.dataset_driver import DataSetDriver, DriverStateKey, DataSourceConfigKey
 from mi.dataset.parser.antelope_orb import AntelopeOrbParser, AntelopeOrbPacketParticle
@@ -148,8 +149,9 @@ class AntelopeOrbDataSetDriver(DataSetDriver):
             while True:
                 result = parser.get_records()
                 if result:
-                    pass
                     log.trace("Record parsed: %r", result)
+                    # keep up with the stream, but let the agent run
+                    cooperate()
                 else:
                     log.trace("No record, sleeping")
                     gevent.sleep(delay)
@@ -19,6 +19,7 @@ log = get_logger()
 
 from mi.core.exceptions import ConfigurationException
 from mi.core.common import BaseEnum
+from mi.core.time_slice import cooperate
 
 from mi.dataset.dataset_driver import MultipleHarvesterDataSetDriver, DataSetDriverConfigKeys
 from mi.dataset.dataset_driver import DriverStateKey
@@ -298,5 +299,7 @@ class CgStcEngStcDataSetDriver(MultipleHarvesterDataSetDriver):
                 log.trace("Record parsed: %r delay: %f", result, delay)
                 if delay:
                     gevent.sleep(delay)
+                else:
+                    cooperate()
             else:
                 break
\ No newline at end of file
@@ -10,6 +10,7 @@ __author__ = 'Emily Hahn, Mike Nicoletti, Maria Lutz'
 __license__ = 'Apache 2.0'
 
 import re
+import numpy
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -64,6 +65,23 @@ class StateKey(BaseEnum):
     POSITION = "position"
 
 
+def find_status_starts(raw_data):
+    """
+    Find every index in the raw data where a status message could start in one pass,
+    rather than matching STATUS_START_MATCHER at each record.  Only status messages
+    which are completely in the raw data are included.
+    @param raw_data The raw data read from the file
+    @retval A numpy array of the start indices, in increasing order
+    """
+    last = len(raw_data) - STATUS_BYTES + 1
+    if last <= 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+    raw = numpy.frombuffer(raw_data, dtype=numpy.uint8)
+    starts = (raw[0:last] == 0xff) & (raw[1:last + 1] == 0xff) & \
+             (raw[2:last + 2] == 0xff) & (raw[3:last + 3] >= 0xfa)
+    return numpy.flatnonzero(starts)
+
+
 class WfpEFileParser(BufferLoadingParser):
 
     def __init__(self,
@@ -98,25 +116,25 @@ class WfpEFileParser(BufferLoadingParser):
         This is needed instead of a regex because blocks are identified by position
         in this binary file.
         """
-        data_index = 0
         return_list = []
         raw_data_len = len(raw_data)
-        remain_bytes = raw_data_len
-
-        while data_index < raw_data_len:
-
-            # check if this is a status or data sample message
-            if remain_bytes >= STATUS_BYTES and STATUS_START_MATCHER.match(raw_data[data_index:data_index+4]):
-                return_list.append((data_index, data_index + STATUS_BYTES))
-                data_index += STATUS_BYTES
-            elif remain_bytes >= SAMPLE_BYTES:
-                return_list.append((data_index, data_index + SAMPLE_BYTES))
-                data_index += SAMPLE_BYTES
-            else:
-                log.debug("not enough bytes to deal with")
-                break
-
-            remain_bytes = raw_data_len - data_index
+        data_index = 0
+
+        # walk the possible status starts once, the next status message is the first
+        # one lined up with the data samples from data_index
+        for status_index in find_status_starts(raw_data).tolist():
+            if status_index < data_index or (status_index - data_index) % SAMPLE_BYTES:
+                continue
+
+            return_list.extend((sample_index, sample_index + SAMPLE_BYTES)
+                               for sample_index in xrange(data_index, status_index, SAMPLE_BYTES))
+            return_list.append((status_index, status_index + STATUS_BYTES))
+            data_index = status_index + STATUS_BYTES
+
+        # there are only data samples left, up to the last complete one
+        end_index = data_index + ((raw_data_len - data_index) // SAMPLE_BYTES) * SAMPLE_BYTES
+        return_list.extend((sample_index, sample_index + SAMPLE_BYTES)
+                           for sample_index in xrange(data_index, end_index, SAMPLE_BYTES))
 
         log.debug("returning sieve list %s", return_list)
         return return_list
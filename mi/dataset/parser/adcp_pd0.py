@@ -16,7 +16,6 @@ __license__ = 'Apache 2.0'
 import copy
 import datetime as dt
 import ntplib
-import re
 import struct
 
 from calendar import timegm
@@ -29,12 +28,10 @@ from mi.core.instrument.data_particle import \
     DataParticle, DataParticleKey, DataParticleValue
 from mi.core.exceptions import SampleException, RecoverableSampleException, \
     DatasetParserException, UnexpectedDataException
+from mi.core.instrument.pd0 import FIXED_LEADER_DTYPE, VARIABLE_LEADER_DTYPE, \
+    VELOCITY_DTYPE, BYTE_DTYPE, find_ensembles, unpack_cells, unpack_leader
 from mi.dataset.dataset_parser import BufferLoadingParser
 
-ADCPS_PD0_HEADER_REGEX = b'\x7f\x7f'  # header bytes in PD0 files flagged by 7F7F
-
-ADCPS_PD0_HEADER_MATCHER = re.compile(ADCPS_PD0_HEADER_REGEX)
-
 #define the lengths of ensemble parts
 FIXED_HEADER_BYTES = 6
 NUM_BYTES_BYTES = 2  # The number of bytes for the number of bytes field.
@@ -52,9 +49,6 @@ ADCPS_BOTTOM_TRACK_BYTES = 85
 ADCPA_BOTTOM_TRACK_BYTES = 81
 CHECKSUM_BYTES = 2
 
-#used to verify 16 bit checksum
-CHECKSUM_MODULO = 65535
-
 #IDs of the different parts of the ensemble.
 FIXED_LEADER_ID = 0
 VARIABLE_LEADER_ID = 128
@@ -450,7 +444,7 @@ class AdcpPd0DataParticle(DataParticle):
          reference_layer_stop, false_target_threshold, low_latency_trigger,
          transmit_lag_distance, cpu_serial_num, system_bandwidth,
          system_power, SPARE2, serial_number) = \
-            struct.unpack_from('<H8B3H4BH4B2h2B2H4BHQH2BI', data)
+            unpack_leader(data, FIXED_LEADER_DTYPE)
 
         # store the number of depth cells for use elsewhere
         self.num_depth_cells = num_cells
@@ -616,7 +610,7 @@ class AdcpPd0DataParticle(DataParticle):
          adc_attitiude, adc_contamination_sensor, error_status_word_1,
          error_status_word_2, error_status_word_3, error_status_word_4,
          SPARE1, pressure, pressure_variance, SPARE2) = \
-            struct.unpack_from('<2H10B3H2hHh18BH2II', data)
+            unpack_leader(data, VARIABLE_LEADER_DTYPE)
             #Note: the ADCPS leader has extra bytes at end, handled lower in method
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.ENSEMBLE_NUMBER,
@@ -767,20 +761,8 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the velocity portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        water_velocity_east = []
-        water_velocity_north = []
-        water_velocity_up = []
-        error_velocity = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4h', data, offset)
-            water_velocity_east.append(a)
-            water_velocity_north.append(b)
-            water_velocity_up.append(c)
-            error_velocity.append(d)
-            offset += VELOCITY_BYTES_PER_CELL
+        (water_velocity_east, water_velocity_north, water_velocity_up, error_velocity) = \
+            unpack_cells(data, self.num_depth_cells, VELOCITY_DTYPE)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.WATER_VELOCITY_EAST,
                                                     water_velocity_east, list))
@@ -795,20 +777,9 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the correlation magnitude portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        correlation_magnitude_beam1 = []
-        correlation_magnitude_beam2 = []
-        correlation_magnitude_beam3 = []
-        correlation_magnitude_beam4 = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            correlation_magnitude_beam1.append(a)
-            correlation_magnitude_beam2.append(b)
-            correlation_magnitude_beam3.append(c)
-            correlation_magnitude_beam4.append(d)
-            offset += CORRELATION_BYTES_PER_CELL
+        (correlation_magnitude_beam1, correlation_magnitude_beam2,
+         correlation_magnitude_beam3, correlation_magnitude_beam4) = \
+            unpack_cells(data, self.num_depth_cells, BYTE_DTYPE)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.CORRELATION_MAGNITUDE_BEAM1,
                                                     correlation_magnitude_beam1, list))
@@ -823,20 +794,8 @@ class AdcpPd0DataParticle(DataParticle):
         """
         Parse the echo intensity portion of the particle
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        echo_intesity_beam1 = []
-        echo_intesity_beam2 = []
-        echo_intesity_beam3 = []
-        echo_intesity_beam4 = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            echo_intesity_beam1.append(a)
-            echo_intesity_beam2.append(b)
-            echo_intesity_beam3.append(c)
-            echo_intesity_beam4.append(d)
-            offset += ECHO_INTENSITY_BYTES_PER_CELL
+        (echo_intesity_beam1, echo_intesity_beam2, echo_intesity_beam3, echo_intesity_beam4) = \
+            unpack_cells(data, self.num_depth_cells, BYTE_DTYPE)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.ECHO_INTENSITY_BEAM1,
                                                     echo_intesity_beam1, list))
@@ -853,20 +812,8 @@ class AdcpPd0DataParticle(DataParticle):
 
         @throws RecoverableSampleException If there is a problem with sample creation
         """
-        num_cells = self.num_depth_cells
-        offset = ID_BYTES
-
-        percent_good_3beam = []
-        percent_transforms_reject = []
-        percent_bad_beams = []
-        percent_good_4beam = []
-        for row in range(0, num_cells):
-            (a, b, c, d) = struct.unpack_from('<4B', data, offset)
-            percent_good_3beam.append(a)
-            percent_transforms_reject.append(b)
-            percent_bad_beams.append(c)
-            percent_good_4beam.append(d)
-            offset += PERCENT_GOOD_BYTES_PER_CELL
+        (percent_good_3beam, percent_transforms_reject, percent_bad_beams, percent_good_4beam) = \
+            unpack_cells(data, self.num_depth_cells, BYTE_DTYPE)
 
         self.final_result.append(self._encode_value(AdcpPd0ParserDataParticleKey.PERCENT_GOOD_3BEAM,
                                                     percent_good_3beam, list))
@@ -1124,49 +1071,7 @@ class AdcpPd0Parser(BufferLoadingParser):
         Returns:
           A list of start,end tuples
         """
-
-        #log.debug("sieve called with buffer of length %d", len(input_buffer))
-
-        indices_list = []  # initialize the return list to empty
-        header_iter = ADCPS_PD0_HEADER_MATCHER.finditer(input_buffer[0: -CHECKSUM_BYTES])
-        #find all occurrences of the record header sentinel
-        #don't look in the last 2 bytes because you will not have num bytes
-
-        for match in header_iter:
-
-            record_start = match.start()
-            #place in string where sentinel was found
-
-            #log.debug("sieve function found sentinel at byte  %d", record_start)
-
-            num_bytes = struct.unpack("<H", input_buffer[record_start + 2: record_start + 4])[0]
-            # get the number of bytes in the record, does not include the 2 checksum bytes
-
-            record_end = record_start + num_bytes
-
-            #log.debug("sieve function number of bytes= %d , record end is %d", num_bytes, record_end)
-
-            #if there is enough in the buffer check the record
-            if record_end <= len(input_buffer[0: -CHECKSUM_BYTES]):
-                #make sure the checksum bytes are in the buffer too
-
-                total = 0
-                for i in range(record_start, record_end):
-                    total += ord(input_buffer[i])
-                #add up all the bytes in the record
-
-                checksum = total & CHECKSUM_MODULO  # bitwise and with 65535 or mod vs 65536
-
-                #log.debug("sieve checksum & total = %d %d ", checksum, total)
-
-                if checksum == struct.unpack("<H", input_buffer[record_end: record_end + CHECKSUM_BYTES])[0]:
-                    #verify the checksum
-                    indices_list.append((record_start, record_end + CHECKSUM_BYTES))
-                    #include the 2 checksum bytes in the chunk
-
-                    #log.debug("sieve function found record.  Start = %d End = %d", record_start, record_end)
-
-        return indices_list
+        return find_ensembles(input_buffer)
 
 
 
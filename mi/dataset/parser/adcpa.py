@@ -32,6 +32,7 @@ from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException
 from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
+from mi.core.instrument.pd0 import VELOCITY_DTYPE, BYTE_DTYPE, calculate_checksum, unpack_cells
 from mi.dataset.dataset_parser import BufferLoadingParser
 
 # start the logger
@@ -282,14 +283,9 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result = []
 
         length = unpack("<H", self.raw_data[2:4])[0]
-        data = str(self.raw_data)
 
         # Calculate the checksum
-        total = int(0)
-        for i in range(0, length):
-            total += int(ord(data[i]))
-
-        checksum = total & 65535    # bitwise and with 65535 or mod vs 65536
+        checksum = calculate_checksum(str(self.raw_data), length)
 
         if checksum != unpack("<H", self.raw_data[length: length+2])[0]:
             log.debug("Checksum mismatch " + str(checksum) + " != "
@@ -667,7 +663,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 2 / 4
-        offset = 0
 
         velocity_data_id = unpack("<H", chunk[0:2])[0]
         if 256 != velocity_data_id:
@@ -676,17 +671,8 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.VELOCITY_DATA_ID,
                                   DataParticleKey.VALUE: velocity_data_id})
 
-        water_velocity_east = []
-        water_velocity_north = []
-        water_velocity_up = []
-        error_velocity = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<hhhh', chunk[offset + 2: offset + 10])
-            water_velocity_east.append(a)
-            water_velocity_north.append(b)
-            water_velocity_up.append(c)
-            error_velocity.append(d)
-            offset += 4 * 2
+        (water_velocity_east, water_velocity_north, water_velocity_up, error_velocity) = \
+            unpack_cells(chunk, N, VELOCITY_DTYPE)
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.WATER_VELOCITY_EAST,
                                   DataParticleKey.VALUE: water_velocity_east})
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.WATER_VELOCITY_NORTH,
@@ -703,7 +689,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 4
-        offset = 0
 
         correlation_magnitude_id = unpack("<H", chunk[0:2])[0]
         if 512 != correlation_magnitude_id:
@@ -712,17 +697,9 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_ID,
                                   DataParticleKey.VALUE: correlation_magnitude_id})
 
-        correlation_magnitude_beam1 = []
-        correlation_magnitude_beam2 = []
-        correlation_magnitude_beam3 = []
-        correlation_magnitude_beam4 = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            correlation_magnitude_beam1.append(a)
-            correlation_magnitude_beam2.append(b)
-            correlation_magnitude_beam3.append(c)
-            correlation_magnitude_beam4.append(d)
-            offset += 4
+        (correlation_magnitude_beam1, correlation_magnitude_beam2,
+         correlation_magnitude_beam3, correlation_magnitude_beam4) = \
+            unpack_cells(chunk, N, BYTE_DTYPE)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_BEAM1,
                                   DataParticleKey.VALUE: correlation_magnitude_beam1})
@@ -740,7 +717,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 4
-        offset = 0
 
         echo_intensity_id = unpack("<H", chunk[0:2])[0]
         if 768 != echo_intensity_id:
@@ -748,17 +724,8 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.ECHO_INTENSITY_ID,
                                   DataParticleKey.VALUE: echo_intensity_id})
 
-        echo_intesity_beam1 = []
-        echo_intesity_beam2 = []
-        echo_intesity_beam3 = []
-        echo_intesity_beam4 = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            echo_intesity_beam1.append(a)
-            echo_intesity_beam2.append(b)
-            echo_intesity_beam3.append(c)
-            echo_intesity_beam4.append(d)
-            offset += 4
+        (echo_intesity_beam1, echo_intesity_beam2, echo_intesity_beam3, echo_intesity_beam4) = \
+            unpack_cells(chunk, N, BYTE_DTYPE)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.ECHO_INTENSITY_BEAM1,
                                   DataParticleKey.VALUE: echo_intesity_beam1})
@@ -776,7 +743,6 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 4
-        offset = 0
 
         percent_good_id = unpack("<H", chunk[0:2])[0]
         if 1024 != percent_good_id:
@@ -785,17 +751,8 @@ class ADCPA_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_GOOD_ID,
                                   DataParticleKey.VALUE: percent_good_id})
 
-        percent_good_3beam = []
-        percent_transforms_reject = []
-        percent_bad_beams = []
-        percent_good_4beam = []
-        for row in range(0, N):
-            (a, b, c, d) = unpack('<BBBB', chunk[offset + 2: offset + 6])
-            percent_good_3beam.append(a)
-            percent_transforms_reject.append(b)
-            percent_bad_beams.append(c)
-            percent_good_4beam.append(d)
-            offset += 4
+        (percent_good_3beam, percent_transforms_reject, percent_bad_beams, percent_good_4beam) = \
+            unpack_cells(chunk, N, BYTE_DTYPE)
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_GOOD_3BEAM,
                                   DataParticleKey.VALUE: percent_good_3beam})
         self.final_result.append({DataParticleKey.VALUE_ID: ADCPA_PD0_PARSED_KEY.PERCENT_TRANSFORMS_REJECT,
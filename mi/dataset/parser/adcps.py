@@ -13,6 +13,7 @@ __license__ = 'Apache 2.0'
 import re
 import struct
 import time
+import numpy
 from dateutil import parser
 
 from mi.core.log import get_logger
@@ -22,6 +23,7 @@ from mi.dataset.parser.sio_mule_common import SioMuleParser, SIO_HEADER_MATCHER
 from mi.core.common import BaseEnum
 from mi.core.exceptions import  RecoverableSampleException, UnexpectedDataException
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
+from mi.core.instrument.pd0 import byte_sum
 
 
 class DataParticleType(BaseEnum):
@@ -70,6 +72,8 @@ DATA_MATCHER = re.compile(DATA_REGEX)
 
 SIO_HEADER_BYTES = 33
 STARTING_BYTES = 34
+# velocities are big endian shorts
+VELOCITY_DTYPE = numpy.dtype('>i2')
 
 CRC_TABLE = [0, 1996959894, 3993919788, 2567524794, 124634137, 1886057615, 3915621685, 2657392035,
              249268274, 2044508324, 3772115230, 2547177864, 162941995, 2125561021, 3887607047, 2428444049,
@@ -169,21 +173,11 @@ class AdcpsParserDataParticle(DataParticle):
 
                 date_fields = struct.unpack('HBBBBBB', match.group(0)[11:19])
     
-                # create a string with the right number of shorts to unpack
-                struct_format = '>'
-
-                for i in range(0, nbins):
-                    struct_format = struct_format + 'h'
-    
+                # the velocities are 4 consecutive arrays of nbins big endian shorts
                 bin_len = nbins*2
-                vel_err = struct.unpack(struct_format,
-                                        match.group(0)[STARTING_BYTES:(STARTING_BYTES+bin_len)])
-                vel_up = struct.unpack(struct_format,
-                                       match.group(0)[(STARTING_BYTES+bin_len):(STARTING_BYTES+(bin_len*2))])
-                vel_north = struct.unpack(struct_format,
-                                          match.group(0)[(STARTING_BYTES+(bin_len*2)):(STARTING_BYTES+(bin_len*3))])
-                vel_east = struct.unpack(struct_format,
-                                         match.group(0)[(STARTING_BYTES+(bin_len*3)):(STARTING_BYTES+(bin_len*4))])
+                (vel_err, vel_up, vel_north, vel_east) = \
+                    numpy.frombuffer(match.group(0), dtype=VELOCITY_DTYPE, count=nbins*4,
+                                     offset=STARTING_BYTES).reshape(4, nbins).tolist()
     
                 checksum = struct.unpack('<H', match.group(0)[(STARTING_BYTES+(bin_len*4)):(36+(bin_len*4))])
                 calculated_checksum = self.calc_inner_checksum(match.group(0)[:-2])
@@ -247,16 +241,13 @@ class AdcpsParserDataParticle(DataParticle):
         """
         calculate the checksum on the adcps data block, which occurs at the end of the data block
         """
-        crc = 0
         # sum all bytes and take last 2 bytes
-        for i in range(0, len(data_block)):
-            val = struct.unpack('<B', data_block[i])
-            crc += int(val[0])
-            # values are "unsigned short", wrap around if we go outside
-            if crc < 0:
-                crc += 65536
-            elif crc > 65536:
-                crc -= 65536
+        total = byte_sum(data_block)
+        crc = total % 65536
+        # values are "unsigned short", but the sum only wraps around once it
+        # goes past 65536, so a non-zero multiple of 65536 is left at 65536
+        if crc == 0 and total > 0:
+            crc = 65536
         return crc
 
 
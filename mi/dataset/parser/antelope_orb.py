@@ -14,6 +14,8 @@ __author__ = 'Jeff Laughlin <jeff@jefflaughlinconsulting.com>'
 __license__ = 'Apache 2.0'
 
 
+import time
+
 import numpy as np
 
 from mi.core.log import get_logger
@@ -43,6 +45,13 @@ class ParserConfigKey(BaseEnum):
     ORBNAME = "orbname"
     SELECT  = "select"
     REJECT  = "reject"
+    BATCH_SIZE = "batch_size" # optional, most packets published together
+    BATCH_TIME = "batch_time" # optional, most seconds spent gathering a batch
+
+
+# the reap thread queues up to this many packets, drain all of them by default
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_BATCH_TIME = 1.0
 
 
 class StateKey(BaseEnum):
@@ -243,6 +252,9 @@ class AntelopeOrbParser(Parser):
 
         tafter = state[StateKey.TAFTER]
 
+        self._batch_size = config.get(ParserConfigKey.BATCH_SIZE, DEFAULT_BATCH_SIZE)
+        self._batch_time = config.get(ParserConfigKey.BATCH_TIME, DEFAULT_BATCH_TIME)
+
         self._orbreapthr = OrbReapThr(orbname, select, reject, float(tafter), timeout=0, queuesize=100)
         log.info("Connected to ORB %s %s %s %s" % (orbname, select, reject, tafter))
 
@@ -252,32 +264,41 @@ class AntelopeOrbParser(Parser):
 
     def get_records(self):
         """
-        Go ahead and execute the data parsing loop up to a point. This involves
-        getting data from the file, stuffing it in to the chunker, then parsing
-        it and publishing.
-        @param num_records The number of records to gather
-        @retval Return the list of particles requested, [] if none available
+        Drain the packets queued in the reap thread, up to the batch size or until
+        the batch time has passed.  The particles for the whole batch are published
+        together and the state is only pushed to the driver once per batch, with
+        tafter set to the time of the last packet.  If a packet fails, the packets
+        before it are still published before the exception is raised.
+        @retval Return the list of packets reaped, None if none available
         """
         log.trace("GET RECORDS")
+        if self.stop:
+            return
+        batch = []
+        particles = []
+        batch_end = time.time() + self._batch_time
         try:
-            if self.stop:
-                return
-            get_r = self._orbreapthr.get()
-            pktid, srcname, orbtimestamp, raw_packet = get_r
-            log.trace("get_r: %s %s %s %s", pktid, srcname, orbtimestamp, len(raw_packet))
-            particle = make_antelope_particle(
-                get_r,
-                preferred_timestamp = DataParticleKey.INTERNAL_TIMESTAMP,
-                new_sequence=False,
-            )
-            self._publish_sample(particle)
-            # TODO rate limit state updates?
-            self._state[StateKey.TAFTER] = orbtimestamp
-            log.debug("State: ", self._state)
-            self._state_callback(self._state, False) # push new state to driver
+            while len(batch) < self._batch_size:
+                get_r = self._orbreapthr.get()
+                pktid, srcname, orbtimestamp, raw_packet = get_r
+                log.trace("get_r: %s %s %s %s", pktid, srcname, orbtimestamp, len(raw_packet))
+                particles.append(make_antelope_particle(
+                    get_r,
+                    preferred_timestamp = DataParticleKey.INTERNAL_TIMESTAMP,
+                    new_sequence=False,
+                ))
+                batch.append(get_r)
+                if time.time() >= batch_end:
+                    break
         except (Timeout, NoData), e:
             log.debug("orbreapthr.get exception %r" % type(e))
+        finally:
+            if particles:
+                self._publish_sample(particles)
+                pktid, srcname, orbtimestamp, raw_packet = batch[-1]
+                self._state[StateKey.TAFTER] = orbtimestamp
+                log.debug("State: %s", self._state)
+                self._state_callback(self._state, False) # push new state to driver
+        if not batch:
             return None
-        return get_r
-
-
+        return batch
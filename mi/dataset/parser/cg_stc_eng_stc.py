@@ -339,12 +339,81 @@ class CgStcEngStcParserDataParticleKey(BaseEnum):
     CG_ENG_DMGRSTATUS_UPDATE = 'cg_eng_dmgrstatus_update'
 
 
+# the key at the start of a parameter regex, such as 'CPU\.load' in 'CPU\.load=(...)'
+PATTERN_KEY_MATCHER = re.compile(r'((?:\\\.|[\w.])+)=')
+# regex elements which can match a newline, so a match may not be confined to one line
+MULTI_LINE_MATCHER = re.compile(r'\\[sSDW]|\[\^')
+
+
+def pattern_key(pattern):
+    """
+    Find the key of the line a parameter regex matches
+    @param pattern The parameter regex
+    @retval The key, or None if the regex does not start with a key or it can
+        match across lines, in which case it is run over the whole text
+    """
+    match = PATTERN_KEY_MATCHER.match(pattern)
+    if match is None or MULTI_LINE_MATCHER.search(pattern):
+        return None
+    return match.group(1).replace('\\.', '.')
+
+
+def split_key_lines(eng_str):
+    """
+    Split STC engineering text into its key=value lines in a single pass
+    @param eng_str The engineering text
+    @retval dictionary of key: list of lines with that key, in file order and
+        including the line endings
+    """
+    key_lines = {}
+    lines = eng_str.split('\n')
+    last_index = len(lines) - 1
+
+    for index, line in enumerate(lines):
+        (key, sep, value) = line.partition('=')
+        if sep:
+            if index != last_index:
+                line += '\n'
+            key_lines.setdefault(key, []).append(line)
+
+    return key_lines
+
+
+def search_key_lines(regex, key, key_lines, eng_str):
+    """
+    Search for a parameter regex in the lines with its key
+    @param regex The compiled parameter regex
+    @param key The key from pattern_key, None to search all of eng_str
+    @param key_lines The lines from split_key_lines
+    @param eng_str The engineering text
+    @retval The first match or None
+    """
+    if key is None:
+        return regex.search(eng_str)
+
+    lines = key_lines.get(key, [])
+    if eng_str.count(key + '=') != len(lines):
+        # the key also shows up part way through a line, only a search of
+        # the whole text is sure to find the same match
+        return regex.search(eng_str)
+
+    for line in lines:
+        match = regex.search(line)
+        if match:
+            return match
+
+    return None
+
+
 class CgStcEngStcParserDataAbstractParticle(DataParticle):
     """
     Abstract Class for parsing data from the cg_stc_eng_stc data set
     """
     _data_particle_type = None
 
+    # compiled parameter table shared by all the particle classes, built on first use
+    _param_table = None
+
     def _build_parsed_values(self):
         """
         Take something in the data format and turn it into
@@ -352,19 +421,59 @@ class CgStcEngStcParserDataAbstractParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         result = []
-        # Instantiate the param_dict 
-        params = self._build_param_dict()
-        
-        # Go through the param_dict dictionary for every definition
-        params.update(self.raw_data)
-        encoding_errors = params.get_encoding_errors()
+        eng_str = self.raw_data
+        if not isinstance(eng_str, str):
+            eng_str = str(eng_str)
+
+        # split the engineering text into its key=value lines once, then each
+        # regex only has to be run over the lines for its key
+        key_lines = split_key_lines(eng_str)
+
+        matches = {}
+        params = {}
+        encoding_errors = []
+        for (name, regex, key, f_getval) in self._get_param_table():
+            # parameters pulled out of the same field share a single match
+            if regex in matches:
+                match = matches[regex]
+            else:
+                match = search_key_lines(regex, key, key_lines, eng_str)
+                matches[regex] = match
+
+            value = None
+            if match:
+                try:
+                    value = f_getval(match)
+                except Exception:
+                    log.error("Dataset parameter dict error encoding Name:%s, set to None", name)
+                    encoding_errors.append({name: None})
+            params[name] = value
+
         self._encoding_errors = encoding_errors
-        all_params = params.get_all()
-        for (key, value) in all_params.iteritems():
+        for (key, value) in params.iteritems():
             result.append({DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: value})
         log.debug("CgStcEngStcParserDataParticle %s", result)
         return result
 
+    def _get_param_table(self):
+        """
+        Get the compiled parameter table, building it from the parameter
+        dictionary the first time it is needed
+        @retval list of (name, compiled regex, key, value function) tuples, in
+            the same order as the parameter dictionary
+        """
+        if CgStcEngStcParserDataAbstractParticle._param_table is None:
+            param_table = []
+            compiled = {}
+            for (name, param) in self._build_param_dict()._param_dict.iteritems():
+                if param.pattern not in compiled:
+                    compiled[param.pattern] = (re.compile(param.pattern), pattern_key(param.pattern))
+                (regex, key) = compiled[param.pattern]
+                param_table.append((name, regex, key, param.f_getval))
+            CgStcEngStcParserDataAbstractParticle._param_table = param_table
+
+        return CgStcEngStcParserDataAbstractParticle._param_table
+
     def _build_param_dict(self):
         """
         Populate the parameter dictionary with cg_stc_eng_stc parameters.
@@ -13,7 +13,6 @@ initial release
 __author__ = 'Mark Worden'
 __license__ = 'Apache 2.0'
 
-from functools import partial
 import copy
 import re
 import string
@@ -22,9 +21,8 @@ from mi.core.log import get_logger
 log = get_logger()
 from mi.core.common import BaseEnum
 from mi.core.exceptions import DatasetParserException, \
-    UnexpectedDataException, RecoverableSampleException, \
+    RecoverableSampleException, \
     ConfigurationException
-from mi.core.instrument.chunker import StringChunker
 from mi.core.instrument.data_particle import DataParticle
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 from mi.dataset.dataset_parser import BufferLoadingParser
@@ -34,6 +32,11 @@ from mi.dataset.dataset_parser import BufferLoadingParser
 END_OF_LINE_REGEX = r'(?:\r\n|\n)'
 SIEVE_MATCHER = re.compile(r'.*' + END_OF_LINE_REGEX)
 
+NEW_LINE = '\n'
+
+# The number of bytes read from the file at a time
+CSPP_BLOCK_SIZE = 65536
+
 HEADER_PART_REGEX = r'(.*):\s+(.*)' + END_OF_LINE_REGEX
 HEADER_PART_MATCHER = re.compile(HEADER_PART_REGEX)
 
@@ -245,6 +248,17 @@ class CsppParser(BufferLoadingParser):
         else:
             self._data_record_matcher = re.compile(data_record_regex)
 
+        # A single regex classifies and captures a data record or a header part. The data record
+        # alternative comes first so its groups keep their numbers in the match given to the data
+        # particle, the header part groups follow them.
+        self._record_matcher = re.compile(data_record_regex + '|' + HEADER_PART_REGEX)
+        self._header_part_group_offset = self._data_record_matcher.groups
+
+        # Complete records split out of the blocks read from the file, and the
+        # incomplete record at the end of the last block
+        self._records = []
+        self._partial_record = ''
+
         # Build up the header state dictionary using the default her key list ot one that was provided
         self._header_state = {}
 
@@ -277,12 +291,11 @@ class CsppParser(BufferLoadingParser):
         # Initialize the read state
         self._read_state = {StateKey.POSITION: 0, StateKey.METADATA_EXTRACTED: False}
 
-        # Call the superclass constructor
+        # Call the superclass constructor, the records are split out by get_block so no sieve is needed
         super(CsppParser, self).__init__(config,
                                          stream_handle,
                                          state,
-                                         partial(StringChunker.regex_sieve_function,
-                                                 regex_list=[SIEVE_MATCHER]),
+                                         None,
                                          state_callback,
                                          publish_callback,
                                          exception_callback,
@@ -307,15 +320,14 @@ class CsppParser(BufferLoadingParser):
         self._state = state_obj
         self._read_state = state_obj
 
-        # Clear the record buffer
+        # Clear the record buffer and any records not parsed yet
         self._record_buffer = []
+        self._records = []
+        self._partial_record = ''
 
         # Need to seek the correct position in the file stream using the read state position.
         self._stream_handle.seek(self._read_state[StateKey.POSITION])
 
-        # make sure we have cleaned the chunker out of old data
-        self._chunker.clean_all_chunks()
-
     def _increment_read_state(self, increment):
         """
         Increment the parser state
@@ -385,9 +397,9 @@ class CsppParser(BufferLoadingParser):
         """
 
         header_part_key = header_part_match.group(
-            HeaderPartMatchesGroupNumber.HEADER_PART_MATCH_GROUP_KEY)
+            self._header_part_group_offset + HeaderPartMatchesGroupNumber.HEADER_PART_MATCH_GROUP_KEY)
         header_part_value = header_part_match.group(
-            HeaderPartMatchesGroupNumber.HEADER_PART_MATCH_GROUP_VALUE)
+            self._header_part_group_offset + HeaderPartMatchesGroupNumber.HEADER_PART_MATCH_GROUP_VALUE)
 
         if header_part_key in self._header_state.keys():
             self._header_state[header_part_key] = string.rstrip(header_part_value)
@@ -416,11 +428,29 @@ class CsppParser(BufferLoadingParser):
             log.warn('got unrecognized row %s at position %s', chunk, self._read_state[StateKey.POSITION])
             self._exception_callback(RecoverableSampleException("Found an invalid chunk: %s" % chunk))
 
+    def get_block(self, size=CSPP_BLOCK_SIZE):
+        """
+        Read a block of data from the file and split it into records. The record
+        split by the end of the block is kept until the next block completes it.
+        @param size The size of the block to try to read
+        @retval The length of data retrieved
+        @throws EOFError when the end of the file is reached
+        """
+        data = self._stream_handle.read(size)
+        if not data:
+            self.file_complete = True
+            raise EOFError
+
+        records = (self._partial_record + data).split(NEW_LINE)
+        self._partial_record = records.pop()
+        self._records.extend(record + NEW_LINE for record in records)
+        return len(data)
+
     def parse_chunks(self):
         """
-        Parse out any pending data chunks in the chunker. If
+        Parse the records split out of the file so far. If
         it is a valid data piece, build a particle, update the position and
-        timestamp. Go until the chunker has no more valid data.
+        timestamp.
         @retval a list of tuples with sample particles encountered in this
             parsing, plus the state. An empty list of nothing was parsed.
         """
@@ -428,58 +458,23 @@ class CsppParser(BufferLoadingParser):
         # Initialize the result particles list we will return
         result_particles = []
 
-        # Retrieve the next non data chunk
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-
-        # Retrieve the next data chunk
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-
-        # Process the non data
-        self.handle_non_data(non_data, non_end, start)
+        records, self._records = self._records, []
 
-        # While the data chunk is not None, process the data chunk
-        while chunk is not None:
+        for record in records:
 
             # Increment the read state position now
-            self._increment_read_state(len(chunk))
+            self._increment_read_state(len(record))
 
-            # See if the chunk matches a data record
-            data_match = self._data_record_matcher.match(chunk)
+            # See if the record is a data record or a header part
+            record_match = self._record_matcher.match(record)
 
-            # If we found a data match, let's process it
-            if data_match is not None:
-                self._process_data_match(data_match, result_particles)
+            if record_match is None:
+                self._process_chunk_not_containing_data_record_or_header_part(record)
 
-            else:
-                # Check for head part match
-                header_part_match = HEADER_PART_MATCHER.match(chunk)
-
-                if header_part_match is not None:
-                    self._process_header_part_match(header_part_match)
-
-                else:
-                    self._process_chunk_not_containing_data_record_or_header_part(chunk)
-
-            # Retrieve the next non data chunk
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
+            elif record_match.start(self._header_part_group_offset + 1) == -1:
+                self._process_data_match(record_match, result_particles)
 
-            # Retrieve the next data chunk
-            (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-
-            # Process the non data
-            self.handle_non_data(non_data, non_end, start)
+            else:
+                self._process_header_part_match(record_match)
 
         return result_particles
-
-    def handle_non_data(self, non_data, non_end, start):
-        """
-        Handle any non-data that is found in the file
-        """
-        # if non-data is expected, handle it here, otherwise it is an error
-        if non_data is not None and non_end <= start:
-            log.debug("non_data: %s", non_data)
-            # if this non-data is an error, send an UnexpectedDataException and increment the state
-            self._increment_read_state(len(non_data))
-            # if non-data is a fatal error, directly call the exception, if it is not use the _exception_callback
-            self._exception_callback(UnexpectedDataException("Found %d bytes of un-expected non-data %s" %
-                                                             (len(non_data), non_data)))
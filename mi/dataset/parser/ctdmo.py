@@ -27,6 +27,8 @@ __license__ = 'Apache 2.0'
 import binascii
 import copy
 from functools import partial
+import ntplib
+import numpy
 import re
 import struct
 
@@ -106,33 +108,26 @@ REC_CT_GROUP_PRESSURE = 3
 REC_CT_GROUP_PRESSURE_TEMP = 4
 REC_CT_GROUP_TIME = 5
 
+# Jan 1, 2000 as seconds since Jan 1, 1900
+EPOCH_2000_NTP = string_to_ntp_date_time("2000-01-01T00:00:00.00Z")
+
 # Telemetered CT Data record (binary):
 TEL_CT_RECORD_END = b'\x0D'           # records separated by a new line
 TEL_CT_SAMPLE_BYTES = 13              # includes record separator
 
-TEL_CT_REGEX = b'([\x00-\xFF])'       # Inductive ID
-TEL_CT_REGEX += b'([\x00-\xFF]{7})'   # Temperature, Conductivity, Pressure (reversed)
-TEL_CT_REGEX += b'([\x00-\xFF]{4})'   # Time since Jan 1, 2000 (bytes reversed)
-TEL_CT_REGEX += TEL_CT_RECORD_END     # CT Record separator
-TEL_CT_MATCHER = re.compile(TEL_CT_REGEX)
-
-# The TEL_CT_MATCHER produces the following groups:
-TEL_CT_GROUP_ID = 1
-TEL_CT_GROUP_SCIENCE_DATA = 2
-TEL_CT_GROUP_TIME = 3
+# Telemetered CT record layout, to filter and decode a whole CT block at once:
+# inductive ID, temperature, conductivity and pressure (reversed), time since
+# Jan 1, 2000 (bytes reversed) and the record separator
+TEL_CT_RECORD_DTYPE = numpy.dtype([('id', 'u1'), ('science_data', 'V7'), ('time', '<u4'), ('end', 'u1')])
+TEL_CT_RECORD_ENDS = [ord(TEL_CT_RECORD_END)]
 
 # Recovered and Telemetered CO Data record (binary):
-CO_RECORD_END = b'[\x13|\x0D]'     # records separated by sentinel 0x13 or 0x0D
 CO_SAMPLE_BYTES = 6
 
-CO_REGEX = b'([\x00-\xFF])'        # Inductive ID
-CO_REGEX += b'([\x00-\xFF]{4})'    # Time offset in seconds
-CO_REGEX += CO_RECORD_END          # CO Record separator
-CO_MATCHER = re.compile(CO_REGEX)
-
-# The CO_MATCHER produces the following groups:
-CO_GROUP_ID = 1
-CO_GROUP_TIME_OFFSET = 2
+# CO record layout, to filter a whole CO block at once: inductive ID, time
+# offset in seconds and the record separator
+CO_RECORD_DTYPE = numpy.dtype([('id', 'u1'), ('time_offset', '>i4'), ('end', 'u1')])
+CO_RECORD_ENDS = [0x13, 0x0D, ord('|')]     # records separated by sentinel 0x13 or 0x0D
 
 # Indices into raw_data tuples for recovered CT data
 RAW_INDEX_REC_CT_ID = 0
@@ -170,7 +165,7 @@ def generate_particle_timestamp(time_2000):
     Returns:
       number of seconds since Jan 1, 1900
     """
-    return int(time_2000, 16) + string_to_ntp_date_time("2000-01-01T00:00:00.00Z")
+    return int(time_2000, 16) + EPOCH_2000_NTP
 
 
 class CtdmoStateKey(BaseEnum):
@@ -223,9 +218,11 @@ class CtdmoRecoveredInstrumentDataParticle(DataParticle):
         # The particle timestamp is the time contained in the CT instrument data.
         # This time field is number of seconds since Jan 1, 2000.
         # Convert from epoch in 2000 to epoch in 1900.
+        # The parser passes it in when it has already decoded it.
         #
-        time_stamp = generate_particle_timestamp(self.raw_data[RAW_INDEX_REC_CT_TIME])
-        self.set_internal_timestamp(timestamp=time_stamp)
+        if internal_timestamp is None:
+            time_stamp = generate_particle_timestamp(self.raw_data[RAW_INDEX_REC_CT_TIME])
+            self.set_internal_timestamp(timestamp=time_stamp)
 
     def _build_parsed_values(self):
         """
@@ -293,20 +290,24 @@ class CtdmoTelemeteredInstrumentDataParticle(DataParticle):
         #
         # The particle timestamp is the time contained in the science data
         # (as opposed to the timestamp in the SIO header).
-        # Extract the time field and convert from binary to ascii on a
-        # byte by byte basis.
+        # The parser passes it in when it has already decoded the CT block.
         #
-        hex_time = binascii.b2a_hex(self.raw_data[RAW_INDEX_TEL_CT_TIME])
+        if internal_timestamp is None:
+            #
+            # Extract the time field and convert from binary to ascii on a
+            # byte by byte basis.
+            #
+            hex_time = binascii.b2a_hex(self.raw_data[RAW_INDEX_TEL_CT_TIME])
 
-        #
-        # The input Time field for telemetered CT data has bytes in reverse order.
-        #
-        reversed_hex_time = hex_time[6:8] + hex_time[4:6] + \
-            hex_time[2:4] + hex_time[0:2]
+            #
+            # The input Time field for telemetered CT data has bytes in reverse order.
+            #
+            reversed_hex_time = hex_time[6:8] + hex_time[4:6] + \
+                hex_time[2:4] + hex_time[0:2]
 
-        # convert from epoch in 2000 to epoch in 1900.
-        time_stamp = generate_particle_timestamp(reversed_hex_time)
-        self.set_internal_timestamp(timestamp=time_stamp)
+            # convert from epoch in 2000 to epoch in 1900.
+            time_stamp = generate_particle_timestamp(reversed_hex_time)
+            self.set_internal_timestamp(timestamp=time_stamp)
 
     def _build_parsed_values(self):
         """
@@ -391,9 +392,11 @@ class CtdmoOffsetDataParticle(DataParticle):
 
         #
         # The particle timestamp for CO data is the SIO header timestamp.
+        # The parser passes it in, converted once for the whole CO block.
         #
-        time_stamp = convert_hex_ascii_to_int(self.raw_data[RAW_INDEX_CO_SIO_TIMESTAMP])
-        self.set_internal_timestamp(unix_time=time_stamp)
+        if internal_timestamp is None:
+            time_stamp = convert_hex_ascii_to_int(self.raw_data[RAW_INDEX_CO_SIO_TIMESTAMP])
+            self.set_internal_timestamp(unix_time=time_stamp)
 
     def _build_parsed_values(self):
         """
@@ -435,75 +438,93 @@ class CtdmoTelemeteredOffsetDataParticle(CtdmoOffsetDataParticle):
 
 class CtdmoParser(Parser):
 
-    def compare_inductive_id(self, inductive_id):
+    def filter_records(self, block, record_dtype, record_ends):
         """
-        Compare the inductive id from the data with the configured inductive ID
-        @param inductive_id to compare
-        @returns True if IDs match, False if they don't
+        Find the records of the configured inductive ID in a block of fixed
+        size binary records, without decoding any of the other records.
+        The first byte of each record is the inductive ID and the last one
+        the record separator.
+        @param block the binary records, following the SIO header
+        @param record_dtype numpy dtype of a record, with 'id' and 'end' fields
+        @param record_ends allowed values of the record separator
+        @retval (records as a numpy record array, indices of the records to
+            generate particles for, index in block of the first invalid
+            record or None if all records are valid)
         """
-        return inductive_id == self._config.get(CtdmoStateKey.INDUCTIVE_ID)
+        num_records = len(block) // record_dtype.itemsize
+        records = numpy.frombuffer(block, dtype=record_dtype, count=num_records)
+
+        #
+        # Records are only valid up to the first one with a bad separator,
+        # or up to the end of the block if it ends with a partial record.
+        #
+        bad_index = None
+        valid = numpy.in1d(records['end'], record_ends)
+        if not valid.all():
+            num_records = int(numpy.argmin(valid))
+            bad_index = num_records * record_dtype.itemsize
+        elif num_records * record_dtype.itemsize < len(block):
+            bad_index = num_records * record_dtype.itemsize
+
+        inductive_id = self._config.get(CtdmoStateKey.INDUCTIVE_ID)
+        if isinstance(inductive_id, (int, long)) and 0 <= inductive_id <= 0xFF:
+            indices = numpy.flatnonzero(records['id'][:num_records] == inductive_id)
+        else:
+            indices = numpy.array([], dtype=int)
+
+        return records, indices, bad_index
 
     def parse_co_data(self, particle_class, chunk, sio_header_timestamp):
         """
         This function parses a CO record and returns a list of samples.
         The CO input record is the same for both recovered and telemetered data.
+        The whole CO block is filtered on the inductive ID first, and only
+        the records of the configured inductive ID are sliced out.
         """
         particles = []
-        sample_count = 0
-        last_index = len(chunk)
-        start_index = 0
+        records, indices, bad_index = self.filter_records(chunk, CO_RECORD_DTYPE, CO_RECORD_ENDS)
 
-        while start_index < last_index:
+        if len(indices):
             #
-            # Look for a match in the next group of bytes
+            # The particle timestamp is the SIO header timestamp, the same
+            # for the whole block.
             #
-            co_match = CO_MATCHER.match(
-                chunk[start_index : start_index+CO_SAMPLE_BYTES])
+            time_stamp = float(ntplib.system_to_ntp_time(convert_hex_ascii_to_int(sio_header_timestamp)))
 
-            if co_match is not None:
-                #
-                # If the inductive ID is the one we're looking for,
-                # generate a data particle.
-                # The ID needs to be converted from a byte string to an integer
-                # for the comparison.
-                #
-                inductive_id = co_match.group(CO_GROUP_ID)
-                if self.compare_inductive_id(struct.unpack('>B', inductive_id)[0]):
-                    #
-                    # Generate the data particle.
-                    # Data stored for each particle is a tuple of the following:
-                    #   SIO header timestamp (input parameter)
-                    #   inductive ID (from chunk)
-                    #   Time Offset (from chunk)
-                    #
-                    sample = self._extract_sample(particle_class, None,
-                        (sio_header_timestamp, inductive_id,
-                            co_match.group(CO_GROUP_TIME_OFFSET)),
-                        None)
-                    if sample is not None:
-                        #
-                        # Add this particle to the list of particles generated
-                        # so far for this chunk of input data.
-                        #
-                        particles.append(sample)
-                        sample_count += 1
-
-                start_index += CO_SAMPLE_BYTES
+        for index in indices.tolist():
             #
-            # If there wasn't a match, the input data is messed up.
+            # Generate the data particle.
+            # Data stored for each particle is a tuple of the following:
+            #   SIO header timestamp (input parameter)
+            #   inductive ID (from chunk)
+            #   Time Offset (from chunk)
             #
-            else:
-                log.error('unknown data found in CO chunk %s at %d, leaving out the rest',
-                    binascii.b2a_hex(chunk), start_index)
-                self._exception_callback(SampleException(
-                    'unknown data found in CO chunk at %d, leaving out the rest' % start_index))
-                break
+            start_index = index * CO_SAMPLE_BYTES
+            sample = self._extract_sample(particle_class, None,
+                (sio_header_timestamp, chunk[start_index],
+                    chunk[start_index+1 : start_index+CO_SAMPLE_BYTES-1]),
+                time_stamp)
+            if sample is not None:
+                #
+                # Add this particle to the list of particles generated
+                # so far for this chunk of input data.
+                #
+                particles.append(sample)
+
+        #
+        # If there was an invalid record, the input data is messed up.
+        #
+        if bad_index is not None:
+            log.error('unknown data found in CO chunk %s at %d, leaving out the rest',
+                binascii.b2a_hex(chunk), bad_index)
+            self._exception_callback(SampleException(
+                'unknown data found in CO chunk at %d, leaving out the rest' % bad_index))
 
         #
         # Once we reach the end of the input data,
         # return the number of particles generated and the list of particles.
         #
-        return sample_count, particles
+        return len(particles), particles
 
 
 class CtdmoRecoveredCoParser(SioParser, CtdmoParser):
@@ -767,7 +788,7 @@ class CtdmoRecoveredCtParser(BufferLoadingParser, CtdmoParser):
                     ct_match.group(REC_CT_GROUP_PRESSURE),
                     ct_match.group(REC_CT_GROUP_PRESSURE_TEMP),
                     ct_match.group(REC_CT_GROUP_TIME)),
-                None)
+                generate_particle_timestamp(ct_match.group(REC_CT_GROUP_TIME)))
 
         #
         # If there wasn't a match, the input data is messed up.
@@ -888,69 +909,56 @@ class CtdmoTelemeteredParser(SioMuleParser, CtdmoParser):
         """
         This function parses a Telemetered CT record and
         returns the number of particles found and a list of data particles.
+        The whole CT block is filtered on the inductive ID first, and the
+        science data times of the remaining records are decoded together.
         Parameters:
           chunk - the input which is being parsed
           sio_header_timestamp - required for particle, passed through
         """
         particles = []
-        sample_count = 0
-        last_index = len(ct_record)
-        start_index = 0
+        records, indices, bad_index = self.filter_records(ct_record, TEL_CT_RECORD_DTYPE, TEL_CT_RECORD_ENDS)
+
+        #
+        # Convert the times of the records from epoch in 2000 to epoch in 1900.
+        #
+        time_stamps = (records['time'][indices] + EPOCH_2000_NTP).tolist()
 
-        while start_index < last_index:
+        for index, time_stamp in zip(indices.tolist(), time_stamps):
             #
-            # Look for a match in the next group of bytes
+            # Generate the data particle.
+            # Data stored for each particle is a tuple of the following:
+            #   SIO header timestamp (input parameter)
+            #   inductive ID
+            #   science data (temperature, conductivity, pressure)
+            #   time of science data
             #
-            ct_match = TEL_CT_MATCHER.match(
-                ct_record[start_index : start_index+TEL_CT_SAMPLE_BYTES])
-
-            if ct_match is not None:
+            start_index = index * TEL_CT_SAMPLE_BYTES
+            sample = self._extract_sample(
+                CtdmoTelemeteredInstrumentDataParticle,
+                None,
+                (sio_header_timestamp,
+                    ct_record[start_index],
+                    ct_record[start_index+1 : start_index+8],
+                    ct_record[start_index+8 : start_index+12]),
+                time_stamp)
+            if sample is not None:
                 #
-                # If the inductive ID is the one we're looking for,
-                # generate a data particle.
-                # The ID needs to be converted from a byte string to an integer
-                # for the comparison.
+                # Add this particle to the list of particles generated
+                # so far for this chunk of input data.
                 #
-                inductive_id = ct_match.group(TEL_CT_GROUP_ID)
-                if self.compare_inductive_id(struct.unpack('>B', inductive_id)[0]):
-                    #
-                    # Generate the data particle.
-                    # Data stored for each particle is a tuple of the following:
-                    #   SIO header timestamp (input parameter)
-                    #   inductive ID
-                    #   science data (temperature, conductivity, pressure)
-                    #   time of science data
-                    #
-                    sample = self._extract_sample(
-                        CtdmoTelemeteredInstrumentDataParticle,
-                        None,
-                        (sio_header_timestamp,
-                            inductive_id,
-                            ct_match.group(TEL_CT_GROUP_SCIENCE_DATA),
-                            ct_match.group(TEL_CT_GROUP_TIME)),
-                        None)
-                    if sample is not None:
-                        #
-                        # Add this particle to the list of particles generated
-                        # so far for this chunk of input data.
-                        #
-                        particles.append(sample)
-                        sample_count += 1
-
-                start_index += TEL_CT_SAMPLE_BYTES
+                particles.append(sample)
 
-            #
-            # If there wasn't a match, the input data is messed up.
-            #
-            else:
-                log.error('unknown data found in CT record %s at %d, leaving out the rest',
-                    binascii.b2a_hex(ct_record), start_index)
-                self._exception_callback(SampleException(
-                    'unknown data found in CT record at %d, leaving out the rest' % start_index))
-                break
+        #
+        # If there was an invalid record, the input data is messed up.
+        #
+        if bad_index is not None:
+            log.error('unknown data found in CT record %s at %d, leaving out the rest',
+                binascii.b2a_hex(ct_record), bad_index)
+            self._exception_callback(SampleException(
+                'unknown data found in CT record at %d, leaving out the rest' % bad_index))
 
         #
         # Once we reach the end of the input data,
         # return the number of particles generated and the list of particles.
         #
-        return sample_count, particles
+        return len(particles), particles
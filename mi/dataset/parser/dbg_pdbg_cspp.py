@@ -533,24 +533,26 @@ class DbgPdbgCsppParser(BufferLoadingParser):
 
             battery_match = BATTERY_DATA_MATCHER.match(chunk)
 
-            gps_match = GPS_DATA_MATCHER.match(chunk)
-
             # If we found a data match, let's process it
             if battery_match is not None:
                 self._process_data_match(self._battery_status_class, battery_match, result_particles)
 
-            elif gps_match is not None:
-                self._process_data_match(self._gps_adjustment_class, gps_match, result_particles)
-
             else:
-                # Check for head part match
-                header_part_match = HEADER_PART_MATCHER.match(chunk)
+                # Only try the gps regex on records which are not battery records
+                gps_match = GPS_DATA_MATCHER.match(chunk)
 
-                if header_part_match is not None:
-                    self._process_header_part_match(header_part_match)
+                if gps_match is not None:
+                    self._process_data_match(self._gps_adjustment_class, gps_match, result_particles)
 
                 else:
-                    self._process_chunk_not_containing_data_record_or_header_part(chunk)
+                    # Check for head part match
+                    header_part_match = HEADER_PART_MATCHER.match(chunk)
+
+                    if header_part_match is not None:
+                        self._process_header_part_match(header_part_match)
+
+                    else:
+                        self._process_chunk_not_containing_data_record_or_header_part(chunk)
 
             # Retrieve the next non data chunk
             (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+
+"""
+@package mi.dataset.parser.dcl_file_common
+@file mi/dataset/parser/dcl_file_common.py
+@brief Common code for the parsers of DCL instrument log files.
+
+DCL log files are ASCII, with records separated by a newline (\n or \r\n).
+All records start with the DCL controller timestamp: YYYY/MM/DD HH:MM:SS.mmm
+Metadata records: timestamp [text] more text newline.
+Sensor Data records: timestamp sensor_data newline.
+
+The DclFileParser reads the file in large blocks and splits them into
+records once, instead of running a regex sieve over the data. The
+records are classified by the character following the timestamp, so
+each record is matched against at most one of the instrument regexes.
+The position in the file is kept to the byte, after each record, so a
+parser can be restarted from any state it published.
+"""
+
+__license__ = 'Apache 2.0'
+
+import calendar
+import copy
+import ntplib
+
+from mi.core.log import get_logger; log = get_logger()
+
+from mi.core.common import BaseEnum
+from mi.core.exceptions import \
+    DatasetParserException, \
+    UnexpectedDataException
+
+from mi.dataset.dataset_parser import BufferLoadingParser
+
+# Number of bytes read from the file at a time.
+DCL_BLOCK_SIZE = 65536
+
+NEW_LINE = '\n'
+
+# The DCL timestamp and the space following it are the first 24 characters
+# of every record: YYYY/MM/DD HH:MM:SS.mmm<space>
+# Metadata records have a '[' following the timestamp.
+DCL_TIMESTAMP_LENGTH = 23
+START_METADATA_INDEX = DCL_TIMESTAMP_LENGTH + 1
+START_METADATA = '['
+
+
+def dcl_timestamp_to_ntp(timestamp):
+    """
+    Convert a DCL controller timestamp to an NTP timestamp.
+    @param timestamp the timestamp in the format YYYY/MM/DD HH:MM:SS.mmm,
+        taken as UTC
+    @retval the NTP timestamp (seconds since Jan 1, 1900)
+    @throws ValueError if timestamp is not a valid DCL timestamp
+    """
+    try:
+        unix_time = calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                                     int(timestamp[11:13]), int(timestamp[14:16]), int(timestamp[17:19]),
+                                     0, 0, 0))
+        milliseconds = int(timestamp[20:23])
+    except (ValueError, TypeError):
+        raise ValueError("Invalid time format: %s" % timestamp)
+
+    return ntplib.system_to_ntp_time(unix_time + milliseconds / 1000.0)
+
+
+class DclStateKey(BaseEnum):
+    POSITION = 'position'            # position within the input file
+
+
+class DclFileParser(BufferLoadingParser):
+    """
+    Base class for the parsers of DCL instrument log files.
+    Subclasses implement parse_sensor_record, and set METADATA_MATCHER to the
+    regex valid metadata records must match.
+    """
+
+    # regex matching a valid metadata record, if None any record with a
+    # '[' following the timestamp is valid metadata
+    METADATA_MATCHER = None
+
+    def __init__(self,
+                 config,
+                 stream_handle,
+                 state,
+                 state_callback,
+                 publish_callback,
+                 exception_callback,
+                 *args, **kwargs):
+
+        # The records are split out by get_block, no sieve function needed.
+
+        super(DclFileParser, self).__init__(config,
+                                            stream_handle,
+                                            state,
+                                            None,
+                                            state_callback,
+                                            publish_callback,
+                                            exception_callback,
+                                            *args,
+                                            **kwargs)
+
+        # Default the position within the file to the beginning.
+
+        self._read_state = {DclStateKey.POSITION: 0}
+        self._records = []
+        self._partial_record = ''
+
+        # If there's an existing state, update to it.
+
+        if state is not None:
+            self.set_state(state)
+
+    def get_block(self, size=DCL_BLOCK_SIZE):
+        """
+        Read a block from the file and split it into records.
+        A record split by the end of the block is kept for the next block.
+        @param size The size of the block to try to read
+        @retval The length of data retrieved
+        @throws EOFError when the end of the file is reached
+        """
+        data = self._stream_handle.read(size)
+        if not data:
+            self.file_complete = True
+            raise EOFError
+
+        records = (self._partial_record + data).split(NEW_LINE)
+        self._partial_record = records.pop()
+        self._records.extend(record + NEW_LINE for record in records)
+        return len(data)
+
+    def parse_chunks(self):
+        """
+        Parse the records split out of the file so far.
+        @retval a list of tuples with sample particles encountered in this
+            parsing, plus the state.
+        """
+        result_particles = []
+        records, self._records = self._records, []
+
+        for record in records:
+            self._read_state[DclStateKey.POSITION] += len(record)
+
+            # Metadata records produce no particles, but are validated.
+
+            if record[START_METADATA_INDEX:START_METADATA_INDEX + 1] == START_METADATA:
+                self.parse_metadata_record(record)
+                continue
+
+            particle = self.parse_sensor_record(record)
+            if particle is not None:
+                result_particles.append((particle, copy.copy(self._read_state)))
+
+        return result_particles
+
+    def parse_sensor_record(self, record):
+        """
+        Parse a record which is not a metadata record.
+        Subclasses call handle_unknown_record if it is not a valid sensor
+        data record.
+        @param record The record, including its newline
+        @retval The particle for the record, or None
+        """
+        raise NotImplementedError("parse_sensor_record must be implemented")
+
+    def parse_metadata_record(self, record):
+        """
+        Validate a metadata record.
+        @param record The record, including its newline
+        """
+        if self.METADATA_MATCHER is not None and self.METADATA_MATCHER.match(record) is None:
+            self.handle_unknown_record(record)
+
+    def handle_unknown_record(self, record):
+        """
+        Report a record which is neither a sensor data nor a metadata record.
+        """
+        error_message = 'Unknown data found in chunk %s' % record
+        log.warn(error_message)
+        self._exception_callback(UnexpectedDataException(error_message))
+
+    def _process_end_of_file(self):
+        """
+        Confirm there is no partial record left at the end of the file.
+        """
+        if self._partial_record:
+            log.warn("Have extra unexplained non-data bytes at the end of the file:%s", self._partial_record)
+            raise UnexpectedDataException("Have extra unexplained non-data bytes at the end of the file:%s"
+                                          % self._partial_record)
+
+    def set_state(self, state_obj):
+        """
+        Set the value of the state object for this parser
+        @param state_obj The object to set the state to.
+        @throws DatasetParserException if there is a bad state structure
+        """
+        if not isinstance(state_obj, dict):
+            raise DatasetParserException("Invalid state structure")
+
+        if not (DclStateKey.POSITION in state_obj):
+            raise DatasetParserException('%s missing in state keys' %
+                                         DclStateKey.POSITION)
+
+        self._record_buffer = []
+        self._records = []
+        self._partial_record = ''
+        self._state = state_obj
+        self._read_state = state_obj
+
+        self._stream_handle.seek(state_obj[DclStateKey.POSITION])
@@ -26,22 +26,13 @@ __author__ = 'Steve Myerson'
 __license__ = 'Apache 2.0'
 
 import calendar
-import copy
-from functools import partial
 import re
 
-from mi.core.instrument.chunker import \
-    StringChunker
-
 from mi.core.log import get_logger; log = get_logger()
 
-from mi.dataset.dataset_parser import \
-    BufferLoadingParser
+from mi.dataset.parser.dcl_file_common import DclFileParser
 
 from mi.core.common import BaseEnum
-from mi.core.exceptions import \
-    DatasetParserException, \
-    UnexpectedDataException
 
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
 
@@ -63,11 +54,6 @@ START_METADATA = r'\['
 END_METADATA = r'\]'
 PRODUCT = '(4831)'                     # the only valid Product Number
 
-# All dosta records are ASCII characters separated by a newline.
-DOSTA_RECORD_REGEX = ANY_CHARS       # Any number of characters
-DOSTA_RECORD_REGEX += NEW_LINE       # separated by a new line
-DOSTA_RECORD_MATCHER = re.compile(DOSTA_RECORD_REGEX)
-
 # Metadata record:
 #   Timestamp [Text]MoreText newline
 METADATA_REGEX = TIMESTAMP + SPACE   # date and time
@@ -213,13 +199,16 @@ class DostaAbcdjmDclTelemeteredInstrumentDataParticle(DostaAbcdjmDclInstrumentDa
     _data_particle_type = DataParticleType.TEL_INSTRUMENT_PARTICLE
 
 
-class DostaAbcdjmDclParser(BufferLoadingParser):
+class DostaAbcdjmDclParser(DclFileParser):
 
     """
     Parser for Dosta_abcdjm_dcl data.
     In addition to the standard constructor parameters,
     this constructor takes an additional parameter particle_class.
     """
+
+    METADATA_MATCHER = METADATA_MATCHER
+
     def __init__(self,
                  config,
                  stream_handle,
@@ -230,121 +219,45 @@ class DostaAbcdjmDclParser(BufferLoadingParser):
                  particle_class,
                  *args, **kwargs):
 
-        # No fancy sieve function needed for this parser.
-        # File is ASCII with records separated by newlines.
+        self.input_file = stream_handle
+        self.particle_class = particle_class
 
         super(DostaAbcdjmDclParser, self).__init__(config,
                                           stream_handle,
                                           state,
-                                          partial(StringChunker.regex_sieve_function,
-                                                  regex_list=[DOSTA_RECORD_MATCHER]),
                                           state_callback,
                                           publish_callback,
                                           exception_callback,
                                           *args,
                                           **kwargs)
 
-        # Default the position within the file to the beginning.
-
-        self._read_state = {DostaStateKey.POSITION: 0}
-        self.input_file = stream_handle
-        self.particle_class = particle_class
-
-        # If there's an existing state, update to it.
-
-        if state is not None:
-            self.set_state(state)
-
-    def handle_non_data(self, non_data, non_end, start):
-        """
-        Handle any non-data that is found in the file
+    def parse_sensor_record(self, record):
         """
-        # Handle non-data here.
-        # Increment the position within the file.
-        # Use the _exception_callback.
-        if non_data is not None and non_end <= start:
-            self._increment_position(len(non_data))
-            self._exception_callback(UnexpectedDataException(
-                "Found %d bytes of un-expected non-data %s" %
-                (len(non_data), non_data)))
-
-    def _increment_position(self, bytes_read):
+        If this is a valid sensor data record,
+        use the extracted fields to generate a particle.
         """
-        Increment the position within the file.
-        @param bytes_read The number of bytes just read
-        """
-        self._read_state[DostaStateKey.POSITION] += bytes_read
+        sensor_match = SENSOR_DATA_MATCHER.match(record)
+        if sensor_match is None:
+            self.handle_unknown_record(record)
+            return None
 
-    def parse_chunks(self):
-        """
-        Parse out any pending data chunks in the chunker.
-        If it is valid data, build a particle.
-        Go until the chunker has no more valid data.
-        @retval a list of tuples with sample particles encountered in this
-            parsing, plus the state.
-        """
-        result_particles = []
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-        self.handle_non_data(non_data, non_end, start)
-
-        while chunk is not None:
-            self._increment_position(len(chunk))
-
-            # If this is a valid sensor data record,
-            # use the extracted fields to generate a particle.
-
-            sensor_match = SENSOR_DATA_MATCHER.match(chunk)
-            if sensor_match is not None:
-                particle = self._extract_sample(self.particle_class,
-                                                None,
-                                                sensor_match.groups(),
-                                                None)
-                if particle is not None:
-                    result_particles.append((particle, copy.copy(self._read_state)))
-
-            # It's not a sensor data record, see if it's a metadata record.
-
-            else:
-
-                # If it appears to be a metadata record,
-                # look for multiple lines which have been garbled,
-                # i.e., a metadata record minus the newline
-                # plus tab-separated values from a following sensor data record.
-                # find returns -1 if not found.
-                # Valid Metadata records produce no particles and
-                # are silently ignored.
-
-                meta_match = METADATA_MATCHER.match(chunk)
-                if meta_match is None or chunk.find(TAB) != -1:
-                    error_message = 'Unknown data found in chunk %s' % chunk
-                    log.warn(error_message)
-                    self._exception_callback(UnexpectedDataException(error_message))
-
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-            self.handle_non_data(non_data, non_end, start)
-
-        return result_particles
-
-    def set_state(self, state_obj):
+        return self._extract_sample(self.particle_class,
+                                    None,
+                                    sensor_match.groups(),
+                                    None)
+
+    def parse_metadata_record(self, record):
         """
-        Set the value of the state object for this parser
-        @param state_obj The object to set the state to.
-        @throws DatasetParserException if there is a bad state structure
+        Look for multiple lines which have been garbled,
+        i.e., a metadata record minus the newline
+        plus tab-separated values from a following sensor data record.
+        Valid Metadata records produce no particles and
+        are silently ignored.
         """
-        if not isinstance(state_obj, dict):
-            raise DatasetParserException("Invalid state structure")
-
-        if not (DostaStateKey.POSITION in state_obj):
-            raise DatasetParserException('%s missing in state keys' %
-                                         DostaStateKey.POSITION)
-
-        self._record_buffer = []
-        self._state = state_obj
-        self._read_state = state_obj
-
-        self.input_file.seek(state_obj[DostaStateKey.POSITION])
+        if record.find(TAB) != -1:
+            self.handle_unknown_record(record)
+        else:
+            super(DostaAbcdjmDclParser, self).parse_metadata_record(record)
 
 
 class DostaAbcdjmDclRecoveredParser(DostaAbcdjmDclParser):
@@ -14,13 +14,13 @@ __author__ = 'Mark Worden'
 __license__ = 'Apache 2.0'
 
 import copy
-import gevent
 import ntplib
 import struct
 import binascii
 
 from mi.core.log import get_logger
 log = get_logger()
+from mi.core.time_slice import cooperate
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle
 from mi.core.exceptions import SampleException, UnexpectedDataException
@@ -136,7 +136,7 @@ class DostaLnWfpParser(WfpEFileParser):
             next_block = self._stream_handle.read(block_size)
             if next_block:
                 data = data + next_block
-                gevent.sleep(0)
+                cooperate()
             else:
                 eof = True
 
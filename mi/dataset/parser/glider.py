@@ -21,6 +21,7 @@ import sys
 
 from math import copysign
 from functools import partial
+from itertools import izip
 
 from mi.core.log import get_logger
 from mi.core.common import BaseEnum
@@ -32,6 +33,14 @@ from mi.dataset.dataset_parser import BufferLoadingParser
 # start the logger
 log = get_logger()
 
+# latitude/longitude strings in DDMM.MMMM or DDDMM.MMMM format
+LAT_LON_REGEX = r'(-*\d{2,3})(\d{2}.\d+)'
+LAT_LON_MATCHER = re.compile(LAT_LON_REGEX)
+
+# glider rows are many kB long, read enough of the file at once that a
+# block holds a batch of rows to decode together
+GLIDER_BLOCK_SIZE = 65536
+
 class StateKey(BaseEnum):
     POSITION = 'position'
     SENT_METADATA = 'sent_metadata'
@@ -853,6 +862,96 @@ class EngineeringScienceRecoveredDataParticle(GliderParticle):
         # need to exclude m times
         return self._parsed_values(EngineeringScienceRecoveredDataParticle.keys_exclude_times)
 
+class GliderSchema(object):
+    """
+    The column layout of a glider file, compiled once from the column labels
+    and byte sizes in the header. Rows are decoded in bulk into a float array,
+    and only the columns a particle class can use are turned into the data
+    dictionary passed to the particle.
+    """
+    def __init__(self, labels, num_of_bytes):
+        """
+        @param labels The column labels from the header
+        @param num_of_bytes The number of bytes of each column from the header
+        """
+        self.labels = labels
+        self.num_columns = len(labels)
+        self.column_index = dict((label, index) for index, label in enumerate(labels))
+
+        # the converter for each column is determined by the number of bytes,
+        # columns of any other size are left as strings
+        num_of_bytes = np.array(num_of_bytes)
+        self.int_mask = (num_of_bytes == 1) | (num_of_bytes == 2)
+        self.float_mask = (num_of_bytes == 4) | (num_of_bytes == 8)
+        self.converters = [int if is_int else float if is_float else None
+                           for is_int, is_float in zip(self.int_mask, self.float_mask)]
+        self.numeric_columns = np.flatnonzero(self.int_mask | self.float_mask)
+
+        # latitude/longitude strings are converted to decimal degrees
+        self.lat_lon_mask = np.array([('_lat' in label) or ('_lon' in label) for label in labels], dtype=bool)
+        self.lat_lon_columns = np.flatnonzero(self.lat_lon_mask).tolist()
+
+        # column indices for each particle class, built the first time the class is used
+        self._particle_columns = {}
+
+    def particle_columns(self, particle_class):
+        """
+        Get the columns a particle class needs
+        @param particle_class The glider particle class
+        @retval a tuple of (list of the column indices of all the particle
+            parameters in this file, array of the column indices of the
+            particle's science parameters in this file)
+        """
+        columns = self._particle_columns.get(particle_class)
+
+        if columns is None:
+            parameters = set(particle_class.science_parameters)
+            parameters.update(GliderParticle.common_parameters)
+
+            all_columns = sorted(self.column_index[key] for key in parameters
+                                 if key in self.column_index)
+            science_columns = np.array(sorted(self.column_index[key] for key in particle_class.science_parameters
+                                              if key in self.column_index),
+                                       dtype=np.intp)
+
+            columns = (all_columns, science_columns)
+            self._particle_columns[particle_class] = columns
+
+        return columns
+
+    def decode(self, rows):
+        """
+        Decode the numeric columns of a batch of rows
+        @param rows A list of rows, each a list of num_columns strings
+        @retval A 2D float array with one row per input row, string columns are NaN
+        @throws ValueError if a numeric column is not a number
+        """
+        values = np.empty((len(rows), self.num_columns))
+        values.fill(np.nan)
+
+        if rows and len(self.numeric_columns) == self.num_columns:
+            # every column is a number, parse the whole batch in one pass
+            numbers = np.fromstring(' '.join(' '.join(row) for row in rows), sep=' ')
+            if numbers.size == values.size:
+                values[:] = numbers.reshape(values.shape)
+                return values
+
+        if rows:
+            values[:, self.numeric_columns] = np.array(rows)[:, self.numeric_columns].astype(np.float64)
+
+        return values
+
+    def has_data(self, values, particle_class):
+        """
+        Check if a decoded row has any non NaN science parameters for a particle class
+        @param values A row from decode
+        @param particle_class The glider particle class
+        @retval True if at least one science parameter is not NaN
+        """
+        science_columns = self.particle_columns(particle_class)[1]
+        return not np.isnan(values[science_columns]).all()
+
+
 class GliderParser(BufferLoadingParser):
     """
     GliderParser parses a Slocum Electric Glider data file that has been
@@ -1033,6 +1132,9 @@ class GliderParser(BufferLoadingParser):
         log.trace("Data units: %s", self._header_dict['data_units'])
         log.trace("Bytes: %s", self._header_dict['num_of_bytes'])
 
+        # compile the column layout once for decoding all the rows in this file
+        self._schema = GliderSchema(self._header_dict['labels'], self._header_dict['num_of_bytes'])
+
         log.debug("End of header, position: %d", self._stream_handle.tell())
 
     def set_state(self, state_obj):
@@ -1076,70 +1178,124 @@ class GliderParser(BufferLoadingParser):
         log.trace("GliderParser._increment_state(): NEW State Position: %s", self._read_state[StateKey.POSITION])
 
 
-    def _read_data(self, data_record):
+    def _get_data_records(self):
         """
-        Read in the column labels, data type, number of bytes of each
-        data type, and the data from an ASCII glider data file.
+        Get all the complete data records from the chunker, along with any
+        non-data found before each of them.
+        @retval A list of (non_data, non_start, non_end, data_record, start, end)
+            tuples in file order. The last tuple has a data_record of None.
         """
+        data_records = []
+        data_record = ''
 
-        data_dict = {}
-        num_columns = self._header_dict['sensors_per_cycle']
-        data_labels = self._header_dict['labels']
-        num_bytes = self._header_dict['num_of_bytes']
+        while data_record is not None:
+            # collect the non-data from the file
+            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
+            # collect the data from the file
+            (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
 
-        data = data_record.strip().split()
+            data_records.append((non_data, non_start, non_end, data_record, start, end))
 
-        log.trace("GliderParser._read_data(): Split data: %s", data)
+        return data_records
 
-        if num_columns != len(data):
+    def _split_data(self, data_records):
+        """
+        Split each data record into its column strings.
+        @param data_records The records from _get_data_records
+        @retval A list with one entry per record: the list of column strings,
+            None if there is no record or it is only whitespace, or a
+            SampleException if the record does not have the number of columns
+            described in the header
+        """
+        num_columns = self._schema.num_columns
+        rows = []
 
-            log.error("GliderParser._read_data(): Num Of Columns NOT EQUAL to Num of Data items: "
-                      "Expected Columns= %s vs Actual Data= %s", num_columns, len(data))
+        for (non_data, non_start, non_end, data_record, start, end) in data_records:
+            if data_record is None or self._whitespace_regex.match(data_record):
+                rows.append(None)
+                continue
 
-            raise SampleException('Glider data file does not have the ' +
-                                  'same number of columns as described ' +
-                                  'in the header.\n' +
-                                  'Described: %d, Actual: %d' %
-                                  (num_columns, len(data)))
+            data = data_record.split()
 
-        # extract record to dictionary
-        for ii in range(0, num_columns, 1):
-            log.trace("GliderParser._read_data(): index: %d label: %s, value: %s", ii, data_labels[ii], data[ii])
+            log.trace("GliderParser._split_data(): Split data: %s", data)
 
-            valuePreConversion = data[ii]
+            if num_columns != len(data):
 
-            # Check if this data value is a NaN...
-            if valuePreConversion == "NaN":
-                # data is NaN, convert it to a float
-                value = float(valuePreConversion)
-            # Determine what type of data the value is - int or float, or neither
+                log.error("GliderParser._split_data(): Num Of Columns NOT EQUAL to Num of Data items: "
+                          "Expected Columns= %s vs Actual Data= %s", num_columns, len(data))
+
+                rows.append(SampleException('Glider data file does not have the ' +
+                                            'same number of columns as described ' +
+                                            'in the header.\n' +
+                                            'Described: %d, Actual: %d' %
+                                            (num_columns, len(data))))
             else:
+                rows.append(data)
 
-                # determine what type of data the value is, based on the number of bytes attribute
-                if (num_bytes[ii] == 1) or (num_bytes[ii] == 2):
-                        stringConverter = int
-                elif (num_bytes[ii] == 4) or (num_bytes[ii] == 8):
-                        stringConverter = float
-                else:
-                        stringConverter = None
+        return rows
 
-                # check to see if this is a latitude/longitude string
-                if ('_lat' in data_labels[ii]) or ('_lon' in data_labels[ii]):
-                    # convert latitude/longitude strings to decimal degrees
-                    value = self._string_to_ddegrees(data[ii])
+    def _decode_data(self, rows):
+        """
+        Decode the numeric columns of all the complete rows in one batch.
+        @param rows The rows from _split_data
+        @retval A generator with the decoded values of each complete row, and
+            None for the other rows
+        @throws ValueError if a numeric column is not a number
+        """
+        try:
+            batch_values = self._schema.decode([data for data in rows if isinstance(data, list)])
+        except ValueError:
+            # decode one row at a time so the error is raised when the bad row is reached
+            batch_values = None
+
+        index = 0
+        for data in rows:
+            if not isinstance(data, list):
+                yield None
+            elif batch_values is None:
+                yield self._schema.decode([data])[0]
+            else:
+                yield batch_values[index]
+                index += 1
 
-                    log.trace("GliderParser._read_data(): converted lat/lon %s from %s to %10.5f", data_labels[ii], data[ii], value)
+    def _read_data(self, data, values, columns):
+        """
+        Build the data dictionary for the particles from a decoded row. Only
+        the requested columns are included, but every latitude/longitude column
+        is converted so bad positions are always reported.
+        @param data The column strings of the row
+        @param values The decoded values of the row
+        @param columns The indices of the columns to include
+        @retval A dictionary of {label: {'Name': label, 'Data': value}}
+        """
+        schema = self._schema
 
-                else:
-                    # convert the string to and int or float, or leave it as a string
-                    if stringConverter is not None:
-                        value = stringConverter(data[ii])
-                    else:
-                        log.trace("GliderParser._read_data(): data value %s was not an int or a float", data[ii])
-                        value = data[ii]
+        lat_lon = {}
+        for column in schema.lat_lon_columns:
+            if data[column] != "NaN":
+                # convert latitude/longitude strings to decimal degrees
+                lat_lon[column] = self._string_to_ddegrees(data[column])
+
+        data_dict = {}
 
-            data_dict[data_labels[ii]] = {
-                'Name': data_labels[ii],
+        for column, decoded_value in zip(columns, values[columns].tolist()):
+            label = schema.labels[column]
+            value_string = data[column]
+
+            if value_string == "NaN":
+                value = decoded_value
+            elif column in lat_lon:
+                value = lat_lon[column]
+            elif schema.converters[column] is int:
+                value = int(value_string)
+            elif schema.converters[column] is float:
+                value = decoded_value
+            else:
+                log.trace("GliderParser._read_data(): data value %s was not an int or a float", value_string)
+                value = value_string
+
+            data_dict[label] = {
+                'Name': label,
                 'Data': value
             }
 
@@ -1147,7 +1303,7 @@ class GliderParser(BufferLoadingParser):
 
         return data_dict
 
-    def get_block(self, size=1024):
+    def get_block(self, size=GLIDER_BLOCK_SIZE):
         """
         Need to overload the base class behavior so we can get the last
         record if it doesn't end with a newline it would be ignored.
@@ -1170,56 +1326,51 @@ class GliderParser(BufferLoadingParser):
         # set defaults
         result_particles = []
 
-        # collect the non-data from the file
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        # collect the data from the file
-        (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
+        # the columns this particle class uses
+        columns = self._schema.particle_columns(self._particle_class)[0]
 
-        self.handle_non_data(non_data, non_start, non_end, start)
+        data_records = self._get_data_records()
+        rows = self._split_data(data_records)
 
         # process a row of data from the file
-        while data_record is not None:
+        for (non_data, non_start, non_end, data_record, start, end), data, values in \
+                izip(data_records, rows, self._decode_data(rows)):
+
+            self.handle_non_data(non_data, non_start, non_end, start)
+
+            if data_record is None:
+                break
+
             log.debug("## GliderParser.parse_chunks(): data record: %s", data_record)
 
             self._increment_state(end)
 
-            if self._whitespace_regex.match(data_record):
+            if data is None:
 
                 log.debug("## GliderParser.parse_chunks(): Only whitespace detected in record. Ignoring.")
 
-                # parse the data record into a data dictionary to pass to the particle class
-            else:
-
-                exception_detected = False
-
-                try:
-                    # create the dictionary of key/value pairs composed of the labels and the values from the
-                    # record being parsed
-                    # ex: data_dict = {'sci_bsipar_temp': {'Data': 10.67, 'Name': 'sci_bsipar_temp'}, n1, n2, nn}
-                    data_dict = self._read_data(data_record)
+            elif isinstance(data, SampleException):
+                # We are done processing this record if we have detected an exception
+                self._exception_callback(data)
 
-                    log.debug("  GliderParser.parse_chunks(): ### ## #### ## ####  data_dict = %s", data_dict)
+            else:
+                # create the dictionary of key/value pairs composed of the labels and the values from the
+                # record being parsed
+                # ex: data_dict = {'sci_bsipar_temp': {'Data': 10.67, 'Name': 'sci_bsipar_temp'}, n1, n2, nn}
+                data_dict = self._read_data(data, values, columns)
 
-                except SampleException as e:
-                    exception_detected = True
-                    self._exception_callback(e)
+                log.debug("  GliderParser.parse_chunks(): ### ## #### ## ####  data_dict = %s", data_dict)
 
                 # from the parsed data, m_present_time is the unix timestamp per IDD
-                try:
-                    if not exception_detected:
-                        record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
-                        log.debug("## GliderParser.parse_chunks(): Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
-                except KeyError:
-                    exception_detected = True
+                if 'm_present_time' not in data_dict:
                     self._exception_callback(SampleException("GliderParser.parse_chunks(): unable to find timestamp in data"))
 
-                if exception_detected:
-                    # We are done processing this record if we have detected an exception
-                    pass
-
                 # check if
-                elif self._has_science_data(data_dict):
+                elif self._schema.has_data(values, self._particle_class):
+                    record_time = data_dict['m_present_time']['Data']
+                    timestamp = ntplib.system_to_ntp_time(record_time)
+                    log.debug("## GliderParser.parse_chunks(): Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
+
                     # create the particle
                     particle = self._extract_sample(self._particle_class, None, data_dict, timestamp)
                     log.debug("===> ## ## ## GliderParser.parse_chunks(): PARTICLE NAMED %s CREATED ", particle._data_particle_type)
@@ -1229,13 +1380,6 @@ class GliderParser(BufferLoadingParser):
                 else:
                     log.debug("No science data found in particle. %s", data_dict)
 
-            # collect the non-data from the file
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            # collect the data from the file
-            (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
-
-            self.handle_non_data(non_data, non_start, non_end, start)
-
         # publish the results
         return result_particles
 
@@ -1255,24 +1399,6 @@ class GliderParser(BufferLoadingParser):
             # if it is not use the _exception_callback
             self._exception_callback(UnexpectedDataException("Found un-expected non-data: %s" % non_data))
 
-    def _has_science_data(self, data_dict):
-        """
-        Examine the data_dict to see if it contains particle parameters
-        """
-        log.trace("## ## ## GliderParser._has_science_data(): _particle_class is %s", self._particle_class)
-        log.trace("## ## ## GliderParser._has_science_data(): Looking for data in science parameters: %s", self._particle_class.science_parameters)
-        for key in data_dict.keys():
-            if key in self._particle_class.science_parameters:
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    log.debug("Found science value for key: %s, value: %s", key, value)
-                    return True
-                else:
-                    log.debug("Science data value is nan: %s %s", key, value)
-
-        log.debug("No science data found!")
-        return False
-
     def _string_to_ddegrees(self, pos_str):
         """
         Converts the given string from this data stream into a more
@@ -1301,9 +1427,7 @@ class GliderParser(BufferLoadingParser):
             for i in range(0, adj_zeros):
                 pos_str = '0' + pos_str
 
-        regex = r'(-*\d{2,3})(\d{2}.\d+)'
-        regex_matcher = re.compile(regex)
-        latlon_match = regex_matcher.match(pos_str)
+        latlon_match = LAT_LON_MATCHER.match(pos_str)
 
         if latlon_match is None:
             log.error("Failed to parse lat/lon value: '%s'", pos_str)
@@ -1382,52 +1506,54 @@ class GliderEngineeringParser(GliderParser):
         # set defaults
         result_particles = []
 
-        # collect the non-data from the file
-        (nd_timestamp, non_data, none_start, none_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        # collect the data from the file
-        (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
+        # the columns used by any of the particles to produce
+        columns = set()
+        for particle in self.list_of_particles_to_produce or []:
+            columns.update(self._schema.particle_columns(particle)[0])
+        columns = sorted(columns)
 
-        self.handle_non_data(non_data, none_start, none_end, start)
+        data_records = self._get_data_records()
+        rows = self._split_data(data_records)
 
-        if data_record is None:
-            log.trace("GliderEngineeringParser.parse_chunks():         data_record from Chunker at index start= %s and end= %s is NONE", start, end)
+        for (non_data, none_start, none_end, data_record, start, end), data, values in \
+                izip(data_records, rows, self._decode_data(rows)):
 
+            self.handle_non_data(non_data, none_start, none_end, start)
 
-        while data_record is not None:
+            if data_record is None:
+                log.trace("GliderEngineeringParser.parse_chunks():         data_record from Chunker at index start= %s and end= %s is NONE", start, end)
+                break
 
             log.debug("GliderEngineeringParser.parse_chunks(): data record: %s", data_record)
 
-            if self._whitespace_regex.match(data_record):
+            if data is None:
 
                 log.debug("GliderEngineeringParser.parse_chunks(): Only whitespace detected in record. Ignoring.")
 
-                # parse the data record into a data dictionary to pass to the particle class
             else:
 
                 exception_detected = False
 
-                try:
-                    # create the dictionary of key/value pairs composed of the labels and the values from the
-                    # record being parsed
-                    data_dict = self._read_data(data_record)
-                except SampleException as e:
+                if isinstance(data, SampleException):
                     exception_detected = True
-                    self._exception_callback(e)
+                    self._exception_callback(data)
                     log.warn("GliderEngineeringParser.parse_chunks(): "
-                             "Sample Exception, problem creating data dict from raw data %s", e)
-                    data_dict = {}
+                             "Sample Exception, problem creating data dict from raw data %s", data)
+                else:
+                    # create the dictionary of key/value pairs composed of the labels and the values from the
+                    # record being parsed
+                    data_dict = self._read_data(data, values, columns)
 
-                # from the parsed data, m_present_time is the unix timestamp
-                try:
-                    if not exception_detected:
+                    # from the parsed data, m_present_time is the unix timestamp
+                    if 'm_present_time' in data_dict:
                         record_time = data_dict['m_present_time']['Data']
-                        timestamp = ntplib.system_to_ntp_time(data_dict['m_present_time']['Data'])
+                        timestamp = ntplib.system_to_ntp_time(record_time)
                         log.debug(" ## ## ## GliderEngineeringParser.parse_chunks(): "
                                   "Converting record timestamp %f to ntp timestamp %f", record_time, timestamp)
-                except KeyError:
-                    exception_detected = True
-                    self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser.parse_chunks(): "
-                                                             "unable to find timestamp in data"))
+                    else:
+                        exception_detected = True
+                        self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser.parse_chunks(): "
+                                                                 "unable to find timestamp in data"))
 
                 if exception_detected:
                     # We are done processing this record if we have detected an exception
@@ -1454,7 +1580,7 @@ class GliderEngineeringParser(GliderParser):
                         self.handle_metadata_particle(particle, result_particles, timestamp)
 
                         # check for the presence of any particle data in the raw data row before continuing
-                        if self._contains_eng_data(data_dict, particle):
+                        if values is not None and self._schema.has_data(values, particle):
 
                             try:
                                 # create the particle
@@ -1474,13 +1600,6 @@ class GliderEngineeringParser(GliderParser):
                     self._exception_callback(SampleException(" ## ## ## GliderEngineeringParser.parse_chunks(): "
                                                              "List of Particles to create is empty or None"))
 
-            # collect the non-data from the file
-            (nd_timestamp, non_data, none_start, none_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            # collect the data from the file
-            (chunker_timestamp, data_record, start, end) = self._chunker.get_next_data_with_index()
-
-            self.handle_non_data(non_data, none_start, none_end, start)
-
         log.trace("GliderEngineeringParser.parse_chunks():         ### ### ### EXITING ### ### ### ")
 
         # publish the results
@@ -1582,20 +1701,3 @@ class GliderEngineeringParser(GliderParser):
         localtime = time.mktime(converted_time.timetuple())
         utctime = localtime - time.timezone
         return ntplib.system_to_ntp_time(float(utctime))
-
-    def _contains_eng_data(self, data_dict, particle_class):
-        """
-        Examine the data_dict to see if it contains data from the engineering telemetered particle being worked on
-        """
-
-        for key in data_dict.keys():
-
-            # only check for particle params that do not include the two m_ time oriented attributes
-            if key in particle_class.science_parameters:
-                # return true as soon as the first particle non-NaN attribute from the data dict
-                value = data_dict[key]['Data']
-                if not np.isnan(value):
-                    return True
-
-        log.debug("No engineering attributes in the particle found!")
-        return False
\ No newline at end of file
@@ -13,14 +13,14 @@ initial release
 __author__ = 'Mark Worden'
 __license__ = 'Apache 2.0'
 
-import gevent
 import msgpack
 import ntplib
-import time
+import struct
 
 from mi.core.log import get_logger
 
 log = get_logger()
+from mi.core.time_slice import cooperate
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle
 from mi.core.exceptions import DatasetParserException, SampleException, NotImplementedException
@@ -42,9 +42,92 @@ UNABLE_TO_ITERATE_THROUGH_UNPACKED_MSGPACK_MSG = "Unable to iterate through unpa
 # A message to be reported when the format of the unpacked msgpack data does nto match expected
 UNEXPECTED_UNPACKED_MSGPACK_FORMAT_MSG = "Unexpected unpacked msgpack format"
 
+# The number of bytes read from the file and fed to the msgpack Unpacker at a time
+MMP_CDS_BLOCK_SIZE = 65536
+
+# The msgpack first byte codes 0xc0 through 0xdf, each mapped to a tuple containing the number of header bytes,
+# the struct format of the length or count in the header (None if there is none), the number of bytes following
+# the header for each unit of the length, and the number of nested objects following the header for each unit
+# of the count
+MSGPACK_TYPE_HEADERS = {
+    0xc0: (1, None, 0, 0),     # nil
+    0xc1: (1, None, 0, 0),     # never used
+    0xc2: (1, None, 0, 0),     # false
+    0xc3: (1, None, 0, 0),     # true
+    0xc4: (2, '>B', 1, 0),     # bin 8
+    0xc5: (3, '>H', 1, 0),     # bin 16
+    0xc6: (5, '>I', 1, 0),     # bin 32
+    0xc7: (3, '>B', 1, 0),     # ext 8
+    0xc8: (4, '>H', 1, 0),     # ext 16
+    0xc9: (6, '>I', 1, 0),     # ext 32
+    0xca: (5, None, 0, 0),     # float 32
+    0xcb: (9, None, 0, 0),     # float 64
+    0xcc: (2, None, 0, 0),     # uint 8
+    0xcd: (3, None, 0, 0),     # uint 16
+    0xce: (5, None, 0, 0),     # uint 32
+    0xcf: (9, None, 0, 0),     # uint 64
+    0xd0: (2, None, 0, 0),     # int 8
+    0xd1: (3, None, 0, 0),     # int 16
+    0xd2: (5, None, 0, 0),     # int 32
+    0xd3: (9, None, 0, 0),     # int 64
+    0xd4: (3, None, 0, 0),     # fixext 1
+    0xd5: (4, None, 0, 0),     # fixext 2
+    0xd6: (6, None, 0, 0),     # fixext 4
+    0xd7: (10, None, 0, 0),    # fixext 8
+    0xd8: (18, None, 0, 0),    # fixext 16
+    0xd9: (2, '>B', 1, 0),     # str 8
+    0xda: (3, '>H', 1, 0),     # str 16
+    0xdb: (5, '>I', 1, 0),     # str 32
+    0xdc: (3, '>H', 0, 1),     # array 16
+    0xdd: (5, '>I', 0, 1),     # array 32
+    0xde: (3, '>H', 0, 2),     # map 16
+    0xdf: (5, '>I', 0, 2),     # map 32
+}
+
+
+def msgpack_object_end(data, position):
+    """
+    Find the end of a single msgpack object by walking the type headers without decoding any values.  The
+    object must be complete and well formed, which is the case once the Unpacker has decoded it.
+    @param data The buffer containing the msgpack data
+    @param position The index in data of the first byte of the object
+    @retval The index in data just past the last byte of the object
+    """
+    # the number of objects still to be skipped, nested arrays and maps add their elements to this
+    remaining = 1
+
+    while remaining:
+        remaining -= 1
+        code = ord(data[position])
+
+        if code <= 0x7f or code >= 0xe0:
+            # positive or negative fixint
+            position += 1
+        elif code <= 0x8f:
+            # fixmap, a key and a value for each entry
+            remaining += 2 * (code & 0x0f)
+            position += 1
+        elif code <= 0x9f:
+            # fixarray
+            remaining += code & 0x0f
+            position += 1
+        elif code <= 0xbf:
+            # fixstr
+            position += 1 + (code & 0x1f)
+        else:
+            (header_size, length_format, length_bytes, length_objects) = MSGPACK_TYPE_HEADERS[code]
+            if length_format is not None:
+                length = struct.unpack_from(length_format, data, position + 1)[0]
+                position += length * length_bytes
+                remaining += length * length_objects
+            position += header_size
+
+    return position
+
 
 class StateKey(BaseEnum):
     PARTICLES_RETURNED = 'particles_returned'  # holds the number of particles returned
+    POSITION = 'position'  # holds the byte offset of the msgpack object following the last particle returned
 
 
 class MmpCdsParserDataParticleKey(BaseEnum):
@@ -111,6 +194,8 @@ class MmpCdsParserDataParticle(DataParticle):
 class MmpCdsParser(BufferLoadingParser):
     """
     Class for parsing data as received from a McLane Moored Profiler connected to a cabled docking station.
+    The file is fed to a persistent msgpack Unpacker a block at a time and particles are returned as soon
+    as their msgpack objects have been decoded, so only a block of the file is held in memory at once.
     """
 
     def __init__(self,
@@ -132,6 +217,17 @@ class MmpCdsParser(BufferLoadingParser):
         # Initialize the record buffer to an empty list
         self._record_buffer = []
 
+        # The Unpacker decoding the file, the bytes fed to it which have not been decoded yet and the
+        # file offset of the first of those bytes
+        self._unpacker = msgpack.Unpacker()
+        self._unpacked_buffer = ''
+        self._unpacked_position = 0
+
+        # The number of particles found so far and the number to skip when restarting from a state without
+        # a position
+        self._particles_found = 0
+        self._particles_to_skip = 0
+
         if state is None:
             state = {StateKey.PARTICLES_RETURNED: 0}
 
@@ -150,7 +246,9 @@ class MmpCdsParser(BufferLoadingParser):
 
     def set_state(self, state_obj):
         """
-        This method will set the state of the MmpCdsParser to a given state
+        This method will set the state of the MmpCdsParser to a given state.  If the state includes a position
+        the file is read from that position, otherwise the file is read from the beginning and the number of
+        particles already returned are skipped.
         @param state_obj the updated state to use
         """
         log.debug("Attempting to set state to: %s", state_obj)
@@ -167,12 +265,54 @@ class MmpCdsParser(BufferLoadingParser):
         self._chunker.clean_all_chunks()
 
         self._record_buffer = []
+        self.file_complete = False
 
         # Set the state and read state to the provide state
         self._state = state_obj
 
-        # Always seek to the beginning of the buffer to read all records
-        self._stream_handle.seek(0)
+        particles_returned = max(state_obj[StateKey.PARTICLES_RETURNED], 0)
+
+        if StateKey.POSITION in state_obj:
+            # Start decoding at the object following the last particle returned
+            position = state_obj[StateKey.POSITION]
+            self._particles_to_skip = 0
+        else:
+            # Decode from the beginning, skipping the particles already returned
+            position = 0
+            self._particles_to_skip = particles_returned
+
+        self._particles_found = particles_returned - self._particles_to_skip
+
+        self._unpacker = msgpack.Unpacker()
+        self._unpacked_buffer = ''
+        self._unpacked_position = position
+
+        self._stream_handle.seek(position)
+
+    def get_records(self, num_records):
+        """
+        Go ahead and execute the data parsing loop up to a point.  Blocks are decoded until there is one
+        more particle than requested or the end of the file is reached, so that the state callback for the
+        last particle in the file can report the file as ingested.
+        @param num_records The number of records to gather
+        @retval Return the list of particles requested, [] if none available
+        """
+        if num_records <= 0:
+            return []
+        try:
+            while len(self._record_buffer) <= num_records:
+                self._load_particle_buffer()
+        except EOFError:
+            self._process_end_of_file()
+        return self._yank_particles(num_records)
+
+    def _load_particle_buffer(self):
+        """
+        Decode the next block of the file and add its particles to the record buffer
+        @throws EOFError when the end of the file is reached.
+        """
+        self.get_block()
+        self._record_buffer.extend(self.parse_chunks())
 
     def _yank_particles(self, num_records):
         """
@@ -183,20 +323,7 @@ class MmpCdsParser(BufferLoadingParser):
         cannot be collected (perhaps due to an EOF), the list will have the
         elements it was able to collect.
         """
-        particles_returned = 0
-
-        if self._state is not None and StateKey.PARTICLES_RETURNED in self._state and \
-                self._state[StateKey.PARTICLES_RETURNED] > 0:
-            particles_returned = self._state[StateKey.PARTICLES_RETURNED]
-
-        total_num_records = len(self._record_buffer)
-
-        num_records_remaining = total_num_records - particles_returned
-
-        if num_records_remaining < num_records:
-            num_to_fetch = num_records_remaining
-        else:
-            num_to_fetch = num_records
+        num_to_fetch = min(num_records, len(self._record_buffer))
 
         log.debug("Yanking %s records of %s requested",
                   num_to_fetch,
@@ -204,63 +331,56 @@ class MmpCdsParser(BufferLoadingParser):
 
         return_list = []
 
-        end_range = particles_returned + num_to_fetch
+        records_to_return = self._record_buffer[:num_to_fetch]
+        self._record_buffer = self._record_buffer[num_to_fetch:]
 
-        records_to_return = self._record_buffer[particles_returned:end_range]
         if len(records_to_return) > 0:
 
-            log.info(records_to_return)
-
-            # Update the number of particles returned
-            self._state[StateKey.PARTICLES_RETURNED] = particles_returned+num_to_fetch
+            # Update the number of particles returned and the position of the object following the last one
+            self._state[StateKey.PARTICLES_RETURNED] = records_to_return[-1][1]
+            self._state[StateKey.POSITION] = records_to_return[-1][2]
 
             # strip the state info off of them now that we have what we need
             for item in records_to_return:
                 log.debug("Record to return: %s", item)
-                return_list.append(item)
+                return_list.append(item[0])
 
             self._publish_sample(return_list)
             log.trace("Sending parser state [%s] to driver", self._state)
             file_ingested = False
-            if self.file_complete and total_num_records == self._state[StateKey.PARTICLES_RETURNED]:
+            if self.file_complete and len(self._record_buffer) == 0:
                 # file has been read completely and all records pulled out of the record buffer
                 file_ingested = True
             self._state_callback(self._state, file_ingested)  # push new state to driver
 
         return return_list
 
-    def get_block(self, size=1024):
+    def get_block(self, size=MMP_CDS_BLOCK_SIZE):
         """
-        This function overrides the get_block function in BufferLoadingParser
-        to read the entire file rather than break it into chunks.
+        This function overrides the get_block function in BufferLoadingParser to feed the next block of the
+        file to the Unpacker rather than the chunker.
+        @param size The size of the block to read
         @return The length of data retrieved.
         @throws EOFError when the end of the file is reached.
         """
-        # Read in data in blocks so as to not tie up the CPU.
-        eof = False
-        data = ''
-        while not eof:
-            next_block = self._stream_handle.read(size)
-            if next_block:
-                data = data + next_block
-                gevent.sleep(0)
-            else:
-                eof = True
-
-        if data != '':
-            self._timestamp = float(ntplib.system_to_ntp_time(time.time()))
-            log.debug("Calculated current time timestamp %.10f", self._timestamp)
-            self._chunker.add_chunk(data, self._timestamp)
-            self.file_complete = True
+        data = self._stream_handle.read(size)
+
+        if data:
+            self._unpacker.feed(data)
+            self._unpacked_buffer += data
             return len(data)
         else:  # EOF
             self.file_complete = True
+            if self._unpacked_buffer:
+                log.warn("Ignoring %d bytes of incomplete msgpack data at the end of the file",
+                         len(self._unpacked_buffer))
             raise EOFError
 
     def sieve_function(self, raw_data):
         """
         This method sorts through the raw data to identify new blocks of data that need processing.  This method
-        identifies the start index as 0 and the length of the input raw_data as the end.
+        identifies the start index as 0 and the length of the input raw_data as the end.  The msgpack data is
+        fed directly to the Unpacker, so the chunker is not used in parsing.
         @param raw_data the raw msgpack data for which to return the chunk location information
         @return the list of tuples containing the start index and range for each chunk
         """
@@ -272,61 +392,58 @@ class MmpCdsParser(BufferLoadingParser):
 
     def parse_chunks(self):
         """
-        This method parses each chunk and attempts to extract samples to return.
-        @return for each discovered sample, a list of tuples containing each particle and associated state position
-        # information
+        This method extracts samples from each msgpack object the Unpacker is able to decode from the data fed
+        to it so far.  An object split across blocks is decoded once the rest of it has been fed.
+        @return a list of tuples containing each particle, the number of particles returned and the byte offset
+        of the following msgpack object once the particle has been returned
         """
         # Initialize the resultant particle list to return to an emtpy list
         result_particles = []
 
-        # Obtain the next chunk to process
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-
-        # We need to use the msgpack library and instantiate an Unpacker to process the chunk of data
-        unpacker = msgpack.Unpacker()
-
-        # Process each chunk as long as one exists
-        if chunk is not None:
+        # The offset of the next object to decode within the undecoded bytes
+        offset = 0
 
-            # Feed the Unpacker instance the chunk of data
-            unpacker.feed(chunk)
-
-            # Initialize the list of samples for this chunk to an emtpy list
-            samples = []
-
-            # We need to put the following in a try block just in case the chunk of data provided is malformed
-            try:
-                # Let's iterate through each unpacked list item
-                for unpacked_data in unpacker:
-
-                    # The expectation is that an unpacked list item associated with a McLane Moored Profiler cabled
-                    # docking station data chunk consists of a list of three items
-                    if isinstance(unpacked_data, tuple) or isinstance(unpacked_data, list) and \
-                            len(unpacked_data) == NUM_MMP_CDS_UNPACKED_ITEMS:
-
-                        # Extract the sample an provide the particle class which could be different for each
-                        # derived MmpCdsParser
-                        sample = self._extract_sample(self._particle_class, None, unpacked_data, None)
-
-                        # If we extracted a sample, add it to the list of samples to retrun
-                        if sample:
-                            samples.append(sample)
-
-                    else:
-                        log.debug(UNEXPECTED_UNPACKED_MSGPACK_FORMAT_MSG)
-                        raise SampleException(UNEXPECTED_UNPACKED_MSGPACK_FORMAT_MSG)
-
-                    # Let's call gevent.sleep with 0 to allow for the CPU to be used by another gevent thread just
-                    # in case we are dealing with a large list of unpacked msgpack data
-                    gevent.sleep(0)
-
-            except TypeError:
-                log.warn(UNABLE_TO_ITERATE_THROUGH_UNPACKED_MSGPACK_MSG)
-                raise SampleException(UNABLE_TO_ITERATE_THROUGH_UNPACKED_MSGPACK_MSG)
-
-            # For each sample we retrieved in the chunk, let's create a tuple containing the sample, and the parser's
-            # current read state
-            for sample in samples:
-                result_particles.append(sample)
+        # We need to put the following in a try block just in case the data provided is malformed
+        try:
+            # Let's iterate through each unpacked list item
+            for unpacked_data in self._unpacker:
+
+                offset = msgpack_object_end(self._unpacked_buffer, offset)
+
+                # The expectation is that an unpacked list item associated with a McLane Moored Profiler cabled
+                # docking station data chunk consists of a list of three items
+                if isinstance(unpacked_data, tuple) or isinstance(unpacked_data, list) and \
+                        len(unpacked_data) == NUM_MMP_CDS_UNPACKED_ITEMS:
+
+                    # Extract the sample an provide the particle class which could be different for each
+                    # derived MmpCdsParser
+                    sample = self._extract_sample(self._particle_class, None, unpacked_data, None)
+
+                    # If we extracted a sample, add it to the list of samples to return unless it has already
+                    # been returned
+                    if sample:
+                        if self._particles_to_skip > 0:
+                            self._particles_to_skip -= 1
+                        else:
+                            self._particles_found += 1
+                            result_particles.append((sample, self._particles_found,
+                                                     self._unpacked_position + offset))
+
+                else:
+                    log.debug(UNEXPECTED_UNPACKED_MSGPACK_FORMAT_MSG)
+                    raise SampleException(UNEXPECTED_UNPACKED_MSGPACK_FORMAT_MSG)
+
+                # Let other gevent threads use the CPU once the time slice is used up, just
+                # in case we are dealing with a large list of unpacked msgpack data
+                cooperate()
+
+        except TypeError:
+            log.warn(UNABLE_TO_ITERATE_THROUGH_UNPACKED_MSGPACK_MSG)
+            raise SampleException(UNABLE_TO_ITERATE_THROUGH_UNPACKED_MSGPACK_MSG)
+
+        finally:
+            # Drop the bytes of the objects which have been decoded
+            self._unpacked_buffer = self._unpacked_buffer[offset:]
+            self._unpacked_position += offset
 
         return result_particles
\ No newline at end of file
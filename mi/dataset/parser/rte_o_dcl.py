@@ -13,19 +13,13 @@ Initial Release
 __author__ = 'Jeff Roy'
 __license__ = 'Apache 2.0'
 
-import copy
 import re
-import ntplib
-import time
-from dateutil import parser
-from functools import partial
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.common import BaseEnum
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.core.exceptions import SampleException, DatasetParserException, UnexpectedDataException
-from mi.dataset.dataset_parser import BufferLoadingParser
-from mi.core.instrument.chunker import StringChunker
+from mi.dataset.parser.dcl_file_common import DclFileParser, dcl_timestamp_to_ntp
 
 # This is an example of the input string
 #             2013/11/16 20:46:24.989 Coulombs = 1.1110C,
@@ -105,7 +99,9 @@ class RteODclParserRecoveredDataParticle(RteODclParserDataAbstractParticle):
     _data_particle_type = RteDataParticleType.RECOVERED
 
 
-class RteODclParser(BufferLoadingParser):
+class RteODclParser(DclFileParser):
+
+    METADATA_MATCHER = METADATA_MATCHER
 
     def __init__(self,
                  config,
@@ -118,17 +114,10 @@ class RteODclParser(BufferLoadingParser):
         super(RteODclParser, self).__init__(config,
                                             stream_handle,
                                             state,
-                                            partial(StringChunker.regex_sieve_function,
-                                                    regex_list=[DATA_MATCHER, METADATA_MATCHER]),
                                             state_callback,
                                             publish_callback,
                                             exception_callback)
 
-        self._read_state = {StateKey.POSITION:0}
-
-        if state:
-            self.set_state(self._state)
-
     def set_state(self, state_obj):
         """
         Set the value of the state object for this parser
@@ -139,21 +128,8 @@ class RteODclParser(BufferLoadingParser):
             raise DatasetParserException("Invalid state structure")
         if not ((StateKey.POSITION in state_obj)):
             raise DatasetParserException("Invalid state keys")
-        
-        self._record_buffer = []
-        self._state = state_obj
-        self._read_state = state_obj
-        self._chunker.clean_all_chunks()
-        
-        # seek to the position
-        self._stream_handle.seek(state_obj[StateKey.POSITION])
-
-    def _increment_state(self, increment):
-        """
-        Increment the parser state
-        @param timestamp The timestamp completed up to that position
-        """
-        self._read_state[StateKey.POSITION] += increment
+
+        super(RteODclParser, self).set_state(state_obj)
 
     @staticmethod
     def _convert_string_to_timestamp(ts_str):
@@ -163,75 +139,32 @@ class RteODclParser(BufferLoadingParser):
         @param ts_str The timestamp string in the format "yyyy/mm/dd hh:mm:ss.sss"
         @retval The NTP4 timestamp
         """
-        match = LOG_TIME_MATCHER.match(ts_str)
-        if not match:
+        if not LOG_TIME_MATCHER.match(ts_str):
             raise ValueError("Invalid time format: %s" % ts_str)
 
-        zulu_ts = "%04d-%02d-%02dT%02d:%02d:%fZ" % (
-            int(match.group(1)), int(match.group(2)), int(match.group(3)),
-            int(match.group(4)), int(match.group(5)), float(match.group(6))
-        )
-        log.trace("converted ts '%s' to '%s'", ts_str[match.start(0):(match.start(0) + 24)], zulu_ts)
+        return dcl_timestamp_to_ntp(ts_str)
 
-        converted_time = float(parser.parse(zulu_ts).strftime("%s.%f"))
-        adjusted_time = converted_time - time.timezone
-        ntptime = ntplib.system_to_ntp_time(adjusted_time)
-
-        log.trace("Converted time \"%s\" (unix: %s) into %s", ts_str, adjusted_time, ntptime)
-        return ntptime
-
-    def parse_chunks(self):
-        """
-        Parse out any pending data chunks in the chunker. If
-        it is a valid data piece, build a particle, update the position and
-        timestamp. Go until the chunker has no more valid data.
-        @retval a list of tuples with sample particles encountered in this
-            parsing, plus the state. An empty list of nothing was parsed.
-        """            
-        result_particles = []
-        (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-        (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-        self.handle_non_data(non_data, non_end, start)
-        
-        while (chunk != None):
-            # if this chunk is a data match process it, otherwise it is a metadata record which is ignored
-            data_match = DATA_MATCHER.match(chunk)
-            if data_match:
-                # time is inside the data regex
-                self._timestamp = self._convert_string_to_timestamp(chunk)
-                
-                # particle-ize the data block received, return the record
-                sample = self._extract_sample(self._particle_class, DATA_MATCHER, chunk, self._timestamp)
-                # increment state for this chunk even if we don't get a particle
-                self._increment_state(len(chunk)) 
-                if sample:
-                    # create particle
-                    result_particles.append((sample, copy.copy(self._read_state)))
-                    log.debug("Extracting sample chunk %s with read_state: %s", chunk, self._read_state)
-            else:
-                # this is a metadata chunk, just increment the state
-                self._increment_state(len(chunk))    
-
-            (nd_timestamp, non_data, non_start, non_end) = self._chunker.get_next_non_data_with_index(clean=False)
-            (timestamp, chunk, start, end) = self._chunker.get_next_data_with_index(clean=True)
-            self.handle_non_data(non_data, non_end, start)
-
-        return result_particles
-
-    def handle_non_data(self, non_data, non_end, start):
+    def parse_sensor_record(self, record):
         """
-        handle data in the non_data chunker queue
-        @param non_data data in the non data chunker queue
-        @param non_end ending index of the non_data chunk
-        @param start start index of the next data chunk
+        If this record is a data match, build a particle from it. The time
+        is inside the data regex.
         """
-        # we can get non_data after our current chunk, check that this chunk is before that chunk
-        if non_data is not None and non_end <= start:
-            log.error("Found %d bytes of unexpected non-data:%s", len(non_data), non_data)
-            self._exception_callback(UnexpectedDataException("Found %d bytes of un-expected non-data:%s" %
-                                                         (len(non_data), non_data)))
-            self._increment_state(len(non_data))
-
+        if not DATA_MATCHER.match(record):
+            self.handle_unknown_record(record)
+            return None
 
+        self._timestamp = self._convert_string_to_timestamp(record)
 
+        # particle-ize the data block received, return the record
+        sample = self._extract_sample(self._particle_class, DATA_MATCHER, record, self._timestamp)
+        if sample:
+            log.debug("Extracting sample chunk %s with read_state: %s", record, self._read_state)
+        return sample
 
+    def handle_unknown_record(self, record):
+        """
+        Report a record which is neither a data nor a metadata record.
+        """
+        log.error("Found %d bytes of unexpected non-data:%s", len(record), record)
+        self._exception_callback(UnexpectedDataException("Found %d bytes of un-expected non-data:%s" %
+                                                         (len(record), record)))
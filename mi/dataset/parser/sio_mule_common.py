@@ -8,19 +8,24 @@ This file contains classes that handle parsing instruments which pass through
 sio which contain the common sio header.
 The SioParser class is used for Recovered data files.
 The SioMuleParser class is used for Telemetered data files.
+
+Telemetered files are appended to as data arrives and are reparsed on every
+harvest.  The SioBlockIndex records the SIO blocks framed in a file so far,
+and is kept in the parser state, so parsing a file which has grown only
+frames and verifies the checksums of the newly appended data.
 """
 
 __author__ = 'Emily Hahn'
 __license__ = 'Apache 2.0'
 
 import re
-import struct
-import gevent
 import time
 import ntplib
+from bisect import bisect_left, bisect_right
 
 from mi.core.common import BaseEnum
 from mi.core.log import get_logger; log = get_logger()
+from mi.core.time_slice import cooperate
 from mi.core.exceptions import DatasetParserException
 from mi.dataset.dataset_parser import BufferLoadingParser
 
@@ -62,6 +67,63 @@ SIO_HEADER_GROUP_TIMESTAMP = 3      # POSIX timestamp
 SIO_HEADER_GROUP_BLOCK_NUMBER = 4   # Block Number
 SIO_HEADER_GROUP_CHECKSUM = 5       # checksum
 
+# Every SIO header is this long, including the start and end of header
+SIO_HEADER_LENGTH = 33
+
+# Telemetered data escapes 0x2b and 0x18 with a 0x18 prefix
+SIO_ESCAPE_MATCHER = re.compile(b'\x18[\x6b\x58]')
+
+# Number of bytes read from the file at a time
+SIO_READ_SIZE = 65536
+
+# SIO CRC is a reflected CRC-16 (polynomial 0x8408) with initial value 0xFFFF
+# and a final one's complement
+SIO_CRC_POLYNOMIAL = 0x8408
+SIO_CRC_INITIAL = 0xFFFF
+
+
+def _build_crc_table():
+    """
+    Build the 256 entry lookup table for the SIO CRC, one entry for each
+    possible byte value, equivalent to shifting that byte through the CRC
+    register 8 bits at a time.
+    """
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ SIO_CRC_POLYNOMIAL
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+SIO_CRC_TABLE = _build_crc_table()
+
+
+def calc_sio_checksum(data):
+    """
+    Calculate the SIO header checksum of data using the table driven CRC
+    @param data The data portion of the SIO block
+    @retval The checksum as an unsigned 16 bit integer
+    """
+    table = SIO_CRC_TABLE
+    crc = SIO_CRC_INITIAL
+    for byte in bytearray(data):
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return ~crc & 0xFFFF
+
+
+def unescape_sio(data):
+    """
+    Replace the escape sequences of telemetered SIO data
+    @param data The escaped data
+    @retval The unescaped data
+    """
+    data = data.replace(b'\x18\x6b', b'\x2b')
+    return data.replace(b'\x18\x58', b'\x18')
+
 # blocks can be uniquely identified a combination of block number and timestamp,
 # since block numbers roll over after 255
 # each block may contain multiple data samples
@@ -71,6 +133,138 @@ class StateKey(BaseEnum):
         # the number of samples in that packet, how many packets have been pulled out currently
         # being processed
     FILE_SIZE = "file_size"
+    BLOCK_INDEX = "block_index"  # the SioBlockIndex of the file, optional
+
+# constants for accessing the block index entries
+BLOCK_START = 0
+BLOCK_LENGTH = 1
+BLOCK_ID = 2
+BLOCK_TIMESTAMP = 3
+BLOCK_NUMBER = 4
+BLOCK_CHECKSUM_OK = 5
+
+class SioBlockIndex(object):
+    """
+    Index of the SIO blocks framed in the first size (unescaped) bytes of a
+    file, the first raw_size bytes as stored.  Each block entry records the
+    start and length of the block, the instrument ID, timestamp and block
+    number from its header, and whether its checksum matches the header, or
+    None until it has been verified.
+    Anchors map positions in the unescaped data to positions in the file, so
+    any section of the file can be read and unescaped on its own.
+
+    The index is stored in the parser state as a dictionary, with only the
+    blocks and anchors which are still needed to parse the unprocessed data.
+    """
+    def __init__(self, index_state=None):
+        """
+        @param index_state The index as stored in the parser state, or None
+        """
+        self.size = 0
+        self.raw_size = 0
+        self.blocks = {}
+        self._block_starts = []
+        self.anchors = {0: 0}
+        self._anchor_positions = [0]
+
+        if index_state is not None:
+            self.size = index_state['size']
+            self.raw_size = index_state['raw_size']
+            for block in index_state['blocks']:
+                self.add_block(block)
+            for (position, raw_position) in index_state['anchors']:
+                self.add_anchor(position, raw_position)
+            self.add_anchor(self.size, self.raw_size)
+
+    def add_block(self, block):
+        """
+        Add a block, blocks are added in order of their start
+        @param block [start, length, instrument id, timestamp, block number, checksum ok]
+        """
+        if block[BLOCK_START] not in self.blocks:
+            self._block_starts.append(block[BLOCK_START])
+        self.blocks[block[BLOCK_START]] = block
+
+    def add_anchor(self, position, raw_position):
+        """
+        Record the position in the file of a position in the unescaped data
+        """
+        if position not in self.anchors:
+            idx = bisect_left(self._anchor_positions, position)
+            self._anchor_positions.insert(idx, position)
+        self.anchors[position] = raw_position
+
+    def anchor_before(self, position):
+        """
+        @retval (position, raw position) of the last anchor at or before position
+        """
+        anchor = self._anchor_positions[bisect_right(self._anchor_positions, position) - 1]
+        return (anchor, self.anchors[anchor])
+
+    def anchor_after(self, position):
+        """
+        @retval (position, raw position) of the first anchor at or after position,
+            (None, None) if there is none
+        """
+        idx = bisect_left(self._anchor_positions, position)
+        if idx == len(self._anchor_positions):
+            return (None, None)
+        anchor = self._anchor_positions[idx]
+        return (anchor, self.anchors[anchor])
+
+    def find_block(self, start, length, match):
+        """
+        Find an indexed block
+        @param start The start of the block in the unescaped data
+        @param length The length of the block
+        @param match The SIO_HEADER_MATCHER match of the block header
+        @retval The block entry, None if the block is not in the index
+        """
+        block = self.blocks.get(start)
+        if block is None or block[BLOCK_LENGTH] != length or \
+                block[BLOCK_ID] != match.group(SIO_HEADER_GROUP_ID) or \
+                block[BLOCK_TIMESTAMP] != int(match.group(SIO_HEADER_GROUP_TIMESTAMP), 16) or \
+                block[BLOCK_NUMBER] != int(match.group(SIO_HEADER_GROUP_BLOCK_NUMBER), 16):
+            return None
+        return block
+
+    def get_state(self, ranges, raw_position_fn):
+        """
+        Get the index to store in the parser state, with the blocks starting
+        within the ranges and anchors at the start and end of the ranges and
+        those blocks.
+        @param ranges List of [start, end, ...] ranges still to be parsed
+        @param raw_position_fn Function returning the file position of a
+            position in the unescaped data
+        @retval The index as a dictionary
+        """
+        blocks = []
+        positions = set()
+        block_starts = set()
+        for packet in ranges:
+            start = packet[START_IDX]
+            end = min(packet[END_IDX], self.size)
+            if start >= end:
+                continue
+            positions.add(start)
+            positions.add(end)
+            idx = bisect_left(self._block_starts, start)
+            while idx < len(self._block_starts) and self._block_starts[idx] < end:
+                block = self.blocks[self._block_starts[idx]]
+                if block[BLOCK_START] not in block_starts:
+                    block_starts.add(block[BLOCK_START])
+                    blocks.append(block)
+                    positions.add(block[BLOCK_START])
+                    positions.add(block[BLOCK_START] + block[BLOCK_LENGTH])
+                idx += 1
+
+        blocks.sort()
+        positions.discard(0)
+        positions = sorted(position for position in positions if position < self.size)
+        return {'size': self.size,
+                'raw_size': self.raw_size,
+                'blocks': [list(block) for block in blocks],
+                'anchors': [[position, raw_position_fn(position)] for position in positions]}
 
 # constants for accessing unprocessed and in process data
 START_IDX = 0
@@ -108,7 +302,6 @@ class SioParser(BufferLoadingParser):
                                         publish_callback,
                                         exception_callback)
 
-        self.all_data = None
         self._chunk_sample_count = []
         self.input_file = stream_handle
         self._mid_sample_packets = 0
@@ -117,6 +310,18 @@ class SioParser(BufferLoadingParser):
         self.recovered = recovered
         self._samples_to_throw_out = None
 
+        # the block index, the data following the indexed section of the
+        # file, which is framed when the file is first read, and the
+        # positions of escape sequences within it
+        self._block_index = None
+        self._tail = None
+        self._tail_escapes = []
+        self._tail_start = 0
+        self._raw_tail_start = 0
+        self._data_size = None
+        self._raw_file_size = None
+        self._chunk_length = 0
+
         # use None flag in unprocessed data to initialize this
         # we read the entire file and get the size of the data
         self._read_state = {
@@ -131,33 +336,10 @@ class SioParser(BufferLoadingParser):
     def calc_checksum(self, data):
         """
         Calculate SIO header checksum of data
+        @param data The data portion of the SIO block
+        @retval The checksum as an unsigned 16 bit integer
         """
-        crc = 65535
-        if len(data) == 0:
-            return '0000'
-        for iData in range(0, len(data)):
-            short = struct.unpack('H', data[iData] + '\x00')
-            point = 255 & short[0]
-            crc = crc ^ point
-            for i in range(7, -1, -1):
-                if crc & 1:
-                    crc = (crc >> 1) ^ 33800
-                else:
-                    crc >>= 1
-        crc = ~crc
-        # convert to unsigned
-        if crc < 0:
-            crc += 65536
-        # get rid of the '0x' from the hex string
-        crc = "%s" % hex(crc)[2:].upper()
-        # make sure we have the right format for comparing, must be 4 hex digits
-        if len(crc) == 3:
-            crc = '0' + crc
-        elif len(crc) == 2:
-            crc = '00' + crc
-        elif len(crc) == 1:
-            crc = '000' + crc
-        return crc
+        return calc_sio_checksum(data)
 
     def _combine_adjacent_packets(self, packets):
         """
@@ -196,7 +378,7 @@ class SioParser(BufferLoadingParser):
             next_idx += 1
 
         if len(unproc) > next_idx:
-            data = self.all_data[unproc[next_idx][START_IDX]:unproc[next_idx][END_IDX]]
+            data = self.read_data(unproc[next_idx][START_IDX], unproc[next_idx][END_IDX])
             self._position = unproc[next_idx]
         else:
             data = []
@@ -207,22 +389,17 @@ class SioParser(BufferLoadingParser):
         Loop through all the in process or unprocessed data until the requested number of records are found
         @param num records number of records to get
         """
-        if self.all_data is None:
-            # need to read in the entire data file first and store it because escape sequences shift position of
-            # in process and unprocessed blocks
-            self.all_data = self.read_file()
+        if self._data_size is None:
+            # frame the data appended to the file since it was last indexed.  Escape
+            # sequences shift the position of in process and unprocessed blocks, which
+            # are positions in the unescaped data
+            self.frame_file()
             self.file_complete = True
-            orig_len = len(self.all_data)
-
-            # need to replace escape chars if telemetered data
-            if not self.recovered:
-                self.all_data = self.all_data.replace(b'\x18\x6b', b'\x2b')
-                self.all_data = self.all_data.replace(b'\x18\x58', b'\x18')
 
         # if unprocessed data has not been initialized yet, set it to the entire file
         if self._read_state[StateKey.UNPROCESSED_DATA] is None:
-            self._read_state[StateKey.UNPROCESSED_DATA] = [[0, len(self.all_data)]]
-            self._read_state[StateKey.FILE_SIZE] = orig_len
+            self._read_state[StateKey.UNPROCESSED_DATA] = [[0, self._data_size]]
+            self._read_state[StateKey.FILE_SIZE] = self._raw_file_size
 
         while len(self._record_buffer) < num_records:
             # read unprocessed data packet from the file, starting with in process data
@@ -235,6 +412,7 @@ class SioParser(BufferLoadingParser):
 
             if data and len(self._record_buffer) < num_records:
                 # there is more data, add it to the chunker
+                self._chunk_length = len(data)
                 self._chunker.add_chunk(data, ntplib.system_to_ntp_time(time.time()))
 
                 # parse the chunks now that there is new data in the chunker
@@ -255,8 +433,8 @@ class SioParser(BufferLoadingParser):
             else:
                  # if there is no more data, it is the end of the file, stop looping
                 break
-            # sleep in case this is a long loop
-            gevent.sleep(0)
+            # yield to other greenlets in case this is a long loop
+            cooperate()
 
     def get_records(self, num_records):
         """
@@ -386,24 +564,150 @@ class SioParser(BufferLoadingParser):
             self._read_state[StateKey.UNPROCESSED_DATA] = self._combine_adjacent_packets(
                 self._read_state[StateKey.UNPROCESSED_DATA])
 
-    def read_file(self):
+    def read_file(self, position=0):
         """
-        This function reads the entire input file.
-        Returns:
-            A string containing the contents of the entire file.
+        Read the input file from position to the end of the file.
+        @param position The position in the file to start reading from
+        @retval A string containing the contents of the file from position
         """
-        input_buffer = ''
+        self._stream_handle.seek(position)
+        input_buffer = []
 
         while True:
-            # read data in small blocks in order to not block processing
-            next_data = self._stream_handle.read(1024)
+            # read data in blocks in order to not block processing
+            next_data = self._stream_handle.read(SIO_READ_SIZE)
             if next_data != '':
-                input_buffer = input_buffer + next_data
-                gevent.sleep(0)
+                input_buffer.append(next_data)
+                cooperate()
             else:
                 break
 
-        return input_buffer
+        return ''.join(input_buffer)
+
+    def frame_file(self):
+        """
+        Read the data which follows the indexed section of the file, and add
+        the SIO blocks found in it to the block index.  The blocks are framed
+        up to the first block that isn't complete yet, which is framed again
+        when the file has grown.  The checksums are verified by the sieve,
+        the first time each block is parsed.
+        """
+        self._block_index = SioBlockIndex(self._read_state.get(StateKey.BLOCK_INDEX))
+
+        self._stream_handle.seek(0, 2)
+        if self._block_index.raw_size > self._stream_handle.tell():
+            # the file is smaller than when it was indexed, index it again
+            log.warn("SIO file is smaller than its block index, indexing the whole file")
+            self._block_index = SioBlockIndex()
+        index = self._block_index
+
+        raw_tail = self.read_file(index.raw_size)
+        self._raw_file_size = index.raw_size + len(raw_tail)
+
+        if self.recovered:
+            self._tail = raw_tail
+            self._tail_escapes = []
+        else:
+            self._tail = unescape_sio(raw_tail)
+            # the positions in the unescaped data of the characters which were escaped
+            self._tail_escapes = [match.start(0) - idx for idx, match in
+                                  enumerate(SIO_ESCAPE_MATCHER.finditer(raw_tail))]
+
+        tail_start = index.size
+        raw_tail_start = index.raw_size
+        self._tail_start = tail_start
+        self._raw_tail_start = raw_tail_start
+        self._data_size = tail_start + len(self._tail)
+
+        # any header starting before this would be complete
+        framed_end = max(0, len(self._tail) - SIO_HEADER_LENGTH + 1)
+        n_blocks = 0
+
+        for match in SIO_HEADER_MATCHER.finditer(self._tail):
+            data_len = int(match.group(SIO_HEADER_GROUP_DATA_LENGTH), 16)
+            end_packet_idx = match.end(0) + data_len
+
+            if end_packet_idx >= len(self._tail):
+                # this block isn't complete, frame it again next time
+                framed_end = min(framed_end, match.start(0))
+                break
+
+            start = tail_start + match.start(0)
+            end = tail_start + end_packet_idx + 1
+            index.add_block([start, end - start,
+                             match.group(SIO_HEADER_GROUP_ID),
+                             int(match.group(SIO_HEADER_GROUP_TIMESTAMP), 16),
+                             int(match.group(SIO_HEADER_GROUP_BLOCK_NUMBER), 16),
+                             None])
+            index.add_anchor(start, raw_tail_start + self._tail_raw_position(match.start(0)))
+            index.add_anchor(end, raw_tail_start + self._tail_raw_position(end_packet_idx + 1))
+            n_blocks += 1
+            cooperate()
+
+        index.size = tail_start + framed_end
+        index.raw_size = raw_tail_start + self._tail_raw_position(framed_end)
+        index.add_anchor(index.size, index.raw_size)
+
+        log.debug("Framed %d SIO blocks in %d bytes from file position %d",
+                  n_blocks, len(raw_tail), raw_tail_start)
+
+    def _tail_raw_position(self, position):
+        """
+        @param position A position in the unescaped data following the indexed
+            section of the file when it was read
+        @retval The corresponding position in the escaped data
+        """
+        return position + bisect_left(self._tail_escapes, position)
+
+    def raw_position(self, position):
+        """
+        Find the position in the file of a position in the unescaped data
+        @param position A position in the unescaped data
+        @retval The position in the file
+        """
+        if position >= self._tail_start:
+            return self._raw_tail_start + self._tail_raw_position(position - self._tail_start)
+
+        if position in self._block_index.anchors:
+            return self._block_index.anchors[position]
+
+        # read forward from the previous anchor
+        (anchor, raw_anchor) = self._block_index.anchor_before(position)
+        if self.recovered:
+            return raw_anchor + position - anchor
+
+        self._stream_handle.seek(raw_anchor)
+        raw_data = self._stream_handle.read(2 * (position - anchor) + 1)
+        escapes = [match.start(0) - idx for idx, match in enumerate(SIO_ESCAPE_MATCHER.finditer(raw_data))]
+        return raw_anchor + position - anchor + bisect_left(escapes, position - anchor)
+
+    def read_data(self, start, end):
+        """
+        Read a section of the unescaped data.  Data in the indexed section of
+        the file is read from the file, starting at the nearest anchor.
+        @param start The start of the data, a position in the unescaped data
+        @param end The end of the data
+        @retval The data, shorter than end - start if the data ends before end
+        """
+        end = min(end, self._data_size)
+        if start >= end:
+            return ''
+
+        if start >= self._tail_start:
+            return self._tail[start - self._tail_start:end - self._tail_start]
+
+        # the start of the tail is always an anchor
+        (anchor, raw_anchor) = self._block_index.anchor_before(start)
+        (next_anchor, raw_next_anchor) = self._block_index.anchor_after(min(end, self._tail_start))
+
+        self._stream_handle.seek(raw_anchor)
+        data = self._stream_handle.read(raw_next_anchor - raw_anchor)
+        if not self.recovered:
+            data = unescape_sio(data)
+
+        if end > self._tail_start:
+            data += self._tail[:end - self._tail_start]
+        return data[start - anchor:end - anchor]
 
     def packet_exists(self, start, end):
         """
@@ -490,21 +794,41 @@ class SioParser(BufferLoadingParser):
                 #
                 end_packet = raw_data[end_packet_idx]
                 if end_packet == SIO_BLOCK_END:
+                    expected_checksum = int(match.group(SIO_HEADER_GROUP_CHECKSUM), 16)
+
                     #
-                    # Calculate the checksum on the data portion of the
-                    # SIO block (excludes start of header, header,
-                    # and end of header).
+                    # The checksum of a block is only verified once, the
+                    # result is kept in the block index.
                     #
-                    actual_checksum = self.calc_checksum(
-                        raw_data[match.end(0):end_packet_idx])
-
-                    expected_checksum = match.group(SIO_HEADER_GROUP_CHECKSUM)
+                    block = self._find_indexed_block(raw_data, match, end_packet_idx + 1)
+                    if block is not None and block[BLOCK_CHECKSUM_OK] is not None:
+                        checksum_ok = block[BLOCK_CHECKSUM_OK]
+                        if not checksum_ok:
+                            log.debug("Checksum does not match received checksum %04X for header %s and packet %d to %d",
+                                      expected_checksum, match.group(0)[1:32],
+                                      match.end(0), end_packet_idx)
+                    else:
+                        #
+                        # Calculate the checksum on the data portion of the
+                        # SIO block (excludes start of header, header,
+                        # and end of header).
+                        #
+                        actual_checksum = self.calc_checksum(
+                            raw_data[match.end(0):end_packet_idx])
+                        checksum_ok = actual_checksum == expected_checksum
+                        if block is not None:
+                            block[BLOCK_CHECKSUM_OK] = checksum_ok
+                        if not checksum_ok:
+                            log.debug("Calculated checksum %04X != received checksum %04X for header %s and packet %d to %d",
+                                      actual_checksum, expected_checksum,
+                                      match.group(0)[1:32],
+                                      match.end(0), end_packet_idx)
 
                     #
                     # If the checksums match, add the start,end indices to
                     # the return list.  The end of SIO block byte is included.
                     #
-                    if actual_checksum == expected_checksum:
+                    if checksum_ok:
                         # even if this is not the right instrument, keep track that
                         # this packet was processed
                         if not self.packet_exists(match.start(0), end_packet_idx+1):
@@ -512,17 +836,45 @@ class SioParser(BufferLoadingParser):
                                                                                end_packet_idx+1,
                                                                                None, 0])
                         return_list.append((match.start(0), end_packet_idx+1))
-                    else:
-                        log.debug("Calculated checksum %s != received checksum %s for header %s and packet %d to %d",
-                                  actual_checksum, expected_checksum,
-                                  match.group(0)[1:32],
-                                  match.end(0), end_packet_idx)
                 else:
                     log.debug('End packet at %d is not x03 for header %s',
                               end_packet_idx, match.group(0)[1:32])
 
+            # computing the checksums of a whole file takes a while
+            cooperate()
+
         return return_list
 
+    def _find_indexed_block(self, raw_data, match, end):
+        """
+        Find a block found by the sieve in the block index
+        @param raw_data The data passed to the sieve, which ends with the
+            section of the file added to the chunker last
+        @param match The SIO_HEADER_MATCHER match of the block header
+        @param end The end of the block in raw_data
+        @retval The block entry, None if it isn't in the index
+        """
+        if self._block_index is None:
+            return None
+
+        # data left in the chunker from an earlier section precedes this section
+        chunk_start = len(raw_data) - self._chunk_length
+        if match.start(0) < chunk_start:
+            return None
+
+        start = self._position[START_IDX] + match.start(0) - chunk_start
+        return self._block_index.find_block(start, end - match.start(0), match)
+
+    def _update_block_index_state(self):
+        """
+        Store the block index in the state, with the blocks and anchors needed
+        to parse the in process and unprocessed data.
+        """
+        if self._block_index is not None:
+            self._read_state[StateKey.BLOCK_INDEX] = self._block_index.get_state(
+                self._read_state[StateKey.IN_PROCESS_DATA] + (self._read_state[StateKey.UNPROCESSED_DATA] or []),
+                self.raw_position)
+
     def _yank_particles(self, num_to_fetch):
         """
         Get particles out of the buffer and publish them. Update the state
@@ -549,6 +901,7 @@ class SioParser(BufferLoadingParser):
 
             # need to keep track of which records have actually been returned
             self._increment_state(num_to_fetch)
+            self._update_block_index_state()
             self._state = self._read_state
 
             if self.recovered:
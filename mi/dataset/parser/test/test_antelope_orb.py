@@ -8,6 +8,8 @@
 """
 
 import logging
+import time
+
 from mi.core.log import get_logger
 log = get_logger()
 #log.setLevel(logging.TRACE)
@@ -17,16 +19,18 @@ from nose.plugins.attrib import attr
 from mock import patch, MagicMock
 
 from mi.core.exceptions import SampleException
+from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.dataset.test.test_parser import ParserUnitTestCase
 
 try:
     from mi.dataset.parser.antelope_orb import AntelopeOrbParser, StateKey
     from mi.dataset.parser.antelope_orb import AntelopeOrbPacketParticleKey
     from mi.dataset.parser.antelope_orb import AntelopeOrbPacketParticleChannelKey
-    from mi.dataset.parser.antelope_orb import ParserConfigKey
+    from mi.dataset.parser.antelope_orb import ParserConfigKey, DEFAULT_BATCH_SIZE
 
     from mi.core.kudu import _pkt
     from mi.core.kudu.brttpkt import NoData
+    from mi.core.kudu.fakeorb import FakeOrbReapThr
 except Exception as e:
     log.error("Failed to import antelope lib: %s", e, exc_info=True)
 
@@ -160,3 +164,115 @@ class AntelopeOrbParserUnitTestCase(ParserUnitTestCase):
         self.assertRaises(SampleException, self.parser.get_records)
 
 
+class FakeOrbPacketParticle(DataParticle):
+    """
+    Particle for the packets from FakeOrbReapThr, which can't be unstuffed
+    without the Antelope libs
+    """
+    _data_particle_type = 'antelope_orb_packet_chan'
+
+    def _build_parsed_values(self):
+        pktid, srcname, orbtimestamp, raw_packet = self.raw_data
+        return [{DataParticleKey.VALUE_ID: AntelopeOrbPacketParticleKey.ID,
+                 DataParticleKey.VALUE: pktid}]
+
+
+def make_fake_particle(get_r, *args, **kwargs):
+    return FakeOrbPacketParticle(get_r, *args, **kwargs)
+
+
+@attr('UNIT', group='mi')
+class AntelopeOrbParserBatchTestCase(ParserUnitTestCase):
+    """
+    Batched reaping from an in-process fake ORB
+    """
+    def state_callback(self, state, file_ingested):
+        self.state_callback_values.append(dict(state))
+
+    def pub_callback(self, particles):
+        self.publish_callback_values.append(particles)
+
+    def setUp(self):
+        ParserUnitTestCase.setUp(self)
+        self.state_callback_values = []
+        self.publish_callback_values = []
+
+        patcher = patch('mi.dataset.parser.antelope_orb.make_antelope_particle', make_fake_particle)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_parser(self, batch_size=None, **fake_kwargs):
+        """
+        Build a parser reaping a FakeOrbReapThr with fake_kwargs
+        """
+        config = {
+            ParserConfigKey.ORBNAME: ParserConfigKey.ORBNAME,
+            ParserConfigKey.SELECT: ParserConfigKey.SELECT,
+            ParserConfigKey.REJECT: ParserConfigKey.REJECT,
+        }
+        if batch_size is not None:
+            config[ParserConfigKey.BATCH_SIZE] = batch_size
+
+        def reap_thread(*args, **kwargs):
+            kwargs.update(fake_kwargs)
+            return FakeOrbReapThr(*args, **kwargs)
+
+        with patch('mi.dataset.parser.antelope_orb.OrbReapThr', reap_thread):
+            parser = AntelopeOrbParser(config, None, self.state_callback, self.pub_callback)
+        self.addCleanup(parser.kill_threads)
+        return parser
+
+    def reap(self, parser, count):
+        """
+        Call get_records like the driver does until count packets are published
+        @retval The number of get_records calls which returned packets
+        """
+        batches = 0
+        timeout = time.time() + 30
+        while sum(len(particles) for particles in self.publish_callback_values) < count:
+            if parser.get_records():
+                batches += 1
+            else:
+                time.sleep(0.001)
+            self.assertLess(time.time(), timeout)
+        return batches
+
+    def test_batch(self):
+        """
+        All the queued packets are published together and the state is pushed once per batch
+        """
+        parser = self.make_parser(count=250, queuesize=1000)
+        while parser._orbreapthr._queue.qsize() < 250:
+            time.sleep(0.001)
+
+        self.assertEqual(self.reap(parser, 250), 3)
+        self.assertEqual([len(particles) for particles in self.publish_callback_values],
+                         [DEFAULT_BATCH_SIZE, DEFAULT_BATCH_SIZE, 50])
+        self.assertEqual(len(self.state_callback_values), 3)
+
+        pktids = [particle.raw_data[0] for particles in self.publish_callback_values for particle in particles]
+        self.assertEqual(pktids, range(250))
+        for (particles, state) in zip(self.publish_callback_values, self.state_callback_values):
+            self.assertEqual(state[StateKey.TAFTER], particles[-1].raw_data[2])
+
+        self.assertEqual(parser.get_records(), None)
+        self.assertEqual(len(self.state_callback_values), 3)
+
+    def test_bad_packet(self):
+        """
+        The packets before a bad packet are published and the state covers them
+        """
+        parser = self.make_parser(count=10, queuesize=1000)
+        while parser._orbreapthr._queue.qsize() < 10:
+            time.sleep(0.001)
+
+        def make_particle(get_r, *args, **kwargs):
+            if get_r[0] == 4:
+                raise SampleException("Failed to unstuff ORB packet")
+            return make_fake_particle(get_r, *args, **kwargs)
+
+        with patch('mi.dataset.parser.antelope_orb.make_antelope_particle', make_particle):
+            self.assertRaises(SampleException, parser.get_records)
+        self.assertEqual([particle.raw_data[0] for particle in self.publish_callback_values[0]], range(4))
+        self.assertEqual(self.state_callback_values[-1][StateKey.TAFTER],
+                         self.publish_callback_values[0][-1].raw_data[2])
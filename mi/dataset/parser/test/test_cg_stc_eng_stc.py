@@ -272,4 +272,29 @@ class CgParserUnitTestCase(ParserUnitTestCase):
 	res_dict = result[0].generate_dict()
 	errors = result[0].get_encoding_errors()
 	log.debug("encoding errors: %s", errors)
-	self.assertNotEqual(errors, [])
\ No newline at end of file
+	self.assertNotEqual(errors, [])
+
+    def test_compiled_table(self):
+        """
+        Compare the compiled parameter table with updating a newly built
+        parameter dictionary for each of the STC engineering files
+        """
+        file_names = sorted(name for name in os.listdir(RESOURCE_PATH)
+                            if name.startswith('stc_status') and name.endswith('.txt'))
+        eng_strs = []
+        for file_name in file_names:
+            with open(os.path.join(RESOURCE_PATH, file_name)) as stream_handle:
+                eng_strs.append(stream_handle.read())
+
+        for eng_str in eng_strs:
+            particle = CgStcEngStcParserDataParticle(eng_str, internal_timestamp=self.timestamp_a)
+            values = particle.generate_dict()[DataParticleKey.VALUES]
+
+            params = particle._build_param_dict()
+            params.update(eng_str)
+            expected = params.get_all()
+
+            self.assertEqual(len(values), len(expected))
+            for value in values:
+                self.assertEqual(value[DataParticleKey.VALUE], expected[value[DataParticleKey.VALUE_ID]])
+            self.assertEqual(particle.get_encoding_errors(), params.get_encoding_errors())
@@ -39,6 +39,8 @@ Recovered CT files:
 import gevent
 import unittest
 import os
+import random
+import struct
 from nose.plugins.attrib import attr
 from StringIO import StringIO
 
@@ -46,7 +48,7 @@ from mi.core.log import get_logger ; log = get_logger()
 
 from mi.dataset.test.test_parser import ParserUnitTestCase
 
-from mi.dataset.parser.sio_mule_common import StateKey
+from mi.dataset.parser.sio_mule_common import StateKey, calc_sio_checksum
 
 from mi.dataset.parser.ctdmo import \
     CtdmoRecoveredCoParser, \
@@ -60,7 +62,7 @@ from mi.dataset.parser.ctdmo import \
 
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 from mi.core.instrument.data_particle import DataParticleKey
-from mi.core.exceptions import DatasetParserException
+from mi.core.exceptions import DatasetParserException, SampleException
 
 from mi.idk.config import Config
 RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver',
@@ -270,6 +272,53 @@ EXPECTED_SBE20141231 = [
 ]
 
 
+def build_mule_file(num_blocks, inductive_ids, records_per_block, bad_record=None, seed=0):
+    """
+    Build a telemetered SIO mule file with CT and CO blocks carrying the
+    records of several instruments on the same inductive loop.
+    If bad_record is given, the record separator of that record in the
+    first CT block is invalid.
+    @retval (file contents, {inductive ID: [expected particle], ...})
+    """
+    rand = random.Random(seed)
+    blocks = []
+    particles = dict((inductive_id, []) for inductive_id in inductive_ids)
+
+    for block_number in range(num_blocks):
+        sio_timestamp = '%08X' % (0x51EF36D6 + block_number * 7200)
+        if block_number % 10 == 9:
+            instrument_id = 'CO'
+            records = []
+            for inductive_id in inductive_ids:
+                offset = struct.pack('>i', rand.randint(-100, 100))
+                records.append(chr(inductive_id) + offset + '\x13')
+                particles[inductive_id].append(CtdmoTelemeteredOffsetDataParticle(
+                    (sio_timestamp, chr(inductive_id), offset)))
+        else:
+            instrument_id = 'CT'
+            records = []
+            # records following an invalid one are left out by the parser
+            valid = True
+            for index in range(records_per_block):
+                inductive_id = inductive_ids[index % len(inductive_ids)]
+                science = ''.join(chr(rand.randint(0, 255)) for _ in range(7))
+                science_time = struct.pack('<I', 0x19818000 + block_number * 7200 + index)
+                if block_number == 0 and index == bad_record:
+                    valid = False
+                records.append(chr(inductive_id) + science + science_time + ('\x0D' if valid else '\x0A'))
+                if valid:
+                    particles[inductive_id].append(CtdmoTelemeteredInstrumentDataParticle(
+                        (sio_timestamp, chr(inductive_id), science, science_time)))
+
+        data = ''.join(records)
+        escaped_data = data.replace('\x18', '\x18\x58').replace('\x2b', '\x18\x6b')
+        blocks.append('\x01%s1237602_%04X4%s_%02X_%04X\x02%s\x03' %
+                      (instrument_id, len(data), sio_timestamp, block_number % 256,
+                       calc_sio_checksum(data), escaped_data))
+
+    return ''.join(blocks), particles
+
+
 @attr('UNIT', group='mi')
 class CtdmoParserUnitTestCase(ParserUnitTestCase):
 
@@ -1181,3 +1230,31 @@ class CtdmoParserUnitTestCase(ParserUnitTestCase):
 
         in_file.close()
         self.assertEqual(self.exception_callback_value, None)
+
+    def test_multi_instrument(self):
+        """
+        Read a telemetered file with the CT and CO records of several
+        instruments, verify only the particles of the configured inductive
+        ID are generated, and that data after an invalid record in a block
+        is reported and left out.
+        """
+        data, particles = build_mule_file(20, range(50, 60), 40)
+        expected_results = particles[55]
+
+        self.parser = CtdmoTelemeteredParser(self.config, StringIO(data), None, self.state_callback,
+                                             self.pub_callback, self.exception_callback)
+        result = self.parser.get_records(len(expected_results) + 1)
+        self.assertEqual(result, expected_results)
+        self.assertEqual(self.exception_callback_value, None)
+
+        #
+        # With an invalid 7th record in the first CT block, the particle for
+        # the 6th record is still generated.
+        #
+        data, particles = build_mule_file(20, range(50, 60), 40, bad_record=6)
+        self.assertEqual(len(particles[55]), len(expected_results) - 3)
+        self.parser = CtdmoTelemeteredParser(self.config, StringIO(data), None, self.state_callback,
+                                             self.pub_callback, self.exception_callback)
+        result = self.parser.get_records(len(particles[55]) + 1)
+        self.assertEqual(result, particles[55])
+        self.assertIsInstance(self.exception_callback_value, SampleException)
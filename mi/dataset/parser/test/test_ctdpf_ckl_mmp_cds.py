@@ -11,6 +11,10 @@ import os
 import numpy
 import yaml
 import copy
+import msgpack
+import random
+
+from StringIO import StringIO
 
 from nose.plugins.attrib import attr
 
@@ -23,7 +27,7 @@ from mi.core.exceptions import SampleException, DatasetParserException
 from mi.dataset.test.test_parser import ParserUnitTestCase
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 from mi.dataset.parser.ctdpf_ckl_mmp_cds import CtdpfCklMmpCdsParser
-from mi.dataset.parser.mmp_cds_base import StateKey
+from mi.dataset.parser.mmp_cds_base import StateKey, MMP_CDS_BLOCK_SIZE, msgpack_object_end
 
 # Resource path for ctdpf ckl mmp cds
 RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver', 'ctdpf_ckl', 'mmp_cds', 'resource')
@@ -247,6 +251,96 @@ class CtdpfCklMmpCdsParserUnitTestCase(ParserUnitTestCase):
 
         stream_handle.close()
 
+    def test_streaming(self):
+        """
+        This test verifies that particles are returned from a large file without decoding the whole file, that
+        the undecoded data held by the parser stays bounded and that restarting from a state with a position
+        continues with the next particle.
+        """
+
+        file_path = os.path.join(RESOURCE_PATH, 'ctd_1_20131124T005004_458.mpk')
+        with open(file_path, 'rb') as stream_handle:
+            data = stream_handle.read()
+
+        # 86 particles per copy of the file
+        stream_handle = StringIO(data * 100)
+
+        parser = CtdpfCklMmpCdsParser(self.config, None, stream_handle,
+                                      self.state_callback, self.pub_callback)
+
+        particles = parser.get_records(1)
+
+        self.assertEqual(len(particles), 1)
+        self.assert_result(self.get_dict_from_yml('first.yml')['data'][0], particles[0])
+        self.assertTrue(stream_handle.tell() <= MMP_CDS_BLOCK_SIZE)
+
+        num_particles = 1
+        max_buffered = 0
+        while True:
+            particles = parser.get_records(500)
+            if not particles:
+                break
+            num_particles += len(particles)
+            max_buffered = max(max_buffered, len(parser._unpacked_buffer))
+
+            if num_particles == 501:
+                # Restart from the current state and check the next particle is the same one
+                state = copy.copy(self.state_callback_value)
+                self.assertTrue(0 < state[StateKey.POSITION] < len(data) * 100)
+
+                restart_handle = StringIO(data * 100)
+                restart_parser = CtdpfCklMmpCdsParser(self.config, state, restart_handle,
+                                                      self.state_callback, self.pub_callback)
+                expected = parser.get_records(1)[0].generate_dict()
+                restarted = restart_parser.get_records(1)[0].generate_dict()
+                num_particles += 1
+                for particle_dict in (expected, restarted):
+                    particle_dict.pop('driver_timestamp')
+                self.assertEqual(expected, restarted)
+
+        self.assertEqual(num_particles, 8600)
+        self.assertEqual(self.state_callback_value[StateKey.PARTICLES_RETURNED], 8600)
+        self.assertEqual(self.state_callback_value[StateKey.POSITION], len(data) * 100)
+        self.assertTrue(self.file_ingested_value)
+        self.assertTrue(max_buffered < MMP_CDS_BLOCK_SIZE)
+
+    def test_msgpack_object_end(self):
+        """
+        This test verifies that walking the msgpack headers finds the end of each packed object.
+        """
+
+        rand = random.Random(1234)
+
+        def random_object(depth):
+            choice = rand.randint(0, 7 if depth < 3 else 4)
+            if choice == 0:
+                return rand.choice([None, True, False, rand.randint(-2**63, 2**64 - 1),
+                                    rand.randint(-40, 200), rand.randint(-2**31, 2**32)])
+            elif choice == 1:
+                return rand.random() * 10 ** rand.randint(-5, 5)
+            elif choice == 2:
+                return 's' * rand.choice([0, 5, 31, 32, 300, 70000])
+            elif choice == 3:
+                return msgpack.ExtType(rand.randint(0, 100), 'x' * rand.choice([1, 2, 3, 4, 8, 16, 300]))
+            elif choice == 4:
+                return [1385254224, 123032, {'condwat': rand.random(), 'tempwat': 8.7794, 'preswat': 13.71}]
+            elif choice in (5, 6):
+                return [random_object(depth + 1) for _ in range(rand.choice([0, 3, 15, 16, 20]))]
+            return dict((rand.randint(0, 10**6), random_object(depth + 1))
+                        for _ in range(rand.choice([0, 3, 15, 16, 20])))
+
+        for i in range(500):
+            objects = [random_object(0) for _ in range(3)]
+            packed = [msgpack.packb(item, use_bin_type=bool(i % 2), use_single_float=bool(i % 3 == 0))
+                      for item in objects]
+            data = ''.join(packed)
+
+            position = 0
+            for item in packed:
+                end = msgpack_object_end(data, position)
+                self.assertEqual(end - position, len(item))
+                position = end
+
     def test_bad_data_one(self):
         """
         This test verifies that a SampleException is raised when msgpack data is malformed.
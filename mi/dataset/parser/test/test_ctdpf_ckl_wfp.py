@@ -7,6 +7,7 @@
 @brief Test code for a ctdpf_ckl_wfp data parser
 """
 import os
+import random
 import struct
 import ntplib
 from StringIO import StringIO
@@ -26,7 +27,7 @@ from mi.dataset.parser.ctdpf_ckl_wfp_particles import CtdpfCklWfpRecoveredDataPa
 from mi.dataset.parser.ctdpf_ckl_wfp_particles import CtdpfCklWfpTelemeteredDataParticle
 from mi.dataset.parser.ctdpf_ckl_wfp_particles import CtdpfCklWfpRecoveredMetadataParticle
 from mi.dataset.parser.ctdpf_ckl_wfp_particles import CtdpfCklWfpTelemeteredMetadataParticle
-from mi.dataset.parser.wfp_c_file_common import StateKey
+from mi.dataset.parser.wfp_c_file_common import StateKey, DATA_RECORD_BYTES, find_end_of_profile
 from mi.dataset.driver.ctdpf_ckl.wfp.driver import DataTypeKey
 
 
@@ -565,3 +566,51 @@ class CtdpfCklWfpParserUnitTestCase(ParserUnitTestCase):
                 self.config.get(DataTypeKey.CTDPF_CKL_WFP_RECOVERED), self.telemetered_start_state, stream_handle,
                 self.state_callback, self.pub_callback, self.exception_callback,
                 len(CtdpfCklWfpParserUnitTestCase.TEST_DATA_BAD_EOP))
+
+    def test_large_profile(self):
+        """
+        Read a large recovered profile and check each particle's timestamp and state
+        against a parse of the same profile passed through the chunker one record
+        at a time.
+        """
+        rand = random.Random(1234)
+        num_records = 20000
+        records = [''.join(chr(rand.randint(0, 254)) for _ in range(DATA_RECORD_BYTES))
+                   for _ in range(num_records)]
+        data = ''.join(records) + '\xff' * DATA_RECORD_BYTES + '\x52\x4e\x75\x82\x52\x4e\x76\x9a'
+
+        self.assertEqual(find_end_of_profile(data), (num_records, num_records * DATA_RECORD_BYTES))
+        self.assertEqual(find_end_of_profile(data[:-20]), (num_records - 1, None))
+
+        self.parser = CtdpfCklWfpParser(
+            self.config.get(DataTypeKey.CTDPF_CKL_WFP_RECOVERED), None, StringIO(data),
+            self.state_callback, self.pub_callback, self.exception_callback, len(data))
+        result = self.parser.get_records(num_records + 1)
+
+        self.assertEqual(len(result), num_records + 1)
+        self.assertEqual(self.file_ingested_value, True)
+        self.assertEqual(self.state_callback_value, {StateKey.POSITION: num_records * DATA_RECORD_BYTES,
+                                                     StateKey.RECORDS_READ: num_records,
+                                                     StateKey.METADATA_SENT: True})
+
+        time_increment = float(0x524e769a - 0x524e7582) / num_records
+        for index in range(0, num_records, 997):
+            self.assertEqual(result[index + 1].raw_data, records[index])
+            self.assertEqual(result[index + 1].get_value('internal_timestamp'),
+                             self.calc_timestamp(0x524e7582, time_increment, index))
+
+        chunk_parser = CtdpfCklWfpParser(
+            self.config.get(DataTypeKey.CTDPF_CKL_WFP_RECOVERED), None, StringIO(data),
+            self.state_callback, self.pub_callback, self.exception_callback, len(data))
+        chunk_result = []
+        for index in range(0, len(data), 1024):
+            chunk_parser._chunker.add_chunk(data[index:index + 1024], float(index))
+            chunk_result.extend(chunk_parser.parse_chunks())
+
+        self.assertEqual([particle.raw_data for (particle, state) in chunk_result],
+                         [particle.raw_data for particle in result])
+        self.assertEqual([particle.get_value('internal_timestamp') for (particle, state) in chunk_result],
+                         [particle.get_value('internal_timestamp') for particle in result])
+        self.assertEqual(chunk_result[-1][1], self.state_callback_value)
+        self.assertEqual(chunk_parser._read_state[StateKey.POSITION], len(data))
+        self.assertEqual(self.parser._read_state[StateKey.POSITION], len(data))
@@ -52,8 +52,10 @@ Files used for testing:
   15. extra floating point number in sensor data
 """
 
+import copy
 import unittest
 import os
+from StringIO import StringIO
 from nose.plugins.attrib import attr
 
 from mi.core.log import get_logger ; log = get_logger()
@@ -359,6 +361,42 @@ class DostaAbcdjmDclParserUnitTestCase(ParserUnitTestCase):
 
         log.debug('===== END TEST BIG GIANT INPUT =====')
 
+    def test_day_of_logs(self):
+        """
+        Read a day of concatenated log files.  Verify that a parser restarted
+        from a state published in the middle of the day produces the same
+        particles as the parser reading it all.
+        """
+        log.debug('===== START TEST DAY OF LOGS =====')
+
+        # A dosta samples every 13.6 seconds, about 6350 records per day.
+        day_of_logs = ''
+        for filename in [FILE1, FILE2, FILE3, FILE4] * 11:
+            in_file = self.open_file(filename)
+            day_of_logs += in_file.read()
+            in_file.close()
+
+        number_expected_results = 11 * (len(EXPECTED_FILE1) + len(EXPECTED_FILE2) +
+                                        len(EXPECTED_FILE3) + 500)
+
+        parser = self.create_tel_parser(StringIO(day_of_logs))
+        result = parser.get_records(number_expected_results + 1)
+
+        self.assertEqual(len(result), number_expected_results)
+        self.assertEqual(self.tel_exception_callback_value, None)
+
+        # Stop half way through the day and restart from the published state.
+        parser = self.create_tel_parser(StringIO(day_of_logs))
+        half = number_expected_results / 2
+        self.assertEqual(parser.get_records(half), result[:half])
+
+        parser = self.create_tel_parser(StringIO(day_of_logs),
+                                        new_state=copy.copy(self.rec_state_callback_value))
+        self.assertEqual(parser.get_records(number_expected_results), result[half:])
+        self.assertEqual(self.tel_exception_callback_value, None)
+
+        log.debug('===== END TEST DAY OF LOGS =====')
+
     def test_get_many(self):
         """
         Read a file and pull out multiple data particles at one time.
@@ -7,6 +7,7 @@
 @brief Test code for a Glider data parser.
 """
 
+import os
 from StringIO import StringIO
 
 import numpy as np
@@ -41,6 +42,10 @@ from mi.dataset.parser.glider import EngineeringRecoveredDataParticle
 from mi.dataset.parser.glider import EngineeringScienceRecoveredParticleKey
 from mi.dataset.parser.glider import EngineeringScienceRecoveredDataParticle
 
+from mi.idk.config import Config
+ENG_RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver',
+                                 'moas', 'gl', 'engineering', 'resource')
+
 
 
 
@@ -815,4 +820,79 @@ class ENGRecoveredGliderTest(GliderParserUnitTestCase):
         self.reset_eng_parser({StateKey.POSITION: 10795, StateKey.SENT_METADATA: True})
         self.assert_generate_particle(EngineeringRecoveredDataParticle, record_2, 10795)
         self.assert_generate_particle(EngineeringScienceRecoveredDataParticle, record_sci_2, 12479)
-        self.assert_no_more_data()
\ No newline at end of file
+        self.assert_no_more_data()
+
+
+@attr('UNIT', group='mi')
+class GliderSchemaTest(GliderParserUnitTestCase):
+    """
+    Test the compiled glider schema against decoding each column of each row
+    """
+    config = {
+        DataSetDriverConfigKeys.PARTICLE_MODULE: 'mi.dataset.parser.glider',
+        DataSetDriverConfigKeys.PARTICLE_CLASS: [EngineeringMetadataDataParticle,
+                                                 EngineeringTelemeteredDataParticle,
+                                                 EngineeringScienceTelemeteredDataParticle]
+    }
+
+    def reference_read_data(self, data_record):
+        """
+        Decode every column of a row one at a time into a data dictionary
+        """
+        data_dict = {}
+        labels = self.parser._header_dict['labels']
+        num_bytes = self.parser._header_dict['num_of_bytes']
+
+        for label, size, value_string in zip(labels, num_bytes, data_record.split()):
+            if value_string == 'NaN':
+                value = float(value_string)
+            elif '_lat' in label or '_lon' in label:
+                value = self.parser._string_to_ddegrees(value_string)
+            elif size in (1, 2):
+                value = int(value_string)
+            elif size in (4, 8):
+                value = float(value_string)
+            else:
+                value = value_string
+            data_dict[label] = {'Name': label, 'Data': value}
+
+        return data_dict
+
+    def test_schema_decode(self):
+        """
+        The schema decodes the same values as converting each column on its
+        own, and only includes the columns used by the particles
+        """
+        self.set_data_file(os.path.join(ENG_RESOURCE_PATH, 'unit_247_2012_051_0_0-engDataOnly.mrg'))
+        self.reset_eng_parser()
+        data_records = self.test_data.read().strip('\n').split('\n')
+
+        schema = self.parser._schema
+        columns = sorted(set(schema.particle_columns(EngineeringTelemeteredDataParticle)[0]) |
+                         set(schema.particle_columns(EngineeringScienceTelemeteredDataParticle)[0]))
+        rows = [data_record.split() for data_record in data_records]
+        values = schema.decode(rows)
+
+        self.assertEqual(len(values), len(data_records))
+
+        for data_record, data, row_values in zip(data_records, rows, values):
+            expected = self.reference_read_data(data_record)
+            data_dict = self.parser._read_data(data, row_values, columns)
+
+            self.assertEqual(sorted(data_dict.keys()), sorted(schema.labels[column] for column in columns))
+
+            for label, item in data_dict.iteritems():
+                value = item['Data']
+                expected_value = expected[label]['Data']
+                self.assertEqual(type(value), type(expected_value))
+                if isinstance(value, float) and np.isnan(value):
+                    self.assertTrue(np.isnan(expected_value))
+                else:
+                    self.assertEqual(value, expected_value)
+
+        self.assertEqual(self.error_callback_values, [])
+
+        # a bad number fails the whole batch
+        rows[0][2] = 'bad'
+        with self.assertRaises(ValueError):
+            schema.decode(rows)
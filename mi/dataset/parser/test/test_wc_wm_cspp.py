@@ -11,6 +11,7 @@ test_dosta_abcdjm_cspp.py fully tests all of the capabilities of the
 base parser.  That level of testing is omitted from this test suite
 """
 
+import copy
 import os
 import yaml
 import numpy
@@ -261,6 +262,44 @@ class WcWmCsppParserUnitTestCase(ParserUnitTestCase):
 
         stream_handle.close()
 
+    def test_large_import(self):
+        """
+        Read the whole file, which spans many blocks.  Assert that a parser
+        started from a state published in the middle of the file produces the
+        same particles as the parser reading the whole file.
+        """
+        file_path = os.path.join(RESOURCE_PATH, '11079364_WC_WM.txt')
+        stream_handle = open(file_path, 'r')
+
+        parser = WcWmCsppParser(self.config.get(WcWmDataTypeKey.WC_WM_CSPP_RECOVERED),
+                                None, stream_handle,
+                                self.state_callback, self.pub_callback,
+                                self.exception_callback)
+
+        particles = parser.get_records(10000)
+
+        # the metadata particle and one particle for each data record
+        self.assertEqual(len(particles), 6679)
+        self.assertEqual(self.exception_callback_value, None)
+
+        stream_handle.seek(0)
+        parser = WcWmCsppParser(self.config.get(WcWmDataTypeKey.WC_WM_CSPP_RECOVERED),
+                                None, stream_handle,
+                                self.state_callback, self.pub_callback,
+                                self.exception_callback)
+        parser.get_records(5000)
+
+        parser = WcWmCsppParser(self.config.get(WcWmDataTypeKey.WC_WM_CSPP_RECOVERED),
+                                copy.copy(self.state_callback_value), stream_handle,
+                                self.state_callback, self.pub_callback,
+                                self.exception_callback)
+        restarted_particles = parser.get_records(10000)
+
+        self.assertEqual([particle.generate_dict()['values'] for particle in restarted_particles],
+                         [particle.generate_dict()['values'] for particle in particles[5000:]])
+
+        stream_handle.close()
+
     def test_mid_state_start(self):
         """
         This test makes sure that we retrieve the correct particles upon starting with an offset state.
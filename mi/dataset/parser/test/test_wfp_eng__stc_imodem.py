@@ -7,6 +7,7 @@
 @brief Test code for a Wfp_eng__stc_imodem data parser
 """
 import ntplib
+import random
 import struct
 from StringIO import StringIO
 
@@ -19,7 +20,7 @@ from mi.core.exceptions import SampleException
 from mi.dataset.test.test_parser import ParserUnitTestCase
 from mi.dataset.dataset_driver import DataSetDriverConfigKeys
 from mi.dataset.driver.WFP_ENG.STC_IMODEM.driver import DataTypeKey
-from mi.dataset.parser.WFP_E_file_common import StateKey
+from mi.dataset.parser.WFP_E_file_common import StateKey, STATUS_START_MATCHER, STATUS_BYTES, SAMPLE_BYTES
 from mi.dataset.parser.wfp_eng__stc_imodem import WfpEngStcImodemParser
 from mi.dataset.parser.wfp_eng__stc_imodem_particles import WfpEngStcImodemStartRecoveredDataParticle
 from mi.dataset.parser.wfp_eng__stc_imodem_particles import WfpEngStcImodemStatusRecoveredDataParticle
@@ -34,6 +35,25 @@ from mi.idk.config import Config
 RESOURCE_PATH = os.path.join(Config().base_dir(), 'mi', 'dataset', 'driver', 'WFP_ENG', 'wfp', 'resource')
 
 
+def regex_sieve(raw_data):
+    """
+    Reference sieve which matches the status start at each record
+    """
+    data_index = 0
+    return_list = []
+    while data_index < len(raw_data):
+        remain_bytes = len(raw_data) - data_index
+        if remain_bytes >= STATUS_BYTES and STATUS_START_MATCHER.match(raw_data[data_index:data_index + 4]):
+            return_list.append((data_index, data_index + STATUS_BYTES))
+            data_index += STATUS_BYTES
+        elif remain_bytes >= SAMPLE_BYTES:
+            return_list.append((data_index, data_index + SAMPLE_BYTES))
+            data_index += SAMPLE_BYTES
+        else:
+            break
+    return return_list
+
+
 @attr('UNIT', group='mi')
 class WfpEngStcImodemParserUnitTestCase(ParserUnitTestCase):
     """
@@ -545,6 +565,38 @@ class WfpEngStcImodemParserUnitTestCase(ParserUnitTestCase):
         if len(result) == 4:
             self.fail("We got 4 records, the bad data should only make 3")
 
+    def test_sieve(self):
+        """
+        The sieve splits samples and status messages the same way as matching the
+        status start at each record, including partial records and data that looks
+        like a status start
+        """
+        self.stream_handle = StringIO(WfpEngStcImodemParserUnitTestCase.TEST_DATA)
+        self.parser = WfpEngStcImodemParser(
+            self.config.get(DataTypeKey.WFP_ENG_STC_IMODEM_RECOVERED), self.start_state, self.stream_handle,
+            self.state_callback, self.pub_callback)
+
+        rand = random.Random(1234)
+        for i in range(500):
+            records = []
+            for j in range(rand.randint(0, 12)):
+                choice = rand.random()
+                if choice < 0.3:
+                    records.append('\xff\xff\xff' + chr(rand.randint(0xf8, 0xff)) +
+                                   ''.join(chr(rand.randint(0, 255)) for _ in range(STATUS_BYTES - 4)))
+                elif choice < 0.4:
+                    records.append('\xff' * rand.randint(1, 30))
+                else:
+                    records.append(''.join(chr(rand.choice([0, 255, rand.randint(0, 255)]))
+                                           for _ in range(SAMPLE_BYTES)))
+            raw_data = ''.join(records)
+            cut = rand.randint(0, len(raw_data))
+            for data in (raw_data, raw_data[:cut], raw_data[cut:]):
+                self.assertEqual(self.parser.sieve_function(data), regex_sieve(data))
+
+        self.assertEqual(self.parser.sieve_function(WfpEngStcImodemParserUnitTestCase.TEST_DATA),
+                         regex_sieve(WfpEngStcImodemParserUnitTestCase.TEST_DATA))
+
     def particle_to_yml(self, particles, filename, mode='w'):
         """
         This is added as a testing helper, not actually as part of the parser tests. Since the same particles
@@ -25,7 +25,6 @@ __author__ = 'Steve Myerson (Raytheon)'
 __license__ = 'Apache 2.0'
 
 import copy
-import gevent
 import ntplib
 import re
 import struct
@@ -34,6 +33,7 @@ from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException, DatasetParserException
 from mi.core.instrument.data_particle import DataParticle, DataParticleKey
 from mi.core.log import get_logger; log = get_logger()
+from mi.core.time_slice import cooperate
 from mi.dataset.dataset_parser import BufferLoadingParser
 
 FLAG_RECORD_SIZE = 26                   # bytes
@@ -306,7 +306,7 @@ class Vel3dKWfpStcParser(BufferLoadingParser):
             next_block = self._stream_handle.read(BLOCK_SIZE)
             if next_block:
                 data = data + next_block
-                gevent.sleep(0)
+                cooperate()
             else:
                 eof = True
 
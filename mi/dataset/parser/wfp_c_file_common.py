@@ -18,6 +18,7 @@ import re
 import ntplib
 import struct
 import binascii
+import numpy
 
 from mi.core.log import get_logger ; log = get_logger()
 from mi.core.common import BaseEnum
@@ -34,11 +35,30 @@ DATA_RECORD_BYTES = 11
 TIME_RECORD_BYTES = 8
 FOOTER_BYTES = DATA_RECORD_BYTES + TIME_RECORD_BYTES
 
+# a profile file is read as an array of fixed size records
+DATA_RECORD_DTYPE = numpy.dtype([('record', numpy.uint8, DATA_RECORD_BYTES)])
+
 class StateKey(BaseEnum):
     POSITION = 'position' # holds the file position
     RECORDS_READ = 'records_read' # holds the number of records read so far
     METADATA_SENT = 'metadata_sent' # holds a flag indicating if the footer has been sent
 
+def find_end_of_profile(raw_data):
+    """
+    Find the end of profile marker in raw data starting at a record boundary.  The
+    raw data is viewed as an array of data records, and the first record filled
+    with \xFF is found in one search rather than matching each record.
+    @param raw_data The raw data read from the file
+    @retval A tuple of the number of data records before the end of profile, and the index
+        of the end of profile record in raw_data, or None if the end of profile was not found
+    """
+    num_records = len(raw_data) // DATA_RECORD_BYTES
+    records = numpy.frombuffer(raw_data, dtype=DATA_RECORD_DTYPE, count=num_records)['record']
+    eop_records = numpy.flatnonzero((records == 0xFF).all(axis=1))
+    if len(eop_records) == 0:
+        return num_records, None
+    return int(eop_records[0]), int(eop_records[0]) * DATA_RECORD_BYTES
+
 class WfpMetadataParserDataParticleKey(BaseEnum):
     WFP_TIME_ON = 'wfp_time_on'
     WFP_TIME_OFF = 'wfp_time_off'
@@ -84,27 +104,13 @@ class WfpCFileCommonParser(BufferLoadingParser):
         in this binary file.
         @param raw_data The raw data read from the file
         """
-        data_index = 0
-        return_list = []
-        raw_data_len = len(raw_data)
-
-        while data_index < raw_data_len:
-            # check if this is a status or data sample message
-            if EOP_ONLY_MATCHER.match(raw_data[data_index:data_index + DATA_RECORD_BYTES]):
-                if (raw_data_len - (data_index + DATA_RECORD_BYTES)) >= TIME_RECORD_BYTES:
-                    return_list.append((data_index, data_index + DATA_RECORD_BYTES + TIME_RECORD_BYTES))
-                    break;
-                else:
-                    # not enough bytes have been read to get both the end of profile and timestamps, need to wait for more
-                    break
-            else:
-                return_list.append((data_index, data_index + DATA_RECORD_BYTES))
-                data_index += DATA_RECORD_BYTES
+        (num_records, eop_index) = find_end_of_profile(raw_data)
+        return_list = [(data_index, data_index + DATA_RECORD_BYTES)
+                       for data_index in xrange(0, num_records * DATA_RECORD_BYTES, DATA_RECORD_BYTES)]
 
-            # if the remaining bytes are less than the data sample bytes, we will just have the
-            # timestamp which is parsed in __init__
-            if (raw_data_len - data_index) < DATA_RECORD_BYTES:
-                break
+        # if not enough bytes have been read to get both the end of profile and timestamps, need to wait for more
+        if eop_index is not None and (len(raw_data) - (eop_index + DATA_RECORD_BYTES)) >= TIME_RECORD_BYTES:
+            return_list.append((eop_index, eop_index + FOOTER_BYTES))
         return return_list
 
     def extract_metadata_particle(self, raw_data, timestamp):
@@ -203,6 +209,18 @@ class WfpCFileCommonParser(BufferLoadingParser):
         timestamp = self._start_time + (self._time_increment * record_number)
         return float(ntplib.system_to_ntp_time(timestamp))
 
+    def calc_timestamps(self, first_record, num_records):
+        """
+        calculate the timestamps for a run of records in one vector operation, these are
+        identical to calling calc_timestamp for each record
+        @param first_record The number of the first record to calculate the timestamp for
+        @param num_records The number of records to calculate timestamps for
+        @retval A list of floating point NTP64 formatted timestamps
+        """
+        record_numbers = numpy.arange(first_record, first_record + num_records, dtype=numpy.float64)
+        timestamps = self._start_time + (self._time_increment * record_numbers)
+        return ntplib.system_to_ntp_time(timestamps).tolist()
+
     def parse_chunks(self):
         """
         Parse out any pending data chunks in the chunker. If
@@ -210,7 +228,14 @@ class WfpCFileCommonParser(BufferLoadingParser):
         timestamp. Go until the chunker has no more valid data.
         @retval a list of tuples with sample particles encountered in this
             parsing, plus the state. An empty list of nothing was parsed.
-        """     
+        """
+        records = []
+
+        (timestamp, chunk) = self._chunker.get_next_data()
+        while chunk != None:
+            records.append(chunk)
+            (timestamp, chunk) = self._chunker.get_next_data()
+
         result_particles = []
 
         if not self._read_state[StateKey.METADATA_SENT] and not self.footer_data is None:
@@ -219,21 +244,22 @@ class WfpCFileCommonParser(BufferLoadingParser):
             self._read_state[StateKey.METADATA_SENT] = True
             result_particles.append((sample, copy.copy(self._read_state)))
 
-        (timestamp, chunk) = self._chunker.get_next_data()
+        # the records read only advances when a particle is created, so index
+        # the timestamps by the records read rather than the record position
+        first_record = self._read_state[StateKey.RECORDS_READ]
+        timestamps = self.calc_timestamps(first_record, len(records))
 
-        while (chunk != None):
+        for record in records:
             # particle-ize the data block received, return the record
-            if EOP_MATCHER.match(chunk):
+            if len(record) == FOOTER_BYTES:
                 # this is the end of profile matcher, just increment the state
                 self._increment_state(DATA_RECORD_BYTES + TIME_RECORD_BYTES, 0)
             else:
-                timestamp = self.calc_timestamp(self._read_state[StateKey.RECORDS_READ])
-                sample = self.extract_data_particle(chunk, timestamp)
+                timestamp = timestamps[self._read_state[StateKey.RECORDS_READ] - first_record]
+                sample = self.extract_data_particle(record, timestamp)
                 if sample:
                     # create particle
                     self._increment_state(DATA_RECORD_BYTES, 1)
                     result_particles.append((sample, copy.copy(self._read_state)))
 
-            (timestamp, chunk) = self._chunker.get_next_data()
-
-        return result_particles
\ No newline at end of file
+        return result_particles
@@ -7,11 +7,76 @@
 @brief Test code for the dataset driver base classes
 """
 
+import os
+import re
+import shutil
+import tempfile
+import gevent
+
+from mock import patch
 from nose.plugins.attrib import attr
 
 from mi.core.unit_test import MiUnitTestCase
+from mi.core.log import get_logger ; log = get_logger()
 from mi.core.exceptions import DataSourceLocationException
+from mi.core.time_slice import get_time_slice
 from mi.dataset.dataset_driver import DataSourceLocation
+from mi.dataset.dataset_driver import SimpleDataSetDriver
+from mi.dataset.dataset_driver import DataSourceConfigKey
+from mi.dataset.dataset_driver import DataSetDriverConfigKeys
+from mi.dataset.dataset_driver import DriverParameter
+from mi.dataset.dataset_parser import BufferLoadingParser
+
+LINE_MATCHER = re.compile(r'[^\n]*\n')
+
+# CPU time spent parsing each record
+RECORD_TIME = 0.0002
+
+class FakeClock(object):
+    """
+    Clock of the time slices, only advanced by the CPU time the parser uses
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+clock = FakeClock()
+
+class SlowParser(BufferLoadingParser):
+    """
+    Parser of a file of lines, using RECORD_TIME of the fake clock for each
+    record without ever blocking
+    """
+    def __init__(self, config, stream_handle, state, state_callback, publish_callback):
+        super(SlowParser, self).__init__(config, stream_handle, state, self.sieve_function,
+                                         state_callback, publish_callback)
+        self._position = 0
+
+    def sieve_function(self, raw_data):
+        return [(match.start(), match.end()) for match in LINE_MATCHER.finditer(raw_data)]
+
+    def parse_chunks(self):
+        result = []
+        (timestamp, chunk) = self._chunker.get_next_data()
+        while chunk is not None:
+            clock.advance(RECORD_TIME)
+            self._position += len(chunk)
+            result.append((chunk, self._position))
+            (timestamp, chunk) = self._chunker.get_next_data()
+        return result
+
+class SlowDataSetDriver(SimpleDataSetDriver):
+    """
+    Driver parsing with the SlowParser
+    """
+    def _build_parser(self, memento, infile):
+        return SlowParser(self._parser_config, infile, memento,
+                          self._save_parser_state, self._data_callback)
 
 @attr('UNIT', group='mi')
 class DataSourceLocationUnitTestCase(MiUnitTestCase):
@@ -55,6 +120,93 @@ class DataSourceLocationUnitTestCase(MiUnitTestCase):
         dsl = DataSourceLocation(parser_position=parser_pos1)
         self.assertEqual(dsl.harvester_position, None)
         self.assertEqual(dsl.parser_position, parser_pos1)
-        
-        
-                
\ No newline at end of file
+
+
+@attr('UNIT', group='mi')
+class CooperativeParsingUnitTestCase(MiUnitTestCase):
+    """
+    Test the driver keeps handling commands while it ingests a file
+    """
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+        self.file_name = 'large.txt'
+        self.record_count = 10000
+        with open(os.path.join(self.test_dir, self.file_name), 'w') as f:
+            for i in range(self.record_count):
+                f.write("record %08d\n" % i)
+
+        self.particles = []
+        self.config = {
+            DataSourceConfigKey.HARVESTER: {
+                DataSetDriverConfigKeys.DIRECTORY: self.test_dir,
+                DataSetDriverConfigKeys.PATTERN: '*.txt'
+            },
+            DataSourceConfigKey.PARSER: {},
+            DataSourceConfigKey.DRIVER: {
+                DriverParameter.BATCHED_PARTICLE_COUNT: 1000,
+                DriverParameter.RECORDS_PER_SECOND: 100000
+            }
+        }
+
+        # the time slices run on the fake clock
+        time_slice = get_time_slice()
+        self.addCleanup(time_slice.restart)
+        self.addCleanup(setattr, time_slice, 'budget', time_slice.budget)
+        clock_patcher = patch('mi.core.time_slice.time', clock)
+        clock_patcher.start()
+        self.addCleanup(clock_patcher.stop)
+
+    def ingest(self, budget):
+        """
+        Ingest the file while sending get_resource commands to the driver.
+        @param budget time slice budget of the parser
+        @retval (parse time, number of yields, list of command latencies),
+                all times on the fake clock
+        """
+        time_slice = get_time_slice()
+        time_slice.budget = budget
+        time_slice.restart()
+        yields = time_slice.yields
+
+        self.particles = []
+        driver = SlowDataSetDriver(self.config, {}, self.particles.extend,
+                                   lambda state: None, lambda **kwargs: None, lambda e: None)
+        driver._new_file_callback(self.file_name)
+
+        start = clock.time()
+        ingest = gevent.spawn(driver._got_file, self.file_name)
+        latencies = []
+        while not ingest.ready():
+            # a command is always pending, the parser time until it is
+            # handled is the latency
+            command_time = clock.time()
+            gevent.sleep(0)
+            gevent.spawn(driver.cmd_dvr, 'get_resource', DriverParameter.ALL).get()
+            latencies.append(clock.time() - command_time)
+        ingest.get()
+
+        return (clock.time() - start, time_slice.yields - yields, latencies)
+
+    def test_command_latency(self):
+        """
+        Test commands are handled within a time slice while a CPU bound
+        parser ingests a large file, and are blocked until the file is parsed
+        without the time slices.
+        """
+        budget = 0.05
+        (parse_time, yields, latencies) = self.ingest(budget)
+        self.assertEqual(len(self.particles), self.record_count)
+        self.assertAlmostEqual(parse_time, self.record_count * RECORD_TIME)
+        # the parser checks the time slice between blocks, each a fraction of
+        # the budget
+        self.assertGreaterEqual(yields, int(parse_time / (2 * budget)))
+        self.assertLessEqual(yields, int(parse_time / budget))
+        self.assertLess(max(latencies), 2 * budget)
+
+        # with a budget longer than the ingest the driver never yields
+        (parse_time, yields, latencies) = self.ingest(3600)
+        self.assertEqual(len(self.particles), self.record_count)
+        self.assertEqual(yields, 0)
+        self.assertAlmostEqual(max(latencies), parse_time)
@@ -136,6 +136,24 @@ class NoseTest(mi.idk.nose_test.NoseTest):
             self._log("No unit tests to run")
             return True
 
+    def test_names(self, unit=True, integration=True, qualification=True):
+        """
+        @brief Nose test names of the selected test classes, for running the
+        tests in parallel
+        @return (names, exclusive) where exclusive are the qualification test
+        names, which can't run at the same time as each other
+        """
+        names = []
+        exclusive = []
+        if unit and self.has_unit:
+            names.append(self._unit_test_module_param())
+        if integration:
+            names.append(self._int_test_module_param())
+        if qualification:
+            exclusive.append(self._qual_test_module_param())
+
+        return (names, exclusive)
+
     def _ingest_test_module_param(self):
         '''
         Module name and test to run
@@ -0,0 +1,294 @@
+"""
+@file mi/idk/dataset/parallel_test.py
+@brief Run dataset driver tests in parallel in a local process pool
+
+Every test runs with nose in a new python process with its own root
+directory for the /tmp paths the test uses (see mi.idk.util.isolated_path),
+so the tests of one or many drivers can run at the same time without
+sharing data directories or state files.  Tests that can't run concurrently,
+i.e. qualification tests which share the capability container and its
+broker, run one after another in a thread of their own, alongside the
+others.
+
+The wall time of every test is collected and reported.
+
+Usage:
+
+runner = ParallelTest(processes=8)
+runner.run(['mi/dataset/driver/foo/test/test_driver.py:IntegrationTest'],
+           exclusive=['mi/dataset/driver/foo/test/test_driver.py:QualificationTest'])
+runner.report()
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import unittest
+from multiprocessing.pool import ThreadPool
+
+import nose
+import yaml
+from nose.plugins import Plugin
+from nose.plugins.skip import SkipTest
+
+from mi.core.common import BaseEnum
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.idk.util import ISOLATED_ROOT_ENV
+
+# Number of slowest tests listed in the report
+REPORT_SLOWEST = 20
+
+class TestStatus(BaseEnum):
+    OK = 'ok'
+    ERROR = 'error'
+    FAILURE = 'failure'
+    SKIPPED = 'skipped'
+
+class TestTimerPlugin(Plugin):
+    """
+    Nose plugin recording the status and wall time of every test
+    """
+    name = 'test-timer'
+    enabled = True
+
+    # ahead of the error class plugins, which stop addError for skipped tests
+    score = 2000
+
+    def __init__(self):
+        Plugin.__init__(self)
+        self.results = []
+        self._start_time = None
+        self._status = None
+
+    def startTest(self, test):
+        self._start_time = time.time()
+        self._status = TestStatus.OK
+
+    def addError(self, test, err):
+        if issubclass(err[0], SkipTest):
+            self._status = TestStatus.SKIPPED
+        else:
+            self._status = TestStatus.ERROR
+
+    def addFailure(self, test, err):
+        self._status = TestStatus.FAILURE
+
+    def stopTest(self, test):
+        if self._start_time is not None:
+            self.results.append({'test': test.id(),
+                                 'status': self._status,
+                                 'time': time.time() - self._start_time})
+        self._start_time = None
+
+class TestResult(object):
+    """
+    Result of running one test name in a worker process
+    """
+    def __init__(self, name, returncode, tests, output, wall_time):
+        self.name = name
+        self.returncode = returncode
+        self.tests = tests
+        self.output = output
+        self.wall_time = wall_time
+
+    @property
+    def failed(self):
+        if self.returncode != 0 and not self.tests:
+            return True
+        return any(test['status'] in (TestStatus.ERROR, TestStatus.FAILURE) for test in self.tests)
+
+def expand_names(names):
+    """
+    Expand test names to the names of the individual tests, so each one can
+    run in its own process.
+    @param names nose test names, i.e. path/test_driver.py:TestClass
+    @return list of test names, path/test_driver.py:TestClass.test_method
+    """
+    loader = nose.loader.TestLoader()
+    result = []
+
+    def add(test, name):
+        if isinstance(test, unittest.TestSuite):
+            for t in test:
+                add(t, name)
+            return
+
+        address = test.address() if hasattr(test, 'address') else None
+        if address is None or address[2] is None:
+            # not a test case method, run the name as given
+            if name not in result:
+                result.append(name)
+            return
+
+        (filename, module, call) = address
+        result.append("%s:%s" % (filename or module, call))
+
+    for name in names:
+        add(loader.loadTestsFromName(name), name)
+
+    return result
+
+class ParallelTest(object):
+    """
+    Run nose tests in a pool of worker processes.
+    """
+    def __init__(self, processes=None, nose_args=None):
+        """
+        @param processes number of tests running at the same time, defaults
+               to the number of CPUs
+        @param nose_args list of extra arguments for nose
+        """
+        if processes is None:
+            import multiprocessing
+            processes = multiprocessing.cpu_count()
+
+        self.processes = processes
+        self.nose_args = nose_args or []
+        self.results = []
+        self.wall_time = 0.0
+
+    def run(self, names, exclusive=None):
+        """
+        Run the tests, each in its own process.
+        @param names nose test names to run in parallel
+        @param exclusive nose test names to run one at a time
+        @return True if all tests passed
+        """
+        exclusive = expand_names(exclusive or [])
+        names = expand_names(names)
+        log.info("Running %d tests with %d processes and %d tests one at a time",
+                 len(names), self.processes, len(exclusive))
+
+        start_time = time.time()
+        # the exclusive tests run in order in a single thread, the others in the pool
+        exclusive_pool = ThreadPool(1)
+        pool = ThreadPool(self.processes)
+        try:
+            exclusive_results = exclusive_pool.map_async(self.run_test, exclusive, chunksize=1)
+            results = pool.map(self.run_test, names, chunksize=1)
+            self.results = exclusive_results.get() + results
+        finally:
+            for p in (exclusive_pool, pool):
+                p.close()
+                p.join()
+        self.wall_time = time.time() - start_time
+
+        return not any(result.failed for result in self.results)
+
+    def run_test(self, name):
+        """
+        Run a test in a new process with its own isolated root directory.
+        @param name nose test name
+        @return TestResult
+        """
+        root = tempfile.mkdtemp(prefix='idk_test_')
+        results_file = os.path.join(root, 'results.yml')
+
+        env = dict(os.environ)
+        env[ISOLATED_ROOT_ENV] = root
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+
+        args = [sys.executable, '-m', 'mi.idk.dataset.parallel_test', results_file, name] + self.nose_args
+
+        start_time = time.time()
+        try:
+            log.debug("Starting test %s in %s", name, root)
+            process = subprocess.Popen(args, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+            output = process.communicate()[0]
+            wall_time = time.time() - start_time
+
+            tests = []
+            if os.path.exists(results_file):
+                with open(results_file) as f:
+                    tests = yaml.load(f) or []
+
+            result = TestResult(name, process.returncode, tests, output, wall_time)
+            log.info("%s %s in %.3fs", name, 'FAILED' if result.failed else 'ok', wall_time)
+            return result
+
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
+
+    @property
+    def counts(self):
+        """
+        @return (success, error, failure) test counts
+        """
+        success = error = failure = 0
+        for result in self.results:
+            if not result.tests and result.failed:
+                error += 1
+            for test in result.tests:
+                if test['status'] == TestStatus.OK:
+                    success += 1
+                elif test['status'] == TestStatus.ERROR:
+                    error += 1
+                elif test['status'] == TestStatus.FAILURE:
+                    failure += 1
+
+        return (success, error, failure)
+
+    def report(self, stream=None):
+        """
+        Write the test report, with the output of the failed tests and the
+        slowest tests.
+        @param stream file to write to, defaults to stdout
+        @return report string
+        """
+        stream = stream or sys.stdout
+        tests = [test for result in self.results for test in result.tests]
+        test_time = sum(result.wall_time for result in self.results)
+
+        msg = ""
+        for result in self.results:
+            if result.failed:
+                msg += "\n======================================================================\n"
+                msg += "FAILED: %s\n" % result.name
+                msg += "----------------------------------------------------------------------\n"
+                msg += result.output
+
+        msg += "\n------------------------ Parallel Nosetest Result ------------------------\n"
+        msg += "Slowest tests:\n"
+        for test in sorted(tests, key=lambda t: t['time'], reverse=True)[:REPORT_SLOWEST]:
+            msg += "%10.3fs  %-8s %s\n" % (test['time'], test['status'], test['test'])
+
+        (success, error, failure) = self.counts
+        msg += "\nRan %d tests in %.3fs with %d processes\n" % (success + error + failure, self.wall_time, self.processes)
+        if self.wall_time:
+            msg += "Test processes ran for %.3fs, speedup %.2fx\n\n" % (test_time, test_time / self.wall_time)
+
+        if failure or error:
+            msg += "FAILED ("
+            if error:
+                msg += "errors=%d" % error
+                if failure: msg += ", "
+            if failure:
+                msg += "failure=%d" % failure
+            msg += ")"
+        else:
+            msg += "OK"
+        msg += "\n"
+
+        stream.write(msg)
+        return msg
+
+def run_worker(results_file, name, nose_args):
+    """
+    Run a test in this process and store the test timings in results_file.
+    @return True if the test passed
+    """
+    timer = TestTimerPlugin()
+    try:
+        return nose.run(argv=[sys.argv[0], '--with-%s' % timer.name, name] + nose_args, addplugins=[timer], exit=False)
+    finally:
+        with open(results_file, 'w') as f:
+            yaml.dump(timer.results, f)
+
+if __name__ == '__main__':
+    sys.exit(0 if run_worker(sys.argv[1], sys.argv[2], sys.argv[3:]) else 1)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+"""
+@package mi.idk.dataset.test.test_parallel_test
+@file mi/idk/dataset/test/test_parallel_test.py
+@brief Test the parallel test runner
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.idk.dataset import parallel_test
+from mi.idk.dataset.parallel_test import ParallelTest
+
+# Sample test module, all the tests use the same data directory under /tmp
+# and fail if another test uses it at the same time
+SAMPLE_TESTS = '''
+import os
+import time
+import unittest
+
+from mi.idk.util import isolated_path
+
+DATA_DIR = '%(data_dir)s'
+
+class SampleTest(unittest.TestCase):
+    def _use_data_dir(self, name):
+        start = time.time()
+        data_dir = isolated_path(DATA_DIR)
+        with open('%(paths)s', 'a') as f:
+            f.write(data_dir + '\\n')
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+        self.assertEqual(os.listdir(data_dir), [])
+        open(os.path.join(data_dir, name), 'w').close()
+        time.sleep(%(sleep)s)
+        self.assertEqual(os.listdir(data_dir), [name])
+        os.unlink(os.path.join(data_dir, name))
+        with open('%(times)s', 'a') as f:
+            f.write('%%s %%r %%r\\n' %% (name, start, time.time()))
+
+    def test_a(self):
+        self._use_data_dir('a')
+
+    def test_b(self):
+        self._use_data_dir('b')
+
+    def test_c(self):
+        self._use_data_dir('c')
+
+    def test_d(self):
+        self._use_data_dir('d')
+
+class FailingTest(unittest.TestCase):
+    def test_failure(self):
+        self.fail("expected failure")
+
+    def test_error(self):
+        raise ValueError("expected error")
+
+    def test_skip(self):
+        raise unittest.SkipTest("expected skip")
+'''
+
+SLEEP = 1.0
+
+DATA_DIR = '/tmp/idk_parallel_test_data'
+
+@attr('UNIT', group='mi')
+class TestParallelTest(MiUnitTest):
+    """
+    Test the parallel test runner
+    """
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+        # a new module name for every test, nose imports by module name
+        self.test_file = os.path.join(self.test_dir, 'test_sample_%s.py' % os.path.basename(self.test_dir))
+        # the sample tests list the data directories they used in this file
+        self.paths_file = os.path.join(self.test_dir, 'paths.txt')
+        # and the times they started and ended in this one
+        self.times_file = os.path.join(self.test_dir, 'times.txt')
+        with open(self.test_file, 'w') as f:
+            f.write(SAMPLE_TESTS % {'sleep': SLEEP, 'data_dir': DATA_DIR, 'paths': self.paths_file,
+                                    'times': self.times_file})
+
+    def sample_times(self):
+        """
+        @retval {test name: (start time, end time)} of the sample tests which ran
+        """
+        times = {}
+        with open(self.times_file) as f:
+            for line in f:
+                (name, start, end) = line.split()
+                times[name] = (float(start), float(end))
+        return times
+
+    def assertOverlap(self, first, second, overlap=True):
+        """
+        Assert two tests ran at the same time, or not if overlap is False
+        @param first (start time, end time) of a test
+        @param second (start time, end time) of another test
+        """
+        self.assertEqual(first[0] < second[1] and second[0] < first[1], overlap,
+                         "%s and %s %s" % (first, second, "don't overlap" if overlap else "overlap"))
+
+    def test_expand_names(self):
+        """
+        Test class names are expanded to the names of their tests
+        """
+        names = parallel_test.expand_names(['%s:SampleTest' % self.test_file,
+                                            '%s:FailingTest.test_skip' % self.test_file])
+        self.assertEqual(names, ['%s:SampleTest.%s' % (self.test_file, name)
+                                 for name in ['test_a', 'test_b', 'test_c', 'test_d']] +
+                                ['%s:FailingTest.test_skip' % self.test_file])
+
+    def test_parallel(self):
+        """
+        Test concurrent tests get their own data directory, and the test times
+        and results are collected.
+        """
+        runner = ParallelTest(processes=4)
+        self.assertTrue(runner.run(['%s:SampleTest' % self.test_file]))
+        self.assertEqual(runner.counts, (4, 0, 0))
+
+        test_times = [test['time'] for result in runner.results for test in result.tests]
+        self.assertEqual(len(test_times), 4)
+        for test_time in test_times:
+            self.assertGreaterEqual(test_time, SLEEP)
+
+        # every test used its own data directory
+        with open(self.paths_file) as f:
+            paths = f.read().split()
+        self.assertEqual(len(set(paths)), 4)
+        self.assertNotIn(DATA_DIR, paths)
+
+        stream = StringIO()
+        report = runner.report(stream)
+        self.assertEqual(stream.getvalue(), report)
+        self.assertIn("Ran 4 tests", report)
+        self.assertIn("SampleTest.test_a", report)
+        self.assertTrue(report.endswith("OK\n"))
+
+    def test_exclusive(self):
+        """
+        Test exclusive tests run one at a time.
+        """
+        runner = ParallelTest(processes=4)
+        self.assertTrue(runner.run([], exclusive=['%s:SampleTest' % self.test_file]))
+        self.assertEqual(runner.counts, (4, 0, 0))
+
+        times = sorted(self.sample_times().values())
+        self.assertEqual(len(times), 4)
+        for (first, second) in zip(times, times[1:]):
+            self.assertOverlap(first, second, False)
+
+    def test_exclusive_alongside(self):
+        """
+        Test the other tests run while an exclusive test runs.
+        """
+        runner = ParallelTest(processes=2)
+        self.assertTrue(runner.run(['%s:SampleTest.test_c' % self.test_file,
+                                    '%s:SampleTest.test_d' % self.test_file],
+                                   exclusive=['%s:SampleTest.test_a' % self.test_file,
+                                              '%s:SampleTest.test_b' % self.test_file]))
+        self.assertEqual(runner.counts, (4, 0, 0))
+        # the exclusive results come first, in order
+        self.assertEqual([result.name.split('.')[-1] for result in runner.results],
+                         ['test_a', 'test_b', 'test_c', 'test_d'])
+
+        times = self.sample_times()
+        self.assertOverlap(times['a'], times['b'], False)
+        self.assertOverlap(times['a'], times['c'])
+        self.assertOverlap(times['a'], times['d'])
+
+    def test_failures(self):
+        """
+        Test failures, errors and skipped tests are reported.
+        """
+        runner = ParallelTest(processes=2)
+        self.assertFalse(runner.run(['%s:FailingTest' % self.test_file]))
+        self.assertEqual(runner.counts, (0, 1, 1))
+
+        statuses = dict((test['test'].split('.')[-1], test['status'])
+                        for result in runner.results for test in result.tests)
+        self.assertEqual(statuses, {'test_failure': parallel_test.TestStatus.FAILURE,
+                                    'test_error': parallel_test.TestStatus.ERROR,
+                                    'test_skip': parallel_test.TestStatus.SKIPPED})
+
+        report = runner.report(StringIO())
+        self.assertIn("FAILED: %s:FailingTest.test_failure" % self.test_file, report)
+        self.assertIn("expected failure", report)
+        self.assertIn("FAILED (errors=1, failure=1)", report)
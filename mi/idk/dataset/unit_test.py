@@ -22,6 +22,8 @@ from mi.core.unit_test import ParticleTestMixin
 
 from ooi.reflection import EggCache
 from mi.idk.util import remove_all_files
+from mi.idk.util import isolated_config
+from mi.idk.util import isolated_path
 from mi.idk.unit_test import InstrumentDriverTestConfig
 from mi.idk.exceptions import TestNotInitialized
 from mi.idk.exceptions import IDKConfigMissing
@@ -67,6 +69,11 @@ class DataSetTestConfig(InstrumentDriverTestConfig):
     def initialize(self, *args, **kwargs):
         super(DataSetTestConfig, self).initialize(*args, **kwargs)
 
+        # When running in an isolated test process, move the data directories
+        # out of the /tmp paths other tests use
+        self.driver_startup_config = isolated_config(self.driver_startup_config)
+        self.working_dir = isolated_path(self.working_dir)
+
         log.debug("Dataset Agent Test Config:")
         for property, value in vars(self).iteritems():
             log.debug("key: %s, value: %s", property, value)
@@ -354,6 +361,7 @@ class DataSetTestCase(MiIntTestCase):
         @param: copy_metadata - True to copy file metadata false to not copy metadata
         @return: path to file created
         """
+        dest_dir = isolated_path(dest_dir)
         if not os.path.exists(dest_dir):
             log.debug("Creating data dir: %s", dest_dir)
             os.makedirs(dest_dir)
@@ -399,6 +407,7 @@ class DataSetTestCase(MiIntTestCase):
         """
         Create a state object for a file.  If a position is passed then add a parser state as well.
         """
+        path = isolated_path(path)
         mod_time = os.path.getmtime(path)
         file_size = os.path.getsize(path)
         with open(path) as filehandle:
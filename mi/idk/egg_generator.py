@@ -32,6 +32,7 @@ from mi.idk.exceptions import InvalidParameters
 from mi.idk.exceptions import MissingTemplate
 from mi.idk.exceptions import ValidationFailure
 from mi.idk.exceptions import IDKException
+from mi.idk.import_cache import get_import_cache
 from mi.idk.unit_test import InstrumentDriverTestConfig
 from mi.idk.driver_generator import DriverGenerator
 
@@ -45,6 +46,28 @@ from snakefood.roots import *
 
 REPODIR = '/tmp/repoclone/marine-integrations'
 
+def _scan_dependencies(filename):
+    """
+    Scan the imports of a python module with snakefood
+    @retval (files, errors) found by snakefood
+    """
+    return find_dependencies(filename, 0, 0)
+
+# (filename, ignores) -> (package root, relative filename).  Finding the
+# package root lists the parent directories, which is most of the time spent
+# building the graph of modules shared by many drivers.
+_relfile_cache = {}
+
+def _relfile(fn, ignores):
+    """
+    snakefood relfile, memoised for the lifetime of the process
+    @retval (package root, relative filename)
+    """
+    key = (fn, tuple(ignores))
+    if key not in _relfile_cache:
+        _relfile_cache[key] = relfile(fn, ignores)
+    return _relfile_cache[key]
+
 class DependencyList:
     """
     Build a list of dependency classes for a python module.  This uses the snakefood
@@ -109,6 +132,15 @@ class DependencyList:
         #    log.debug(" --  %s" % dn)
         inroots = frozenset(inroots)
 
+        # Reuse the dependency graph from an earlier run if none of the
+        # modules it was built from changed.
+        import_cache = get_import_cache()
+        cached_files = import_cache.graph(self.filename)
+        if cached_files is not None:
+            log.debug("Using cached dependency graph for %s" % self.filename)
+            self.dependency_list = defaultdict(set, cached_files)
+            return self.dependency_list
+
         # Find all the dependencies.
         log.debug("Processing file:")
         allfiles = defaultdict(set)
@@ -126,7 +158,7 @@ class DependencyList:
                 processed_files.add(fn)
     
                 if is_python(fn):
-                    files, errors = find_dependencies(fn, 0, 0)
+                    files, errors = import_cache.dependencies(fn, _scan_dependencies)
                     log.debug("dependency file count: %d" % len(files))
                     allerrors.extend(errors)
                 else:
@@ -142,7 +174,7 @@ class DependencyList:
                     fn = dirname(fn)
 
                 # no dependency.
-                from_ = relfile(fn, ignorefiles)
+                from_ = _relfile(fn, ignorefiles)
                 if from_ is None:
                     log.debug("from_ empty.  Move on")
                     continue
@@ -157,7 +189,7 @@ class DependencyList:
                     if basename(xfn) == '__init__.py':
                         xfn = dirname(xfn)
         
-                    to_ = relfile(xfn, ignorefiles)
+                    to_ = _relfile(xfn, ignorefiles)
                     into = to_[0] in inroots
                     log.debug( "  from: %s,  to: %s" % (from_[1], to_[1]))
 
@@ -189,6 +221,10 @@ class DependencyList:
             log.debug("  %s" % root)
 
         
+        import_cache.set_graph(self.filename, dict(allfiles), processed_files)
+        import_cache.save()
+        log.debug("Import cache: %d modules scanned, %d reused" % (import_cache.misses, import_cache.hits))
+
         self.dependency_list = allfiles
         return self.dependency_list;
                 
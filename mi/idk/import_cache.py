@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+"""
+@file mi/idk/import_cache.py
+@brief Persistent cache of the import graph scanned when packaging drivers.
+
+Scanning the imports of a python module means reading and parsing it, and
+the egg generator scans the same mi.core and mi.instrument modules for every
+driver it packages.  The ImportCache keeps the dependencies found for each
+module keyed by its path and the md5 of its contents, so a module is only
+scanned again when its bytes change.  It also keeps the resolved dependency
+graph of every target file along with the hashes of all the modules it was
+built from, so packaging a driver again reuses the whole graph while none of
+those modules changed.
+
+An import the scan could not resolve may be resolved by a module added later,
+so the cache also keeps the files which would have resolved each failed
+import, and scans again as soon as one of them exists.  The cache is
+discarded when a directory is added to or removed from sys.path.
+
+The cache is stored in the IDK config directory and shared by all the
+package_driver runs of a user.
+
+Usage:
+
+cache = get_import_cache()
+(files, errors) = cache.dependencies(filename, scan_function)
+cache.save()
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import imp
+import sys
+import hashlib
+import tempfile
+import cPickle as pickle
+
+from mi.core.log import get_logger ; log = get_logger()
+
+from mi.idk.config import Config
+
+from snakefood.find import ERROR_IMPORT
+
+CACHE_FILENAME = 'import_cache.pkl'
+
+# Increment when the layout of the cache changes, older caches are discarded
+CACHE_VERSION = 2
+
+# file name suffixes of the modules the import statement finds
+MODULE_SUFFIXES = [suffix for (suffix, mode, type) in imp.get_suffixes()]
+
+def search_path():
+    """
+    @retval the directories of sys.path, without duplicates.  The egg
+            generator prepends the package roots again for every target.
+    """
+    result = []
+    for root in sys.path:
+        root = os.path.abspath(root)
+        if root not in result:
+            result.append(root)
+    return result
+
+class ImportCache(object):
+    """
+    Import graph cache keyed by module path and content hash.
+    """
+    def __init__(self, cache_file):
+        """
+        @param cache_file path of the file storing the cache
+        """
+        self.cache_file = os.path.abspath(cache_file)
+
+        # path -> (md5, dependency files, errors, files resolving the failed imports)
+        self._modules = {}
+        # target path -> (dependency graph, {path: md5} of the scanned modules,
+        #                 files resolving the failed imports of those modules)
+        self._graphs = {}
+        # path -> (mtime, size, md5), so a file is only hashed once per run
+        self._hashes = {}
+
+        self.hits = 0
+        self.misses = 0
+        self._changed = False
+
+        self.load()
+
+    def load(self):
+        """
+        Load the cache file.  A missing, unreadable or outdated cache file
+        starts an empty cache.
+        """
+        if not os.path.exists(self.cache_file):
+            return
+
+        try:
+            with open(self.cache_file, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            log.warn("Failed to read import cache %s, ignoring it: %s", self.cache_file, e)
+            return
+
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            log.info("Discarding outdated import cache %s", self.cache_file)
+            return
+
+        if set(data['search_path']) != set(search_path()):
+            log.info("Discarding import cache %s built with another sys.path", self.cache_file)
+            return
+
+        self._modules = data['modules']
+        self._graphs = data['graphs']
+        log.debug("Loaded import cache %s: %d modules, %d graphs",
+                  self.cache_file, len(self._modules), len(self._graphs))
+
+    def save(self):
+        """
+        Write the cache file if anything changed.  The file is replaced
+        atomically so concurrent runs never read a partial cache.  Failing
+        to write the cache is not an error, the next run scans again.
+        """
+        if not self._changed:
+            return
+
+        cache_dir = os.path.dirname(self.cache_file)
+        try:
+            if not os.path.isdir(cache_dir):
+                os.makedirs(cache_dir)
+
+            (fd, tmp_file) = tempfile.mkstemp(dir=cache_dir, prefix=CACHE_FILENAME)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump({'version': CACHE_VERSION, 'search_path': search_path(),
+                                 'modules': self._modules, 'graphs': self._graphs},
+                                f, pickle.HIGHEST_PROTOCOL)
+                os.rename(tmp_file, self.cache_file)
+            except:
+                os.unlink(tmp_file)
+                raise
+        except Exception as e:
+            log.warn("Failed to write import cache %s: %s", self.cache_file, e)
+            return
+
+        self._changed = False
+        log.debug("Saved import cache %s", self.cache_file)
+
+    def file_hash(self, filename):
+        """
+        @param filename path of the file
+        @retval md5 hex digest of the file contents, None if it doesn't exist
+        """
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+
+        cached = self._hashes.get(filename)
+        if cached and cached[0] == stat.st_mtime and cached[1] == stat.st_size:
+            return cached[2]
+
+        with open(filename, 'rb') as f:
+            digest = hashlib.md5(f.read()).hexdigest()
+        self._hashes[filename] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def import_candidates(self, filename, errors):
+        """
+        Files which would resolve the imports a module failed to resolve,
+        looked up like snakefood does, next to the module then on sys.path.
+        @param filename path of the python module
+        @param errors errors from scanning the module
+        @retval sorted list of paths
+        """
+        candidates = set()
+        roots = [os.path.dirname(filename)] + search_path()
+        for (error, modname) in errors:
+            if error != ERROR_IMPORT:
+                continue
+            for root in roots:
+                base = os.path.join(root, *modname.split('.'))
+                candidates.add(os.path.join(base, '__init__.py'))
+                candidates.update(base + suffix for suffix in MODULE_SUFFIXES)
+        return sorted(candidates)
+
+    def _resolved(self, candidates):
+        """
+        @param candidates files which would resolve failed imports
+        @retval the first of the files which exists, None if none does
+        """
+        for fn in candidates:
+            if os.path.exists(fn):
+                return fn
+        return None
+
+    def dependencies(self, filename, scan):
+        """
+        Dependencies of a module, scanned only if the module is not in the cache
+        with the same contents, one of its dependency files is gone, or a
+        module which resolves one of its failed imports was added.
+        @param filename path of the python module
+        @param scan function scanning a module, returning (files, errors)
+        @retval (files, errors) as returned by scan
+        """
+        filename = os.path.abspath(filename)
+        digest = self.file_hash(filename)
+
+        cached = self._modules.get(filename)
+        if cached and cached[0] == digest and all(os.path.exists(fn) for fn in cached[1]) \
+                and self._resolved(cached[3]) is None:
+            self.hits += 1
+            return (list(cached[1]), list(cached[2]))
+
+        self.misses += 1
+        (files, errors) = scan(filename)
+        self._modules[filename] = (digest, list(files), list(errors),
+                                   self.import_candidates(filename, errors))
+        self._changed = True
+        return (files, errors)
+
+    def graph(self, filename):
+        """
+        @param filename path of the target file
+        @retval the dependency graph stored for the target, None if there is
+                none, any of the modules it was built from changed, or a
+                module which resolves one of their failed imports was added
+        """
+        cached = self._graphs.get(os.path.abspath(filename))
+        if cached is None:
+            return None
+
+        (graph, hashes, candidates) = cached
+        for fn, digest in hashes.iteritems():
+            if self.file_hash(fn) != digest:
+                log.debug("Import graph of %s is outdated, %s changed", filename, fn)
+                return None
+
+        resolved = self._resolved(candidates)
+        if resolved is not None:
+            log.debug("Import graph of %s is outdated, %s resolves a failed import", filename, resolved)
+            return None
+
+        return graph
+
+    def set_graph(self, filename, graph, files):
+        """
+        Store the dependency graph of a target file.
+        @param filename path of the target file
+        @param graph dependency graph, a dict of picklable values
+        @param files all the modules scanned to build the graph, with
+               dependencies()
+        """
+        hashes = {}
+        candidates = set()
+        for fn in files:
+            fn = os.path.abspath(fn)
+            hashes[fn] = self.file_hash(fn)
+            if fn in self._modules:
+                candidates.update(self._modules[fn][3])
+
+        self._graphs[os.path.abspath(filename)] = (graph, hashes, sorted(candidates))
+        self._changed = True
+
+_import_cache = None
+
+def get_import_cache():
+    """
+    @retval the import cache shared by all the egg generators of this process,
+            stored in the IDK config directory
+    """
+    global _import_cache
+    if _import_cache is None:
+        _import_cache = ImportCache(os.path.join(Config().idk_config_dir(), CACHE_FILENAME))
+    return _import_cache
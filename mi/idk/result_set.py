@@ -17,6 +17,16 @@ else:
     log.error("Particle validate failed")
     log.error(rs.report())
 
+Particles can also be verified as they are produced, optionally stopping
+after a number of particles failed verification:
+
+rs.start_verify(max_errors=10)
+for particle in particles:
+    if not rs.verify_particle(particle):
+        break
+if not rs.end_verify():
+    log.error(rs.report())
+
 Result Set File Format:
   result files are yml formatted files with a header and data section.
   the data is stored in record elements with the key being the parameter name.
@@ -77,18 +87,52 @@ contiguous records, but these are not used currently.
 __author__ = 'Bill French'
 __license__ = 'Apache 2.0'
 
-import re
 import yaml
-import ntplib
-import time
-from dateutil import parser
 
 from mi.core.instrument.data_particle import DataParticle
+from mi.core.time import strings_to_ntp_date_time, string_to_ntp_date_time
 
 from mi.core.log import get_logger ; log = get_logger()
 
-DATE_PATTERN = r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?Z?$'
-DATE_MATCHER = re.compile(DATE_PATTERN)
+# Keys of a particle definition which are not particle values
+HEADER_KEYS = ['_index', '_new_sequence', 'internal_timestamp', 'particle_object', 'particle_type']
+
+# Use the libyaml loader when available, large result sets load much faster
+YamlLoader = getattr(yaml, 'CLoader', yaml.Loader)
+
+class ExpectedParticle(object):
+    """
+    Expected values of a single particle of a result set, prepared once when
+    the result set is read so each particle verification only compares values.
+    """
+    def __init__(self, particle_def, internal_timestamp):
+        """
+        @param particle_def: particle definition from the result set file
+        @param internal_timestamp: expected internal timestamp in ntp, None if
+        no timestamp is expected
+        """
+        self.particle_def = particle_def
+        self.internal_timestamp = internal_timestamp
+        self.new_sequence = particle_def.get("_new_sequence", False) or False
+
+        # particle object and particle type keys will only be present for drivers
+        # returning multiple particle types
+        self.check_class = 'particle_object' in particle_def
+        self.particle_object = particle_def.get('particle_object')
+        self.particle_type = particle_def.get('particle_type', None)
+
+        # {key: (value, round factor)} of the expected particle values
+        self.values = {}
+        for (key, value) in particle_def.items():
+            if key in HEADER_KEYS:
+                continue
+
+            if isinstance(value, dict):
+                self.values[key] = (value['value'], value.get('round'))
+            else:
+                self.values[key] = (value, None)
+
+        self.keys = sorted(self.values)
 
 class ResultSet(object):
     """
@@ -100,13 +144,13 @@ class ResultSet(object):
 
         log.debug("read result file: %s" % result_file_path)
         stream = file(result_file_path, 'r')
-        result_set = yaml.load(stream)
+        result_set = yaml.load(stream, Loader=YamlLoader)
 
         self._set_result_set(result_set)
 
-        self._clear_report()
+        self.start_verify()
 
-    def verify(self, particles):
+    def verify(self, particles, max_errors=None):
         """
         Verify particles passed in against result set read
         in the ctor.
@@ -117,16 +161,92 @@ class ResultSet(object):
 
         store verification result in the object and
         return success or failure.
-        @param particls: list of particles to verify.
+        @param particls: list or iterable of particles to verify.
+        @param max_errors: stop verifying after this many particles failed
+        verification, None to verify all the particles.
         @return True if verification successful, False otherwise
         """
+        self.start_verify(max_errors)
+
+        for particle in particles:
+            if not self.verify_particle(particle):
+                break
+
+        return self.end_verify()
+
+    def start_verify(self, max_errors=None):
+        """
+        Start verifying particles one at a time with verify_particle.
+        @param max_errors: stop verifying after this many particles failed
+        verification, None to verify all the particles.
+        """
         self._clear_report()
-        result = True
+        self._max_errors = max_errors
+        self._particle_count = 0
+        self._error_count = 0
+        self._stopped = False
+
+    def verify_particle(self, particle):
+        """
+        Verify the next particle against the result set, the particles are
+        expected in _index order.
+        @param particle: particle or particle dict to verify
+        @return False if the maximum number of particles failed verification
+        and no more particles should be verified, True otherwise
+        """
+        if self._stopped:
+            return False
+
+        self._particle_count += 1
+        index = self._particle_count
+        expected = self._result_set_data.get(index)
+        errors = []
+
+        # if this driver returns multiple particle classes, type checking happens
+        # for each particle in _get_particle_data_errors
+        if self._check_particle_type and not self._verify_particle_type(particle):
+            log.error("particle type mismatch: %s", particle)
+            errors.append('particle type mismatch')
+
+        # No particle definition, we fail
+        if expected is None:
+            errors.append("no particle result defined for index %d" % index)
 
-        if self._verify_set(particles):
-            result = self._verify_particles(particles)
+        # Otherwise lets do some validation
         else:
-            result = False
+            try:
+                particle_dict = self._particle_as_dict(particle)
+            except AttributeError:
+                errors.append("particle is not a data particle: %s" % particle)
+            else:
+                errors += self._get_particle_header_errors(particle_dict, expected)
+                errors += self._get_particle_data_errors(particle, particle_dict, expected)
+
+        if len(errors):
+            self._add_to_report("Failed particle validation for index %d" % index)
+            self._add_to_report(errors, 1)
+            self._error_count += 1
+
+            if self._max_errors is not None and self._error_count >= self._max_errors:
+                self._add_to_report("Verification stopped after %d failed particles" % self._error_count)
+                self._stopped = True
+                return False
+
+        return True
+
+    def end_verify(self):
+        """
+        Complete the verification of the particles passed to verify_particle,
+        checking the particle count unless verification was stopped early.
+        @return True if verification successful, False otherwise
+        """
+        if not self._stopped and len(self._result_set_data) != self._particle_count:
+            self._add_to_report("Header verification failure")
+            self._add_to_report("result set records != particles to verify (%d != %d)" %
+                                (len(self._result_set_data), self._particle_count), 1)
+            self._error_count += 1
+
+        result = self._error_count == 0
 
         if not result:
             log.error("Failed verification: \n%s", self.report())
@@ -184,7 +304,10 @@ class ResultSet(object):
         if self._result_set_header.get("particle_type") is None:
             IOError("header.particle_type not defined")
 
-        self._result_set_data = {}
+        self._check_particle_type = self._result_set_header.get("particle_object") != 'MULTIPLE' and \
+            self._result_set_header.get("particle_type") != 'MULTIPLE'
+
+        particle_defs = {}
         data = result_set.get("data")
         if not data: raise IOError("Missing result set data")
 
@@ -194,71 +317,30 @@ class ResultSet(object):
                 log.error("Particle definition missing _index: %s", particle)
                 raise IOError("Particle definition missing _index")
 
-            if self._result_set_data.get(index) is not None:
+            if particle_defs.get(index) is not None:
                 log.error("Duplicate particle definition for _index %s: %s", index, particle)
                 raise IOError("Duplicate definition found for index: %s"% index)
 
-            self._result_set_data[index] = particle
-            log.trace("Result set data: %s", self._result_set_data)
-
-    def _verify_set(self, particles):
-        """
-        Verify the particles as a set match what we expect.
-        - All particles are of the expected type
-        - Check particle count
-        """
-        errors = []
-
-        if len(self._result_set_data) != len(particles):
-            errors.append("result set records != particles to verify (%d != %d)" %
-                          (len(self._result_set_data), len(particles)))
-
-        # if this driver returns multiple particle classes, type checking happens
-        # for each particle in _get_particle_data_errors
-        if self._result_set_header.get("particle_object") != 'MULTIPLE' and \
-        self._result_set_header.get("particle_type") != 'MULTIPLE':
-            for particle in particles:
-                if not self._verify_particle_type(particle):
-                    log.error("particle type mismatch: %s", particle)
-                    errors.append('particle type mismatch')
-
-        if len(errors):
-            self._add_to_report("Header verification failure")
-            self._add_to_report(errors, 1)
-            return False
-
-        return True
-
-    def _verify_particles(self, particles):
-        """
-        Verify data in the particles individually.
-        - Verify order based on _index
-        - Verify parameter data values
-        - Verify there are extra or missing parameters
-        """
-        result = True
-        index = 1
-        for particle in particles:
-            particle_def = self._result_set_data.get(index)
-            errors = []
-
-            # No particle definition, we fail
-            if particle_def is None:
-                errors.append("no particle result defined for index %d" % index)
-
-            # Otherwise lets do some validation
-            else:
-                errors += self._get_particle_header_errors(particle, particle_def)
-                errors += self._get_particle_data_errors(particle, particle_def)
-
-            if len(errors):
-                self._add_to_report("Failed particle validation for index %d" % index)
-                self._add_to_report(errors, 1)
-                result = False
+            particle_defs[index] = particle
+
+        # Convert all the expected timestamps at once, if not a string a
+        # timestamp should already be in ntp
+        timestamps = dict((index, particle_def.get('internal_timestamp'))
+                          for (index, particle_def) in particle_defs.items()
+                          if particle_def.get('internal_timestamp'))
+        string_indexes = [index for (index, timestamp) in timestamps.items() if isinstance(timestamp, str)]
+        if string_indexes:
+            try:
+                ntp_times = strings_to_ntp_date_time([timestamps[index] for index in string_indexes])
+            except ValueError as e:
+                raise IOError("Invalid internal_timestamp in result set: %s" % e)
+            timestamps.update(zip(string_indexes, ntp_times.tolist()))
 
-            index += 1
+        self._result_set_data = {}
+        for (index, particle_def) in particle_defs.items():
+            self._result_set_data[index] = ExpectedParticle(particle_def, timestamps.get(index))
 
-        return result
+        log.trace("Result set data: %s", particle_defs)
 
     def _verify_particle_type(self, particle):
         """
@@ -281,16 +363,15 @@ class ResultSet(object):
 
         return True
 
-    def _get_particle_header_errors(self, particle, particle_def):
+    def _get_particle_header_errors(self, particle_dict, expected):
         """
         Verify all parameters defined in the header:
         - Stream type
         - Internal timestamp
         """
         errors = []
-        particle_dict = self._particle_as_dict(particle)
         particle_timestamp = particle_dict.get('internal_timestamp')
-        expected_time = particle_def.get('internal_timestamp')
+        expected_time = expected.internal_timestamp
         allow_diff = .000001
 
         # Verify the timestamp
@@ -300,17 +381,12 @@ class ResultSet(object):
             errors.append("particle_timestamp expected, but not defined in particle")
 
         elif particle_timestamp:
-            if isinstance(expected_time, str):
-                expected = self._string_to_ntp_date_time(expected_time)
-            else:
-                # if not a string, timestamp should alread be in ntp
-                expected = expected_time
-            ts_diff =  abs(particle_timestamp - expected)
-            log.debug("verify timestamp: abs(%s - %s) = %s", expected, particle_timestamp, ts_diff)
+            ts_diff =  abs(particle_timestamp - expected_time)
+            log.debug("verify timestamp: abs(%s - %s) = %s", expected_time, particle_timestamp, ts_diff)
 
             if ts_diff > allow_diff:
                 errors.append("expected internal_timestamp mismatch, %.9f != %.9f (%.9f)" %
-                              (expected, particle_timestamp, ts_diff))
+                              (expected_time, particle_timestamp, ts_diff))
 
         # verify the stream name, unless multiple are returned, type checking is done
         # in get_particle_data_errors if so
@@ -323,92 +399,66 @@ class ResultSet(object):
 
         return errors
 
-    def _get_particle_data_errors(self, particle, particle_def):
+    def _get_particle_data_errors(self, particle, particle_dict, expected):
         """
         Verify that all data parameters are present and have the
         expected value
         """
         errors = []
-        particle_dict = self._particle_as_dict(particle)
         log.debug("Particle to test: %s", particle_dict)
-        log.debug("Particle definition: %s", particle_def)
+        log.debug("Particle definition: %s", expected.particle_def)
         particle_values = particle_dict['values']
 
-        expected_new_sequence = particle_dict.get("new_sequence", False)
-        particle_new_sequence = particle_def.get("_new_sequence", False)
-        if expected_new_sequence is None: expected_new_sequence = False
-        if particle_new_sequence is None: particle_new_sequence = False
+        particle_new_sequence = particle_dict.get("new_sequence", False) or False
 
-        # particle object and particle type keys will only be present for drivers
-        # returning multiple particle types
-        if 'particle_object' in particle_def:
-            expected_object = particle_def.get('particle_object')
-            expected_type = particle_def.get('particle_type', None)
+        if expected.check_class:
             # if this is a dictionary can't compare classes
             if not isinstance(particle, dict):
                 cls = particle.__class__.__name__
                 if not issubclass(particle.__class__, DataParticle):
                     errors.append("Particle class %s is not a subclass of DataParticle" % particle.__class__)
 
-                if expected_object != cls:
-                    errors.append("Class mismatch, expected: %s, received: %s" % (expected_object, cls))
+                if expected.particle_object != cls:
+                    errors.append("Class mismatch, expected: %s, received: %s" % (expected.particle_object, cls))
 
                 particle_stream = particle_dict['stream_name']
-                if particle_stream != expected_type:
-                    errors.append("Stream type mismatch, expected: %s, received: %s" % (expected_type, particle_stream))
+                if particle_stream != expected.particle_type:
+                    errors.append("Stream type mismatch, expected: %s, received: %s" %
+                                  (expected.particle_type, particle_stream))
 
-        if expected_new_sequence != particle_new_sequence:
+        if expected.new_sequence != particle_new_sequence:
             errors.append("New sequence flag mismatch, expected: %s, received: %s" %
-                          (expected_new_sequence, particle_new_sequence))
+                          (expected.new_sequence, particle_new_sequence))
 
-        expected_keys = []
-        for (key, value) in particle_def.items():
-            if(key not in ['_index', '_new_sequence', 'internal_timestamp', 'particle_object', 'particle_type']):
-                expected_keys.append(key)
-
-        particle_keys = []
         pv = {}
         for value in particle_values:
-            particle_keys.append(value['value_id'])
             pv[value['value_id']] = value['value']
 
-        if sorted(expected_keys) != sorted(particle_keys):
+        if expected.keys != sorted(pv):
             errors.append("expected / particle keys mismatch: %s != %s" %
-                          (sorted(expected_keys), sorted(particle_keys)))
+                          (expected.keys, sorted(pv)))
 
         else:
-            for key in expected_keys:
-                expected_value = particle_def[key]
-                particle_value = pv[key]
-                log.debug("Verify value for '%s'", key)
-                e = self._verify_value(expected_value, particle_value)
+            for key in expected.keys:
+                ex_value, round_factor = expected.values[key]
+                e = self._verify_value(ex_value, round_factor, pv[key])
                 if e:
                     errors.append("'%s' %s"  % (key, e))
 
         return errors
 
-    def _verify_value(self, expected_value, particle_value):
+    def _verify_value(self, ex_value, round_factor, particle_value):
         """
         Verify a value matches what we expect.  If the expected value (from the yaml)
-        is a dict then we expect the value to be in a 'value' field.  Otherwise just
-        use the parameter as a raw value.
-
-        when passing a dict you can specify a 'round' factor.
+        is a dict then we expect the value to be in a 'value' field, with an
+        optional 'round' factor, ExpectedParticle splits them when the result
+        set is read.
         """
-        if isinstance(expected_value, dict):
-            ex_value = expected_value['value']
-            round_factor = expected_value.get('round')
-        else:
-            ex_value = expected_value
-            round_factor = None
-
         if ex_value is None:
-            log.debug("No value to compare, ignoring")
             return None
 
         if round_factor is not None and particle_value is not None:
             particle_value = round(particle_value, round_factor)
-            log.debug("rounded value to %s", particle_value)
 
         if ex_value != particle_value:
             return "value mismatch, %s != %s (decimals may be rounded)" % (ex_value, particle_value)
@@ -423,31 +473,7 @@ class ResultSet(object):
         @throws InstrumentParameterException if datestr cannot be formatted to
         a date.
         """
-        if not isinstance(datestr, str):
-            raise IOError('Value %s is not a string.' % str(datestr))
-        if not DATE_MATCHER.match(datestr):
-            raise ValueError("date string not in ISO8601 format YYYY-MM-DDTHH:MM:SS.SSSSZ")
-
-        try:
-            # This assumes input date string are in UTC (=GMT)
-            if datestr[-1:] != 'Z':
-                datestr += 'Z'
-
-            # the parsed date time represents a GMT time, but strftime
-            # does not take timezone into account, so these are seconds from the
-            # local start of 1970
-            local_sec = float(parser.parse(datestr).strftime("%s.%f"))
-            # remove the local time zone to convert to gmt (seconds since gmt jan 1 1970)
-            gmt_sec = local_sec - time.timezone
-            # convert to ntp (seconds since gmt jan 1 1900)
-            timestamp = ntplib.system_to_ntp_time(gmt_sec)
-
-        except ValueError as e:
-            raise ValueError('Value %s could not be formatted to a date. %s' % (str(datestr), e))
-
-        log.debug("converting time string '%s', unix_ts: %s ntp: %s", datestr, gmt_sec, timestamp)
-
-        return timestamp
+        return string_to_ntp_date_time(datestr)
 
     def _particle_as_dict(self, particle):
         if isinstance(particle, dict):
@@ -3,6 +3,7 @@ __author__ = 'Bill French'
 import argparse
 
 from mi.idk.dataset.nose_test import NoseTest
+from mi.idk.dataset.parallel_test import ParallelTest
 from mi.idk.dataset.metadata import Metadata
 from mi.core.log import get_logger ; log = get_logger()
 
@@ -24,6 +25,9 @@ def run():
     """
 
     opts = parseArgs()
+    if opts.processes and not opts.ingest:
+        return run_parallel(opts)
+
     failed = False
     count = 0
     success = 0
@@ -62,6 +66,35 @@ def run():
 
     return failure
 
+def run_parallel(opts):
+    """
+    Run the tests of one or more dataset drivers in a pool of processes,
+    each test in its own process, and report the time of each test.
+    @return: number of failed tests
+    """
+    names = []
+    exclusive = []
+    all_types = not (opts.unit or opts.integration or opts.qualification)
+
+    for metadata in get_metadata(opts):
+        app = NoseTest(metadata, testname=opts.testname)
+        (driver_names, driver_exclusive) = app.test_names(unit=opts.unit or all_types,
+                                                          integration=opts.integration or all_types,
+                                                          qualification=opts.qualification or all_types)
+        names += driver_names
+        exclusive += driver_exclusive
+
+    noseargs = []
+    if opts.noseargs:
+        noseargs = [arg.replace("+", "-") for arg in opts.noseargs.split()]
+
+    runner = ParallelTest(opts.processes, noseargs)
+    runner.run(names, exclusive)
+    runner.report()
+
+    (success, error, failure) = runner.counts
+    return failure + error
+
 def get_metadata(opts):
     """
     return a list of metadata objects that we would like to
@@ -108,6 +141,8 @@ def parseArgs():
                         help="test function name to run (all if not set)" )
     parser.add_argument("-n", dest='noseargs',
                         help="extra nosetest args, use '+' for '-'" )
+    parser.add_argument("-p", dest='processes', type=int,
+                        help="run each test in its own process, this many at a time" )
     #parser.add_argument("-m", dest='launch_monitor', action="store_true",
     #                    help="Launch data file monitor" )
     return parser.parse_args()
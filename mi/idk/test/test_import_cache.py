@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+
+"""
+@package mi.idk.test.test_import_cache
+@file mi/idk/test/test_import_cache.py
+@brief Test the import graph cache of the egg generator
+"""
+
+__license__ = 'Apache 2.0'
+
+import os
+import sys
+import shutil
+import tempfile
+
+from nose.plugins.attrib import attr
+from mi.core.unit_test import MiUnitTest
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.idk.import_cache import ImportCache
+
+from snakefood.find import ERROR_IMPORT, ERROR_SYMBOL
+
+# the scan of impl.py fails to import the module newmod
+ERRORS = [(ERROR_SYMBOL, 'base.MiFoo'), (ERROR_IMPORT, 'newmod')]
+
+@attr('UNIT', group='mi')
+class TestImportCache(MiUnitTest):
+    """
+    Test the ImportCache
+    """
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.cache_file = os.path.join(self.test_dir, 'cache', 'import_cache.pkl')
+
+        self.base = self._write('base.py', "class MiFoo():\n    pass\n")
+        self.impl = self._write('impl.py', "from base import MiFoo\n")
+        self.scanned = []
+
+    def _write(self, name, contents):
+        filename = os.path.join(self.test_dir, name)
+        with open(filename, 'w') as f:
+            f.write(contents)
+        return filename
+
+    def _scan(self, filename):
+        """
+        Fake scanner, every module depends on base.py
+        """
+        self.scanned.append(filename)
+        if filename == self.base:
+            return ([], [])
+        return ([self.base], list(ERRORS))
+
+    def test_dependencies(self):
+        """
+        Test modules are only scanned when their contents change
+        """
+        cache = ImportCache(self.cache_file)
+        self.assertEqual(cache.dependencies(self.impl, self._scan), ([self.base], ERRORS))
+        self.assertEqual(cache.dependencies(self.impl, self._scan), ([self.base], ERRORS))
+        self.assertEqual(self.scanned, [self.impl])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # shared across runs through the cache file
+        cache.save()
+        cache = ImportCache(self.cache_file)
+        self.assertEqual(cache.dependencies(self.impl, self._scan), ([self.base], ERRORS))
+        self.assertEqual(self.scanned, [self.impl])
+
+        # contents changed
+        self._write('impl.py', "from base import MiFoo\nimport os\n")
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.impl, self.impl])
+
+        # dependency file removed
+        cache.save()
+        os.unlink(self.base)
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.impl, self.impl, self.impl])
+
+    def test_failed_import(self):
+        """
+        Test modules and graphs are scanned again once a module resolving
+        one of their failed imports is added
+        """
+        graph = {(self.test_dir, 'impl.py'): set([(self.test_dir, 'base.py')])}
+
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.base, self._scan)
+        cache.dependencies(self.impl, self._scan)
+        cache.set_graph(self.impl, graph, [self.impl, self.base])
+        cache.save()
+
+        cache = ImportCache(self.cache_file)
+        self.assertEqual(cache.graph(self.impl), graph)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.base, self.impl])
+
+        # newmod is added next to impl.py
+        self._write('newmod.py', "")
+        cache = ImportCache(self.cache_file)
+        self.assertIsNone(cache.graph(self.impl))
+        cache.dependencies(self.base, self._scan)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.base, self.impl, self.impl])
+
+    def test_sys_path(self):
+        """
+        Test the cache is discarded when sys.path changes
+        """
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        cache.save()
+
+        sys.path.append(self.test_dir)
+        self.addCleanup(sys.path.remove, self.test_dir)
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.impl, self.impl])
+
+    def test_graph(self):
+        """
+        Test dependency graphs are reused until one of their modules changes
+        """
+        graph = {(self.test_dir, 'impl.py'): set([(self.test_dir, 'base.py')])}
+
+        cache = ImportCache(self.cache_file)
+        self.assertIsNone(cache.graph(self.impl))
+        cache.set_graph(self.impl, graph, [self.impl, self.base])
+        cache.save()
+
+        cache = ImportCache(self.cache_file)
+        self.assertEqual(cache.graph(self.impl), graph)
+
+        self._write('base.py', "class MiFoo():\n    value = 1\n")
+        cache = ImportCache(self.cache_file)
+        self.assertIsNone(cache.graph(self.impl))
+
+    def test_bad_cache_file(self):
+        """
+        Test an unreadable cache file is ignored and replaced
+        """
+        os.makedirs(os.path.dirname(self.cache_file))
+        with open(self.cache_file, 'w') as f:
+            f.write("not a pickle")
+
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        cache.save()
+
+        cache = ImportCache(self.cache_file)
+        cache.dependencies(self.impl, self._scan)
+        self.assertEqual(self.scanned, [self.impl])
@@ -12,6 +12,9 @@ __license__ = 'Apache 2.0'
 
 import os
 import re
+import tempfile
+import time
+import yaml
 
 from nose.plugins.attrib import attr
 from mock import Mock
@@ -195,3 +198,90 @@ class TestResultSet(MiUnitTest):
 
         self.assertTrue(rs.verify([particle_a]))
         self.assertIsNone(rs.report())
+
+    def test_streaming(self):
+        """
+        Verify particles one at a time, and stop after max_errors failed
+        particles.
+        """
+        rs = ResultSet(self._get_result_set_file("record_set_files/test_data_1.txt.result.yml"))
+
+        base_timestamp = 3583861263.0
+        particle_a = CtdpfParserDataParticle("10.5914,  4.1870,  161.06,   2693.0",
+                                             internal_timestamp=base_timestamp, new_sequence=True)
+        particle_b = CtdpfParserDataParticle("10.5915,  4.1871,  161.07,   2693.1",
+                                             internal_timestamp=base_timestamp)
+
+        rs.start_verify()
+        self.assertTrue(rs.verify_particle(particle_a))
+        self.assertTrue(rs.verify_particle(particle_b))
+        self.assertTrue(rs.end_verify())
+        self.assertIsNone(rs.report())
+
+        # particles from a generator
+        self.assertTrue(rs.verify(particle for particle in [particle_a, particle_b]))
+
+        # missing particle reported at the end
+        rs.start_verify()
+        self.assertTrue(rs.verify_particle(particle_a))
+        self.assertFalse(rs.end_verify())
+        self.assertIsNotNone(rs.report())
+
+        # stop at the first failed particle
+        verified = []
+        def particles():
+            for particle in [particle_b, particle_a, particle_b]:
+                verified.append(particle)
+                yield particle
+
+        self.assertFalse(rs.verify(particles(), max_errors=1))
+        self.assertEqual(len(verified), 1)
+        self.assertIn("Verification stopped after 1 failed particles", rs.report())
+
+        verified = []
+        self.assertFalse(rs.verify(particles(), max_errors=2))
+        self.assertEqual(len(verified), 2)
+
+        # without a limit all the particles are verified
+        verified = []
+        self.assertFalse(rs.verify(particles()))
+        self.assertEqual(len(verified), 3)
+        self.assertNotIn("Verification stopped", rs.report())
+
+    def test_large_result_set(self):
+        """
+        Verify a large result set, and stop early when every particle fails.
+        """
+        count = 2000
+        base_timestamp = 3583861263.0
+        particles = []
+        data = []
+        for index in range(1, count + 1):
+            values = (10.5 + index / 100000.0, 4.1 + index / 100000.0, 161.0 + index / 1000.0, 2693.0 + index / 10.0)
+            particles.append(CtdpfParserDataParticle("%.5f, %.5f, %.3f, %.1f" % values,
+                                                     internal_timestamp=base_timestamp + index,
+                                                     new_sequence=(index == 1)).generate_dict())
+            data.append({'_index': index,
+                         '_new_sequence': index == 1,
+                         'internal_timestamp': time.strftime('%Y-%m-%dT%H:%M:%S.0',
+                                                             time.gmtime(base_timestamp + index - 2208988800)),
+                         'conductivity': float("%.5f" % values[0]),
+                         'temperature': {'value': round(float("%.5f" % values[1]), 3), 'round': 3},
+                         'pressure': float("%.3f" % values[2]),
+                         'oxygen': float("%.1f" % values[3])})
+
+        rs_file = tempfile.NamedTemporaryFile(suffix='.result.yml')
+        self.addCleanup(rs_file.close)
+        yaml.dump({'header': {'particle_object': 'CtdpfParserDataParticle', 'particle_type': 'ctdpf_parsed'},
+                   'data': data}, rs_file)
+        rs_file.flush()
+
+        rs = ResultSet(rs_file.name)
+        self.assertTrue(rs.verify(particles))
+
+        # every particle fails, stop early
+        particles[0]['values'][0]['value'] += 1
+        for particle in particles[1:]:
+            particle['internal_timestamp'] += 1
+        self.assertFalse(rs.verify(particles, max_errors=10))
+        self.assertEqual(rs.report().count("Failed particle validation"), 10)
@@ -11,6 +11,7 @@ __author__ = 'Bill French'
 __license__ = 'Apache 2.0'
 
 from nose.plugins.attrib import attr
+import os
 import unittest
 from mi.core.unit_test import MiUnitTest
 
@@ -18,6 +19,9 @@ from mi.core.log import get_logger ; log = get_logger()
 from mi.core.common import BaseEnum
 from mi.idk.util import convert_enum_to_dict
 from mi.idk.util import get_dict_value
+from mi.idk.util import isolated_config
+from mi.idk.util import isolated_path
+from mi.idk.util import ISOLATED_ROOT_ENV
 
 @attr('UNIT', group='mi')
 class TestUnitTest(MiUnitTest):
@@ -59,3 +63,34 @@ class TestUnitTest(MiUnitTest):
         self.assertIsNone(get_dict_value(a, ['d']))
         self.assertEqual(get_dict_value(a, ['d'], 99), 99)
 
+    def test_isolated_path(self):
+        """
+        Test paths under /tmp are moved under the isolated root
+        """
+        root = os.environ.pop(ISOLATED_ROOT_ENV, None)
+        if root is not None:
+            self.addCleanup(os.environ.__setitem__, ISOLATED_ROOT_ENV, root)
+        else:
+            self.addCleanup(os.environ.pop, ISOLATED_ROOT_ENV, None)
+
+        self.assertEqual(isolated_path('/tmp/dsatest'), '/tmp/dsatest')
+
+        os.environ[ISOLATED_ROOT_ENV] = '/tmp/idk_test_1'
+        self.assertEqual(isolated_path('/tmp/dsatest'), '/tmp/idk_test_1/tmp/dsatest')
+        self.assertEqual(isolated_path('/tmp/'), '/tmp/idk_test_1/tmp/')
+        self.assertEqual(isolated_path('/tmp/idk_test_1/tmp/dsatest'), '/tmp/idk_test_1/tmp/dsatest')
+        self.assertEqual(isolated_path('/tmpdir/dsatest'), '/tmpdir/dsatest')
+        self.assertEqual(isolated_path('/home/dsatest'), '/home/dsatest')
+        self.assertEqual(isolated_path('dsatest'), 'dsatest')
+        self.assertEqual(isolated_path(1), 1)
+
+        config = {'harvester': {'rec': {'directory': '/tmp/dsatest_rec', 'pattern': '*.log', 'frequency': 1},
+                                'tel': {'directory': '/tmp/dsatest_tel', 'storage_directory': '/tmp/stored'}},
+                  'parser': {'dirs': ['/tmp/a', '/data/b']}}
+        self.assertEqual(isolated_config(config),
+                         {'harvester': {'rec': {'directory': '/tmp/idk_test_1/tmp/dsatest_rec', 'pattern': '*.log',
+                                                'frequency': 1},
+                                        'tel': {'directory': '/tmp/idk_test_1/tmp/dsatest_tel',
+                                                'storage_directory': '/tmp/idk_test_1/tmp/stored'}},
+                          'parser': {'dirs': ['/tmp/idk_test_1/tmp/a', '/data/b']}})
+        self.assertEqual(config['harvester']['rec']['directory'], '/tmp/dsatest_rec')
@@ -12,6 +12,13 @@ import subprocess
 from mi.idk.config import Config
 from mi.core.log import get_logger ; log = get_logger()
 
+# Environment variable with the root directory of an isolated test process,
+# see isolated_path
+ISOLATED_ROOT_ENV = 'IDK_ISOLATED_ROOT'
+
+# Tests share the paths under this directory
+SHARED_TMP_DIR = '/tmp'
+
 def convert_enum_to_dict(obj):
     """
     @author Roger Unwin
@@ -79,3 +86,42 @@ def remove_all_files(dir_name):
         for file_name in os.listdir(dir_name):
             file_path = os.path.join(dir_name, file_name)
             os.unlink(file_path)
+
+def isolated_path(path):
+    """
+    Return the path a test should use in place of a path under /tmp.  When
+    tests run in parallel each test process gets its own root directory in
+    the IDK_ISOLATED_ROOT environment variable and the /tmp paths the tests
+    are configured with are moved under it, so concurrent tests don't share
+    data directories or state files.  Other paths, and all paths when no
+    isolated root is set, are returned unchanged.
+    @param path file or directory path
+    @return path to use
+    """
+    root = os.environ.get(ISOLATED_ROOT_ENV)
+    if not root or not isinstance(path, basestring) or not os.path.isabs(path):
+        return path
+
+    # already moved, the root itself is usually under /tmp
+    if path == root or path.startswith(os.path.join(root, '')):
+        return path
+
+    if path != SHARED_TMP_DIR and not path.startswith(os.path.join(SHARED_TMP_DIR, '')):
+        return path
+
+    return os.path.join(root, path.lstrip('/'))
+
+def isolated_config(config):
+    """
+    Return a copy of a configuration with all the paths under /tmp replaced
+    by their isolated_path.
+    @param config configuration dict, list or value
+    @return isolated configuration
+    """
+    if isinstance(config, dict):
+        return dict((key, isolated_config(value)) for (key, value) in config.items())
+
+    if isinstance(config, list):
+        return [isolated_config(value) for value in config]
+
+    return isolated_path(config)
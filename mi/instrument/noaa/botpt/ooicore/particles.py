@@ -35,6 +35,12 @@ common_regex_items = {
     'newline': NEWLINE
 }
 
+# the embedded timestamp, split into the minute and the seconds
+DATE_TIME_FORMAT = "%Y/%m/%d %H:%M:%S"
+DATE_TIME_MATCHER = re.compile(r'(\d{4}/\d{2}/\d{2} \d{2}:\d{2}):(\d{2})$')
+# strptime accepts leap seconds up to 61
+MAX_SECONDS = 61
+
 
 class DataParticleType(BaseEnum):
     RAW = CommonDataParticleType.RAW
@@ -104,9 +110,49 @@ class BotptStatusParticleKey(BaseEnum):
     SYST = 'botpt_syst_status'
 
 
+class TimestampCache(object):
+    """
+    Convert the embedded BOTPT timestamps to unix time.  Samples arrive in time
+    order, so the start of the previous minute is kept and only the seconds
+    and fraction are added to it while the minute is unchanged.  Any other
+    timestamp is fully parsed with strptime/mktime, which also sets the minute
+    for the following samples.
+    """
+    def __init__(self):
+        # (minute string, unix time of the start of that minute)
+        self._minute = (None, None)
+
+    def to_unix_time(self, date_time):
+        """
+        Convert a timestamp in the form YYYY/MM/DD HH:MM:SS[.fff] to unix time
+        @param date_time: the timestamp string
+        @return: unix time, identical to mktime(strptime(date_time)) plus the fraction
+        @throws ValueError if the timestamp cannot be parsed
+        """
+        if '.' in date_time:
+            date_time, right = date_time.split('.', 1)
+            fraction = float('.' + right)
+        else:
+            fraction = 0
+
+        match = DATE_TIME_MATCHER.match(date_time)
+        if match:
+            minute, minute_start = self._minute
+            seconds = int(match.group(2))
+            if match.group(1) == minute and seconds <= MAX_SECONDS:
+                return minute_start + seconds + fraction
+
+        timestamp = time.strptime(date_time, DATE_TIME_FORMAT)
+        unix_time = time.mktime(timestamp)
+        if match:
+            self._minute = (match.group(1), unix_time - timestamp.tm_sec)
+        return unix_time + fraction
+
+
 class BotptDataParticle(DataParticle):
     _compiled_regex = None
     _compile_flags = None
+    _timestamp_cache = None
     __metaclass__ = METALOGGER
 
     def __init__(self, *args, **kwargs):
@@ -137,18 +183,24 @@ class BotptDataParticle(DataParticle):
                 cls._compiled_regex = re.compile(cls.regex(), cls._compile_flags)
         return cls._compiled_regex
 
+    @classmethod
+    def timestamp_cache(cls):
+        """
+        Create the timestamp cache of the particle class on first use.  Each
+        class gets its own cache, the streams of the different instruments
+        interleave and would keep replacing each other's minute.
+        @return: TimestampCache of the particle class
+        """
+        if cls._timestamp_cache is None:
+            cls._timestamp_cache = TimestampCache()
+        return cls._timestamp_cache
+
     def set_botpt_timestamp(self):
         """
         Set the internal timestamp based on the embedded timestamp in the sample
         """
-        ts = self.match.group('date_time')
-        if '.' in ts:
-            ts, right = ts.split('.', 1)
-            fraction = float('.' + right)
-        else:
-            fraction = 0
-        timestamp = time.strptime(ts, "%Y/%m/%d %H:%M:%S")
-        self.set_internal_timestamp(unix_time=time.mktime(timestamp) + fraction)
+        unix_time = self.timestamp_cache().to_unix_time(self.match.group('date_time'))
+        self.set_internal_timestamp(unix_time=unix_time)
 
     def _encode_all(self):
         """
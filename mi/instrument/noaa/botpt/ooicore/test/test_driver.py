@@ -13,11 +13,13 @@ USAGE:
        $ bin/test_driver -q [-t testname]
 """
 
+import json
+import random
 import time
 import ntplib
 import mi.instrument.noaa.botpt.ooicore.particles as particles
 from mi.core.instrument.port_agent_client import PortAgentPacket
-from mock import Mock, call
+from mock import Mock, call, patch
 from nose.plugins.attrib import attr
 from mi.core.log import get_logger
 from mi.idk.unit_test import InstrumentDriverTestCase
@@ -657,6 +659,80 @@ class DriverUnitTest(InstrumentDriverUnitTestCase, BotptTestMixinSub):
         driver._protocol._handler_stop_heater()
         self.assertEqual(driver._protocol._param_dict.get(Parameter.HEATER_ON), False)
 
+    def test_timestamp_cache(self):
+        """
+        Verify the cached timestamp conversion matches strptime/mktime exactly,
+        across minute, hour and day boundaries and for malformed timestamps
+        """
+        def reference(date_time):
+            if '.' in date_time:
+                date_time, right = date_time.split('.', 1)
+                fraction = float('.' + right)
+            else:
+                fraction = 0
+            return time.mktime(time.strptime(date_time, "%Y/%m/%d %H:%M:%S")) + fraction
+
+        rand = random.Random(1234)
+        cache = particles.TimestampCache()
+        unix_time = time.mktime((2013, 8, 22, 22, 48, 36, 0, 0, -1))
+        for i in range(20000):
+            unix_time += rand.choice([0.05, 0.05, 0.05, 1, 61, 3599, 86400])
+            date_time = time.strftime("%Y/%m/%d %H:%M:%S", time.localtime(int(unix_time)))
+            if rand.random() < 0.5:
+                date_time += '.%03d' % rand.randint(0, 999)
+            if rand.random() < 0.05:
+                date_time = date_time[:17] + rand.choice(['60', '61', '62', '99', ' 5', '5'])
+            if rand.random() < 0.05:
+                date_time = rand.choice([' ' + date_time, date_time + ' ', date_time + '.x'])
+
+            try:
+                expected = reference(date_time)
+            except ValueError:
+                self.assertRaises(ValueError, cache.to_unix_time, date_time)
+            else:
+                self.assertEqual(repr(cache.to_unix_time(date_time)), repr(expected))
+
+    def test_timestamp_cache_per_class(self):
+        """
+        Verify each particle class keeps its own timestamp cache, so interleaved
+        streams do not replace each other's minute
+        """
+        nano_cache = particles.NanoSampleParticle.timestamp_cache()
+        lily_cache = particles.LilySampleParticle.timestamp_cache()
+        self.assertIsNot(nano_cache, lily_cache)
+        self.assertIs(particles.NanoSampleParticle.timestamp_cache(), nano_cache)
+
+        nano_cache.to_unix_time("2013/08/22 22:48:36.010")
+        lily_cache.to_unix_time("2013/06/24 23:36:02")
+        self.assertEqual(nano_cache._minute[0], "2013/08/22 22:48")
+        self.assertEqual(lily_cache._minute[0], "2013/06/24 23:36")
+
+    def test_nano_timestamps(self):
+        """
+        Verify the internal timestamps of NANO particles generated with the
+        timestamp cache are identical to a full strptime/mktime for every sample
+        """
+        class ReferenceCache(object):
+            def to_unix_time(self, date_time):
+                if '.' in date_time:
+                    date_time, right = date_time.split('.', 1)
+                    fraction = float('.' + right)
+                else:
+                    fraction = 0
+                return time.mktime(time.strptime(date_time, "%Y/%m/%d %H:%M:%S")) + fraction
+
+        # two minutes of samples at 20 Hz
+        nano_samples = ["NANO,V,2013/08/22 22:%02d:%02d.%03d,13.888533,26.147947328%s" %
+                        (i / 1200, i / 20 % 60, i % 20 * 50, NEWLINE) for i in range(2400)]
+
+        def run(cache):
+            with patch.object(particles.NanoSampleParticle, '_timestamp_cache', cache):
+                result = [json.loads(particles.NanoSampleParticle(sample, port_timestamp=0).generate())
+                          for sample in nano_samples]
+            return [p['internal_timestamp'] for p in result]
+
+        self.assertEqual(run(particles.TimestampCache()), run(ReferenceCache()))
+
     def test_driver_enums(self):
         """
         Verify that all driver enumeration has no duplicate values that might cause confusion. Also
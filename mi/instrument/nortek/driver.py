@@ -15,6 +15,8 @@ import re
 import time
 import base64
 
+import numpy
+
 from mi.core.log import get_logger, get_logging_metaclass
 log = get_logger()
 
@@ -1006,17 +1008,24 @@ class NortekProtocolParameterDict(ProtocolParameterDict):
     @staticmethod
     def calculate_checksum(input, length=None):
         """
-        Calculate the checksum
+        Calculate the checksum, the seed plus the sum of the little endian
+        words before the checksum word, modulo 0x10000
+        @param input The raw structure
+        @param length The length of the structure including the checksum word,
+            defaults to the length of input
+        @retval The checksum as an int
+        @throws SampleException if input is too short for length
         """
-        calculated_checksum = CHECK_SUM_SEED
         if length is None:
             length = len(input)
 
-        for word_index in range(0, length - 2, 2):
-            word_value = NortekProtocolParameterDict.convert_word_to_int(input[word_index:word_index + 2])
-            calculated_checksum = (calculated_checksum + word_value) % 0x10000
-            #log.trace('w_i=%d, c_c=%d', word_index, calculated_checksum)
-        return calculated_checksum
+        num_words = max(0, (length - 1) // 2)
+        if len(input) < num_words * 2:
+            raise SampleException("Invalid number of bytes for checksum! Found %d, need %d" %
+                                  (len(input), num_words * 2))
+
+        words = numpy.frombuffer(input, dtype='<u2', count=num_words)
+        return (CHECK_SUM_SEED + int(words.sum(dtype=numpy.uint64))) % 0x10000
 
     @staticmethod
     def convert_bytes_to_string(bytes_in):
@@ -14,11 +14,14 @@ import time
 import re
 import base64
 
+import numpy
+
 from mi.core.common import BaseEnum
 from mi.core.exceptions import SampleException
 from mi.core.instrument.protocol_param_dict import ParameterDictVisibility
 from mi.core.instrument.protocol_param_dict import ParameterDictType
-from mi.core.instrument.data_particle import DataParticle, DataParticleKey
+from mi.core.instrument.data_particle import DataParticle, DataParticleKey, DataParticleValue
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
 
 from mi.instrument.nortek.driver import NortekDataParticleType, Parameter, ParameterUnits
 from mi.instrument.nortek.driver import NortekInstrumentDriver
@@ -26,6 +29,7 @@ from mi.instrument.nortek.driver import NortekInstrumentProtocol
 from mi.instrument.nortek.driver import NortekProtocolParameterDict
 from mi.instrument.nortek.driver import InstrumentPrompts
 from mi.instrument.nortek.driver import NEWLINE
+from mi.instrument.nortek.driver import CHECK_SUM_SEED
 
 from mi.core.log import get_logger
 log = get_logger()
@@ -46,6 +50,27 @@ VELOCITY_HEADER_DATA_REGEX = re.compile(VELOCITY_HEADER_DATA_PATTERN, re.DOTALL)
 
 VECTOR_SAMPLE_REGEX = [VELOCITY_DATA_REGEX, SYSTEM_DATA_REGEX, VELOCITY_HEADER_DATA_REGEX]
 
+# layout of the velocity data structure, used to decode a burst of structures at once
+VELOCITY_DATA_DTYPE = numpy.dtype([
+    ('sync', '<u2'),
+    ('analog_input2_lsb', 'u1'),
+    ('count', 'u1'),
+    ('pressure_msb', 'u1'),
+    ('analog_input2_msb', 'u1'),
+    ('pressure_lsw', '<u2'),
+    ('analog_input1', '<u2'),
+    ('velocity_beam1', '<u2'),
+    ('velocity_beam2', '<u2'),
+    ('velocity_beam3', '<u2'),
+    ('amplitude_beam1', 'u1'),
+    ('amplitude_beam2', 'u1'),
+    ('amplitude_beam3', 'u1'),
+    ('correlation_beam1', 'u1'),
+    ('correlation_beam2', 'u1'),
+    ('correlation_beam3', 'u1'),
+    ('checksum', '<u2'),
+])
+
 
 class DataParticleType(NortekDataParticleType):
     """
@@ -73,14 +98,74 @@ class VectorVelocityDataParticleKey(BaseEnum):
     CORRELATION_BEAM1 = "correlation_beam_1"
     CORRELATION_BEAM2 = "correlation_beam_2"
     CORRELATION_BEAM3 = "correlation_beam_3"
-    
-            
+
+
+# order of the values in a velocity data particle
+VELOCITY_DATA_KEYS = [VectorVelocityDataParticleKey.ANALOG_INPUT2,
+                      VectorVelocityDataParticleKey.COUNT,
+                      VectorVelocityDataParticleKey.PRESSURE,
+                      VectorVelocityDataParticleKey.ANALOG_INPUT1,
+                      VectorVelocityDataParticleKey.VELOCITY_BEAM1,
+                      VectorVelocityDataParticleKey.VELOCITY_BEAM2,
+                      VectorVelocityDataParticleKey.VELOCITY_BEAM3,
+                      VectorVelocityDataParticleKey.AMPLITUDE_BEAM1,
+                      VectorVelocityDataParticleKey.AMPLITUDE_BEAM2,
+                      VectorVelocityDataParticleKey.AMPLITUDE_BEAM3,
+                      VectorVelocityDataParticleKey.CORRELATION_BEAM1,
+                      VectorVelocityDataParticleKey.CORRELATION_BEAM2,
+                      VectorVelocityDataParticleKey.CORRELATION_BEAM3]
+
+
+def decode_velocity_data(structures):
+    """
+    Decode a burst of velocity data structures into columns, verifying all
+    the checksums at once
+    @param structures list of velocity data structures, each VELOCITY_DATA_LEN bytes
+    @retval (columns, checksum_ok) where columns is a list of value lists in
+        VELOCITY_DATA_KEYS order, and checksum_ok is a list of booleans, one
+        per structure
+    @throws SampleException if a structure is the wrong length or does not
+        start with the velocity data sync bytes
+    """
+    for structure in structures:
+        if len(structure) != VELOCITY_DATA_LEN or not structure.startswith(VELOCITY_DATA_SYNC_BYTES):
+            raise SampleException("Invalid velocity data structure: [%s]" % structure.encode('hex'))
+
+    raw = ''.join(structures)
+    records = numpy.frombuffer(raw, dtype=VELOCITY_DATA_DTYPE)
+
+    # the checksum is the seed plus the sum of all the words before the checksum word
+    words = numpy.frombuffer(raw, dtype='<u2').reshape(len(structures), VELOCITY_DATA_LEN / 2)
+    checksums = (words[:, :-1].sum(axis=1, dtype=numpy.uint64) + CHECK_SUM_SEED) % 0x10000
+    checksum_ok = (checksums == records['checksum']).tolist()
+
+    analog_input2 = records['analog_input2_lsb'].astype(numpy.int64) + \
+        records['analog_input2_msb'].astype(numpy.int64) * 0x100
+    pressure = records['pressure_msb'].astype(numpy.int64) * 0x10000 + records['pressure_lsw']
+
+    columns = [analog_input2, records['count'], pressure, records['analog_input1'],
+               records['velocity_beam1'], records['velocity_beam2'], records['velocity_beam3'],
+               records['amplitude_beam1'], records['amplitude_beam2'], records['amplitude_beam3'],
+               records['correlation_beam1'], records['correlation_beam2'], records['correlation_beam3']]
+
+    return [column.tolist() for column in columns], checksum_ok
+
+
 class VectorVelocityDataParticle(DataParticle):
     """
     Routine for parsing velocity data into a data particle structure for the Vector sensor. 
     """
     _data_particle_type = DataParticleType.VELOCITY
 
+    def __init__(self, raw_data, *args, **kwargs):
+        """
+        @param decoded optional (values, checksum_ok) tuple already decoded by
+            decode_velocity_data, with values in VELOCITY_DATA_KEYS order.  When
+            not given the raw data is decoded when the particle is built.
+        """
+        self._decoded = kwargs.pop('decoded', None)
+        super(VectorVelocityDataParticle, self).__init__(raw_data, *args, **kwargs)
+
     def _build_parsed_values(self):
         """
         Take the velocity data sample format and parse it into
@@ -88,41 +173,27 @@ class VectorVelocityDataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         log.debug('VectorVelocityDataParticle: raw data =%r', self.raw_data)
-        match = VELOCITY_DATA_REGEX.match(self.raw_data)
-        
-        if not match:
-            raise SampleException("VectorVelocityDataParticle: No regex match of parsed sample data: [%s]" % self.raw_data)
-        
-        analog_input2 = ord(match.group(1))
-        count = ord(match.group(2))
-        pressure = ord(match.group(3)) * 0x10000
-        analog_input2 += ord(match.group(4)) * 0x100
-        pressure += NortekProtocolParameterDict.convert_word_to_int(match.group(5))
-        analog_input1 = NortekProtocolParameterDict.convert_word_to_int(match.group(6))
-        velocity_beam1 = NortekProtocolParameterDict.convert_word_to_int(match.group(7))
-        velocity_beam2 = NortekProtocolParameterDict.convert_word_to_int(match.group(8))
-        velocity_beam3 = NortekProtocolParameterDict.convert_word_to_int(match.group(9))
-        amplitude_beam1 = ord(match.group(10))
-        amplitude_beam2 = ord(match.group(11))
-        amplitude_beam3 = ord(match.group(12))
-        correlation_beam1 = ord(match.group(13))
-        correlation_beam2 = ord(match.group(14))
-        correlation_beam3 = ord(match.group(15))
-        
-        result = [{DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.ANALOG_INPUT2, DataParticleKey.VALUE: analog_input2},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.COUNT, DataParticleKey.VALUE: count},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.PRESSURE, DataParticleKey.VALUE: pressure},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.ANALOG_INPUT1, DataParticleKey.VALUE: analog_input1},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.VELOCITY_BEAM1, DataParticleKey.VALUE: velocity_beam1},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.VELOCITY_BEAM2, DataParticleKey.VALUE: velocity_beam2},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.VELOCITY_BEAM3, DataParticleKey.VALUE: velocity_beam3},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.AMPLITUDE_BEAM1, DataParticleKey.VALUE: amplitude_beam1},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.AMPLITUDE_BEAM2, DataParticleKey.VALUE: amplitude_beam2},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.AMPLITUDE_BEAM3, DataParticleKey.VALUE: amplitude_beam3},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.CORRELATION_BEAM1, DataParticleKey.VALUE: correlation_beam1},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.CORRELATION_BEAM2, DataParticleKey.VALUE: correlation_beam2},
-                  {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.CORRELATION_BEAM3, DataParticleKey.VALUE: correlation_beam3}]
- 
+
+        if self._decoded is None:
+            match = VELOCITY_DATA_REGEX.match(self.raw_data)
+
+            if not match:
+                raise SampleException("VectorVelocityDataParticle: No regex match of parsed sample data: [%s]" % self.raw_data)
+
+            columns, checksum_ok = decode_velocity_data([match.group(0)])
+            values = [column[0] for column in columns]
+            checksum_ok = checksum_ok[0]
+        else:
+            values, checksum_ok = self._decoded
+
+        if not checksum_ok:
+            log.warn("VectorVelocityDataParticle: checksum did not match packet checksum: %s",
+                     self.raw_data.encode('hex'))
+            self.contents[DataParticleKey.QUALITY_FLAG] = DataParticleValue.CHECKSUM_FAILED
+
+        result = [{DataParticleKey.VALUE_ID: key, DataParticleKey.VALUE: value}
+                  for key, value in zip(VELOCITY_DATA_KEYS, values)]
+
         log.debug('VectorVelocityDataParticle: particle=%s', result)
         return result
 
@@ -315,9 +386,45 @@ class Protocol(NortekInstrumentProtocol):
 
         self._got_chunk_base(structure, timestamp)
 
+    def _got_chunks(self, chunks):
+        """
+        Consecutive velocity data structures are decoded together, all other
+        structures are passed to _got_chunk in order.
+        @param chunks iterable of (timestamp, structure) tuples
+        """
+        burst = []
+        for timestamp, structure in chunks:
+            if len(structure) == VELOCITY_DATA_LEN and structure.startswith(VELOCITY_DATA_SYNC_BYTES):
+                burst.append((timestamp, structure))
+            else:
+                self._got_velocity_burst(burst)
+                burst = []
+                self._got_chunk(structure, timestamp)
+
+        self._got_velocity_burst(burst)
+
     ########################################################################
     # Private helpers.
     ########################################################################
+    def _got_velocity_burst(self, burst):
+        """
+        Decode a burst of velocity data structures as columns, then build and
+        publish a particle for each structure
+        @param burst list of (timestamp, structure) tuples
+        """
+        if not burst:
+            return
+
+        timestamps, structures = zip(*burst)
+        columns, checksum_ok = decode_velocity_data(structures)
+
+        for timestamp, structure, values, valid in zip(timestamps, structures, zip(*columns), checksum_ok):
+            particle = VectorVelocityDataParticle(structure, port_timestamp=timestamp, decoded=(values, valid))
+            parsed_sample = particle.generate()
+
+            if self._driver_event:
+                self._driver_event(DriverAsyncEvent.SAMPLE, parsed_sample)
+
     def _build_param_dict(self):
         NortekInstrumentProtocol._build_param_dict(self)
 
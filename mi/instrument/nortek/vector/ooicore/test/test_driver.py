@@ -21,6 +21,8 @@ USAGE:
 __author__ = 'Rachel Manoni, Ronald Ronquillo'
 __license__ = 'Apache 2.0'
 
+import json
+import random
 import time
 import ntplib
 
@@ -39,12 +41,15 @@ from mi.core.instrument.instrument_driver import DriverConfigKey, DriverEvent, R
 
 from mi.core.instrument.data_particle import DataParticleKey, DataParticleValue
 from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.instrument_driver import DriverAsyncEvent
+from mi.core.instrument.port_agent_client import PortAgentPacket
 
 from mi.core.exceptions import SampleException
 
 from mi.instrument.nortek.driver import ProtocolState, TIMEOUT, Parameter, NEWLINE, EngineeringParameter
 
 from mi.instrument.nortek.driver import ProtocolEvent
+from mi.instrument.nortek.driver import InstrumentPrompts, NortekProtocolParameterDict
 
 from mi.instrument.nortek.vector.ooicore.driver import Protocol, DataParticleType, NortekDataParticleType
 from mi.instrument.nortek.vector.ooicore.driver import VectorVelocityHeaderDataParticle
@@ -53,6 +58,7 @@ from mi.instrument.nortek.vector.ooicore.driver import VectorVelocityDataParticl
 from mi.instrument.nortek.vector.ooicore.driver import VectorVelocityDataParticleKey
 from mi.instrument.nortek.vector.ooicore.driver import VectorSystemDataParticle
 from mi.instrument.nortek.vector.ooicore.driver import VectorSystemDataParticleKey
+from mi.instrument.nortek.vector.ooicore.driver import decode_velocity_data
 
 ###
 #   Driver parameters for the tests
@@ -100,6 +106,30 @@ velocity_particle = [{DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.AN
                      {DataParticleKey.VALUE_ID: VectorVelocityDataParticleKey.CORRELATION_BEAM3, DataParticleKey.VALUE: 24}]
 
 
+
+def velocity_burst(num_records, rand):
+    """
+    Build a burst as the Vector sends it, a velocity header, velocity data
+    structures with random contents and a system structure.  Every tenth
+    velocity data structure has a bad checksum.
+    @param num_records The number of velocity data structures
+    @param rand The random number generator
+    @retval (burst, velocity data structures, list of checksum ok flags)
+    """
+    structures = []
+    checksum_ok = []
+    for i in range(num_records):
+        structure = velocity_sample()[:2] + ''.join(chr(rand.randint(0, 255)) for _ in range(20))
+        checksum = NortekProtocolParameterDict.calculate_checksum(structure + '\x00\x00')
+        if i % 10 == 9:
+            checksum = (checksum + 1) % 0x10000
+        structures.append(structure + chr(checksum & 0xff) + chr(checksum >> 8))
+        checksum_ok.append(i % 10 != 9)
+
+    burst = velocity_header_sample() + ''.join(structures) + system_sample()
+    return burst, structures, checksum_ok
+
+
 # velocity header data particle & sample 
 def velocity_header_sample():
     sample_as_hex = "a512150012491711121270032f2f2e0002090d0000000000000000000000000000000000000000005d70"
@@ -399,6 +429,80 @@ class UnitFromIDK(NortekUnitTest):
         with self.assertRaises(SampleException):
             particle.generate()
 
+    def test_velocity_checksum(self):
+        """
+        Verify a velocity data structure with a bad checksum is still published,
+        flagged as a checksum failure
+        """
+        particle = VectorVelocityDataParticle(velocity_sample(), port_timestamp=3558720820.531179)
+        parsed = particle.generate(sorted=True)
+        self.assertEqual(json.loads(parsed)[DataParticleKey.QUALITY_FLAG], DataParticleValue.OK)
+
+        corrupt = velocity_sample()[:-1] + chr(ord(velocity_sample()[-1]) ^ 0xff)
+        particle = VectorVelocityDataParticle(corrupt, port_timestamp=3558720820.531179)
+        parsed = json.loads(particle.generate(sorted=True))
+        self.assertEqual(parsed[DataParticleKey.QUALITY_FLAG], DataParticleValue.CHECKSUM_FAILED)
+        self.assertEqual(parsed[DataParticleKey.VALUES], velocity_particle)
+
+    def test_velocity_burst(self):
+        """
+        Replay a burst through _got_chunk one structure at a time, and through
+        _got_chunks and got_data which decode the velocity data structures as a
+        batch.  Verify the same particles are published.
+        """
+        rand = random.Random(1234)
+        burst, structures, checksum_ok = velocity_burst(2000, rand)
+
+        columns, decoded_checksum_ok = decode_velocity_data([velocity_sample()] + structures)
+        self.assertEqual(decoded_checksum_ok, [True] + checksum_ok)
+        self.assertEqual([column[0] for column in columns],
+                         [value[DataParticleKey.VALUE] for value in velocity_particle])
+
+        port_agent_packet = PortAgentPacket()
+        port_agent_packet.attach_data(burst)
+        port_agent_packet.attach_timestamp(3558720820.531179)
+        port_agent_packet.pack_header()
+        port_timestamp = port_agent_packet.get_timestamp()
+
+        chunker = StringChunker(Protocol.sieve_function)
+        chunker.add_chunk(burst, port_timestamp)
+        chunks = []
+        (timestamp, chunk) = chunker.get_next_data()
+        while chunk:
+            chunks.append((timestamp, chunk))
+            (timestamp, chunk) = chunker.get_next_data()
+        self.assertEqual(len(chunks), len(structures) + 2)
+
+        def replay(publish):
+            particles = []
+
+            def event_callback(event, value=None):
+                if event == DriverAsyncEvent.SAMPLE:
+                    particle = json.loads(value)
+                    del particle[DataParticleKey.DRIVER_TIMESTAMP]
+                    particles.append(particle)
+
+            protocol = Protocol(InstrumentPrompts, NEWLINE, event_callback)
+            publish(protocol)
+            return particles
+
+        def got_chunk(protocol):
+            for chunk_timestamp, structure in chunks:
+                protocol._got_chunk(structure, chunk_timestamp)
+
+        chunk_particles = replay(got_chunk)
+        batch_particles = replay(lambda protocol: protocol._got_chunks(chunks))
+        data_particles = replay(lambda protocol: protocol.got_data(port_agent_packet))
+
+        self.assertEqual(len(chunk_particles), len(chunks))
+        self.assertEqual(batch_particles, chunk_particles)
+        self.assertEqual(data_particles, chunk_particles)
+
+        velocity = [particle for particle in batch_particles
+                    if particle[DataParticleKey.STREAM_NAME] == DataParticleType.VELOCITY]
+        self.assertEqual([particle[DataParticleKey.QUALITY_FLAG] == DataParticleValue.OK for particle in velocity],
+                         checksum_ok)
+
 
 ###############################################################################
 #                            INTEGRATION TESTS                                #
@@ -1372,9 +1372,7 @@ class Protocol(MenuInstrumentProtocol):
         else:
             debug_string = "---> DHE: do_cmd_resp() sending cmd_line: " + cmd_line
             log.debug(debug_string)
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+            self._connection.send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         (prompt, result) = self._get_response(timeout, expected_prompt=expected_prompt)
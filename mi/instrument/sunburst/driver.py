@@ -1017,9 +1017,7 @@ class SamiProtocol(CommandResponseInstrumentProtocol):
         if write_delay == 0:
             self._connection.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection.send(char)
-                time.sleep(write_delay)
+            self._connection.send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -11,6 +11,7 @@ __license__ = 'Apache 2.0'
 
 import re
 from struct import unpack
+import numpy
 import time as time
 import datetime as dt
 
@@ -23,6 +24,7 @@ from mi.instrument.teledyne.driver import NEWLINE
 from mi.core.instrument.data_particle import DataParticle
 from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.data_particle import CommonDataParticleType
+from mi.core.instrument.pd0 import calculate_checksum, unpack_cells
 
 from mi.core.exceptions import SampleException
 
@@ -40,6 +42,10 @@ ADCP_ANCILLARY_SYSTEM_DATA_REGEX_MATCHER = re.compile(ADCP_ANCILLARY_SYSTEM_DATA
 ADCP_TRANSMIT_PATH_REGEX = r'(IXMT.*\n.*\n.*\n.*)\n>'
 ADCP_TRANSMIT_PATH_REGEX_MATCHER = re.compile(ADCP_TRANSMIT_PATH_REGEX)
 
+# PD0 depth cells are unpacked as rows of 4 big endian unsigned shorts, the
+# last row of each chunk is not included
+CELL_DTYPE = numpy.dtype('>u2')
+
 
 # ##############################################################################
 # Data Particles
@@ -239,16 +245,11 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         self.final_result = []
 
         length = unpack("H", self.raw_data[2:4])[0]
-        data = str(self.raw_data)
 
         #
         # Calculate Checksum
         #
-        total = int(0)
-        for i in xrange(0, length):
-            total += int(ord(data[i]))
-
-        checksum = total & 65535  # bitwise and with 65535 or mod vs 65536
+        checksum = calculate_checksum(str(self.raw_data), length)
 
         if checksum != unpack("H", self.raw_data[length: length + 2])[0]:
             log.debug(
@@ -604,7 +605,6 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 2 / 4
-        offset = 0
 
         velocity_data_id = unpack("!H", chunk[0:2])[0]
         if 1 != velocity_data_id:
@@ -616,17 +616,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
             self._data_particle_type = DataParticleType.ADCP_PD0_PARSED_BEAM
             if self._slave:
                 self._data_particle_type = VADCPDataParticleType.VADCP_PD0_PARSED_BEAM
-            beam_1_velocity = []
-            beam_2_velocity = []
-            beam_3_velocity = []
-            beam_4_velocity = []
-            for row in xrange(1, N):
-                (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-                beam_1_velocity.append(a)
-                beam_2_velocity.append(b)
-                beam_3_velocity.append(c)
-                beam_4_velocity.append(d)
-                offset += 4 * 2
+            (beam_1_velocity, beam_2_velocity,
+             beam_3_velocity, beam_4_velocity) = \
+                unpack_cells(chunk, N - 1, CELL_DTYPE)
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.BEAM_1_VELOCITY,
                                       DataParticleKey.VALUE: beam_1_velocity})
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.BEAM_2_VELOCITY,
@@ -639,17 +631,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
             self._data_particle_type = DataParticleType.ADCP_PD0_PARSED_EARTH
             if self._slave:
                 self._data_particle_type = VADCPDataParticleType.VADCP_PD0_PARSED_EARTH
-            water_velocity_east = []
-            water_velocity_north = []
-            water_velocity_up = []
-            error_velocity = []
-            for row in xrange(1, N):
-                (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-                water_velocity_east.append(a)
-                water_velocity_north.append(b)
-                water_velocity_up.append(c)
-                error_velocity.append(d)
-                offset += 4 * 2
+            (water_velocity_east, water_velocity_north,
+             water_velocity_up, error_velocity) = \
+                unpack_cells(chunk, N - 1, CELL_DTYPE)
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.WATER_VELOCITY_EAST,
                                       DataParticleKey.VALUE: water_velocity_east})
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.WATER_VELOCITY_NORTH,
@@ -669,7 +653,6 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 2 / 4
-        offset = 0
 
         correlation_magnitude_id = unpack("!H", chunk[0:2])[0]
         if 2 != correlation_magnitude_id:
@@ -677,17 +660,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_ID,
                                   DataParticleKey.VALUE: correlation_magnitude_id})
 
-        correlation_magnitude_beam1 = []
-        correlation_magnitude_beam2 = []
-        correlation_magnitude_beam3 = []
-        correlation_magnitude_beam4 = []
-        for row in xrange(1, N):
-            (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-            correlation_magnitude_beam1.append(a)
-            correlation_magnitude_beam2.append(b)
-            correlation_magnitude_beam3.append(c)
-            correlation_magnitude_beam4.append(d)
-            offset += 4 * 2
+        (correlation_magnitude_beam1, correlation_magnitude_beam2,
+         correlation_magnitude_beam3, correlation_magnitude_beam4) = \
+            unpack_cells(chunk, N - 1, CELL_DTYPE)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.CORRELATION_MAGNITUDE_BEAM1,
                                   DataParticleKey.VALUE: correlation_magnitude_beam1})
@@ -705,7 +680,6 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         @throws SampleException If there is a problem with sample creation
         """
         N = (len(chunk) - 2) / 2 / 4
-        offset = 0
 
         echo_intensity_id = unpack("!H", chunk[0:2])[0]
         if 3 != echo_intensity_id:
@@ -713,17 +687,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.ECHO_INTENSITY_ID,
                                   DataParticleKey.VALUE: echo_intensity_id})
 
-        echo_intesity_beam1 = []
-        echo_intesity_beam2 = []
-        echo_intesity_beam3 = []
-        echo_intesity_beam4 = []
-        for row in xrange(1, N):
-            (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-            echo_intesity_beam1.append(a)
-            echo_intesity_beam2.append(b)
-            echo_intesity_beam3.append(c)
-            echo_intesity_beam4.append(d)
-            offset += 4 * 2
+        (echo_intesity_beam1, echo_intesity_beam2,
+         echo_intesity_beam3, echo_intesity_beam4) = \
+            unpack_cells(chunk, N - 1, CELL_DTYPE)
 
         self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.ECHO_INTENSITY_BEAM1,
                                   DataParticleKey.VALUE: echo_intesity_beam1})
@@ -742,7 +708,6 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
         """
 
         N = (len(chunk) - 2) / 2 / 4
-        offset = 0
 
         # coord_transform_type
         # Coordinate Transformation type:
@@ -759,17 +724,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
             self._data_particle_type = DataParticleType.ADCP_PD0_PARSED_BEAM
             if self._slave:
                 self._data_particle_type = VADCPDataParticleType.VADCP_PD0_PARSED_BEAM
-            percent_good_beam1 = []
-            percent_good_beam2 = []
-            percent_good_beam3 = []
-            percent_good_beam4 = []
-            for row in xrange(1, N):
-                (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-                percent_good_beam1.append(a)
-                percent_good_beam2.append(b)
-                percent_good_beam3.append(c)
-                percent_good_beam4.append(d)
-                offset += 4 * 2
+            (percent_good_beam1, percent_good_beam2,
+             percent_good_beam3, percent_good_beam4) = \
+                unpack_cells(chunk, N - 1, CELL_DTYPE)
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.PERCENT_GOOD_BEAM1,
                                       DataParticleKey.VALUE: percent_good_beam1})
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.PERCENT_GOOD_BEAM2,
@@ -782,17 +739,9 @@ class ADCP_PD0_PARSED_DataParticle(DataParticle):
             self._data_particle_type = DataParticleType.ADCP_PD0_PARSED_EARTH
             if self._slave:
                 self._data_particle_type = VADCPDataParticleType.VADCP_PD0_PARSED_EARTH
-            percent_good_3beam = []
-            percent_transforms_reject = []
-            percent_bad_beams = []
-            percent_good_4beam = []
-            for row in xrange(1, N):
-                (a, b, c, d) = unpack('!HHHH', chunk[offset + 2: offset + 10])
-                percent_good_3beam.append(a)
-                percent_transforms_reject.append(b)
-                percent_bad_beams.append(c)
-                percent_good_4beam.append(d)
-                offset += 4 * 2
+            (percent_good_3beam, percent_transforms_reject,
+             percent_bad_beams, percent_good_4beam) = \
+                unpack_cells(chunk, N - 1, CELL_DTYPE)
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.PERCENT_GOOD_3BEAM,
                                       DataParticleKey.VALUE: percent_good_3beam})
             self.final_result.append({DataParticleKey.VALUE_ID: ADCP_PD0_PARSED_KEY.PERCENT_TRANSFORMS_REJECT,
@@ -744,9 +744,7 @@ class Protocol(WorkhorseProtocol):
         if write_delay == 0:
             self._connection_4Beam.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection_4Beam.send(char)
-                time.sleep(write_delay)
+            self._connection_4Beam.send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -823,9 +821,7 @@ class Protocol(WorkhorseProtocol):
             self._connection_5thBeam.send(cmd_line)
 
         else:
-            for char in cmd_line:
-                self._connection_5thBeam.send(char)
-                time.sleep(write_delay)
+            self._connection_5thBeam.send_paced(cmd_line, write_delay)
 
         # Wait for the prompt, prepare result and return, timeout exception
         if response_regex:
@@ -944,9 +940,7 @@ class Protocol(WorkhorseProtocol):
         if write_delay == 0:
             self._connection_4Beam.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection_4Beam.send(char)
-                time.sleep(write_delay)
+            self._connection_4Beam.send_paced(cmd_line, write_delay)
 
     # for Slave
     def _do_cmd_no_resp2(self, cmd, *args, **kwargs):
@@ -982,9 +976,7 @@ class Protocol(WorkhorseProtocol):
         if write_delay == 0:
             self._connection_5thBeam.send(cmd_line)
         else:
-            for char in cmd_line:
-                self._connection_5thBeam.send(char)
-                time.sleep(write_delay)
+            self._connection_5thBeam.send_paced(cmd_line, write_delay)
 
     # for Slave
     def got_data2(self, port_agent_packet):
@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+"""
+@package mi.instrument.uw.res_probe.ooicore.test.test_trhph_recv
+@file    mi/instrument/uw/res_probe/ooicore/test/test_trhph_recv.py
+@brief   Unit tests for the receiver of the TRHPH client.
+
+         The block receiver is compared against a reference receiver
+         updating buffers, state and values for each character in turn, as
+         the receiver did when reading the socket one byte at a time.
+"""
+
+__license__ = 'Apache 2.0'
+
+import random
+import socket
+import tempfile
+import threading
+
+from nose.plugins.attrib import attr
+
+from mi.core.unit_test import MiUnitTestCase
+from mi.core.mi_logger import mi_logger
+log = mi_logger
+
+import mi.instrument.uw.res_probe.ooicore.trhph as trhph
+from mi.instrument.uw.res_probe.ooicore.trhph_client import _Recv, State
+
+NEWLINE = trhph.NEWLINE
+
+
+def data_burst(index):
+    """
+    A data burst as output by the TRHPH in "data only" mode.
+    """
+    return ' '.join('%.3f' % ((index * 12 + channel) % 4096 / 1000.0)
+                    for channel in range(12)) + NEWLINE
+
+
+def session():
+    """
+    Output of the TRHPH during a session going through the menus, with
+    data bursts before and after.
+    """
+    output = [data_burst(index) for index in range(20)]
+    output.append(trhph.MAIN_MENU)
+    output.append(trhph.SYSTEM_PARAMETER_MENU)
+    output.append(trhph.MAIN_MENU)
+    output.append(trhph.SYSTEM_INFO)
+    output.append(trhph.MAIN_MENU)
+    output.append(trhph.HOW_MANY_SCANS_FOR_SYSTEM_DIAGNOSTICS)
+    output.append(trhph.SYSTEM_DIAGNOSTICS_RESPONSE)
+    output.append(trhph.MAIN_MENU)
+    output.append(trhph.SENSOR_POWER_CONTROL_MENU_FORMAT % ('On', 'Off', 'On', 'Off', 'On'))
+    output.append(trhph.MAIN_MENU)
+    output.extend(data_burst(index) for index in range(20, 40))
+    return ''.join(output)
+
+
+class ByteRecv(_Recv):
+    """
+    Reference receiver, reading and processing one character at a time.
+    """
+    def _process_block(self, block):
+        for c in block:
+            self._update_lines(c)
+            self._update_state()
+            self._update_values(c)
+            self._update_outfile(c)
+
+    def run(self):
+        if self._sock.gettimeout() is None:
+            self._sock.settimeout(0.5)
+        while self._active:
+            try:
+                c = self._sock.recv(1)
+            except socket.timeout:
+                continue
+            self._process_block(c)
+        self._end_outfile()
+
+
+@attr('UNIT', group='mi')
+class TestTrhphRecv(MiUnitTestCase):
+
+    def _receive(self, recv_class, blocks):
+        """
+        Processes the blocks with a receiver of the given class.
+        @retval (receiver, samples, outfile contents)
+        """
+        samples = []
+        outfile = tempfile.TemporaryFile()
+        self.addCleanup(outfile.close)
+        recv = recv_class(None, samples.append, outfile, prefix_state=True)
+        for block in blocks:
+            recv._process_block(block)
+
+        outfile.seek(0)
+        return recv, samples, outfile.read()
+
+    def _assert_same(self, blocks):
+        expected, expected_samples, expected_output = self._receive(ByteRecv, [''.join(blocks)])
+        recv, samples, output = self._receive(_Recv, blocks)
+
+        self.assertEqual(recv._state, expected._state)
+        self.assertEqual(recv._lines, expected._lines)
+        self.assertEqual(recv._last_line, expected._last_line)
+        self.assertEqual(recv._new_line, expected._new_line)
+        self.assertEqual(samples, expected_samples)
+        self.assertEqual(recv._last_data_burst, expected._last_data_burst)
+        self.assertEqual(recv._diagnostic_data, expected._diagnostic_data)
+        self.assertEqual(recv._system_info, expected._system_info)
+        self.assertEqual(recv._power_statuses, expected._power_statuses)
+        self.assertEqual(output, expected_output)
+        return recv, samples
+
+    def test_session(self):
+        """
+        Verify the block receiver ends with the same lines, state, values and
+        outfile as the character receiver.
+        """
+        recv, samples = self._assert_same([session()])
+
+        self.assertEqual(recv._state, State.COLLECTING_DATA)
+        self.assertEqual(len(samples), 40)
+        self.assertEqual(len(recv._diagnostic_data), 4)
+        self.assertEqual(recv._power_statuses['Instrumentation Amp Power'], False)
+        self.assertEqual(recv._power_statuses['Reference Temperature Power'], True)
+
+    def test_split_blocks(self):
+        """
+        Verify the result does not depend on where the blocks are split,
+        including within lines, newlines and prompts.
+        """
+        data = session()
+        rand = random.Random(7)
+        for _ in range(20):
+            blocks = []
+            start = 0
+            while start < len(data):
+                end = start + rand.randint(1, 100)
+                blocks.append(data[start:end])
+                start = end
+            self._assert_same(blocks)
+
+        # every prompt ending a block, as when waiting for a user entry
+        for prompt in ('-->', 'Main Menu.'):
+            blocks = [block + prompt for block in data.split(prompt)[:-1]] + [data.split(prompt)[-1]]
+            self._assert_same(blocks)
+
+    def test_states(self):
+        """
+        Verify the state changes as soon as a prompt is received, before its
+        line is complete.
+        """
+        recv = _Recv(None, None)
+        recv._process_block(trhph.MAIN_MENU)
+        self.assertEqual(recv._state, State.MAIN_MENU)
+
+        recv._process_block(trhph.HOW_MANY_SCANS_FOR_SYSTEM_DIAGNOSTICS)
+        self.assertEqual(recv._state, State.ENTER_NUM_SCANS)
+
+        recv._process_block('10' + NEWLINE + trhph.SYSTEM_DIAGNOSTICS_HEADER + NEWLINE)
+        self.assertEqual(recv._state, State.DIAGNOSTICS_INFO)
+
+        recv = _Recv(None, None)
+        recv._process_block('Any menu here --> ')
+        self.assertEqual(recv._state, State.SOME_MENU)
+
+    def test_socket(self):
+        """
+        Verify the character and block receivers produce the same samples
+        reading data bursts from a local socket streaming as fast as it can.
+        """
+        num_bursts = 500
+        data = ''.join(data_burst(index) for index in range(num_bursts))
+
+        def run(recv_class):
+            server, client = socket.socketpair()
+            samples = []
+            done = threading.Event()
+
+            def listener(sample):
+                samples.append(sample)
+                if len(samples) == num_bursts:
+                    done.set()
+
+            recv = recv_class(client, listener)
+            recv.setDaemon(True)
+            recv.start()
+            sender = threading.Thread(target=server.sendall, args=(data,))
+            sender.start()
+
+            done.wait(120)
+            recv.end()
+            sender.join()
+            recv.join()
+            server.close()
+            client.close()
+
+            self.assertEqual(len(samples), num_bursts)
+            return samples
+
+        self.assertEqual(run(_Recv), run(ByteRecv))
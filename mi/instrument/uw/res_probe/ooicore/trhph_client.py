@@ -91,9 +91,20 @@ POWER_STATUS_ITEM_PATTERN = re.compile(r'\s*([^.]*)\.+\s*(On|Off)')
 
 GENERIC_PROMPT_PATTERN = re.compile(r'.*--> ')
 
+# The patterns, other than DATA_LINE_PATTERN, that _Recv._update_state checks
+# against the line being received. Once one of these patterns matches a
+# partial line it also matches the line as it grows.
+STATE_PATTERNS = [MAIN_MENU_PATTERN, MAIN_MENU_PROMPT_PATTERN,
+                  SYSTEM_PARAM_MENU_PATTERN, SYSTEM_INFO_PATTERN,
+                  ENTER_NUM_SCANS_PATTERN, DIAGNOSTICS_HEADER_PATTERN,
+                  POWER_STATUS_MENU_PATTERN, GENERIC_PROMPT_PATTERN]
+
 # keep this max number of received lines
 MAX_NUM_LINES = 30
 
+# max number of bytes read from the socket at a time
+RECV_SIZE = 4096
+
 # default value for the generic timeout. By default, 30 secs
 DEFAULT_GENERIC_TIMEOUT = 30
 
@@ -207,6 +218,28 @@ class _Recv(Greenlet):
         else:
             self._new_line += c
 
+    def _update_new_line(self, string):
+        """
+        Appends characters to the line being received, updating the state as
+        if they had been received one at a time.
+        @param string Characters that have just been received, not including
+               any newline
+        """
+        start = len(self._new_line)
+        line = self._new_line + string
+        self._new_line = line
+
+        # A partial line only changes the state when it matches one of the
+        # STATE_PATTERNS. If none of them matches the whole line, none of them
+        # matches any of the partial lines received one character at a time
+        # either, so the state is only updated character by character otherwise.
+        if not any(pattern.match(line) for pattern in STATE_PATTERNS):
+            return
+
+        for end in xrange(start + 1, len(line) + 1):
+            self._new_line = line[:end]
+            self._update_state()
+
     def _update_state(self):
         """
         Updates the state according to the last received information.
@@ -327,14 +360,37 @@ class _Recv(Greenlet):
     def _update_outfile(self, c):
         """
         Updates the outfile if any.
-        @param c Character that has just been received
+        @param c Characters that have just been received, with a newline, if
+               any, only at the end
         """
         if self._outfile:
             os.write(self._outfile.fileno(), c)
-            if c == '\n' and self._prefix_state:
+            if c.endswith('\n') and self._prefix_state:
                 os.write(self._outfile.fileno(), "%20s| " % self._state)
             self._outfile.flush()
 
+    def _process_block(self, block):
+        """
+        Updates buffers, state, values and outfile with a block of received
+        characters, with the same result as updating them for each character
+        in turn.
+        @param block Characters that have just been received
+        """
+        start = 0
+        while start < len(block):
+            end = block.find('\n', start)
+            if end < 0:
+                self._update_new_line(block[start:])
+                self._update_outfile(block[start:])
+                break
+
+            self._update_new_line(block[start:end])
+            self._update_lines('\n')
+            self._update_state()
+            self._update_values('\n')
+            self._update_outfile(block[start:end + 1])
+            start = end + 1
+
     def _end_outfile(self):
         """
         Writes a mark to the outfile to indicate that
@@ -362,16 +418,13 @@ class _Recv(Greenlet):
 
         log.debug("_Recv running.")
         while self._active:
-            # Note that we read one character at a time.
+            # Note that we read whatever is available, up to RECV_SIZE.
             try:
-                c = self._sock.recv(1)
+                block = self._sock.recv(RECV_SIZE)
             except socket.timeout, e:
                 # ok, just reattempt reading
                 continue
-            self._update_lines(c)
-            self._update_state()
-            self._update_values(c)
-            self._update_outfile(c)
+            self._process_block(block)
             _yield()
         log.debug("_Recv.run done.")
         self._end_outfile()
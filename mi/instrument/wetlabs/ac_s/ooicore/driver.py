@@ -13,6 +13,8 @@ __license__ = 'Apache 2.0'
 
 import re
 
+import numpy
+
 from mi.core.log import get_logger, get_logging_metaclass
 log = get_logger()
 
@@ -29,7 +31,7 @@ from mi.core.instrument.instrument_driver import ResourceAgentState
 from mi.core.instrument.data_particle import DataParticle
 from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.data_particle import CommonDataParticleType
-from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.chunker import StringChunker, FramingSieve
 from mi.core.instrument.driver_dict import DriverDictKey
 
 NEWLINE = '\n'
@@ -40,9 +42,20 @@ SIZE_OF_PACKET_RECORD_LENGTH = 2
 SIZE_OF_SCAN_DATA_SIGNAL_COUNTS = 2
 SIZE_OF_CHECKSUM_PLUS_PAD = 3   # three bytes for 2 byte checksum and 1 byte pad
 
+# each wavelength has c reference, a reference, c signal and a signal counts, as big endian shorts
+SCANS_PER_WAVELENGTH = 4
+SIZE_OF_SCAN_DATA = SCANS_PER_WAVELENGTH * SIZE_OF_SCAN_DATA_SIGNAL_COUNTS
+SCAN_DATA_DTYPE = numpy.dtype('>u2')
+
 PACKET_REGISTRATION_PATTERN = '\xff\x00\xff\x00'
 PACKET_REGISTRATION_REGEX = re.compile(PACKET_REGISTRATION_PATTERN)
 
+# sample packets are framed by the registration pattern and the big endian record length, which is the
+# offset of the checksum, and end with the checksum of the preceding bytes and a pad byte.  The checksum
+# is verified by the sample particle, which reports a mismatch.
+PACKET_SIEVE = FramingSieve(PACKET_REGISTRATION_PATTERN, INDEX_OF_PACKET_RECORD_LENGTH, '>H',
+                            trailer_size=SIZE_OF_CHECKSUM_PLUS_PAD)
+
 SAMPLE_HEADER_PATTERN = (r'^%s' % PACKET_REGISTRATION_PATTERN +
                          '(.{2})' +  # group 1  - record length
                          '(.{1})' +  # group 2  - packet type
@@ -174,33 +187,29 @@ class OptaaSampleDataParticle(DataParticle):
 
         record_length = get_two_byte_value(match.group(1), 0)
         packet_checksum = get_two_byte_value(self.raw_data, record_length)
-        checksum = 0
 
-        for i in range(0, record_length):
-            checksum += ord(self.raw_data[i])
-            checksum &= 0xffff
+        # the checksum is the sum of the bytes before it, truncated to 16 bits
+        checksum = int(numpy.frombuffer(self.raw_data, dtype=numpy.uint8,
+                                        count=record_length).sum(dtype=numpy.uint64)) & 0xffff
         if checksum != packet_checksum:
             log.debug('OPTAA_SampleDataParticle: Checksum mismatch in data packet, rcvd=%d, calc=%d.', packet_checksum,
                       checksum)
             raise SampleException('OPTAA_SampleDataParticle: Checksum mismatch in data packet, rcvd=%d, calc=%d.'
                                   % (packet_checksum, checksum))
 
-        ### Now build four vectors out of the wavelength data
-        index = INDEX_OF_START_OF_SCAN_DATA
-        c_ref_count_vector = []
-        a_ref_count_vector = []
-        c_signal_counts_vector = []
-        a_signal_counts_vector = []
-
-        while index < record_length:
-            c_ref_count_vector.append(get_two_byte_value(self.raw_data, index))
-            index += SIZE_OF_SCAN_DATA_SIGNAL_COUNTS
-            a_ref_count_vector.append(get_two_byte_value(self.raw_data, index))
-            index += SIZE_OF_SCAN_DATA_SIGNAL_COUNTS
-            c_signal_counts_vector.append(get_two_byte_value(self.raw_data, index))
-            index += SIZE_OF_SCAN_DATA_SIGNAL_COUNTS
-            a_signal_counts_vector.append(get_two_byte_value(self.raw_data, index))
-            index += SIZE_OF_SCAN_DATA_SIGNAL_COUNTS
+        ### Now build four vectors out of the wavelength data, which is interleaved c reference, a reference,
+        ### c signal and a signal counts for each wavelength
+        num_scans = max(0, -(-(record_length - INDEX_OF_START_OF_SCAN_DATA) // SIZE_OF_SCAN_DATA))
+        if INDEX_OF_START_OF_SCAN_DATA + num_scans * SIZE_OF_SCAN_DATA > len(self.raw_data):
+            raise SampleException("OPTAA_SampleDataParticle: Scan data extends past the end of the packet: [%r]"
+                                  % self.raw_data)
+
+        scan_data = numpy.frombuffer(self.raw_data, dtype=SCAN_DATA_DTYPE, count=num_scans * SCANS_PER_WAVELENGTH,
+                                     offset=INDEX_OF_START_OF_SCAN_DATA)
+        (c_ref_count_vector,
+         a_ref_count_vector,
+         c_signal_counts_vector,
+         a_signal_counts_vector) = scan_data.reshape(num_scans, SCANS_PER_WAVELENGTH).T.tolist()
 
         result = [
             {DataParticleKey.VALUE_ID: OptaaSampleDataParticleKey.RECORD_LENGTH,
@@ -402,18 +411,9 @@ class Protocol(CommandResponseInstrumentProtocol):
         """
         The method that splits samples and status
         """
-        raw_data_len = len(raw_data)
-        return_list = []
-        
         # look for samples
-        for match in PACKET_REGISTRATION_REGEX.finditer(raw_data):
-            if match.start() + INDEX_OF_PACKET_RECORD_LENGTH + SIZE_OF_PACKET_RECORD_LENGTH < raw_data_len:
-                packet_length = get_two_byte_value(raw_data,
-                                                   match.start() + INDEX_OF_PACKET_RECORD_LENGTH) + SIZE_OF_CHECKSUM_PLUS_PAD
+        return_list = PACKET_SIEVE(raw_data)
 
-                if match.start() + packet_length <= raw_data_len:
-                    return_list.append((match.start(), match.start() + packet_length))
-                    
         # look for status
         for match in STATUS_REGEX.finditer(raw_data):
             return_list.append((match.start(), match.end()))
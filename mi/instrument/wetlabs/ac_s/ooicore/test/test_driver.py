@@ -16,6 +16,9 @@ USAGE:
 __author__ = 'Rachel Manoni'
 __license__ = 'Apache 2.0'
 
+import random
+import struct
+
 from mock import Mock
 from nose.plugins.attrib import attr
 
@@ -31,6 +34,7 @@ from mi.idk.unit_test import DriverTestMixin
 from mi.idk.unit_test import AgentCapabilityType
 
 from mi.core.instrument.chunker import StringChunker
+from mi.core.instrument.data_particle import DataParticleKey
 from mi.core.instrument.instrument_driver import DriverProtocolState, DriverParameter
 from mi.core.instrument.instrument_driver import DriverEvent
 
@@ -118,6 +122,41 @@ def short_sample():
 OPTAA_SAMPLE_DATA = short_sample()
 
 
+def reference_scan_vectors(raw_data):
+    """
+    Decode the checksum and the four count vectors of a sample one value at a
+    time, as the sample particle originally did
+    """
+    record_length = ord(raw_data[4]) * 256 + ord(raw_data[5])
+    checksum = 0
+    for i in range(0, record_length):
+        checksum += ord(raw_data[i])
+        checksum &= 0xffff
+
+    vectors = [[], [], [], []]
+    index = 32
+    while index < record_length:
+        for vector in vectors:
+            vector.append(ord(raw_data[index]) * 256 + ord(raw_data[index + 1]))
+            index += 2
+    return checksum, vectors
+
+
+def build_sample_stream(num_samples, rand):
+    """
+    Build a stream of samples like OPTAA_SAMPLE_DATA with random counts, as the
+    instrument would send them at 4 Hz
+    """
+    record_length = len(OPTAA_SAMPLE_DATA) - 3
+    samples = []
+    for i in range(num_samples):
+        counts = ''.join(chr(rand.randint(0, 255)) for _ in range(record_length - 32))
+        record = OPTAA_SAMPLE_DATA[:32] + counts
+        checksum = sum(ord(c) for c in record) & 0xffff
+        samples.append(record + struct.pack('>H', checksum) + '\x00')
+    return samples
+
+
 OPTAA_STATUS_DATA = \
     "AC-Spectra Version 1.10     (May 16 2005 09:40:13)" + NEWLINE +\
     "Persistor CF2 SN:12154   BIOS:2.28   PicoDOS:2.28" + NEWLINE + NEWLINE +\
@@ -351,6 +390,46 @@ class TestUNIT(InstrumentDriverUnitTestCase, UtilMixin):
         with self.assertRaises(SampleException):
             particle.generate()
          
+    def test_bad_checksum(self):
+        """
+        Verify a sample packet with a bad checksum is still framed by the sieve, and
+        rejected by the particle
+        """
+        corrupt = OPTAA_SAMPLE_DATA[:40] + chr(ord(OPTAA_SAMPLE_DATA[40]) ^ 0x01) + OPTAA_SAMPLE_DATA[41:]
+        self.assertEqual(Protocol.sieve_function(corrupt), [(0, len(corrupt))])
+
+        particle = OptaaSampleDataParticle(corrupt)
+        with self.assertRaises(SampleException):
+            particle.generate()
+
+    def test_sample_decoding(self):
+        """
+        Verify the sample particle decodes the same counts as decoding one value at a
+        time, over a minute of samples passed through the chunker
+        """
+        samples = build_sample_stream(240, random.Random(1234))
+        stream = ''.join(samples)
+
+        chunker = StringChunker(Protocol.sieve_function)
+        chunks = []
+        for index in range(0, len(stream), 1024):
+            chunker.add_chunk(stream[index:index + 1024], 3569168821.102485)
+            (timestamp, chunk) = chunker.get_next_data()
+            while chunk is not None:
+                chunks.append(chunk)
+                (timestamp, chunk) = chunker.get_next_data()
+        self.assertEqual(chunks, samples)
+
+        reference = [reference_scan_vectors(chunk) for chunk in chunks]
+        particles = [OptaaSampleDataParticle(chunk)._build_parsed_values() for chunk in chunks]
+
+        for (checksum, vectors), values in zip(reference, particles):
+            values = dict((value[DataParticleKey.VALUE_ID], value[DataParticleKey.VALUE]) for value in values)
+            self.assertEqual([values[OptaaSampleDataParticleKey.C_REFERENCE_COUNTS],
+                              values[OptaaSampleDataParticleKey.A_REFERENCE_COUNTS],
+                              values[OptaaSampleDataParticleKey.C_SIGNAL_COUNTS],
+                              values[OptaaSampleDataParticleKey.A_SIGNAL_COUNTS]], vectors)
+
     def test_got_data(self):
         """
         Verify sample data passed through the got data method produces the correct data particles
@@ -0,0 +1,302 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.driver.rsn.attribute_poller
+@file    mi/platform/driver/rsn/attribute_poller.py
+@brief   Bulk attribute polling for the RSN platform drivers.
+
+         Every platform driver polls its attribute values with its own
+         get_platform_attribute_values call. With a large platform network
+         the per-node round trips to OMS dominate the monitoring cycle, so
+         the drivers served by the same OMS endpoint can share an
+         AttributePoller: the requests made by the drivers during a polling
+         cycle are collected and sent to OMS together, either as a single
+         xmlrpc system.multicall or, if the server does not support it, as a
+         few concurrent calls. The responses are then handed back to each
+         requesting driver.
+"""
+
+__license__ = 'Apache 2.0'
+
+
+import threading
+import xmlrpclib
+
+from mi.core.log import get_logger
+log = get_logger()
+
+from mi.platform.driver.rsn.oms_transport import create_server_proxy
+
+
+# seconds a request waits for the other registered platforms before the
+# requests collected so far are sent anyway
+DEFAULT_WINDOW = 0.5
+
+# maximum number of concurrent calls when the server does not support multicall
+DEFAULT_MAX_WORKERS = 4
+
+
+def _get_platform_attribute_values(rsn_oms, platform_id, attrs):
+    """
+    Single get_platform_attribute_values call, returning the entry for
+    platform_id or the exception raised by the call.
+    """
+    try:
+        retval = rsn_oms.attr.get_platform_attribute_values(platform_id, attrs)
+        if platform_id not in retval:
+            raise KeyError("response does not include requested platform '%s'" % platform_id)
+        return retval[platform_id]
+    except Exception as e:
+        return e
+
+
+def fetch_multicall(rsn_oms, requests):
+    """
+    Send all the requests in a single xmlrpc system.multicall.
+
+    @param rsn_oms   xmlrpclib.ServerProxy for the OMS endpoint
+    @param requests  list of (platform_id, attrs) pairs
+
+    @return {platform_id: attribute values or exception}
+    @raise  xmlrpclib.Fault, xmlrpclib.ProtocolError if the multicall as a
+            whole fails, for example because the server does not support it
+    """
+    multicall = xmlrpclib.MultiCall(rsn_oms)
+    for platform_id, attrs in requests:
+        multicall.attr.get_platform_attribute_values(platform_id, attrs)
+
+    results = multicall()
+
+    responses = {}
+    for index, (platform_id, attrs) in enumerate(requests):
+        try:
+            retval = results[index]
+            if platform_id not in retval:
+                raise KeyError("response does not include requested platform '%s'" % platform_id)
+            responses[platform_id] = retval[platform_id]
+        except Exception as e:
+            responses[platform_id] = e
+    return responses
+
+
+def fetch_concurrent(rsn_oms_factory, requests, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Send the requests as individual calls spread over a few worker threads.
+
+    @param rsn_oms_factory  callable returning the CIOMSClient each worker
+                            uses. Each worker gets its own, as a
+                            ServerProxy cannot be shared between threads.
+    @param requests         list of (platform_id, attrs) pairs
+    @param max_workers      maximum number of worker threads
+
+    @return {platform_id: attribute values or exception}
+    """
+    responses = {}
+    num_workers = max(1, min(max_workers, len(requests)))
+
+    def worker(index):
+        rsn_oms = rsn_oms_factory()
+        for platform_id, attrs in requests[index::num_workers]:
+            responses[platform_id] = _get_platform_attribute_values(rsn_oms, platform_id, attrs)
+
+    if num_workers == 1:
+        worker(0)
+        return responses
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(num_workers)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return responses
+
+
+class _Batch(object):
+    """
+    Requests collected during one polling cycle.
+    """
+    def __init__(self):
+        self.requests = {}
+        self.responses = {}
+        self.done = threading.Event()
+
+
+class AttributePoller(object):
+    """
+    Collects the get_platform_attribute_values requests of all the platform
+    drivers using the same OMS endpoint and sends them together.
+
+    A batch is sent as soon as every registered platform has a request in it,
+    or when the first request in it has waited for the collection window.
+
+    The poller is used in place of the "attr" handler of the CIOMSClient:
+        poller.get_platform_attribute_values(platform_id, attrs)
+    returns the same {platform_id: {attr_id: [(value, ts), ...]}} dict.
+    """
+
+    # AttributePoller instances by OMS URI, see get_poller
+    _pollers = {}
+    _pollers_lock = threading.Lock()
+
+    def __init__(self, oms_uri, window=DEFAULT_WINDOW, max_workers=DEFAULT_MAX_WORKERS):
+        """
+        @param oms_uri      URI of the OMS endpoint
+        @param window       seconds to wait for the requests of other platforms
+        @param max_workers  maximum number of concurrent calls when the server
+                            does not support multicall
+        """
+        self._oms_uri = oms_uri
+        self._window = window
+        self._max_workers = max_workers
+
+        # {platform_id: CIOMSClient} of the registered platforms
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._batch = _Batch()
+
+        # set to False once the server rejects a multicall
+        self._multicall = True
+
+    @classmethod
+    def get_poller(cls, oms_uri):
+        """
+        Returns the AttributePoller for the given OMS URI, creating it if needed.
+        """
+        with cls._pollers_lock:
+            poller = cls._pollers.get(oms_uri)
+            if poller is None:
+                poller = cls._pollers[oms_uri] = cls(oms_uri)
+            return poller
+
+    @property
+    def platform_ids(self):
+        return self._clients.keys()
+
+    def register(self, platform_id, rsn_oms):
+        """
+        Adds a platform to the platforms polled through this poller.
+
+        @param platform_id  the platform ID
+        @param rsn_oms      CIOMSClient instance of the platform driver
+        """
+        with self._lock:
+            self._clients[platform_id] = rsn_oms
+        log.debug("%r: registered with attribute poller for %r", platform_id, self._oms_uri)
+
+    def unregister(self, platform_id):
+        """
+        Removes a platform. The poller for the URI is discarded when no
+        platforms remain.
+        """
+        with self._lock:
+            self._clients.pop(platform_id, None)
+            empty = not self._clients
+            batch = self._batch
+            ready = bool(batch.requests) and set(batch.requests) >= set(self._clients)
+            if ready:
+                self._batch = _Batch()
+
+        # a pending batch may have been waiting for this platform only
+        if ready:
+            self._send(batch)
+
+        if empty:
+            with self._pollers_lock:
+                if self._pollers.get(self._oms_uri) is self:
+                    del self._pollers[self._oms_uri]
+        log.debug("%r: unregistered from attribute poller for %r", platform_id, self._oms_uri)
+
+    def get_platform_attribute_values(self, platform_id, attrs):
+        """
+        Same as CIOMSClient.get_platform_attribute_values, but the request is
+        sent to OMS together with the requests of the other registered platforms.
+
+        @param platform_id  the platform ID
+        @param attrs        [(attr_id, from_time), ...], from_time in NTP
+
+        @return {platform_id: {attr_id: [(value, ts), ...], ...}}
+        @raise  the exception raised by the call for this platform
+        """
+        with self._lock:
+            # a request from the same platform still pending means the cycle is
+            # over; send the pending batch and start a new one
+            stale = None
+            if platform_id in self._batch.requests:
+                stale, self._batch = self._batch, _Batch()
+
+            batch = self._batch
+            batch.requests[platform_id] = attrs
+            ready = set(batch.requests) >= set(self._clients)
+            if ready:
+                self._batch = _Batch()
+
+        if stale is not None:
+            self._send(stale)
+
+        if not ready:
+            batch.done.wait(self._window)
+            with self._lock:
+                # nobody sent the batch during the window, send it from here
+                if self._batch is batch:
+                    self._batch = _Batch()
+                    ready = True
+
+        if ready:
+            self._send(batch)
+        else:
+            batch.done.wait()
+
+        response = batch.responses[platform_id]
+        if isinstance(response, Exception):
+            raise response
+        return {platform_id: response}
+
+    def _get_client(self):
+        """
+        Returns a CIOMSClient of one of the registered platforms.
+        """
+        with self._lock:
+            if not self._clients:
+                raise KeyError("no platforms registered with attribute poller for %r" % self._oms_uri)
+            return self._clients.itervalues().next()
+
+    def _create_proxy(self):
+        return create_server_proxy(self._oms_uri)
+
+    def _send(self, batch):
+        """
+        Sends all the requests in the batch, stores the responses in the
+        batch and wakes up the waiting requests.
+        """
+        requests = batch.requests.items()
+        try:
+            log.debug("sending %d attribute requests to %r", len(requests), self._oms_uri)
+            rsn_oms = self._get_client()
+
+            if isinstance(rsn_oms, xmlrpclib.ServerProxy):
+                # the drivers keep using their own proxies, so use separate ones
+                # here, all sharing the pooled connections
+                responses = None
+                if self._multicall:
+                    try:
+                        responses = fetch_multicall(self._create_proxy(), requests)
+                    except (xmlrpclib.Fault, xmlrpclib.ProtocolError) as e:
+                        log.info("multicall not supported by %r (%s), using concurrent calls",
+                                 self._oms_uri, e)
+                        self._multicall = False
+
+                if responses is None:
+                    responses = fetch_concurrent(self._create_proxy, requests, self._max_workers)
+            else:
+                # embedded simulator, nothing to gain from concurrent calls
+                responses = fetch_concurrent(lambda: rsn_oms, requests, 1)
+
+            batch.responses.update(responses)
+
+        except Exception as e:
+            log.warn("attribute requests to %r failed: %s", self._oms_uri, e)
+            for platform_id, attrs in requests:
+                batch.responses.setdefault(platform_id, e)
+
+        finally:
+            batch.done.set()
@@ -25,6 +25,7 @@ from mi.platform.exceptions import PlatformException
 from mi.platform.exceptions import PlatformDriverException
 from mi.platform.exceptions import PlatformConnectionException
 from mi.platform.driver.rsn.oms_client_factory import CIOMSClientFactory
+from mi.platform.driver.rsn.attribute_poller import AttributePoller
 from mi.platform.responses import InvalidResponse
 
 from ion.agents.platform.util import ion_ts_2_ntp
@@ -81,6 +82,11 @@ class PlatformDriver(PlatformDriver):
         # CIOMSClient instance created by connect() and destroyed by disconnect():
         self._rsn_oms = None
 
+        # AttributePoller shared with the other drivers using the same OMS,
+        # set by connect() if 'bulk_attribute_polling' is enabled in the
+        # driver configuration:
+        self._attr_poller = None
+
         # TODO(OOIION-1495) review the following. Commented out for the moment.
         # What does "ports that have devices attached" mean?
         """
@@ -277,6 +283,11 @@ class PlatformDriver(PlatformDriver):
         # ping to verify connection:
         self.ping()
 
+        # share attribute polling with the other platforms using this OMS:
+        if self._driver_config.get('bulk_attribute_polling', False):
+            self._attr_poller = AttributePoller.get_poller(oms_uri)
+            self._attr_poller.register(self._platform_id, self._rsn_oms)
+
         # start event dispatch:
         self._start_event_dispatch()
 
@@ -317,6 +328,10 @@ class PlatformDriver(PlatformDriver):
                 log.debug('disconnect power port: %s', port)
                 self.turn_off_port(port)
 
+        if self._attr_poller:
+            self._attr_poller.unregister(self._platform_id)
+            self._attr_poller = None
+
         CIOMSClientFactory.destroy_instance(self._rsn_oms)
         self._rsn_oms = None
         log.debug("%r: CIOMSClient instance destroyed", self._platform_id)
@@ -351,6 +366,11 @@ class PlatformDriver(PlatformDriver):
 
     def get_attribute_values(self, attrs):
         """
+        Gets the values of the given attributes from OMS. With bulk attribute
+        polling enabled the request is sent together with the requests of the
+        other platforms served by the same OMS.
+
+        @param attrs [(attrName, from_time), ...]
         """
         log.debug("get_attribute_values: attrs=%s", attrs)
 
@@ -363,9 +383,9 @@ class PlatformDriver(PlatformDriver):
         attrs_ntp = [(attr_id, ion_ts_2_ntp(from_time))
                      for (attr_id, from_time) in attrs]
 
+        oms_attr = self._attr_poller or self._rsn_oms.attr
         try:
-            retval = self._rsn_oms.attr.get_platform_attribute_values(self._platform_id,
-                                                                      attrs_ntp)
+            retval = oms_attr.get_platform_attribute_values(self._platform_id, attrs_ntp)
         except Exception as e:
             raise PlatformConnectionException(msg="Cannot get_platform_attribute_values: %s" % str(e))
 
@@ -14,7 +14,7 @@ __license__ = 'Apache 2.0'
 from pyon.public import log
 
 from ion.agents.platform.rsn.simulator.oms_simulator import CIOMSSimulator
-import xmlrpclib
+from mi.platform.driver.rsn.oms_transport import create_server_proxy
 import os
 from gevent import Greenlet, sleep
 
@@ -55,8 +55,9 @@ class CIOMSClientFactory(object):
             log.debug("Using embedded CIOMSSimulator instance")
             instance = CIOMSSimulator()
         else:
+            # all the proxies in the process share a pool of keep-alive connections
             log.debug("Creating xmlrpclib.ServerProxy: uri=%s", uri)
-            instance = xmlrpclib.ServerProxy(uri, allow_none=True)
+            instance = create_server_proxy(uri, allow_none=True)
             log.debug("Created xmlrpclib.ServerProxy: uri=%s", uri)
 
         cls._inst_count += 1
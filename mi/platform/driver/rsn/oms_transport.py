@@ -0,0 +1,289 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.driver.rsn.oms_transport
+@file    mi/platform/driver/rsn/oms_transport.py
+@brief   Pooled keep-alive xmlrpc transport for the OMS clients.
+
+         A ServerProxy keeps at most one connection and cannot be shared
+         between threads, so every RSN platform driver holds its own proxy
+         and the port power commands and attribute polling of a large
+         platform network pay for TCP setup over and over. The
+         PooledTransport here is shared by all the proxies in the process:
+         it keeps a bounded pool of HTTP/1.1 keep-alive connections per
+         host, checks idle connections before reusing them, and can be used
+         from any number of threads.
+"""
+
+__license__ = 'Apache 2.0'
+
+
+import errno
+import httplib
+import select
+import socket
+import threading
+import time
+import urllib
+import xmlrpclib
+
+from mi.core.log import get_logger
+log = get_logger()
+
+
+# maximum number of connections per host, requests beyond this wait for a
+# connection to be released
+DEFAULT_POOL_SIZE = 8
+
+# idle connections older than this are closed rather than reused, seconds
+DEFAULT_MAX_IDLE = 30.0
+
+# socket timeout of the connections, seconds
+DEFAULT_TIMEOUT = 60.0
+
+
+def is_connection_dropped(connection):
+    """
+    Health check of an idle connection: an idle keep-alive connection must
+    not have anything to read, if it is readable the server has closed it
+    (or sent something unexpected) and it cannot be reused.
+
+    @param connection httplib.HTTPConnection
+    @return True if the connection cannot be reused
+    """
+    sock = connection.sock
+    if sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([sock], [], [], 0.0)
+    except (select.error, socket.error, ValueError):
+        return True
+    return bool(readable)
+
+
+class ConnectionPool(object):
+    """
+    Bounded pool of keep-alive connections to a single host.
+    """
+
+    def __init__(self, host, connection_class=httplib.HTTPConnection, max_size=DEFAULT_POOL_SIZE,
+                 max_idle=DEFAULT_MAX_IDLE, timeout=DEFAULT_TIMEOUT):
+        """
+        @param host              host[:port] to connect to
+        @param connection_class  httplib.HTTPConnection or HTTPSConnection
+        @param max_size          maximum number of connections, idle or in use
+        @param max_idle          idle connections older than this are not reused
+        @param timeout           socket timeout of the connections
+        """
+        self._host = host
+        self._connection_class = connection_class
+        self._max_idle = max_idle
+        self._timeout = timeout
+
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_size)
+        # [(connection, time released), ...], most recently used last
+        self._idle = []
+
+        # statistics
+        self.connections_created = 0
+        self.connections_discarded = 0
+
+    def acquire(self):
+        """
+        Gets a connection, waiting if max_size connections are in use.
+
+        @return (connection, reused) where reused is True if the connection
+                has already been used for a previous request
+        """
+        self._slots.acquire()
+        now = time.time()
+        try:
+            while True:
+                with self._lock:
+                    if not self._idle:
+                        break
+                    connection, released = self._idle.pop()
+
+                if now - released <= self._max_idle and not is_connection_dropped(connection):
+                    return connection, True
+                self._close(connection)
+
+            connection = self._connection_class(self._host, timeout=self._timeout)
+            with self._lock:
+                self.connections_created += 1
+            return connection, False
+
+        except:
+            self._slots.release()
+            raise
+
+    def release(self, connection, reusable=True):
+        """
+        Returns a connection acquired with acquire.
+
+        @param connection  the connection
+        @param reusable    False if the connection must be closed, because
+                           of an error or because the server will close it
+        """
+        try:
+            if reusable:
+                with self._lock:
+                    self._idle.append((connection, time.time()))
+            else:
+                self._close(connection)
+        finally:
+            self._slots.release()
+
+    def _close(self, connection):
+        with self._lock:
+            self.connections_discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """
+        Closes all the idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, released in idle:
+            self._close(connection)
+
+    @property
+    def num_idle(self):
+        return len(self._idle)
+
+
+class PooledTransport(xmlrpclib.Transport):
+    """
+    xmlrpclib transport using pooled keep-alive connections. Unlike the
+    default transport a single instance can be shared by any number of
+    ServerProxy instances and threads.
+    """
+
+    def __init__(self, use_https=False, max_size=DEFAULT_POOL_SIZE, max_idle=DEFAULT_MAX_IDLE,
+                 timeout=DEFAULT_TIMEOUT, use_datetime=0):
+        xmlrpclib.Transport.__init__(self, use_datetime)
+        self._connection_class = httplib.HTTPSConnection if use_https else httplib.HTTPConnection
+        self._max_size = max_size
+        self._max_idle = max_idle
+        self._timeout = timeout
+        self._pools = {}
+        self._pools_lock = threading.Lock()
+
+    def get_pool(self, host):
+        """
+        Returns the ConnectionPool for host, creating it if needed.
+        """
+        chost, extra_headers, x509 = self.get_host_info(host)
+        with self._pools_lock:
+            pool = self._pools.get(chost)
+            if pool is None:
+                pool = self._pools[chost] = ConnectionPool(chost, self._connection_class, self._max_size,
+                                                           self._max_idle, self._timeout)
+            return pool
+
+    def request(self, host, handler, request_body, verbose=0):
+        """
+        Same as xmlrpclib.Transport.request, including its single retry when
+        a reused connection turns out to have been closed by the server.
+        """
+        pool = self.get_pool(host)
+        for attempt in (0, 1):
+            connection, reused = pool.acquire()
+            reusable = False
+            try:
+                result, reusable = self._single_request(connection, host, handler, request_body, verbose)
+                return result
+
+            except socket.error as e:
+                if attempt or not reused or e.errno not in (errno.ECONNRESET, errno.ECONNABORTED, errno.EPIPE):
+                    raise
+                log.debug("retrying request to %s on a new connection: %s", host, e)
+
+            except httplib.BadStatusLine:
+                if attempt or not reused:
+                    raise
+                log.debug("retrying request to %s on a new connection: bad status line", host)
+
+            except xmlrpclib.Fault:
+                # the whole response has been read, the connection can be
+                # reused unless the server closed it
+                reusable = connection.sock is not None
+                raise
+
+            finally:
+                pool.release(connection, reusable)
+
+    def _single_request(self, connection, host, handler, request_body, verbose):
+        """
+        Sends one request on the given connection.
+
+        @return (result, reusable) where reusable is False if the server
+                will close the connection
+        """
+        if verbose:
+            connection.set_debuglevel(1)
+
+        self.send_request(connection, handler, request_body)
+        self.send_host(connection, host)
+        self.send_user_agent(connection)
+        self.send_content(connection, request_body)
+
+        response = connection.getresponse(buffering=True)
+        if response.status == 200:
+            self.verbose = verbose
+            return self.parse_response(response), not response.will_close
+
+        response.read()
+        raise xmlrpclib.ProtocolError(host + handler, response.status, response.reason, response.msg)
+
+    def send_host(self, connection, host):
+        """
+        Overridden to take the extra headers from host, the base class keeps
+        them from the last make_connection which is not thread safe.
+        """
+        chost, extra_headers, x509 = self.get_host_info(host)
+        if extra_headers:
+            if isinstance(extra_headers, dict):
+                extra_headers = extra_headers.items()
+            for key, value in extra_headers:
+                connection.putheader(key, value)
+
+    def close(self):
+        """
+        Closes the idle connections of all the pools.
+        """
+        with self._pools_lock:
+            pools = self._pools.values()
+        for pool in pools:
+            pool.close()
+
+
+# PooledTransport instances shared by all the proxies in the process, by scheme
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_shared_transport(uri):
+    """
+    Returns the PooledTransport shared by all the proxies for URIs with the
+    same scheme as uri.
+    """
+    scheme, rest = urllib.splittype(uri)
+    use_https = scheme == 'https'
+    with _transports_lock:
+        transport = _transports.get(use_https)
+        if transport is None:
+            transport = _transports[use_https] = PooledTransport(use_https=use_https)
+        return transport
+
+
+def create_server_proxy(uri, allow_none=True):
+    """
+    Creates a ServerProxy for uri using the shared pooled transport.
+    """
+    return xmlrpclib.ServerProxy(uri, transport=get_shared_transport(uri), allow_none=allow_none)
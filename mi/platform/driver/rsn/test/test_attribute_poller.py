@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.driver.rsn.test.test_attribute_poller
+@file    mi/platform/driver/rsn/test/test_attribute_poller.py
+@brief   Test cases for the bulk attribute polling of the RSN platform drivers.
+
+         The platform network is a synthetic one with a few hundred nodes,
+         served by a CIOMSClient simulation over a local xmlrpc server.
+"""
+
+__license__ = 'Apache 2.0'
+
+import threading
+import time
+import xmlrpclib
+from SimpleXMLRPCServer import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+from SocketServer import ThreadingMixIn
+
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.unit_test import MiUnitTestCase
+
+from mi.platform.util.network import PlatformNode
+from mi.platform.driver.rsn.oms_client import CIOMSClient
+from mi.platform.driver.rsn.attribute_poller import AttributePoller
+
+# simulated network round trip of each xmlrpc request
+LATENCY = 0.002
+
+ATTRIBUTES = ['input_voltage', 'input_bus_current', 'mvpc_temperature', 'mvpc_pressure_1', 'sec_node_uptime']
+
+
+def build_network(num_branches, num_leaves):
+    """
+    Build a synthetic network, a root platform with num_branches
+    subplatforms each having num_leaves subplatforms.
+    @retval the root PlatformNode
+    """
+    root = PlatformNode('ROOT')
+    for branch in range(num_branches):
+        branch_node = PlatformNode('BRANCH_%02d' % branch)
+        root.add_subplatform(branch_node)
+        for leaf in range(num_leaves):
+            branch_node.add_subplatform(PlatformNode('LEAF_%02d_%02d' % (branch, leaf)))
+    return root
+
+
+def platform_ids(pnode):
+    """
+    All the platform IDs in the tree rooted at pnode.
+    """
+    ids = [pnode.platform_id]
+    for subplatform in pnode.subplatforms.itervalues():
+        ids.extend(platform_ids(subplatform))
+    return ids
+
+
+class SimulatedOms(CIOMSClient):
+    """
+    Minimal CIOMSClient simulation answering attribute requests for the
+    platforms in a network. The values of an attribute are a deterministic
+    function of the platform, the attribute and the requested from_time.
+    """
+    def __init__(self, pnode):
+        self._platform_ids = set(platform_ids(pnode))
+
+    def ping(self):
+        return "PONG"
+
+    def get_platform_attribute_values(self, platform_id, attrs):
+        if platform_id == 'FAULT':
+            raise Exception('simulated failure')
+        if platform_id not in self._platform_ids:
+            return {platform_id: 'INVALID_PLATFORM_ID'}
+        return {platform_id: expected_values(platform_id, attrs)}
+
+
+def expected_values(platform_id, attrs):
+    return dict((attr_id, [['%s.%s' % (platform_id, attr_id), from_time + 1.0]])
+                for attr_id, from_time in attrs)
+
+
+class CountingRequestHandler(SimpleXMLRPCRequestHandler):
+    def do_POST(self):
+        self.server.num_requests += 1
+        time.sleep(LATENCY)
+        SimpleXMLRPCRequestHandler.do_POST(self)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class OmsServer(ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    Serves a SimulatedOms over xmlrpc, counting the http requests.
+    """
+    daemon_threads = True
+
+    def __init__(self, oms, multicall=True, request_handler=CountingRequestHandler):
+        SimpleXMLRPCServer.__init__(self, ('localhost', 0), requestHandler=request_handler,
+                                    logRequests=False, allow_none=True)
+        self.num_requests = 0
+        self.register_instance(oms, allow_dotted_names=True)
+        if multicall:
+            self.register_multicall_functions()
+        self.uri = 'http://localhost:%d/' % self.server_address[1]
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+@attr('UNIT', group='mi')
+class TestAttributePoller(MiUnitTestCase):
+
+    def setUp(self):
+        self.pnode = build_network(10, 30)
+        self.platform_ids = platform_ids(self.pnode)
+        self.oms = SimulatedOms(self.pnode)
+        self.attrs = [(attr_id, 3600000000.0 + index) for index, attr_id in enumerate(ATTRIBUTES)]
+
+    def _serve(self, multicall=True):
+        server = OmsServer(self.oms, multicall)
+        self.addCleanup(server.stop)
+        return server
+
+    def _poll_cycle(self, poller, platforms=None):
+        """
+        One polling cycle, every platform driver polls its attributes from its
+        own thread as the platform agents do.
+        @retval ({platform_id: response or exception}, cycle time)
+        """
+        platforms = platforms or self.platform_ids
+        responses = {}
+
+        def poll(platform_id):
+            try:
+                responses[platform_id] = poller.get_platform_attribute_values(platform_id, self.attrs)
+            except Exception as e:
+                responses[platform_id] = e
+
+        threads = [threading.Thread(target=poll, args=(platform_id,)) for platform_id in platforms]
+        start_time = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return responses, time.time() - start_time
+
+    def _assert_responses(self, responses, platforms=None):
+        platforms = platforms or self.platform_ids
+        self.assertEqual(sorted(responses), sorted(platforms))
+        for platform_id in platforms:
+            self.assertEqual(responses[platform_id],
+                             {platform_id: expected_values(platform_id, self.attrs)})
+
+    def _register_all(self, poller, rsn_oms):
+        for platform_id in self.platform_ids:
+            poller.register(platform_id, rsn_oms)
+
+    def test_multicall(self):
+        """
+        Verify a polling cycle of all the platforms is a single multicall,
+        rather than one call per platform.
+        """
+        server = self._serve()
+        rsn_oms = xmlrpclib.ServerProxy(server.uri, allow_none=True)
+
+        for platform_id in self.platform_ids:
+            self.assertEqual(rsn_oms.attr.get_platform_attribute_values(platform_id, self.attrs),
+                             {platform_id: expected_values(platform_id, self.attrs)})
+        self.assertEqual(server.num_requests, len(self.platform_ids))
+
+        poller = AttributePoller(server.uri)
+        self._register_all(poller, rsn_oms)
+
+        server.num_requests = 0
+        responses, cycle_time = self._poll_cycle(poller)
+        self._assert_responses(responses)
+        self.assertEqual(server.num_requests, 1)
+
+        # following cycles are batched the same way
+        responses, cycle_time = self._poll_cycle(poller)
+        self._assert_responses(responses)
+        self.assertEqual(server.num_requests, 2)
+
+    def test_concurrent(self):
+        """
+        Verify the requests are sent as concurrent calls when the server does
+        not support multicall.
+        """
+        server = self._serve(multicall=False)
+        poller = AttributePoller(server.uri, max_workers=4)
+        self._register_all(poller, xmlrpclib.ServerProxy(server.uri, allow_none=True))
+
+        responses, cycle_time = self._poll_cycle(poller)
+        self._assert_responses(responses)
+        # the rejected multicall plus one request per platform
+        self.assertEqual(server.num_requests, len(self.platform_ids) + 1)
+
+        server.num_requests = 0
+        responses, cycle_time = self._poll_cycle(poller)
+        self._assert_responses(responses)
+        self.assertEqual(server.num_requests, len(self.platform_ids))
+
+    def test_embedded(self):
+        """
+        Verify polling through an embedded simulator instance.
+        """
+        poller = AttributePoller('embsimulator')
+        self._register_all(poller, self.oms)
+
+        responses, cycle_time = self._poll_cycle(poller)
+        self._assert_responses(responses)
+
+    def test_window(self):
+        """
+        Verify the collected requests are sent after the window when a
+        registered platform does not poll.
+        """
+        server = self._serve()
+        poller = AttributePoller(server.uri, window=2.0)
+        self._register_all(poller, xmlrpclib.ServerProxy(server.uri, allow_none=True))
+
+        polling = self.platform_ids[:-1]
+        responses, cycle_time = self._poll_cycle(poller, polling)
+        self._assert_responses(responses, polling)
+        self.assertEqual(server.num_requests, 1)
+        self.assertGreaterEqual(cycle_time, 2.0)
+
+        # a platform that no longer polls does not delay the others
+        poller.unregister(self.platform_ids[-1])
+        responses, cycle_time = self._poll_cycle(poller, polling)
+        self._assert_responses(responses, polling)
+        self.assertEqual(server.num_requests, 2)
+        self.assertLess(cycle_time, 2.0)
+
+    def test_invalid_platform(self):
+        """
+        Verify an invalid platform gets the same response as with a direct
+        call, and a failing request only fails the request of that platform.
+        """
+        server = self._serve()
+        rsn_oms = xmlrpclib.ServerProxy(server.uri, allow_none=True)
+        poller = AttributePoller(server.uri)
+        self._register_all(poller, rsn_oms)
+        poller.register('BOGUS', rsn_oms)
+        poller.register('FAULT', rsn_oms)
+
+        responses, cycle_time = self._poll_cycle(poller, self.platform_ids + ['BOGUS', 'FAULT'])
+        self.assertEqual(responses.pop('BOGUS'), rsn_oms.attr.get_platform_attribute_values('BOGUS', self.attrs))
+        self.assertIsInstance(responses.pop('FAULT'), xmlrpclib.Fault)
+        self._assert_responses(responses)
+        self.assertEqual(server.num_requests, 2)
+
+    def test_get_poller(self):
+        """
+        Verify drivers with the same OMS URI share a poller, which is
+        discarded when the last platform unregisters.
+        """
+        poller = AttributePoller.get_poller('http://oms:9021')
+        self.assertIs(AttributePoller.get_poller('http://oms:9021'), poller)
+        self.assertIsNot(AttributePoller.get_poller('http://other:9021'), poller)
+
+        poller.register('ROOT', self.oms)
+        poller.register('BRANCH_00', self.oms)
+        poller.unregister('ROOT')
+        self.assertIs(AttributePoller.get_poller('http://oms:9021'), poller)
+        poller.unregister('BRANCH_00')
+        self.assertIsNot(AttributePoller.get_poller('http://oms:9021'), poller)
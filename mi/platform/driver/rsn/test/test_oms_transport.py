@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+
+"""
+@package mi.platform.driver.rsn.test.test_oms_transport
+@file    mi/platform/driver/rsn/test/test_oms_transport.py
+@brief   Test cases for the pooled keep-alive transport of the OMS clients.
+
+         The OMS stand-in is the CIOMSClient simulation of the attribute
+         poller tests, served over a local HTTP/1.1 xmlrpc server that
+         counts the connections it accepts.
+"""
+
+__license__ = 'Apache 2.0'
+
+import threading
+import time
+import xmlrpclib
+
+from nose.plugins.attrib import attr
+
+from mi.core.log import get_logger ; log = get_logger()
+from mi.core.unit_test import MiUnitTestCase
+
+from mi.platform.driver.rsn.oms_transport import PooledTransport, create_server_proxy, get_shared_transport
+from mi.platform.driver.rsn.test.test_attribute_poller import ATTRIBUTES, CountingRequestHandler, OmsServer, \
+    SimulatedOms, build_network, expected_values, platform_ids
+
+
+class KeepAliveRequestHandler(CountingRequestHandler):
+    """
+    HTTP/1.1 request handler, keeping the connections open between requests.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        self.server.num_connections += 1
+        CountingRequestHandler.setup(self)
+
+
+class KeepAliveOmsServer(OmsServer):
+    """
+    Serves a SimulatedOms counting the connections and the http requests.
+    Idle connections are closed after idle_timeout seconds, or after every
+    request if keep_alive is False.
+    """
+    def __init__(self, oms, idle_timeout=None, keep_alive=True):
+        class Handler(KeepAliveRequestHandler):
+            timeout = idle_timeout
+            protocol_version = 'HTTP/1.1' if keep_alive else 'HTTP/1.0'
+
+        self.num_connections = 0
+        OmsServer.__init__(self, oms, multicall=False, request_handler=Handler)
+
+
+@attr('UNIT', group='mi')
+class TestOmsTransport(MiUnitTestCase):
+
+    def setUp(self):
+        self.pnode = build_network(4, 10)
+        self.platform_ids = platform_ids(self.pnode)
+        self.oms = SimulatedOms(self.pnode)
+        self.attrs = [(attr_id, 3600000000.0 + index) for index, attr_id in enumerate(ATTRIBUTES)]
+
+    def _serve(self, idle_timeout=None):
+        server = KeepAliveOmsServer(self.oms, idle_timeout)
+        self.addCleanup(server.stop)
+        return server
+
+    def _transport(self, **kwargs):
+        transport = PooledTransport(**kwargs)
+        self.addCleanup(transport.close)
+        return transport
+
+    def _poll(self, rsn_oms, platform_id):
+        self.assertEqual(rsn_oms.attr.get_platform_attribute_values(platform_id, self.attrs),
+                         {platform_id: expected_values(platform_id, self.attrs)})
+
+    def test_keep_alive(self):
+        """
+        Verify consecutive requests from different proxies share a single
+        connection.
+        """
+        server = self._serve()
+        transport = self._transport()
+        for platform_id in self.platform_ids:
+            self._poll(xmlrpclib.ServerProxy(server.uri, transport=transport, allow_none=True), platform_id)
+
+        self.assertEqual(server.num_requests, len(self.platform_ids))
+        self.assertEqual(server.num_connections, 1)
+        self.assertEqual(transport.get_pool('localhost:%d' % server.server_address[1]).num_idle, 1)
+
+    def test_fault(self):
+        """
+        Verify a Fault is raised to the caller and the connection is still reused.
+        """
+        server = self._serve()
+        rsn_oms = xmlrpclib.ServerProxy(server.uri, transport=self._transport(), allow_none=True)
+
+        self._poll(rsn_oms, 'ROOT')
+        self.assertRaises(xmlrpclib.Fault, rsn_oms.attr.get_platform_attribute_values, 'FAULT', self.attrs)
+        self._poll(rsn_oms, 'ROOT')
+        self.assertEqual(server.num_connections, 1)
+
+    def test_dropped_connection(self):
+        """
+        Verify a connection closed by the server while idle is not reused.
+        """
+        server = self._serve(idle_timeout=0.2)
+        transport = self._transport()
+        rsn_oms = xmlrpclib.ServerProxy(server.uri, transport=transport, allow_none=True)
+
+        self._poll(rsn_oms, 'ROOT')
+        time.sleep(0.5)
+        self._poll(rsn_oms, 'ROOT')
+        self.assertEqual(server.num_connections, 2)
+
+        pool = transport.get_pool('localhost:%d' % server.server_address[1])
+        self.assertEqual(pool.connections_created, 2)
+        self.assertEqual(pool.connections_discarded, 1)
+
+    def test_max_idle(self):
+        """
+        Verify connections idle for longer than max_idle are not reused.
+        """
+        server = self._serve()
+        rsn_oms = xmlrpclib.ServerProxy(server.uri, transport=self._transport(max_idle=0.1), allow_none=True)
+
+        self._poll(rsn_oms, 'ROOT')
+        self._poll(rsn_oms, 'ROOT')
+        self.assertEqual(server.num_connections, 1)
+        time.sleep(0.2)
+        self._poll(rsn_oms, 'ROOT')
+        self.assertEqual(server.num_connections, 2)
+
+    def test_pool_size(self):
+        """
+        Verify concurrent requests never open more than max_size connections.
+        """
+        server = self._serve()
+        transport = self._transport(max_size=2)
+        errors = []
+
+        def poll():
+            rsn_oms = xmlrpclib.ServerProxy(server.uri, transport=transport, allow_none=True)
+            try:
+                for platform_id in self.platform_ids:
+                    self._poll(rsn_oms, platform_id)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=poll) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(server.num_requests, 10 * len(self.platform_ids))
+        self.assertLessEqual(server.num_connections, 2)
+
+    def test_shared_transport(self):
+        """
+        Verify the proxies created for OMS all share the same transport.
+        """
+        proxy = create_server_proxy('http://oms:9021')
+        self.assertIs(proxy._ServerProxy__transport, get_shared_transport('http://other:9021'))
+        self.assertIsNot(get_shared_transport('https://oms:9021'), get_shared_transport('http://oms:9021'))
+
+    def test_connections(self):
+        """
+        Compare the connections opened by concurrent drivers each using its
+        own proxy, connecting per request as with an HTTP/1.0 OMS or keeping
+        one connection alive, against the shared pooled transport.
+        """
+        num_drivers = len(self.platform_ids)
+        num_rounds = 5
+
+        def run(server, create_proxy):
+            requests = []
+            errors = []
+
+            def driver(platform_id):
+                rsn_oms = create_proxy(server.uri)
+                try:
+                    for _ in range(num_rounds):
+                        requests.append(rsn_oms.attr.get_platform_attribute_values(platform_id, self.attrs))
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=driver, args=(platform_id,)) for platform_id in self.platform_ids]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            self.assertEqual(errors, [])
+            self.assertEqual(len(requests), num_drivers * num_rounds)
+            return server.num_connections
+
+        per_request_server = KeepAliveOmsServer(self.oms, keep_alive=False)
+        self.addCleanup(per_request_server.stop)
+
+        transport = self._transport()
+        self.assertEqual(run(per_request_server, lambda uri: xmlrpclib.ServerProxy(uri, allow_none=True)),
+                         num_drivers * num_rounds)
+        self.assertEqual(run(self._serve(), lambda uri: xmlrpclib.ServerProxy(uri, allow_none=True)),
+                         num_drivers)
+        self.assertLessEqual(run(self._serve(), lambda uri: xmlrpclib.ServerProxy(uri, transport=transport,
+                                                                                  allow_none=True)),
+                             transport._max_size)
@@ -11,12 +11,39 @@ __author__ = 'Carlos Rueda'
 __license__ = 'Apache 2.0'
 
 
+import hashlib
+import marshal
+
+
+def _sorted_items(value):
+    """
+    The entries of a definition dict in a canonical order.
+    """
+    return sorted(value.iteritems())
+
+
+def _encode(canonical):
+    """
+    Encodes a canonical representation for hashing. marshal is fast and
+    gives different encodings for different values of the basic types; for
+    anything else the repr is used. (Version 0 of the format, as the later
+    ones encode the same string differently depending on it being interned.)
+    """
+    try:
+        return marshal.dumps(canonical, 0)
+    except ValueError:
+        return repr(canonical)
+
+
 class BaseNode(object):
     """
     A convenient base class for the components of a platform network.
     """
     def __init__(self):
-        pass
+        # cached digest, see digest
+        self._digest = None
+        # node containing this one, whose digest depends on this one's
+        self._digest_container = None
 
     def diff(self, other):
         """
@@ -25,6 +52,41 @@ class BaseNode(object):
         """
         raise NotImplementedError()  # pragma: no cover
 
+    @property
+    def digest(self):
+        """
+        Hash of the canonical representation of this node, including
+        everything compared by diff. Nodes with the same digest are the same
+        so diff can skip them; nodes with different digests are compared in
+        full (equal values may still have different representations, eg.
+        1 and 1.0, or nested dicts).
+
+        The digest is cached. Modifications through the methods of the nodes
+        update it, but in-place modifications of a definition (for example
+        AttrNode.defn) must be followed by invalidate_digest.
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha1(_encode(self._canonical())).hexdigest()
+        return self._digest
+
+    def invalidate_digest(self):
+        """
+        Discards the cached digest of this node and of the nodes containing it.
+        """
+        self._digest = None
+        node = self._digest_container
+        # a platform without digest has no containers with a digest either
+        while node is not None and node._digest is not None:
+            node._digest = None
+            node = node._digest_container
+
+    def _canonical(self):
+        """
+        Canonical representation of this node for the digest, made of
+        tuples, lists and the values in the node.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
 
 class AttrNode(BaseNode):
     """
@@ -56,6 +118,9 @@ class AttrNode(BaseNode):
     def __repr__(self):
         return "AttrNode{id=%s, defn=%s}" % (self.attr_id, self.defn)
 
+    def _canonical(self):
+        return self.attr_id, _sorted_items(self.defn)
+
     @property
     def attr_name(self):
         return self._attr_name
@@ -105,6 +170,10 @@ class PortNode(BaseNode):
         return "PortNode{port_id=%r, instrument_ids=%r}" % (
             self.port_id, self.instrument_ids)
 
+    def _canonical(self):
+        # instruments are compared as a set
+        return self.port_id, sorted(self.instrument_ids)
+
     @property
     def port_id(self):
         return self._port_id
@@ -121,12 +190,14 @@ class PortNode(BaseNode):
             raise Exception('duplicate instrument_id=%r for port_id=%r' % (
                             instrument_id, self.port_id))
         self._instrument_ids.append(instrument_id)
+        self.invalidate_digest()
 
     def remove_instrument_id(self, instrument_id):
         if instrument_id not in self._instrument_ids:
             raise Exception('no such instrument_id=%r in port_id=%r' % (
                             instrument_id, self.port_id))
         self._instrument_ids.remove(instrument_id)
+        self.invalidate_digest()
 
     def diff(self, other):
         """
@@ -169,6 +240,9 @@ class InstrumentNode(BaseNode):
         return "InstrumentNode{id=%s, attrs=%s}" % (
             self.instrument_id, self.attrs)
 
+    def _canonical(self):
+        return self.instrument_id, _sorted_items(self.attrs)
+
     @property
     def instrument_id(self):
         return self._instrument_id
@@ -231,16 +305,21 @@ class PlatformNode(BaseNode):
 
     def set_name(self, name):
         self._name = name
+        self.invalidate_digest()
 
     def add_port(self, port):
         if port.port_id in self._ports:
             raise Exception('%s: duplicate port ID' % port.port_id)
         self._ports[port.port_id] = port
+        port._digest_container = self
+        self.invalidate_digest()
 
     def add_attribute(self, attr):
         if attr.attr_id in self._attrs:
             raise Exception('%s: duplicate attribute ID' % attr.attr_id)
         self._attrs[attr.attr_id] = attr
+        attr._digest_container = self
+        self.invalidate_digest()
 
     @property
     def platform_id(self):
@@ -278,6 +357,8 @@ class PlatformNode(BaseNode):
             raise Exception('%s: duplicate subplatform ID' % pn.platform_id)
         self._subplatforms[pn.platform_id] = pn
         pn._parent = self
+        pn._digest_container = self
+        self.invalidate_digest()
 
     @property
     def instruments(self):
@@ -312,6 +393,14 @@ class PlatformNode(BaseNode):
             sub_platform.get_map(pairs)
         return pairs
 
+    def _canonical(self):
+        # what diff compares, with the digests of the subplatforms (the parent
+        # is not included, and neither are the instruments)
+        return (self.platform_id, self.name,
+                [self.attrs[attr_id]._canonical() for attr_id in sorted(self.attrs)],
+                [self.ports[port_id]._canonical() for port_id in sorted(self.ports)],
+                [(platform_id, self.subplatforms[platform_id].digest) for platform_id in sorted(self.subplatforms)])
+
     def diff(self, other):
         """
         Returns None if the two PlatformNode's represent the same topology and
@@ -334,6 +423,10 @@ class PlatformNode(BaseNode):
             return "platform parents are different: %r != %r" % (
                 self.parent.platform_id, other.parent.platform_id)
 
+        # same attributes, ports and subplatforms all the way down:
+        if self.digest == other.digest:
+            return None
+
         # compare attributes:
         attr_ids = set(self.attrs.iterkeys())
         other_attr_ids = set(other.attrs.iterkeys())
@@ -415,6 +508,14 @@ class NetworkDefinition(BaseNode):
             root = self._dummy_root.subplatforms.values()[0]
         return root
 
+    @property
+    def digest(self):
+        """
+        Digest of the root PlatformNode, None if there is no single root.
+        """
+        root = self.root
+        return root.digest if root is not None else None
+
     def get_map(self):
         """
         Helper for getting the list of (platform_id, parent_platform_id) pairs.
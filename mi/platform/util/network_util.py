@@ -22,6 +22,9 @@ from mi.platform.util.network import NetworkDefinition
 import yaml
 from collections import OrderedDict
 
+# the network definitions are plain yaml, use the libyaml parser if available
+_YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 class NetworkDefinitionException(Exception):
     def __init__(self, msg=''):
@@ -39,7 +42,8 @@ class NetworkUtil(object):
         """
         Creates a NetworkDefinition object by deserializing the given argument.
 
-        @param ser representation of the given serialization
+        @param ser representation of the given serialization, a string or
+                   an open file
         @return A NetworkDefinition object
         """
 
@@ -106,7 +110,7 @@ class NetworkUtil(object):
             for platObj in pyobj["network"]:
                 build_node(platObj, ndef._dummy_root)
 
-        pyobj = yaml.load(ser)
+        pyobj = yaml.load(ser, Loader=_YamlLoader)
         _build_network(pyobj)
 
         return ndef
@@ -119,10 +123,32 @@ class NetworkUtil(object):
         @param ndef NetworkDefinition object
         @return string with the serialization
         """
-        ser = "\n%s\n%s" % ("# (generated from PlatformNode object)",
-                            NetworkUtil.serialize_pnode(ndef.root))
+        return ''.join(NetworkUtil.iter_network_definition(ndef))
 
-        return ser
+    @staticmethod
+    def write_network_definition(ndef, out):
+        """
+        Writes the serialization of the given NetworkDefinition object to a
+        file, without building the whole serialization in memory.
+
+        @param ndef NetworkDefinition object
+        @param out  file-like object to write to
+        """
+        for chunk in NetworkUtil.iter_network_definition(ndef):
+            out.write(chunk)
+
+    @staticmethod
+    def iter_network_definition(ndef):
+        """
+        Generates the serialization of the given NetworkDefinition object,
+        one platform at a time.
+
+        @param ndef NetworkDefinition object
+        @return iterator over the strings making up the serialization
+        """
+        yield "\n%s\n" % "# (generated from PlatformNode object)"
+        for chunk in NetworkUtil.iter_pnode(ndef.root):
+            yield chunk
 
     @staticmethod
     def serialize_pnode(pnode, level=0):
@@ -133,50 +159,67 @@ class NetworkUtil(object):
         @param level Indentation level (0 by default)
         @return string with the serialization
         """
+        return ''.join(NetworkUtil.iter_pnode(pnode, level))
 
-        result = ""
-        next_level = level
-        if pnode.platform_id:
-            pid = pnode.platform_id
-            lines = []
-            if level == 0:
-                lines.append('network:')
-
-            lines.append('- platform_id: %s' % pid)
+    @staticmethod
+    def iter_pnode(pnode, level=0):
+        """
+        Generates the serialization of the given PlatformNode object, one
+        platform at a time.
 
-            # attributes:
-            if len(pnode.attrs):
-                lines.append('  attrs:')
-                for attr_id, attr in pnode.attrs.iteritems():
-                    lines.append('  - attr_id: %s' % attr_id)
-                    for k, v in attr.defn.iteritems():
-                        if k != "attr_id":
-                            lines.append('    %s: %s' % (k, v))
-
-            # ports
-            if len(pnode.ports):
-                lines.append('  ports:')
-                for port_id, port in pnode.ports.iteritems():
-                    lines.append('  - port_id: %s' % port_id)
-
-                    # instruments
-                    if len(port.instrument_ids):
-                        lines.append('    instruments:')
-                        for instrument_id in port.instrument_ids:
-                            lines.append('    - instrument_id: %s' % instrument_id)
+        @param pnode The PlatformNode to serialize
+        @param level Indentation level (0 by default)
+        @return iterator over the strings making up the serialization
+        """
+        # depth-first traversal with an explicit stack, each entry being
+        # the iterator over the subplatforms of a node and their level
+        stack = [(iter([pnode]), level)]
+        while stack:
+            pnode = next(stack[-1][0], None)
+            if pnode is None:
+                stack.pop()
+                continue
+
+            level = stack[-1][1]
+            next_level = level
+            if pnode.platform_id:
+                pid = pnode.platform_id
+                lines = []
+                if level == 0:
+                    lines.append('network:')
+
+                lines.append('- platform_id: %s' % pid)
+
+                # attributes:
+                if len(pnode.attrs):
+                    lines.append('  attrs:')
+                    for attr_id, attr in pnode.attrs.iteritems():
+                        lines.append('  - attr_id: %s' % attr_id)
+                        for k, v in attr.defn.iteritems():
+                            if k != "attr_id":
+                                lines.append('    %s: %s' % (k, v))
+
+                # ports
+                if len(pnode.ports):
+                    lines.append('  ports:')
+                    for port_id, port in pnode.ports.iteritems():
+                        lines.append('  - port_id: %s' % port_id)
+
+                        # instruments
+                        if len(port.instrument_ids):
+                            lines.append('    instruments:')
+                            for instrument_id in port.instrument_ids:
+                                lines.append('    - instrument_id: %s' % instrument_id)
+
+                if pnode.subplatforms:
+                    lines.append('  subplatforms:')
+
+                nl = "\n" + ("  " * level)
+                yield nl + nl.join(lines)
+                next_level = level + 1
 
             if pnode.subplatforms:
-                lines.append('  subplatforms:')
-
-            nl = "\n" + ("  " * level)
-            result += nl + nl.join(lines)
-            next_level = level + 1
-
-        if pnode.subplatforms:
-            for sub_platform in pnode.subplatforms.itervalues():
-                result += NetworkUtil.serialize_pnode(sub_platform, next_level)
-
-        return result
+                stack.append((pnode.subplatforms.itervalues(), next_level))
 
     @staticmethod
     def _dump_pnode(pnode, indent_level=0, only_topology=False,
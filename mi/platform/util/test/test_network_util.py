@@ -14,12 +14,18 @@ __license__ = 'Apache 2.0'
 # bin/nosetests -sv ion.agents.platform.util.test.test_network_util:Test.test_serialization_deserialization
 # bin/nosetests -sv ion.agents.platform.util.test.test_network_util:Test.test_create_network_definition_from_ci_config_bad
 # bin/nosetests -sv ion.agents.platform.util.test.test_network_util:Test.test_create_network_definition_from_ci_config
+# bin/nosetests -sv ion.agents.platform.util.test.test_network_util:Test.test_large_network
 #
 
 from pyon.public import log
 import logging
 import unittest
+from StringIO import StringIO
 
+from mi.platform.util.network import AttrNode
+from mi.platform.util.network import NetworkDefinition
+from mi.platform.util.network import PlatformNode
+from mi.platform.util.network import PortNode
 from mi.platform.util.network_util import NetworkUtil
 from mi.platform.util.network_util import NetworkDefinitionException
 
@@ -29,6 +35,44 @@ from pyon.util.unit_test import IonUnitTestCase
 from nose.plugins.attrib import attr
 
 
+def _build_large_network(num_branches, num_leaves, num_attrs=8, num_ports=4):
+    """
+    Builds a synthetic NetworkDefinition: a root platform with num_branches
+    subplatforms each having num_leaves subplatforms, every platform with
+    num_attrs attributes and num_ports ports with two instruments each.
+    """
+    ndef = NetworkDefinition()
+    ndef._pnodes = {}
+
+    def create_node(platform_id, parent_node):
+        pn = PlatformNode(platform_id)
+        ndef.pnodes[platform_id] = pn
+        if parent_node is None:
+            return pn
+        parent_node.add_subplatform(pn)
+        for index in range(num_attrs):
+            pn.add_attribute(AttrNode('attr_%d' % index, {'monitor_cycle_seconds': 5,
+                                                         'units': 'Volts',
+                                                         'min_val': -1.5 * index,
+                                                         'max_val': 10 * index,
+                                                         'read_write': 'read',
+                                                         'type': 'float'}))
+        for index in range(num_ports):
+            port = PortNode('%s_port_%d' % (platform_id, index))
+            port.add_instrument_id('%s_instrument_%d_A' % (platform_id, index))
+            port.add_instrument_id('%s_instrument_%d_B' % (platform_id, index))
+            pn.add_port(port)
+        return pn
+
+    ndef._dummy_root = create_node('', None)
+    root = create_node('ROOT', ndef._dummy_root)
+    for branch in range(num_branches):
+        branch_node = create_node('BRANCH_%03d' % branch, root)
+        for leaf in range(num_leaves):
+            create_node('LEAF_%03d_%03d' % (branch, leaf), branch_node)
+    return ndef
+
+
 @attr('UNIT', group='sa')
 class Test(IonUnitTestCase):
 
@@ -245,3 +289,63 @@ class Test(IonUnitTestCase):
         for attr_name in common_attr_names:
             self.assertIn(attr_name, LJ01D.attrs)
 
+    #
+    # Digests, diffs and serialization of large networks.
+    #
+
+    def test_digest(self):
+        ndef = _build_large_network(3, 4)
+        ndef2 = _build_large_network(3, 4)
+        self.assertEqual(ndef.digest, ndef2.digest)
+        self.assertIsNone(ndef.diff(ndef2))
+
+        # changes through the node methods update the digests:
+        leaf = ndef2.pnodes['LEAF_002_003']
+        leaf.get_port('LEAF_002_003_port_1').remove_instrument_id('LEAF_002_003_instrument_1_B')
+        self.assertNotEqual(ndef.digest, ndef2.digest)
+        self.assertIn("instrument_ids are different", ndef.diff(ndef2))
+
+        leaf.get_port('LEAF_002_003_port_1').add_instrument_id('LEAF_002_003_instrument_1_B')
+        self.assertEqual(ndef.digest, ndef2.digest)
+
+        # in-place changes require invalidate_digest:
+        attr = leaf.attrs['attr_3|0']
+        attr.defn['units'] = 'mV'
+        attr.invalidate_digest()
+        self.assertNotEqual(ndef.digest, ndef2.digest)
+        self.assertIn("Attribute definitions are different", ndef.diff(ndef2))
+
+        # equal values with different representations are still equal:
+        attr.defn['units'] = 'Volts'
+        attr.defn['max_val'] = float(attr.defn['max_val'])
+        attr.invalidate_digest()
+        self.assertNotEqual(ndef.digest, ndef2.digest)
+        self.assertIsNone(ndef.diff(ndef2))
+
+        ndef2.pnodes['BRANCH_001'].set_name('renamed')
+        self.assertIn("platform names are different", ndef.diff(ndef2))
+
+    def test_write_network_definition(self):
+        ndef = _build_large_network(3, 4)
+        out = StringIO()
+        NetworkUtil.write_network_definition(ndef, out)
+        self.assertEqual(out.getvalue(), NetworkUtil.serialize_network_definition(ndef))
+
+        out.seek(0)
+        ndef2 = NetworkUtil.deserialize_network_definition(out)
+        self.assertEqual(sorted(ndef2.pnodes), sorted(ndef.pnodes))
+        self.assertIsNone(ndef.diff(ndef2))
+
+    def test_large_network(self):
+        ndef = _build_large_network(50, 60)
+
+        out = StringIO()
+        NetworkUtil.write_network_definition(ndef, out)
+        out.seek(0)
+        ndef2 = NetworkUtil.deserialize_network_definition(out)
+        self.assertIsNone(ndef.diff(ndef2))
+
+        attr = ndef2.pnodes['LEAF_049_059'].attrs['attr_7|0']
+        attr.defn['units'] = 'mV'
+        attr.invalidate_digest()
+        self.assertIn("Attribute definitions are different", ndef.diff(ndef2))